@@ -10,7 +10,8 @@ import json
 import uuid
 import time
 import threading
-from queue import Queue, Empty
+import itertools
+from queue import PriorityQueue, Empty
 from typing import Dict, Any, Optional, Callable, List
 from pathlib import Path
 from datetime import datetime
@@ -35,6 +36,7 @@ class TaskStatus:
     """Task status constants"""
     PENDING = "pending"
     RUNNING = "running"
+    PAUSED = "paused"
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
@@ -43,10 +45,11 @@ class TaskStatus:
 class Task:
     """Task representation"""
     
-    def __init__(self, task_id: str, task_type: str, params: Dict[str, Any]):
+    def __init__(self, task_id: str, task_type: str, params: Dict[str, Any], priority: int = 0):
         self.task_id = task_id
         self.task_type = task_type
         self.params = params
+        self.priority = priority
         self.status = TaskStatus.PENDING
         self.progress = 0
         self.result = None
@@ -54,6 +57,7 @@ class Task:
         self.created_at = datetime.now()
         self.started_at = None
         self.completed_at = None
+        self.cancel_requested = False
         
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -61,6 +65,7 @@ class Task:
             'task_id': self.task_id,
             'task_type': self.task_type,
             'params': self.params,
+            'priority': self.priority,
             'status': self.status,
             'progress': self.progress,
             'result': self.result,
@@ -116,18 +121,19 @@ class SessionManager:
 
 
 class TaskQueue:
-    """Task queue manager"""
+    """Task queue manager (higher priority first, FIFO within a priority)"""
     
     def __init__(self):
         self.tasks: Dict[str, Task] = {}
-        self.queue = Queue()
+        self.queue = PriorityQueue()
         self.lock = threading.Lock()
+        self._sequence = itertools.count()
     
     def add_task(self, task: Task):
         """Add task to queue"""
         with self.lock:
             self.tasks[task.task_id] = task
-            self.queue.put(task.task_id)
+            self.queue.put((-task.priority, next(self._sequence), task.task_id))
     
     def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID"""
@@ -137,12 +143,19 @@ class TaskQueue:
     def get_next_task(self, timeout: float = 1.0) -> Optional[Task]:
         """Get next task from queue"""
         try:
-            task_id = self.queue.get(timeout=timeout)
+            _, _, task_id = self.queue.get(timeout=timeout)
             with self.lock:
                 return self.tasks.get(task_id)
         except Empty:
             return None
     
+    def get_next_task_above(self, priority: int) -> Optional[Task]:
+        """Get next queued task with priority strictly above the given one"""
+        with self.queue.mutex:
+            if not self.queue.queue or -self.queue.queue[0][0] <= priority:
+                return None
+        return self.get_next_task(timeout=0.01)
+    
     def update_task_status(self, task_id: str, status: str, **kwargs):
         """Update task status"""
         with self.lock:
@@ -182,7 +195,9 @@ class GenesisAdvancedServer:
         engine: Optional[GenesisEngine] = None,
         host: str = "0.0.0.0",
         port: int = 5000,
-        debug: bool = False
+        debug: bool = False,
+        gpu_workers: bool = False,
+        workers_per_gpu: int = 1
     ):
         """
         Initialize advanced server
@@ -192,6 +207,8 @@ class GenesisAdvancedServer:
             host: Server host
             port: Server port
             debug: Debug mode
+            gpu_workers: Run tasks in one worker process per GPU (or GPU memory slice)
+            workers_per_gpu: Worker processes per GPU, each limited to its share of memory
         """
         if not FLASK_AVAILABLE:
             raise RuntimeError("Flask/SocketIO required")
@@ -200,6 +217,8 @@ class GenesisAdvancedServer:
         self.host = host
         self.port = port
         self.debug = debug
+        self.gpu_workers = gpu_workers
+        self.workers_per_gpu = workers_per_gpu
         
         # Create Flask app
         self.app = Flask(__name__)
@@ -222,9 +241,14 @@ class GenesisAdvancedServer:
         # Event callbacks
         self.event_callbacks: Dict[str, List[Callable]] = defaultdict(list)
         
-        # Worker thread
+        # Node output cache shared by per-request workflow converters
+        self.workflow_output_cache = None
+        self.workflow_lock = threading.Lock()
+        
+        # Worker thread, or worker processes when gpu_workers is enabled
         self.worker_thread = None
         self.worker_running = False
+        self.worker_pool = None
         
         # Setup routes
         self._setup_http_routes()
@@ -322,7 +346,24 @@ class GenesisAdvancedServer:
                 'status': 'healthy',
                 'initialized': self.engine._initialized,
                 'tasks_pending': self.task_queue.queue.qsize(),
-                'sessions_active': len(self.session_manager.sessions)
+                'sessions_active': len(self.session_manager.sessions),
+                'gpu_workers': len(self.worker_pool) if self.worker_pool else 0
+            })
+        
+        @self.app.route('/api/workers', methods=['GET'])
+        def list_workers():
+            """List GPU worker processes"""
+            if self.worker_pool is None:
+                return jsonify({
+                    'success': True,
+                    'mode': 'thread',
+                    'workers': []
+                })
+            
+            return jsonify({
+                'success': True,
+                'mode': 'gpu_pool',
+                **self.worker_pool.get_stats()
             })
         
         @self.app.route('/api/session/create', methods=['POST'])
@@ -349,6 +390,7 @@ class GenesisAdvancedServer:
                 task_type = data.get('task_type', 'generate')
                 params = data.get('params', {})
                 session_id = data.get('session_id')
+                priority = self._safe_get_param(data, 'priority', 0, int)
                 
                 # Validate and normalize parameters
                 if task_type == 'generate':
@@ -356,7 +398,7 @@ class GenesisAdvancedServer:
                 
                 # Create task
                 task_id = str(uuid.uuid4())
-                task = Task(task_id, task_type, params)
+                task = Task(task_id, task_type, params, priority)
                 
                 # Add to queue
                 self.task_queue.add_task(task)
@@ -406,16 +448,25 @@ class GenesisAdvancedServer:
                     'error': 'Task not found'
                 }), 404
             
-            if task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+            if task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
                 return jsonify({
                     'success': False,
                     'error': 'Task already finished'
                 }), 400
             
-            self.task_queue.update_task_status(
-                task_id,
-                TaskStatus.CANCELLED
-            )
+            if task.status in [TaskStatus.RUNNING, TaskStatus.PAUSED]:
+                # Running tasks stop at their next checkpoint; the worker marks them cancelled.
+                # The flag covers tasks whose execution has not begun yet.
+                task.cancel_requested = True
+                if self.worker_pool is not None:
+                    self.worker_pool.cancel(task_id)
+                elif self.engine.executor is not None:
+                    self.engine.executor.cancel(task_id)
+            else:
+                self.task_queue.update_task_status(
+                    task_id,
+                    TaskStatus.CANCELLED
+                )
             
             return jsonify({
                 'success': True,
@@ -472,7 +523,7 @@ class GenesisAdvancedServer:
         def execute_workflow():
             """Execute ComfyUI workflow"""
             try:
-                from ..core.workflow_converter import ComfyUIWorkflowConverter
+                from ..core.workflow_converter import ComfyUIWorkflowConverter, NodeOutputCache
                 
                 data = request.get_json() or {}
                 workflow = data.get('workflow')
@@ -483,7 +534,17 @@ class GenesisAdvancedServer:
                         'error': 'No workflow provided'
                     }), 400
                 
-                converter = ComfyUIWorkflowConverter()
+                max_workers = self._safe_get_param(data, 'max_workers', None, int)
+                
+                with self.workflow_lock:
+                    if self.workflow_output_cache is None:
+                        self.workflow_output_cache = NodeOutputCache()
+                
+                # Per-request converter, requests only share the (thread-safe) output cache
+                converter = ComfyUIWorkflowConverter(
+                    max_workers=self.engine.config.workflow_max_workers,
+                    output_cache=self.workflow_output_cache
+                )
                 
                 if not converter.parse_workflow(workflow):
                     return jsonify({
@@ -491,7 +552,10 @@ class GenesisAdvancedServer:
                         'error': 'Failed to parse workflow'
                     }), 400
                 
-                result = converter.execute_workflow()
+                result = converter.execute_workflow(
+                    use_cache=bool(data.get('use_cache', True)),
+                    max_workers=max_workers
+                )
                 
                 return jsonify(result)
                 
@@ -517,7 +581,9 @@ class GenesisAdvancedServer:
                         'error': 'No workflow provided'
                     }), 400
                 
-                converter = ComfyUIWorkflowConverter()
+                converter = ComfyUIWorkflowConverter(
+                    max_workers=self.engine.config.workflow_max_workers
+                )
                 
                 if converter.parse_workflow(workflow):
                     info = converter.get_workflow_info()
@@ -615,10 +681,11 @@ class GenesisAdvancedServer:
             """Submit task via WebSocket"""
             task_type = data.get('task_type', 'generate')
             params = data.get('params', {})
+            priority = self._safe_get_param(data, 'priority', 0, int)
             
             # Create task
             task_id = str(uuid.uuid4())
-            task = Task(task_id, task_type, params)
+            task = Task(task_id, task_type, params, priority)
             
             # Add to queue
             self.task_queue.add_task(task)
@@ -653,6 +720,7 @@ class GenesisAdvancedServer:
             'GET  /api/task/<task_id>',
             'POST /api/task/<task_id>/cancel',
             'GET  /api/tasks',
+            'GET  /api/workers',
             'GET  /api/models',
             'GET  /api/device',
             'POST /api/workflow/execute',
@@ -709,46 +777,98 @@ class GenesisAdvancedServer:
             if task is None:
                 continue
             
-            try:
-                # Update status
-                self.task_queue.update_task_status(
-                    task.task_id,
-                    TaskStatus.RUNNING
-                )
-                self.emit_progress(task.task_id, 0, "Starting task")
-                
-                # Initialize engine if needed
-                if not self.engine._initialized:
-                    self.engine.initialize()
-                    self.emit_progress(task.task_id, 10, "Engine initialized")
-                
-                # Execute task
-                if task.task_type == 'generate':
-                    result = self._execute_generate_task(task)
-                elif task.task_type == 'pipeline':
-                    result = self._execute_pipeline_task(task)
-                else:
-                    raise ValueError(f"Unknown task type: {task.task_type}")
-                
-                # Update status
-                self.task_queue.update_task_status(
-                    task.task_id,
-                    TaskStatus.COMPLETED,
-                    result=result,
-                    progress=100
-                )
-                self.emit_task_complete(task.task_id, result)
-                
-            except Exception as e:
-                # Update status
+            self._run_task(task)
+        
+        print("Worker thread stopped")
+    
+    def _run_task(self, task: Task):
+        """Execute a single task and record its outcome"""
+        if task.status == TaskStatus.CANCELLED:
+            return
+        
+        try:
+            # Update status
+            self.task_queue.update_task_status(
+                task.task_id,
+                TaskStatus.RUNNING
+            )
+            self.emit_progress(task.task_id, 0, "Starting task")
+            
+            # Initialize engine if needed
+            if not self.engine._initialized:
+                self.engine.initialize()
+                self.emit_progress(task.task_id, 10, "Engine initialized")
+            
+            if task.cancel_requested:
+                self.task_queue.update_task_status(task.task_id, TaskStatus.CANCELLED)
+                self.emit_task_error(task.task_id, 'Task cancelled')
+                return
+            
+            # Higher-priority tasks may preempt this one at stage boundaries
+            self.engine.executor.preempt_handler = lambda: self._run_preempting_tasks(task)
+            
+            # Execute task
+            if task.task_type == 'generate':
+                result = self._execute_generate_task(task)
+            elif task.task_type == 'pipeline':
+                result = self._execute_pipeline_task(task)
+            else:
+                raise ValueError(f"Unknown task type: {task.task_type}")
+            
+            if isinstance(result, dict) and result.get('status') == 'cancelled':
                 self.task_queue.update_task_status(
                     task.task_id,
-                    TaskStatus.FAILED,
-                    error=str(e)
+                    TaskStatus.CANCELLED,
+                    error=result.get('error')
                 )
-                self.emit_task_error(task.task_id, str(e))
+                self.emit_task_error(task.task_id, 'Task cancelled')
+                return
+            
+            # Update status
+            self.task_queue.update_task_status(
+                task.task_id,
+                TaskStatus.COMPLETED,
+                result=result,
+                progress=100
+            )
+            self.emit_task_complete(task.task_id, result)
+            
+        except Exception as e:
+            # Update status
+            self.task_queue.update_task_status(
+                task.task_id,
+                TaskStatus.FAILED,
+                error=str(e)
+            )
+            self.emit_task_error(task.task_id, str(e))
+        finally:
+            if self.engine.executor is not None:
+                self.engine.executor.preempt_handler = None
+    
+    def _run_preempting_tasks(self, running_task: Task):
+        """
+        Run queued tasks with higher priority than the running one
         
-        print("Worker thread stopped")
+        Called from executor checkpoints at stage boundaries (before
+        sampling, before saving), so the running task is paused while no
+        sampler state or activations are live, and the preempting tasks
+        execute on this thread.
+        """
+        next_task = self.task_queue.get_next_task_above(running_task.priority)
+        if next_task is None:
+            return
+        
+        self.task_queue.update_task_status(running_task.task_id, TaskStatus.PAUSED)
+        self.emit_progress(running_task.task_id, running_task.progress, "Paused for higher-priority task")
+        
+        try:
+            while next_task is not None:
+                self._run_task(next_task)
+                next_task = self.task_queue.get_next_task_above(running_task.priority)
+        finally:
+            self.engine.executor.preempt_handler = lambda: self._run_preempting_tasks(running_task)
+            self.task_queue.update_task_status(running_task.task_id, TaskStatus.RUNNING)
+            self.emit_progress(running_task.task_id, running_task.progress, "Resumed")
     
     def _execute_generate_task(self, task: Task) -> Dict[str, Any]:
         """Execute generation task"""
@@ -758,7 +878,7 @@ class GenesisAdvancedServer:
         self.emit_progress(task.task_id, 20, "Preparing generation")
         
         # Generate
-        result = self.engine.generate(**params)
+        result = self.engine.generate(**params, task_id=task.task_id)
         
         self.emit_progress(task.task_id, 90, "Finalizing")
         
@@ -774,12 +894,33 @@ class GenesisAdvancedServer:
         self.emit_progress(task.task_id, 20, "Executing pipeline")
         
         # Execute
-        result = self.engine.executor.execute_pipeline(pipeline)
+        result = self.engine.executor.execute_pipeline(pipeline, task_id=task.task_id)
         
         return result
     
     def start_worker(self):
-        """Start worker thread"""
+        """Start worker thread, or the GPU worker pool when enabled"""
+        if self.gpu_workers:
+            if self.worker_pool is None:
+                from .worker_pool import GPUWorkerPool
+                
+                pool = GPUWorkerPool(
+                    self.task_queue,
+                    self.engine.config,
+                    workers_per_gpu=self.workers_per_gpu,
+                    on_progress=self.emit_progress,
+                    on_complete=self.emit_task_complete,
+                    on_error=self.emit_task_error
+                )
+                if len(pool) > 0:
+                    self.worker_pool = pool
+                else:
+                    print("No GPUs available for worker pool, using worker thread")
+            
+            if self.worker_pool is not None:
+                self.worker_pool.start()
+                return
+        
         if self.worker_thread is None or not self.worker_thread.is_alive():
             self.worker_running = True
             self.worker_thread = threading.Thread(
@@ -789,7 +930,10 @@ class GenesisAdvancedServer:
             self.worker_thread.start()
     
     def stop_worker(self):
-        """Stop worker thread"""
+        """Stop worker thread and worker pool"""
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+        
         self.worker_running = False
         if self.worker_thread:
             self.worker_thread.join(timeout=5.0)
@@ -822,7 +966,9 @@ def create_advanced_server(
     config: Optional[GenesisConfig] = None,
     host: str = "0.0.0.0",
     port: int = 5000,
-    debug: bool = False
+    debug: bool = False,
+    gpu_workers: bool = False,
+    workers_per_gpu: int = 1
 ) -> GenesisAdvancedServer:
     """
     Create advanced server
@@ -832,12 +978,14 @@ def create_advanced_server(
         host: Server host
         port: Server port
         debug: Debug mode
+        gpu_workers: Run tasks in one worker process per GPU (or GPU memory slice)
+        workers_per_gpu: Worker processes per GPU
         
     Returns:
         GenesisAdvancedServer instance
     """
     engine = GenesisEngine(config or GenesisConfig())
-    server = GenesisAdvancedServer(engine, host, port, debug)
+    server = GenesisAdvancedServer(engine, host, port, debug, gpu_workers, workers_per_gpu)
     return server
 
 
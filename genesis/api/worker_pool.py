@@ -0,0 +1,455 @@
+"""
+Genesis GPU Worker Pool
+Device-bound worker processes for the advanced server task queue
+Author: eddy
+"""
+
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, List
+
+from ..core.config import GenesisConfig
+from .advanced_server import TaskStatus
+
+
+logger = logging.getLogger('Genesis.WorkerPool')
+
+
+# Messages sent to a worker process
+MSG_RUN = 'run'
+MSG_CANCEL = 'cancel'
+MSG_STOP = 'stop'
+
+# Messages sent back by worker processes
+MSG_READY = 'ready'
+MSG_PROGRESS = 'progress'
+MSG_DONE = 'done'
+
+
+def get_task_model_key(task_type: str, params: Dict[str, Any]) -> str:
+    """
+    Get the model a task needs, used for worker affinity
+
+    Args:
+        task_type: Task type
+        params: Task parameters
+
+    Returns:
+        Model key ('default' when the task does not name a model)
+    """
+    for key in ('model', 'checkpoint', 'model_path', 'model_name'):
+        value = params.get(key)
+        if value:
+            return str(value)
+    return 'default'
+
+
+def _worker_main(
+    worker_id: int,
+    device_id: int,
+    memory_fraction: float,
+    config_dict: Dict[str, Any],
+    inbox,
+    outbox
+):
+    """
+    Worker process entry point
+
+    Owns one GenesisEngine bound to a single GPU. A listener thread reads the
+    inbox so cancellation reaches the executor while a task is running.
+    """
+    import torch
+    from ..core.engine import GenesisEngine
+    from ..core.pipeline import Pipeline
+
+    config = GenesisConfig.from_dict({**config_dict, 'device_id': device_id})
+    engine = GenesisEngine(config)
+    engine.initialize()
+
+    if memory_fraction < 1.0 and torch.cuda.is_available():
+        torch.cuda.set_per_process_memory_fraction(memory_fraction, device_id)
+
+    pending = queue.Queue()
+
+    def listen():
+        while True:
+            message = inbox.get()
+            if message[0] == MSG_CANCEL:
+                engine.executor.cancel(message[1])
+            else:
+                pending.put(message)
+                if message[0] == MSG_STOP:
+                    return
+
+    threading.Thread(target=listen, daemon=True).start()
+    outbox.put((MSG_READY, worker_id))
+
+    while True:
+        message = pending.get()
+        if message[0] == MSG_STOP:
+            break
+
+        _, task_id, task_type, params = message
+
+        def on_progress(step, total, task_id=task_id):
+            # Sampler steps map to the 20-90% range used by the server
+            outbox.put((MSG_PROGRESS, worker_id, task_id, 20 + int(70 * step / max(total, 1)), f"Step {step}/{total}"))
+
+        engine.executor.progress_callback = on_progress
+        try:
+            if task_type == 'generate':
+                result = engine.generate(**params, task_id=task_id)
+            elif task_type == 'pipeline':
+                result = engine.executor.execute_pipeline(Pipeline.from_dict(params), task_id=task_id)
+            else:
+                raise ValueError(f"Unknown task type: {task_type}")
+            outbox.put((MSG_DONE, worker_id, task_id, result, None))
+        except Exception as e:
+            outbox.put((MSG_DONE, worker_id, task_id, None, str(e)))
+        finally:
+            engine.executor.progress_callback = None
+
+    engine.cleanup()
+
+
+class GPUWorker:
+    """State of one worker process, as seen by the pool"""
+
+    def __init__(self, worker_id: int, device_id: int, memory_fraction: float):
+        self.worker_id = worker_id
+        self.device_id = device_id
+        self.memory_fraction = memory_fraction
+        self.process = None
+        self.inbox = None
+        self.ready = False
+        self.current_task = None
+        self.resident_models: 'OrderedDict[str, float]' = OrderedDict()
+        self.restarts = 0
+        self.tasks_completed = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.ready and self.current_task is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'worker_id': self.worker_id,
+            'device_id': self.device_id,
+            'memory_fraction': self.memory_fraction,
+            'alive': self.process is not None and self.process.is_alive(),
+            'ready': self.ready,
+            'current_task': self.current_task.task_id if self.current_task else None,
+            'resident_models': list(self.resident_models),
+            'restarts': self.restarts,
+            'tasks_completed': self.tasks_completed
+        }
+
+
+class GPUWorkerPool:
+    """
+    Pool of device-bound worker processes
+
+    Features:
+    - One worker per GPU, or several per GPU each limited to a memory slice
+    - Model affinity: a task goes to an idle worker that already ran its model
+    - Otherwise load-balanced by free memory (MultiGPUManager.get_memory_info)
+    - Crashed workers are restarted; their running task is retried once
+    """
+
+    def __init__(
+        self,
+        task_queue,
+        config: GenesisConfig,
+        device_ids: Optional[List[int]] = None,
+        workers_per_gpu: int = 1,
+        max_restarts: int = 3,
+        max_task_retries: int = 1,
+        max_resident_models: int = 2,
+        on_progress: Optional[Callable] = None,
+        on_complete: Optional[Callable] = None,
+        on_error: Optional[Callable] = None
+    ):
+        """
+        Initialize worker pool
+
+        Args:
+            task_queue: Server TaskQueue to pull tasks from
+            config: Engine configuration (device_id is set per worker)
+            device_ids: GPUs to use, all visible GPUs if None
+            workers_per_gpu: Workers per GPU, each gets 1/workers_per_gpu of its memory
+            max_restarts: Restarts allowed per worker before it is left down
+            max_task_retries: Times a task is requeued after its worker crashed
+            max_resident_models: Models remembered per worker for affinity
+            on_progress: Callback(task_id, progress, message)
+            on_complete: Callback(task_id, result)
+            on_error: Callback(task_id, error)
+        """
+        from ..core.multi_backend import MultiGPUManager
+
+        self.task_queue = task_queue
+        self.config = config
+        self.gpu_manager = MultiGPUManager()
+        self.max_restarts = max_restarts
+        self.max_task_retries = max_task_retries
+        self.max_resident_models = max_resident_models
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.on_error = on_error
+
+        if device_ids is None:
+            device_ids = list(range(self.gpu_manager.device_count))
+
+        workers_per_gpu = max(1, workers_per_gpu)
+        self.workers: List[GPUWorker] = [
+            GPUWorker(i * workers_per_gpu + j, device_id, 1.0 / workers_per_gpu)
+            for i, device_id in enumerate(device_ids)
+            for j in range(workers_per_gpu)
+        ]
+
+        # CUDA cannot be re-initialized in a forked child
+        self._mp = multiprocessing.get_context('spawn')
+        self.outbox = self._mp.Queue()
+        self.condition = threading.Condition()
+        self.task_retries: Dict[str, int] = {}
+        self.running = False
+        self._threads: List[threading.Thread] = []
+
+    def __len__(self) -> int:
+        return len(self.workers)
+
+    def start(self):
+        """Start worker processes and the dispatch / collect threads"""
+        if self.running:
+            return
+
+        self.running = True
+        for worker in self.workers:
+            self._spawn(worker)
+
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, daemon=True),
+            threading.Thread(target=self._collect_loop, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        logger.info(f"Worker pool started: {len(self.workers)} workers on GPUs "
+                    f"{sorted(set(w.device_id for w in self.workers))}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop all workers"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.inbox.put((MSG_STOP,))
+
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(timeout=timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+        logger.info("Worker pool stopped")
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        Cancel a task running on one of the workers
+
+        Returns:
+            True if a worker was running the task
+        """
+        with self.condition:
+            for worker in self.workers:
+                if worker.current_task is not None and worker.current_task.task_id == task_id:
+                    worker.inbox.put((MSG_CANCEL, task_id))
+                    return True
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self.condition:
+            return {
+                'workers': [w.to_dict() for w in self.workers],
+                'busy': sum(1 for w in self.workers if w.current_task is not None),
+                'ready': sum(1 for w in self.workers if w.ready)
+            }
+
+    def _spawn(self, worker: GPUWorker):
+        worker.inbox = self._mp.Queue()
+        worker.ready = False
+        worker.current_task = None
+        worker.resident_models.clear()
+        worker.process = self._mp.Process(
+            target=_worker_main,
+            args=(worker.worker_id, worker.device_id, worker.memory_fraction,
+                  self.config.to_dict(), worker.inbox, self.outbox),
+            name=f"genesis-gpu-worker-{worker.worker_id}",
+            daemon=True
+        )
+        worker.process.start()
+
+    def _select_worker(self, task) -> Optional[GPUWorker]:
+        """Pick an idle worker: model affinity first, then most free GPU memory"""
+        idle = [w for w in self.workers if w.idle]
+        if not idle:
+            return None
+
+        model_key = get_task_model_key(task.task_type, task.params)
+        affine = [w for w in idle if model_key in w.resident_models]
+        if affine:
+            return affine[0]
+
+        try:
+            free_gb = {info['gpu_id']: info['free_gb'] for info in self.gpu_manager.get_memory_info()}
+        except Exception:
+            free_gb = {}
+
+        # Workers sharing a GPU split its free memory
+        busy = {w.device_id: 0 for w in self.workers}
+        for w in self.workers:
+            if w.current_task is not None:
+                busy[w.device_id] += 1
+
+        return max(
+            idle,
+            key=lambda w: (free_gb.get(w.device_id, 0.0) / (busy[w.device_id] + 1), -len(w.resident_models))
+        )
+
+    def _dispatch_loop(self):
+        """Hand queued tasks to idle workers"""
+        while self.running:
+            with self.condition:
+                while self.running and not any(w.idle for w in self.workers):
+                    self.condition.wait(timeout=1.0)
+                if not self.running:
+                    return
+
+            task = self.task_queue.get_next_task(timeout=1.0)
+            if task is None or task.status == TaskStatus.CANCELLED:
+                continue
+
+            with self.condition:
+                worker = self._select_worker(task)
+                if worker is None:
+                    # The idle worker crashed meanwhile; put the task back
+                    self.task_queue.add_task(task)
+                    continue
+
+                worker.current_task = task
+                self.task_queue.update_task_status(task.task_id, TaskStatus.RUNNING)
+                worker.inbox.put((MSG_RUN, task.task_id, task.task_type, task.params))
+
+            logger.info(f"Task {task.task_id} -> worker {worker.worker_id} (GPU {worker.device_id})")
+            self._emit(self.on_progress, task.task_id, 10, f"Assigned to GPU {worker.device_id}")
+
+    def _collect_loop(self):
+        """Receive worker messages and watch for crashed workers"""
+        while self.running:
+            try:
+                message = self.outbox.get(timeout=1.0)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+
+            if message is not None:
+                self._handle_message(message)
+
+            self._check_workers()
+
+    def _handle_message(self, message: tuple):
+        kind, worker_id = message[0], message[1]
+        worker = self.workers[worker_id]
+
+        if kind == MSG_READY:
+            with self.condition:
+                worker.ready = True
+                self.condition.notify_all()
+            logger.info(f"Worker {worker_id} ready on GPU {worker.device_id}")
+
+        elif kind == MSG_PROGRESS:
+            _, _, task_id, progress, text = message
+            self.task_queue.update_task_status(task_id, TaskStatus.RUNNING, progress=progress)
+            self._emit(self.on_progress, task_id, progress, text)
+
+        elif kind == MSG_DONE:
+            _, _, task_id, result, error = message
+            with self.condition:
+                task = worker.current_task
+                worker.current_task = None
+                worker.tasks_completed += 1
+                if task is not None and error is None:
+                    model_key = get_task_model_key(task.task_type, task.params)
+                    worker.resident_models[model_key] = time.time()
+                    worker.resident_models.move_to_end(model_key)
+                    while len(worker.resident_models) > self.max_resident_models:
+                        worker.resident_models.popitem(last=False)
+                self.task_retries.pop(task_id, None)
+                self.condition.notify_all()
+
+            if error is not None:
+                self.task_queue.update_task_status(task_id, TaskStatus.FAILED, error=error)
+                self._emit(self.on_error, task_id, error)
+            elif isinstance(result, dict) and result.get('status') == TaskStatus.CANCELLED:
+                self.task_queue.update_task_status(task_id, TaskStatus.CANCELLED, error=result.get('error'))
+                self._emit(self.on_error, task_id, 'Task cancelled')
+            else:
+                self.task_queue.update_task_status(task_id, TaskStatus.COMPLETED, result=result, progress=100)
+                self._emit(self.on_complete, task_id, result)
+
+    def _check_workers(self):
+        """Restart crashed workers and requeue or fail their tasks"""
+        for worker in self.workers:
+            if not self.running or worker.process is None or worker.process.is_alive():
+                continue
+
+            exitcode = worker.process.exitcode
+            with self.condition:
+                task = worker.current_task
+                worker.current_task = None
+                worker.ready = False
+
+            logger.error(f"Worker {worker.worker_id} (GPU {worker.device_id}) died with exit code {exitcode}")
+
+            if task is not None:
+                retries = self.task_retries.get(task.task_id, 0)
+                if retries < self.max_task_retries and task.status != TaskStatus.CANCELLED:
+                    self.task_retries[task.task_id] = retries + 1
+                    self.task_queue.update_task_status(task.task_id, TaskStatus.PENDING, progress=0)
+                    self.task_queue.add_task(task)
+                    logger.info(f"Task {task.task_id} requeued after worker crash")
+                else:
+                    self.task_retries.pop(task.task_id, None)
+                    error = f"Worker crashed (exit code {exitcode})"
+                    self.task_queue.update_task_status(task.task_id, TaskStatus.FAILED, error=error)
+                    self._emit(self.on_error, task.task_id, error)
+
+            if worker.restarts >= self.max_restarts:
+                logger.error(f"Worker {worker.worker_id} exceeded {self.max_restarts} restarts, leaving it down")
+                worker.process = None
+                continue
+
+            worker.restarts += 1
+            self._spawn(worker)
+            logger.info(f"Worker {worker.worker_id} restarted ({worker.restarts}/{self.max_restarts})")
+
+    @staticmethod
+    def _emit(callback: Optional[Callable], *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.warning(f"Worker pool callback failed: {e}")
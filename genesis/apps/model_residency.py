@@ -0,0 +1,379 @@
+"""
+Model Residency Manager for Genesis Hand
+多模型驻留管理：字节统计、成本感知 LRU 淘汰（GPU -> CPU -> 磁盘）、固定正在使用的模型
+"""
+
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+
+TIER_GPU = "gpu"
+TIER_CPU = "cpu"
+TIER_DISK = "disk"
+
+
+@dataclass
+class ResidencyEntry:
+    """驻留条目"""
+    key: str
+    kind: str
+    value: Any
+    loader: Callable[[], Any]
+    gpu_bytes: int = 0
+    cpu_bytes: int = 0
+    load_cost: float = 0.0
+    priority: float = 0.0
+    pins: int = 0
+    tier: str = TIER_CPU
+    home_device: Optional[torch.device] = None
+    last_used: float = field(default_factory=time.time)
+
+    @property
+    def size_bytes(self) -> int:
+        return self.gpu_bytes + self.cpu_bytes
+
+
+def _find_tensors(obj: Any, depth: int = 0) -> List[torch.Tensor]:
+    """查找对象中的所有张量（参数、buffer、字典中的张量）"""
+    if depth > 3 or obj is None:
+        return []
+    if isinstance(obj, torch.Tensor):
+        return [obj]
+    if isinstance(obj, nn.Module):
+        return list(obj.parameters()) + list(obj.buffers())
+    if isinstance(obj, dict):
+        return [t for v in obj.values() for t in _find_tensors(v, depth + 1)]
+    if isinstance(obj, (list, tuple)):
+        return [t for v in obj for t in _find_tensors(v, depth + 1)]
+    inner = obj.__dict__.get("model") if hasattr(obj, "__dict__") else None
+    return _find_tensors(inner, depth + 1) if inner is not None else []
+
+
+def measure_bytes(obj: Any) -> Dict[str, int]:
+    """统计对象在 GPU / CPU 上占用的字节数（按存储去重）"""
+    seen = set()
+    usage = {TIER_GPU: 0, TIER_CPU: 0}
+    for tensor in _find_tensors(obj):
+        if tensor.device.type == "meta":
+            continue
+        try:
+            ptr = tensor.untyped_storage().data_ptr()
+        except Exception:
+            ptr = tensor.data_ptr()
+        if (tensor.device, ptr) in seen:
+            continue
+        seen.add((tensor.device, ptr))
+        nbytes = tensor.numel() * tensor.element_size()
+        usage[TIER_GPU if tensor.device.type == "cuda" else TIER_CPU] += nbytes
+    return usage
+
+
+def _move(obj: Any, device: torch.device, depth: int = 0):
+    """把对象中的模块和字典张量移动到指定设备（原地）"""
+    if depth > 3 or obj is None:
+        return
+    if isinstance(obj, nn.Module):
+        obj.to(device)
+    elif isinstance(obj, dict):
+        for k, v in obj.items():
+            if isinstance(v, torch.Tensor):
+                obj[k] = v.to(device)
+            else:
+                _move(v, device, depth + 1)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _move(v, device, depth + 1)
+    elif hasattr(obj, "__dict__") and obj.__dict__.get("model") is not None:
+        _move(obj.__dict__["model"], device, depth + 1)
+
+
+class ModelResidencyManager:
+    """
+    多模型驻留管理器
+
+    - 每个条目记录 GPU / CPU 字节数和加载耗时
+    - 超出预算时按 GreedyDual-Size 优先级淘汰（最近使用 + 加载成本 / 大小）
+    - 淘汰顺序：GPU -> CPU，CPU -> 磁盘（只丢弃管理器的引用，下次访问时由 loader 加载新对象，
+      不原地修改外部仍持有的对象）
+    - 正在使用的条目被固定，不会被淘汰
+    """
+
+    def __init__(
+        self,
+        gpu_budget_bytes: Optional[int] = None,
+        cpu_budget_bytes: Optional[int] = None,
+        gpu_fraction: float = 0.9,
+        cpu_fraction: float = 0.7
+    ):
+        if gpu_budget_bytes is None:
+            gpu_budget_bytes = 0
+            if torch.cuda.is_available():
+                gpu_budget_bytes = int(torch.cuda.get_device_properties(0).total_memory * gpu_fraction)
+        if cpu_budget_bytes is None:
+            cpu_budget_bytes = int(psutil.virtual_memory().total * cpu_fraction) if PSUTIL_AVAILABLE else 0
+
+        # 0 表示不限制
+        self.gpu_budget_bytes = gpu_budget_bytes
+        self.cpu_budget_bytes = cpu_budget_bytes
+
+        self.entries: "OrderedDict[str, ResidencyEntry]" = OrderedDict()
+        self.lock = threading.RLock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        # 每个线程各自的固定作用域，只固定本线程访问的条目
+        self._local = threading.local()
+        self._clock = 0.0
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "reloads": 0,
+            "evicted_to_cpu": 0,
+            "evicted_to_disk": 0,
+        }
+
+        log.info(
+            f"模型驻留管理器已初始化: GPU 预算={gpu_budget_bytes / 1e9:.1f}GB, "
+            f"CPU 预算={cpu_budget_bytes / 1e9:.1f}GB"
+        )
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], kind: str = "model") -> Any:
+        """
+        获取或加载模型
+
+        Args:
+            key: 缓存键（模型名 + 精度 + 量化等）
+            loader: 无参数加载函数
+            kind: 条目类型（model / vae / t5 / wav2vec ...）
+
+        Returns:
+            已加载的对象
+        """
+        with self.lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # 同一个 key 只加载一次，不同 key 可以并行加载
+        with key_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry.tier != TIER_DISK:
+                    self.stats["hits"] += 1
+                    self._touch(entry)
+                    self._pin(entry)
+                    if entry.tier == TIER_CPU and entry.home_device is not None:
+                        self._promote(entry)
+                    log.info(f"[CACHE] 命中 {kind}: {key}")
+                    return entry.value
+
+                if entry is None:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["reloads"] += 1
+
+            log.info(f"[LOAD] 加载 {kind}: {key}")
+            start = time.time()
+            value = loader()
+            load_cost = time.time() - start
+
+            with self.lock:
+                entry = ResidencyEntry(key=key, kind=kind, value=value, loader=loader, load_cost=load_cost)
+                self._measure(entry)
+                self.entries[key] = entry
+                self._touch(entry)
+                self._pin(entry)
+                log.info(
+                    f"[CACHE] 已缓存 {kind}: {key} ({entry.size_bytes / 1e9:.2f}GB, {load_cost:.1f}s)"
+                )
+                self.enforce_budget()
+                return value
+
+    @contextmanager
+    def pin_scope(self):
+        """作用域内访问的条目都会被固定，退出时解除固定"""
+        scope = set()
+        scopes = self._pin_scopes
+        scopes.append(scope)
+        try:
+            yield scope
+        finally:
+            scopes.remove(scope)
+            with self.lock:
+                for key in scope:
+                    entry = self.entries.get(key)
+                    if entry is not None:
+                        entry.pins = max(0, entry.pins - 1)
+                self.enforce_budget()
+
+    def bind_scopes(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        把当前线程的固定作用域绑定到函数上
+
+        作用域是线程本地的，提交到线程池的加载函数需要用它包装，
+        否则在工作线程中加载的条目不会被固定，可能被同一次生成中的淘汰移走
+        """
+        scopes = list(self._pin_scopes)
+
+        def run(*args, **kwargs):
+            previous = getattr(self._local, "scopes", None)
+            self._local.scopes = scopes
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.scopes = previous
+
+        return run
+
+    def pin(self, key: str):
+        """固定条目（不会被淘汰）"""
+        with self.lock:
+            if key in self.entries:
+                self.entries[key].pins += 1
+
+    def unpin(self, key: str):
+        """解除固定"""
+        with self.lock:
+            if key in self.entries:
+                entry = self.entries[key]
+                entry.pins = max(0, entry.pins - 1)
+
+    def enforce_budget(self):
+        """超出预算时淘汰条目：先 GPU -> CPU，再 CPU -> 磁盘"""
+        with self.lock:
+            for entry in self._refresh_and_order():
+                if not self.gpu_budget_bytes or self._total(TIER_GPU) <= self.gpu_budget_bytes:
+                    break
+                if entry.gpu_bytes > 0:
+                    self._evict_to_cpu(entry)
+
+            for entry in self._refresh_and_order():
+                if not self.cpu_budget_bytes or self._total(TIER_CPU) <= self.cpu_budget_bytes:
+                    break
+                if entry.cpu_bytes > 0 and entry.gpu_bytes == 0:
+                    self._evict_to_disk(entry)
+
+    def remove(self, key: str):
+        """删除条目（外部不再持有时权重随对象释放）"""
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                entry.value = None
+        self._empty_cache()
+
+    def clear(self):
+        """清空所有未固定的条目"""
+        with self.lock:
+            for key in [k for k, e in self.entries.items() if e.pins == 0]:
+                self.remove(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中 / 未命中 / 淘汰统计和各条目信息"""
+        with self.lock:
+            return {
+                **self.stats,
+                "gpu_bytes": self._total(TIER_GPU),
+                "cpu_bytes": self._total(TIER_CPU),
+                "gpu_budget_bytes": self.gpu_budget_bytes,
+                "cpu_budget_bytes": self.cpu_budget_bytes,
+                "entries": {
+                    key: {
+                        "kind": e.kind,
+                        "tier": e.tier,
+                        "gpu_bytes": e.gpu_bytes,
+                        "cpu_bytes": e.cpu_bytes,
+                        "load_cost": e.load_cost,
+                        "pins": e.pins,
+                    }
+                    for key, e in self.entries.items()
+                },
+            }
+
+    def _touch(self, entry: ResidencyEntry):
+        entry.last_used = time.time()
+        entry.priority = self._clock + entry.load_cost / max(entry.size_bytes / 1e9, 1e-3)
+        self.entries.move_to_end(entry.key)
+
+    @property
+    def _pin_scopes(self) -> List[set]:
+        """当前线程的固定作用域"""
+        scopes = getattr(self._local, "scopes", None)
+        if scopes is None:
+            scopes = self._local.scopes = []
+        return scopes
+
+    def _pin(self, entry: ResidencyEntry):
+        for scope in self._pin_scopes:
+            if entry.key not in scope:
+                scope.add(entry.key)
+                entry.pins += 1
+
+    def _measure(self, entry: ResidencyEntry):
+        if entry.tier == TIER_DISK:
+            return
+        usage = measure_bytes(entry.value)
+        entry.gpu_bytes = usage[TIER_GPU]
+        entry.cpu_bytes = usage[TIER_CPU]
+        entry.tier = TIER_GPU if entry.gpu_bytes > 0 else TIER_CPU
+
+    def _refresh_and_order(self) -> List[ResidencyEntry]:
+        """重新统计字节数（模型可能被节点移动过），返回可淘汰条目（低优先级在前）"""
+        candidates = []
+        for entry in self.entries.values():
+            if entry.tier == TIER_DISK:
+                continue
+            self._measure(entry)
+            if entry.pins == 0:
+                candidates.append(entry)
+        return sorted(candidates, key=lambda e: e.priority)
+
+    def _total(self, tier: str) -> int:
+        attr = "gpu_bytes" if tier == TIER_GPU else "cpu_bytes"
+        return sum(getattr(e, attr) for e in self.entries.values())
+
+    def _evict_to_cpu(self, entry: ResidencyEntry):
+        log.info(f"[EVICT] {entry.kind} {entry.key}: GPU -> CPU ({entry.gpu_bytes / 1e9:.2f}GB)")
+        self._clock = max(self._clock, entry.priority)
+        entry.home_device = next(
+            (t.device for t in _find_tensors(entry.value) if t.device.type == "cuda"), None
+        )
+        _move(entry.value, torch.device("cpu"))
+        self._measure(entry)
+        entry.tier = TIER_CPU
+        self.stats["evicted_to_cpu"] += 1
+        self._empty_cache()
+
+    def _evict_to_disk(self, entry: ResidencyEntry):
+        log.info(f"[EVICT] {entry.kind} {entry.key}: CPU -> 磁盘 ({entry.cpu_bytes / 1e9:.2f}GB)")
+        self._clock = max(self._clock, entry.priority)
+        # 不能原地换成 meta 张量：节点或其它线程可能还持有这个对象，只丢弃管理器的引用，
+        # 内存在外部引用释放后回收，再次访问时 get_or_load 调用 loader 加载新对象
+        entry.value = None
+        entry.gpu_bytes = entry.cpu_bytes = 0
+        entry.tier = TIER_DISK
+        self.stats["evicted_to_disk"] += 1
+
+    def _promote(self, entry: ResidencyEntry):
+        """被降级到 CPU 的条目在再次使用时移回原设备"""
+        _move(entry.value, entry.home_device)
+        entry.home_device = None
+        self._measure(entry)
+        self.enforce_budget()
+
+    @staticmethod
+    def _empty_cache():
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
@@ -71,6 +71,7 @@ from genesis.utils import triton_ops_stub
 # Import genesis components
 from genesis.compat import comfy_stub
 from genesis.core import folder_paths_ext
+from genesis.apps.model_residency import ModelResidencyManager
 
 # Setup ComfyUI-WanVideoWrapper as a module
 import importlib.util
@@ -148,9 +149,18 @@ def load_audio_with_soundfile(audio_file):
 class WanVideoWorkflow:
     """WanVideo workflow executor"""
 
-    def __init__(self):
+    # Loaders that build modules inside accelerate's init_empty_weights(), which patches
+    # nn.Module.register_parameter for every thread, so nothing may be built alongside them
+    EXCLUSIVE_LOADERS = ("model",)
+
+    def __init__(self, concurrent_model_loads: bool = False):
+        """
+        Args:
+            concurrent_model_loads: Load VAE, T5 and Wav2Vec on parallel threads (opt-in)
+        """
         # Get node mappings directly
         self.nodes = NODE_CLASS_MAPPINGS
+        self.concurrent_model_loads = concurrent_model_loads
 
         # Initialize node instances (check if nodes exist)
         self.t5_encoder = self.nodes.get("LoadWanVideoT5TextEncoder")() if self.nodes.get("LoadWanVideoT5TextEncoder") else None
@@ -185,93 +195,102 @@ class WanVideoWorkflow:
         self.current_vae = None
         self.current_t5 = None
         
-        # ✅ 模型缓存机制
-        self._model_cache = {}
-        self._vae_cache = {}
-        self._t5_cache = {}
-        self._wav2vec_cache = {}
-        self._text_embeds_cache = {}
-        print("[INFO] Model caching system initialized")
+        # ✅ 模型缓存机制（统一驻留管理：字节统计 + LRU/成本淘汰 + 固定使用中的模型）
+        self.residency = ModelResidencyManager()
+        print("[INFO] Model residency manager initialized")
     
     def _get_or_load_model(self, model_name, base_precision, quantization, load_device, attention_mode):
         """获取或加载 Diffusion Model（带缓存）"""
-        cache_key = f"{model_name}_{base_precision}_{quantization}_{load_device}_{attention_mode}"
+        cache_key = f"model:{model_name}_{base_precision}_{quantization}_{load_device}_{attention_mode}"
         
-        if cache_key in self._model_cache:
-            print(f"[CACHE] Using cached model: {model_name}")
-            return self._model_cache[cache_key]
+        def load():
+            model_loader = NODE_CLASS_MAPPINGS['WanVideoModelLoader']()
+            return model_loader.loadmodel(
+                model=model_name,
+                base_precision=base_precision,
+                quantization=quantization,
+                load_device=load_device,
+                attention_mode=attention_mode
+            )[0]
         
-        print(f"[LOAD] Loading model: {model_name} (first time)")
-        model_loader = NODE_CLASS_MAPPINGS['WanVideoModelLoader']()
-        model_result = model_loader.loadmodel(
-            model=model_name,
-            base_precision=base_precision,
-            quantization=quantization,
-            load_device=load_device,
-            attention_mode=attention_mode
-        )
-        self._model_cache[cache_key] = model_result[0]
-        print(f"[CACHE] Model cached: {cache_key}")
-        return self._model_cache[cache_key]
+        return self.residency.get_or_load(cache_key, load, kind="model")
     
     def _get_or_load_vae(self, vae_name, precision):
         """获取或加载 VAE（带缓存）"""
-        cache_key = f"{vae_name}_{precision}"
+        cache_key = f"vae:{vae_name}_{precision}"
         
-        if cache_key in self._vae_cache:
-            print(f"[CACHE] Using cached VAE: {vae_name}")
-            return self._vae_cache[cache_key]
+        def load():
+            vae_loader = NODE_CLASS_MAPPINGS['WanVideoVAELoader']()
+            return vae_loader.loadmodel(
+                model_name=vae_name,
+                precision=precision
+            )[0]
         
-        print(f"[LOAD] Loading VAE: {vae_name} (first time)")
-        vae_loader = NODE_CLASS_MAPPINGS['WanVideoVAELoader']()
-        vae_result = vae_loader.loadmodel(
-            model_name=vae_name,
-            precision=precision
-        )
-        self._vae_cache[cache_key] = vae_result[0]
-        print(f"[CACHE] VAE cached: {cache_key}")
-        return self._vae_cache[cache_key]
+        return self.residency.get_or_load(cache_key, load, kind="vae")
     
     def _get_or_load_t5(self, t5_model, precision, load_device, quantization):
         """获取或加载 T5（带缓存）"""
-        cache_key = f"{t5_model}_{precision}_{load_device}_{quantization}"
+        cache_key = f"t5:{t5_model}_{precision}_{load_device}_{quantization}"
         
-        if cache_key in self._t5_cache:
-            print(f"[CACHE] Using cached T5: {t5_model}")
-            return self._t5_cache[cache_key]
+        def load():
+            t5_loader = NODE_CLASS_MAPPINGS['LoadWanVideoT5TextEncoder']()
+            return t5_loader.loadmodel(
+                model_name=t5_model,
+                precision=precision,
+                load_device=load_device,
+                quantization=quantization
+            )[0]
         
-        print(f"[LOAD] Loading T5: {t5_model} (first time)")
-        t5_loader = NODE_CLASS_MAPPINGS['LoadWanVideoT5TextEncoder']()
-        t5_result = t5_loader.loadmodel(
-            model_name=t5_model,
-            precision=precision,
-            load_device=load_device,
-            quantization=quantization
-        )
-        self._t5_cache[cache_key] = t5_result[0]
-        print(f"[CACHE] T5 cached: {cache_key}")
-        return self._t5_cache[cache_key]
+        return self.residency.get_or_load(cache_key, load, kind="t5")
     
     def _get_or_load_wav2vec(self, model_name, base_precision, load_device):
         """获取或加载 Wav2Vec（带缓存）"""
-        cache_key = f"{model_name}_{base_precision}_{load_device}"
+        cache_key = f"wav2vec:{model_name}_{base_precision}_{load_device}"
         
-        if cache_key in self._wav2vec_cache:
-            print(f"[CACHE] Using cached Wav2Vec: {model_name}")
-            return self._wav2vec_cache[cache_key]
+        def load():
+            wav2vec_loader = NODE_CLASS_MAPPINGS['DownloadAndLoadWav2VecModel']()
+            return wav2vec_loader.loadmodel(
+                model=model_name,
+                base_precision=base_precision,
+                load_device=load_device
+            )[0]
         
-        print(f"[LOAD] Loading Wav2Vec: {model_name} (first time)")
-        wav2vec_loader = NODE_CLASS_MAPPINGS['DownloadAndLoadWav2VecModel']()
-        wav2vec_result = wav2vec_loader.loadmodel(
-            model=model_name,
-            base_precision=base_precision,
-            load_device=load_device
-        )
-        self._wav2vec_cache[cache_key] = wav2vec_result[0]
-        print(f"[CACHE] Wav2Vec cached: {cache_key}")
-        return self._wav2vec_cache[cache_key]
-
-    def generate_image_to_video(
+        return self.residency.get_or_load(cache_key, load, kind="wav2vec")
+
+    def _load_models(self, loaders):
+        """加载多个模型，默认依次加载；concurrent_model_loads 时其余模型并行加载（磁盘读取互相重叠）
+
+        Args:
+            loaders: Dict of name -> zero-argument load function
+
+        Returns:
+            Dict of name -> loaded model
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        start = time.time()
+        if self.concurrent_model_loads:
+            # init_empty_weights 的加载必须单独完成，其它线程此时创建的模块会得到 meta 参数
+            loaded = {name: fn() for name, fn in loaders.items() if name in self.EXCLUSIVE_LOADERS}
+            parallel = {name: fn for name, fn in loaders.items() if name not in self.EXCLUSIVE_LOADERS}
+            if parallel:
+                with ThreadPoolExecutor(max_workers=len(parallel), thread_name_prefix="ModelLoad") as pool:
+                    # 工作线程没有调用方的固定作用域，需要绑定过去，否则加载的模型不会被固定
+                    futures = {name: pool.submit(self.residency.bind_scopes(fn)) for name, fn in parallel.items()}
+                    loaded.update({name: future.result() for name, future in futures.items()})
+        else:
+            loaded = {name: fn() for name, fn in loaders.items()}
+        print(f"[LOAD] Loaded {', '.join(loaded)} in {time.time() - start:.1f}s")
+        return loaded
+
+    def generate_image_to_video(self, *args, **kwargs):
+        """Execute image to video generation workflow (models in use are pinned)"""
+        with self.residency.pin_scope():
+            result = self._generate_image_to_video(*args, **kwargs)
+        print(f"[CACHE] Residency stats: { {k: v for k, v in self.residency.get_stats().items() if k != 'entries'} }")
+        return result
+
+    def _generate_image_to_video(
         self,
         # Input image
         input_image,
@@ -373,35 +392,48 @@ class WanVideoWorkflow:
             if progress_callback:
                 progress_callback(0.05, "Loading models...")
             
-            # Load model with caching
+            # Load model, VAE and T5 (VAE and T5 concurrently with concurrent_model_loads)
             load_device = "main_device" if mode == "InfiniteTalk" else "offload_device"
-            model = self._get_or_load_model(
-                model_name=model_name,
-                base_precision=base_precision,
-                quantization=quantization,
-                load_device=load_device,
-                attention_mode=attention_mode
-            )
-            
-            if progress_callback:
-                progress_callback(0.15, "Loading VAE...")
-            
-            # Load VAE with caching
-            vae = self._get_or_load_vae(
-                vae_name=vae_name,
-                precision="bf16"
-            )
+            loaders = {
+                "model": lambda: self._get_or_load_model(
+                    model_name=model_name,
+                    base_precision=base_precision,
+                    quantization=quantization,
+                    load_device=load_device,
+                    attention_mode=attention_mode
+                ),
+                "vae": lambda: self._get_or_load_vae(
+                    vae_name=vae_name,
+                    precision="bf16"
+                ),
+                "t5": lambda: self._get_or_load_t5(
+                    t5_model=t5_model,
+                    precision="bf16",
+                    load_device="offload_device",
+                    quantization="disabled"
+                ),
+            }
+            if mode == "InfiniteTalk" and audio_file:
+                # Warm the Wav2Vec cache with the other loads; failures are
+                # handled later by the audio path, which falls back to silent mode
+                def prefetch_wav2vec():
+                    try:
+                        return self._get_or_load_wav2vec(
+                            model_name="TencentGameMate/chinese-wav2vec2-base",
+                            base_precision=wav2vec_precision,
+                            load_device=wav2vec_device
+                        )
+                    except Exception as e:
+                        print(f"[WARNING] Wav2Vec prefetch failed: {e}")
+                        return None
+                loaders["wav2vec"] = prefetch_wav2vec
+            loaded = self._load_models(loaders)
+            model = loaded["model"]
+            vae = loaded["vae"]
+            t5_encoder = loaded["t5"]
             
             if progress_callback:
-                progress_callback(0.25, "Loading T5 encoder...")
-            
-            # Load T5 with caching
-            t5_encoder = self._get_or_load_t5(
-                t5_model=t5_model,
-                precision="bf16",
-                load_device="offload_device",
-                quantization="disabled"
-            )
+                progress_callback(0.25, "Models loaded")
             
             if progress_callback:
                 progress_callback(0.35, "Encoding text...")
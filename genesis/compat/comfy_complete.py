@@ -10,6 +10,10 @@ import logging
 import hashlib
 from types import ModuleType
 
+from genesis.compat.model_management import manager as model_manager, InterruptProcessingException, cleanup_models_gc
+from genesis.compat.safetensors_mmap import load_safetensors
+from genesis.compat.progress import ProgressBar, set_progress_bar_global_hook, previews_wanted
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,31 +65,50 @@ class ModelManagement:
         return device.type if hasattr(device, 'type') else 'cpu'
     
     @staticmethod
-    def soft_empty_cache():
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+    def soft_empty_cache(force=False):
+        model_manager.soft_empty_cache()
+    
+    @staticmethod
+    def load_models_gpu(models, memory_required=0, force_patch_weights=False, minimum_memory_required=None, force_full_load=False):
+        model_manager.load_models_gpu(models, memory_required, force_full_load=force_full_load,
+                                      minimum_memory_required=minimum_memory_required)
     
     @staticmethod
-    def load_models_gpu(models, memory_required=0):
-        pass
+    def load_model_gpu(model):
+        model_manager.load_models_gpu([model])
     
     @staticmethod
     def unload_all_models():
-        pass
+        model_manager.unload_all_models()
+    
+    @staticmethod
+    def free_memory(memory_required, device, keep_loaded=[]):
+        return model_manager.free_memory(memory_required, device, keep_loaded)
+    
+    @staticmethod
+    def cleanup_models():
+        cleanup_models_gc()
     
     @staticmethod
-    def get_free_memory(device=None):
-        if torch.cuda.is_available():
-            return torch.cuda.get_device_properties(0).total_memory
-        return 0
+    def get_free_memory(device=None, torch_free_too=False):
+        return model_manager.get_free_memory(device, torch_free_too)
+    
+    @staticmethod
+    def get_total_memory(device=None, torch_total_too=False):
+        total = model_manager.get_total_memory(device)
+        return (total, total) if torch_total_too else total
     
     @staticmethod
     def interrupt_current_processing(value=True):
-        pass
+        model_manager.interrupt_current_processing(value)
+    
+    @staticmethod
+    def processing_interrupted():
+        return model_manager.processing_interrupted()
     
     @staticmethod
     def throw_exception_if_processing_interrupted():
-        pass
+        model_manager.throw_exception_if_processing_interrupted()
     
     @staticmethod
     def is_device_mps(device):
@@ -108,8 +131,8 @@ def load_torch_file(path, safe_load=False):
     """Load torch/safetensors file"""
     try:
         if path.endswith('.safetensors'):
-            import safetensors.torch
-            return safetensors.torch.load_file(path, device="cpu")
+            # Memory-mapped, tensors are views into the file
+            return load_safetensors(path)
         else:
             return torch.load(path, map_location="cpu")
     except Exception as e:
@@ -218,20 +241,6 @@ def get_key_weight(model, key: str):
     return weight, set_func, convert_func
 
 
-class ProgressBar:
-    PROGRESS_BAR_ENABLED = True
-    
-    def __init__(self, total):
-        self.total = total
-        self.current = 0
-    
-    def update(self, value):
-        self.current = value
-    
-    def update_absolute(self, value, total=None):
-        self.current = value
-
-
 # ============================================================================
 # CLIP Vision
 # ============================================================================
@@ -335,7 +344,16 @@ class ModelSamplingDiscreteFlow:
 # ============================================================================
 
 class Wan21:
-    pass
+    latent_channels = 16
+    latent_rgb_factors = [
+        [-0.0609, 0.0975, 0.1925, 0.0547, 0.3913, -0.0352, -0.0267, -0.0228,
+         -0.2812, -0.1179, -0.1055, 0.2627, -0.0130, -0.1465, -0.0286, 0.1848],
+        [0.0329, 0.2857, 0.0098, 0.3203, 0.1725, 0.1218, -0.0021, -0.0498,
+         -0.1770, -0.2141, -0.0099, -0.1055, -0.2273, 0.0873, 0.1209, 0.0418],
+        [0.2820, 0.1218, -0.1122, -0.0711, -0.0665, -0.0520, -0.0593, -0.2186,
+         0.0913, 0.2115, -0.0217, -0.2148, -0.2817, 0.2249, 0.0234, 0.0193],
+    ]
+    latent_rgb_factors_bias = [0.0, 0.0, 0.0]
 
 
 class Wan22:
@@ -352,12 +370,15 @@ class HunyuanVideo:
 
 class Args:
     preview_method = "auto"
+    preview_size = 512
 
 
 class LatentPreviewMethod:
     Auto = "auto"
     Latent2RGB = "latent2rgb"
     TAESD = "taesd"
+    Disabled = "disabled"
+    NoPreviews = "none"
 
 
 args = Args()
@@ -477,11 +498,17 @@ for attr in dir(ModelManagement):
     if not attr.startswith('_'):
         setattr(mm_module, attr, getattr(ModelManagement, attr))
 mm_module.cast_to_device = cast_to_device
+mm_module.InterruptProcessingException = InterruptProcessingException
+mm_module.current_loaded_models = model_manager.current_loaded_models
+mm_module.directml_enabled = False
+mm_module.device_supports_non_blocking = lambda device: torch.device(device).type == 'cuda'
 
 # Utils module
 utils_module = ModuleType('comfy.utils')
 utils_module.PROGRESS_BAR_ENABLED = True
 utils_module.ProgressBar = ProgressBar
+utils_module.set_progress_bar_global_hook = set_progress_bar_global_hook
+utils_module.previews_wanted = previews_wanted
 utils_module.load_torch_file = load_torch_file
 utils_module.common_upscale = common_upscale
 utils_module.copy_to_param = copy_to_param
@@ -595,6 +622,38 @@ sys.modules['comfy.comfy_types'] = ct_module
 sys.modules['comfy.comfy_types.node_typing'] = nt_module
 sys.modules['comfy.ops'] = ops_module
 
+# server module (PromptServer stub for nodes that push UI messages)
+if 'server' not in sys.modules:
+    server_module = ModuleType('server')
+
+    class BinaryEventTypes:
+        PREVIEW_IMAGE = 1
+        UNENCODED_PREVIEW_IMAGE = 2
+
+    class PromptServer:
+        instance = None
+
+        def __init__(self):
+            self.client_id = None
+            self.sockets = {}
+            self.last_node_id = None
+
+        def send_sync(self, event, data, sid=None):
+            pass
+
+        def send(self, event, data, sid=None):
+            pass
+
+    PromptServer.instance = PromptServer()
+    server_module.PromptServer = PromptServer
+    server_module.BinaryEventTypes = BinaryEventTypes
+    sys.modules['server'] = server_module
+
+# Root latent_preview module (step callbacks with previews)
+if 'latent_preview' not in sys.modules:
+    from genesis.compat import latent_preview as latent_preview_module
+    sys.modules['latent_preview'] = latent_preview_module
+
 # Register folder_paths
 try:
     from genesis.core import folder_paths as genesis_folder_paths
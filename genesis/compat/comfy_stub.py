@@ -10,6 +10,10 @@ import logging
 import hashlib
 from types import ModuleType
 
+from genesis.compat.model_management import manager as model_manager, InterruptProcessingException, cleanup_models_gc
+from genesis.compat.safetensors_mmap import load_safetensors
+from genesis.compat.progress import ProgressBar, set_progress_bar_global_hook, previews_wanted
+
 logger = logging.getLogger(__name__)
 
 
@@ -73,40 +77,54 @@ class ModelManagement:
 
     @staticmethod
     def throw_exception_if_processing_interrupted():
-        """Check if processing was interrupted - stub implementation"""
-        # In a real implementation, this would check for user interruption
-        pass
+        """Raise InterruptProcessingException if processing was interrupted"""
+        model_manager.throw_exception_if_processing_interrupted()
 
     @staticmethod
-    def soft_empty_cache():
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+    def processing_interrupted():
+        return model_manager.processing_interrupted()
 
     @staticmethod
-    def load_models_gpu(models, memory_required=0):
-        pass
+    def soft_empty_cache(force=False):
+        model_manager.soft_empty_cache()
+
+    @staticmethod
+    def load_models_gpu(models, memory_required=0, force_patch_weights=False, minimum_memory_required=None, force_full_load=False):
+        """Load models on their load device, evicting least recently used models as needed"""
+        model_manager.load_models_gpu(models, memory_required, force_full_load=force_full_load,
+                                      minimum_memory_required=minimum_memory_required)
+
+    @staticmethod
+    def load_model_gpu(model):
+        model_manager.load_models_gpu([model])
 
     @staticmethod
     def unload_all_models():
-        pass
+        model_manager.unload_all_models()
+
+    @staticmethod
+    def free_memory(memory_required, device, keep_loaded=[]):
+        """Evict least recently used models until memory_required bytes are free"""
+        return model_manager.free_memory(memory_required, device, keep_loaded)
 
     @staticmethod
     def cleanup_models():
         """Cleanup models from memory"""
-        import gc
-        gc.collect()
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+        cleanup_models_gc()
+
+    @staticmethod
+    def get_free_memory(device=None, torch_free_too=False):
+        """Free device memory (driver free memory plus memory cached by PyTorch)"""
+        return model_manager.get_free_memory(device, torch_free_too)
 
     @staticmethod
-    def get_free_memory(device=None):
-        if torch.cuda.is_available():
-            return torch.cuda.get_device_properties(0).total_memory
-        return 0
+    def get_total_memory(device=None, torch_total_too=False):
+        total = model_manager.get_total_memory(device)
+        return (total, total) if torch_total_too else total
 
     @staticmethod
     def interrupt_current_processing(value=True):
-        pass
+        model_manager.interrupt_current_processing(value)
 
     @staticmethod
     def unet_offload_device():
@@ -125,21 +143,6 @@ class Utils:
     
     PROGRESS_BAR_ENABLED = True
     
-    @staticmethod
-    def ProgressBar(total):
-        class DummyProgressBar:
-            def __init__(self):
-                self.total = total
-                self.current = 0
-            
-            def update(self, value):
-                self.current = value
-            
-            def update_absolute(self, value, total=None):
-                self.current = value
-        
-        return DummyProgressBar()
-    
     @staticmethod
     def copy_to_param(obj, attr, value):
         """Copy value to parameter"""
@@ -297,7 +300,14 @@ model_management_module.interrupt_current_processing = ModelManagement.interrupt
 model_management_module.cast_to_device = cast_to_device
 model_management_module.unet_offload_device = ModelManagement.unet_offload_device
 model_management_module.vae_offload_device = ModelManagement.vae_offload_device
-model_management_module.current_loaded_models = []  # Track currently loaded models
+model_management_module.processing_interrupted = ModelManagement.processing_interrupted
+model_management_module.load_model_gpu = ModelManagement.load_model_gpu
+model_management_module.free_memory = ModelManagement.free_memory
+model_management_module.get_total_memory = ModelManagement.get_total_memory
+model_management_module.InterruptProcessingException = InterruptProcessingException
+model_management_module.current_loaded_models = model_manager.current_loaded_models  # Track currently loaded models
+model_management_module.directml_enabled = False
+model_management_module.device_supports_non_blocking = lambda device: torch.device(device).type == 'cuda'
 
 def common_upscale(samples, width, height, upscale_method, crop="disabled"):
     """Common upscale function for images/latents"""
@@ -339,21 +349,14 @@ def common_upscale(samples, width, height, upscale_method, crop="disabled"):
     return samples
 
 def load_torch_file(filename, safe_load=True, device=None):
-    """Load a PyTorch checkpoint file"""
-    import safetensors.torch
-
-    # Convert torch.device to string for safetensors
-    if device is not None:
-        if hasattr(device, 'type'):
-            device_str = str(device.type)
-        else:
-            device_str = str(device)
-    else:
-        device_str = "cpu"
+    """
+    Load a PyTorch checkpoint file
 
+    Safetensors files are memory-mapped: on CPU the returned tensors are views
+    into the file, on other devices each tensor is copied straight from the mapping.
+    """
     if filename.endswith('.safetensors'):
-        # Load safetensors file
-        return safetensors.torch.load_file(filename, device=device_str)
+        return load_safetensors(filename, device=device)
     else:
         # Load regular PyTorch file
         if device is None:
@@ -368,7 +371,9 @@ def load_torch_file(filename, safe_load=True, device=None):
 
 utils_module = ModuleType('comfy.utils')
 utils_module.PROGRESS_BAR_ENABLED = True
-utils_module.ProgressBar = Utils.ProgressBar
+utils_module.ProgressBar = ProgressBar
+utils_module.set_progress_bar_global_hook = set_progress_bar_global_hook
+utils_module.previews_wanted = previews_wanted
 utils_module.copy_to_param = copy_to_param
 utils_module.set_attr_param = set_attr_param
 utils_module.set_module_tensor_to_device = set_module_tensor_to_device
@@ -789,6 +794,11 @@ PromptServer.instance = PromptServer()
 
 sys.modules['server'] = server_module
 
+# Root latent_preview module (step callbacks with previews)
+if 'latent_preview' not in sys.modules:
+    from genesis.compat import latent_preview as latent_preview_module
+    sys.modules['latent_preview'] = latent_preview_module
+
 # Register folder_paths as global module (ComfyUI compatibility)
 try:
     from genesis.core import folder_paths as genesis_folder_paths
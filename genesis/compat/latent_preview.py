@@ -0,0 +1,139 @@
+"""
+Latent previews for the comfy compatibility layer
+Root latent_preview module: prepare_callback() reports sampler steps through
+ProgressBar and attaches a cheap preview image, projected from the latent
+with the latent format's linear RGB factors
+Author: eddy
+"""
+
+import time
+import logging
+
+import torch
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from .progress import ProgressBar, previews_wanted
+
+logger = logging.getLogger(__name__)
+
+
+MAX_PREVIEW_RESOLUTION = 512
+
+# Minimum seconds between decoded previews, steps in between only report progress
+PREVIEW_INTERVAL = 0.5
+
+
+def preview_frame(x0: torch.Tensor) -> torch.Tensor:
+    """
+    Pick one [C, H, W] latent frame to preview
+
+    Args:
+        x0: Denoised latent, [C, H, W], [B, C, H, W] (or [T, C, H, W] from
+            video samplers) or [B, C, T, H, W]
+
+    Returns:
+        Latent frame
+    """
+    if x0.ndim == 5:
+        return x0[0, :, x0.shape[2] // 2]
+    if x0.ndim == 4:
+        return x0[x0.shape[0] // 2]
+    return x0
+
+
+def preview_to_image(rgb: torch.Tensor) -> 'Image.Image':
+    """[H, W, 3] tensor in -1..1 to a PIL image"""
+    rgb = ((rgb + 1.0) / 2.0).clamp(0, 1).mul(255)
+    return Image.fromarray(rgb.to(device='cpu', dtype=torch.uint8).numpy())
+
+
+class Latent2RGBPreviewer:
+    """Linear latent-to-RGB projection, one small matmul per preview"""
+
+    def __init__(self, latent_rgb_factors, latent_rgb_factors_bias=None):
+        self.latent_rgb_factors = torch.tensor(latent_rgb_factors, device='cpu').transpose(0, 1)
+        self.latent_rgb_factors_bias = None
+        if latent_rgb_factors_bias is not None:
+            self.latent_rgb_factors_bias = torch.tensor(latent_rgb_factors_bias, device='cpu')
+
+    @property
+    def latent_channels(self) -> int:
+        return self.latent_rgb_factors.shape[1]
+
+    def decode_latent_to_preview(self, x0: torch.Tensor) -> 'Image.Image':
+        frame = preview_frame(x0)
+        factors = self.latent_rgb_factors.to(dtype=frame.dtype, device=frame.device)
+        bias = self.latent_rgb_factors_bias
+        if bias is not None:
+            bias = bias.to(dtype=frame.dtype, device=frame.device)
+        rgb = torch.nn.functional.linear(frame.movedim(0, -1), factors, bias=bias)
+        return preview_to_image(rgb)
+
+    def decode_latent_to_preview_image(self, preview_format: str, x0: torch.Tensor):
+        """Preview in the (format, image, max size) form ProgressBar hooks receive"""
+        return (preview_format, self.decode_latent_to_preview(x0), MAX_PREVIEW_RESOLUTION)
+
+
+def previews_enabled() -> bool:
+    """Decode previews only while someone consumes them, or when a preview method is set explicitly"""
+    from comfy.cli_args import args, LatentPreviewMethod
+
+    method = getattr(args, 'preview_method', LatentPreviewMethod.Auto)
+    if method in ('none', 'disabled'):
+        return False
+    return method != LatentPreviewMethod.Auto or previews_wanted()
+
+
+def get_previewer(device, latent_format):
+    """Latent2RGB previewer for a latent format, None if it has no RGB factors or previews are off"""
+    from comfy.cli_args import args, LatentPreviewMethod
+
+    method = getattr(args, 'preview_method', LatentPreviewMethod.Auto)
+    if method in ('none', 'disabled') or not PIL_AVAILABLE:
+        return None
+    factors = getattr(latent_format, 'latent_rgb_factors', None)
+    if factors is None:
+        return None
+    return Latent2RGBPreviewer(factors, getattr(latent_format, 'latent_rgb_factors_bias', None))
+
+
+def prepare_callback(model, steps, x0_output_dict=None):
+    """
+    Sampler step callback (same signature as ComfyUI's latent_preview.prepare_callback)
+
+    Args:
+        model: ModelPatcher of the sampled model
+        steps: Total steps
+        x0_output_dict: Receives the last denoised latent under 'x0'
+
+    Returns:
+        callback(step, x0, x, total_steps)
+    """
+    latent_format = getattr(getattr(model, 'model', None), 'latent_format', None)
+    previewer = get_previewer(getattr(model, 'load_device', None), latent_format)
+    pbar = ProgressBar(steps)
+    last_preview = [0.0]
+
+    def callback(step, x0, x, total_steps):
+        nonlocal previewer
+        if x0_output_dict is not None:
+            x0_output_dict['x0'] = x0
+
+        preview = None
+        if previewer is not None and time.time() - last_preview[0] >= PREVIEW_INTERVAL and previews_enabled():
+            last_preview[0] = time.time()
+            if preview_frame(x0).shape[0] != previewer.latent_channels:
+                logger.info(f"Latent RGB factors are for {previewer.latent_channels} channels, "
+                            f"latent has {preview_frame(x0).shape[0]}, previews disabled")
+                previewer = None
+            else:
+                with torch.no_grad():
+                    preview = previewer.decode_latent_to_preview_image('JPEG', x0)
+        pbar.update_absolute(step + 1, total_steps, preview)
+
+    return callback
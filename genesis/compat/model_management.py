@@ -0,0 +1,319 @@
+"""
+Model memory management for the comfy compatibility layer
+Tracks models loaded through load_models_gpu, evicts least recently used ones
+to make room and provides the global processing interrupt flag
+Author: eddy
+"""
+
+import gc
+import time
+import weakref
+import threading
+import logging
+from typing import Any, List, Optional
+
+import torch
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class InterruptProcessingException(Exception):
+    """Raised by throw_exception_if_processing_interrupted (same name as in ComfyUI)"""
+    pass
+
+
+def _to_device(device) -> torch.device:
+    """Normalize a device, with an explicit index for CUDA so devices compare equal"""
+    if device is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    elif not isinstance(device, torch.device):
+        device = torch.device(device)
+    if device.type == 'cuda' and device.index is None:
+        device = torch.device('cuda', torch.cuda.current_device())
+    return device
+
+
+def _unwrap(model) -> Any:
+    """Get the nn.Module behind a ModelPatcher (or the model itself)"""
+    inner = model.__dict__.get('model') if hasattr(model, '__dict__') else None
+    return inner if inner is not None else model
+
+
+def module_size(model) -> int:
+    """Bytes of parameters and buffers of a model, counted once per storage"""
+    module = _unwrap(model)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    seen = set()
+    total = 0
+    for tensor in list(module.parameters()) + list(module.buffers()):
+        if tensor.device.type == 'meta':
+            continue
+        key = (tensor.device, tensor.data_ptr())
+        if key in seen:
+            continue
+        seen.add(key)
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def module_device(model) -> Optional[torch.device]:
+    """Device of the first parameter of a model"""
+    module = _unwrap(model)
+    if isinstance(module, torch.nn.Module):
+        for tensor in module.parameters():
+            return tensor.device
+    return None
+
+
+class LoadedModel:
+    """
+    A model placed on a device through load_models_gpu
+
+    Holds a weak reference to the underlying module, so ModelPatcher clones of
+    the same model share one entry and dropped models are forgotten.
+    """
+
+    def __init__(self, model, device: torch.device):
+        module = _unwrap(model)
+        try:
+            self._model_ref = weakref.ref(module)
+        except TypeError:
+            self._model_ref = lambda: module
+        self.device = device
+        self.offload_device = _to_device(getattr(model, 'offload_device', None) or 'cpu')
+        self.size = module_size(module)
+        self.last_used = time.time()
+
+    @property
+    def model(self):
+        return self._model_ref()
+
+    def is_alive(self) -> bool:
+        return self.model is not None
+
+    def unload(self):
+        """Move the model to its offload device"""
+        module = self.model
+        if module is None:
+            return
+        if hasattr(module, 'to'):
+            module.to(self.offload_device)
+        logger.info(f"Unloaded {type(module).__name__} ({self.size / 1024**3:.2f}GB) to {self.offload_device}")
+
+
+class ModelMemoryManager:
+    """
+    LRU registry of models loaded on compute devices
+
+    - load_models_gpu() moves models to their load device, evicting the least
+      recently used other models until the requested memory is free
+    - free memory is reported from the driver (mem_get_info) plus memory cached
+      by the PyTorch allocator, which can be reused without evicting anything
+    - interrupt flag shared by all nodes (interrupt_current_processing /
+      throw_exception_if_processing_interrupted)
+    """
+
+    def __init__(self, extra_reserved_bytes: int = 400 * 1024 * 1024):
+        """
+        Initialize manager
+
+        Args:
+            extra_reserved_bytes: Memory kept free on top of what callers request
+        """
+        self.extra_reserved_bytes = extra_reserved_bytes
+        # Most recently used last, shared with comfy.model_management.current_loaded_models
+        self.current_loaded_models: List[LoadedModel] = []
+        self.lock = threading.RLock()
+        self.interrupt_event = threading.Event()
+
+        self.stats = {
+            'loads': 0,
+            'hits': 0,
+            'evictions': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Memory
+    # ------------------------------------------------------------------
+
+    def get_total_memory(self, device=None) -> int:
+        device = _to_device(device)
+        if device.type == 'cuda':
+            return torch.cuda.get_device_properties(device).total_memory
+        if PSUTIL_AVAILABLE:
+            return psutil.virtual_memory().total
+        return 0
+
+    def get_free_memory(self, device=None, torch_free_too: bool = False):
+        """
+        Get free memory of a device
+
+        Args:
+            device: Device (default: current torch device)
+            torch_free_too: Also return the part cached by the PyTorch allocator
+
+        Returns:
+            Free bytes, or (free bytes, allocator cached bytes) with torch_free_too
+        """
+        device = _to_device(device)
+        if device.type == 'cuda':
+            free_cuda, _ = torch.cuda.mem_get_info(device)
+            stats = torch.cuda.memory_stats(device)
+            free_torch = stats.get('reserved_bytes.all.current', 0) - stats.get('active_bytes.all.current', 0)
+            free_total = free_cuda + free_torch
+        else:
+            free_total = psutil.virtual_memory().available if PSUTIL_AVAILABLE else 0
+            free_torch = free_total
+
+        return (free_total, free_torch) if torch_free_too else free_total
+
+    def free_memory(self, memory_required: int, device=None, keep_loaded: Optional[List[Any]] = None) -> List[LoadedModel]:
+        """
+        Evict least recently used models from a device until enough memory is free
+
+        Args:
+            memory_required: Bytes needed
+            device: Device to free memory on
+            keep_loaded: Models that must stay loaded
+
+        Returns:
+            Unloaded entries
+        """
+        device = _to_device(device)
+        keep_ids = {id(_unwrap(m)) for m in (keep_loaded or [])}
+        unloaded = []
+
+        with self.lock:
+            self.cleanup_models()
+            for entry in list(self.current_loaded_models):
+                if self.get_free_memory(device) >= memory_required + self.extra_reserved_bytes:
+                    break
+                if entry.device != device or id(entry.model) in keep_ids:
+                    continue
+                entry.unload()
+                self.current_loaded_models.remove(entry)
+                unloaded.append(entry)
+                self.stats['evictions'] += 1
+
+        if unloaded:
+            self.soft_empty_cache()
+        return unloaded
+
+    def soft_empty_cache(self):
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            torch.cuda.ipc_collect()
+
+    # ------------------------------------------------------------------
+    # Models
+    # ------------------------------------------------------------------
+
+    def _find(self, model) -> Optional[LoadedModel]:
+        module = _unwrap(model)
+        for entry in self.current_loaded_models:
+            if entry.model is module:
+                return entry
+        return None
+
+    def load_models_gpu(self, models, memory_required: int = 0, force_full_load: bool = False, minimum_memory_required: Optional[int] = None):
+        """
+        Load models on their load device, evicting other models as needed
+
+        Args:
+            models: Models or ModelPatchers
+            memory_required: Extra bytes the caller needs for inference
+            force_full_load: Accepted for ComfyUI compatibility
+            minimum_memory_required: Accepted for ComfyUI compatibility
+        """
+        if not isinstance(models, (list, tuple)):
+            models = [models]
+
+        with self.lock:
+            self.cleanup_models()
+            to_load = []
+            for model in models:
+                device = _to_device(getattr(model, 'load_device', None))
+                entry = self._find(model)
+                if entry is not None and module_device(model) == entry.device:
+                    # Already loaded, mark as most recently used
+                    self.current_loaded_models.remove(entry)
+                    entry.last_used = time.time()
+                    self.current_loaded_models.append(entry)
+                    self.stats['hits'] += 1
+                else:
+                    if entry is not None:
+                        self.current_loaded_models.remove(entry)
+                    to_load.append((model, device))
+
+            required = {}
+            for model, device in to_load:
+                required[device] = required.get(device, 0) + module_size(model)
+            for device in {device for _, device in to_load} or {_to_device(None)}:
+                if device.type != 'cpu':
+                    self.free_memory(required.get(device, 0) + memory_required, device, keep_loaded=list(models))
+
+            for model, device in to_load:
+                if hasattr(model, 'to'):
+                    model.to(device)
+                entry = LoadedModel(model, device)
+                self.current_loaded_models.append(entry)
+                self.stats['loads'] += 1
+                logger.info(f"Loaded {type(_unwrap(model)).__name__} ({entry.size / 1024**3:.2f}GB) to {device}")
+
+    def unload_all_models(self):
+        """Move every tracked model to its offload device"""
+        with self.lock:
+            for entry in self.current_loaded_models:
+                entry.unload()
+            self.current_loaded_models.clear()
+        self.soft_empty_cache()
+
+    def cleanup_models(self):
+        """Forget models that were garbage collected"""
+        with self.lock:
+            self.current_loaded_models[:] = [e for e in self.current_loaded_models if e.is_alive()]
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                **self.stats,
+                'loaded_models': len(self.current_loaded_models),
+                'loaded_bytes': sum(e.size for e in self.current_loaded_models),
+            }
+
+    # ------------------------------------------------------------------
+    # Interrupt
+    # ------------------------------------------------------------------
+
+    def interrupt_current_processing(self, value: bool = True):
+        if value:
+            self.interrupt_event.set()
+        else:
+            self.interrupt_event.clear()
+
+    def processing_interrupted(self) -> bool:
+        return self.interrupt_event.is_set()
+
+    def throw_exception_if_processing_interrupted(self):
+        """Raise InterruptProcessingException once per interrupt request"""
+        if self.interrupt_event.is_set():
+            self.interrupt_event.clear()
+            raise InterruptProcessingException()
+
+
+# Global manager shared by both compat layers
+manager = ModelMemoryManager()
+
+
+def cleanup_models_gc():
+    """Collect garbage and forget collected models"""
+    gc.collect()
+    manager.cleanup_models()
+    manager.soft_empty_cache()
@@ -0,0 +1,69 @@
+"""
+Progress reporting for the comfy compatibility layer
+ComfyUI-compatible ProgressBar that forwards updates to a global hook, so the
+server can track step progress of the node that is running
+Author: eddy
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+# hook(value, total, preview, node_id) - same signature as ComfyUI's global progress hook
+PROGRESS_BAR_HOOK: Optional[Callable[..., Any]] = None
+
+# hook() -> bool, whether anyone consumes step previews of the node running on this thread
+PREVIEW_WANTED_HOOK: Optional[Callable[[], bool]] = None
+
+_context = threading.local()
+
+
+def set_progress_bar_global_hook(function: Optional[Callable[..., Any]]):
+    global PROGRESS_BAR_HOOK
+    PROGRESS_BAR_HOOK = function
+
+
+def set_preview_wanted_hook(function: Optional[Callable[[], bool]]):
+    global PREVIEW_WANTED_HOOK
+    PREVIEW_WANTED_HOOK = function
+
+
+def previews_wanted() -> bool:
+    """Whether step previews would reach anyone, samplers skip decoding them otherwise"""
+    hook = PREVIEW_WANTED_HOOK
+    if hook is None:
+        return False
+    try:
+        return bool(hook())
+    except Exception:
+        return False
+
+
+def set_executing_node(node_id: Optional[str]):
+    """Record the node running on this thread, passed to the hook with each update"""
+    _context.node_id = node_id
+
+
+def get_executing_node() -> Optional[str]:
+    return getattr(_context, 'node_id', None)
+
+
+class ProgressBar:
+    """Step counter used by nodes (comfy.utils.ProgressBar)"""
+
+    def __init__(self, total, node_id: Optional[str] = None):
+        self.total = total
+        self.current = 0
+        self.hook = PROGRESS_BAR_HOOK
+        self.node_id = node_id if node_id is not None else get_executing_node()
+
+    def update_absolute(self, value, total=None, preview=None):
+        if total is not None:
+            self.total = total
+        if self.total is not None and value > self.total:
+            value = self.total
+        self.current = value
+        if self.hook is not None:
+            self.hook(self.current, self.total, preview, node_id=self.node_id)
+
+    def update(self, value):
+        self.update_absolute(self.current + value)
@@ -0,0 +1,160 @@
+"""
+Memory-mapped safetensors loading
+Tensors are views into a copy-on-write mapping of the file, so loading a
+checkpoint does not materialize a second copy of it in host memory
+Author: eddy
+"""
+
+import os
+import mmap
+import json
+import struct
+import logging
+from typing import Dict, Tuple, Any, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+_DTYPES = {
+    'BOOL': torch.bool,
+    'U8': torch.uint8,
+    'I8': torch.int8,
+    'I16': torch.int16,
+    'I32': torch.int32,
+    'I64': torch.int64,
+    'F16': torch.float16,
+    'BF16': torch.bfloat16,
+    'F32': torch.float32,
+    'F64': torch.float64,
+}
+for _name, _attr in (('F8_E4M3', 'float8_e4m3fn'), ('F8_E5M2', 'float8_e5m2'),
+                     ('F8_E8M0', 'float8_e8m0fnu'), ('U16', 'uint16'),
+                     ('U32', 'uint32'), ('U64', 'uint64')):
+    if hasattr(torch, _attr):
+        _DTYPES[_name] = getattr(torch, _attr)
+
+
+def load_safetensors_mmap(path: str) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+    """
+    Map a safetensors file and return its tensors without reading them
+
+    The mapping is copy-on-write: pages are read from the page cache when a
+    tensor is first used, in-place writes stay private to the process.
+
+    Args:
+        path: .safetensors file
+
+    Returns:
+        (state dict of CPU tensors backed by the mapping, metadata)
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header_size = struct.unpack('<Q', mapping[:8])[0]
+    header = json.loads(mapping[8:8 + header_size].decode('utf-8'))
+    metadata = header.pop('__metadata__', None) or {}
+
+    # frombuffer keeps a reference to the mapping, it is closed with the last tensor
+    data = torch.frombuffer(mapping, dtype=torch.uint8)[8 + header_size:]
+
+    sd = {}
+    for name, info in header.items():
+        dtype = _DTYPES.get(info['dtype'])
+        if dtype is None:
+            raise ValueError(f"Unsupported safetensors dtype {info['dtype']} for {name} in {path}")
+        start, end = info['data_offsets']
+        raw = data[start:end]
+        try:
+            tensor = raw.view(dtype)
+        except RuntimeError:
+            # Offset not aligned to the element size, this tensor has to be copied
+            tensor = raw.clone().view(dtype)
+        sd[name] = tensor.view(info['shape'])
+
+    return sd, metadata
+
+
+def load_safetensors(path: str, device=None) -> Dict[str, torch.Tensor]:
+    """
+    Load a safetensors file, reading each tensor straight to its device
+
+    Args:
+        path: .safetensors file
+        device: Target device (default: CPU, tensors stay memory-mapped)
+
+    Returns:
+        State dict
+    """
+    try:
+        sd, _ = load_safetensors_mmap(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Memory-mapped load of {os.path.basename(path)} failed ({e}), using safetensors.torch.load_file")
+        import safetensors.torch
+        return safetensors.torch.load_file(path, device=str(device) if device is not None else 'cpu')
+
+    if device is None or torch.device(device).type == 'cpu':
+        return sd
+    return {name: tensor.to(device) for name, tensor in sd.items()}
+
+
+def save_safetensors_streaming(path: str, tensors: Dict[str, torch.Tensor],
+                               dtypes: Optional[Dict[str, torch.dtype]] = None,
+                               metadata: Optional[Dict[str, str]] = None):
+    """
+    Write a safetensors file one tensor at a time
+
+    Each tensor is converted to its target dtype right before it is written,
+    so at most one converted tensor is held in memory. The file is written to
+    a temporary name and moved into place when complete.
+
+    Args:
+        path: Output .safetensors file
+        tensors: Source tensors (may be memory-mapped)
+        dtypes: Target dtype per tensor name (default: keep source dtype)
+        metadata: String metadata stored in the header
+    """
+    dtypes = dtypes or {}
+    names = {dtype: name for name, dtype in _DTYPES.items()}
+
+    def element_size(name):
+        return torch.empty((), dtype=dtypes.get(name, tensors[name].dtype)).element_size()
+
+    # Largest elements first: the format allows no padding between tensors, this keeps every
+    # tensor aligned to its element size so the file maps without copies
+    order = sorted(tensors, key=lambda name: -element_size(name))
+
+    header = {}
+    if metadata:
+        header['__metadata__'] = {str(k): str(v) for k, v in metadata.items()}
+    offset = 0
+    for name in order:
+        tensor = tensors[name]
+        dtype = dtypes.get(name, tensor.dtype)
+        nbytes = tensor.numel() * element_size(name)
+        header[name] = {
+            'dtype': names[dtype],
+            'shape': list(tensor.shape),
+            'data_offsets': [offset, offset + nbytes],
+        }
+        offset += nbytes
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Pad so the data area starts 8-byte aligned
+    header_bytes += b' ' * (-(8 + len(header_bytes)) % 8)
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for name in order:
+                tensor = tensors[name]
+                data = tensor.detach().to(device='cpu', dtype=dtypes.get(name, tensor.dtype)).contiguous()
+                f.write(data.reshape(-1).view(torch.uint8).numpy().data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
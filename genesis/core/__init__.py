@@ -34,7 +34,7 @@ from .interfaces import (
 )
 from . import folder_paths
 from .workflow_converter import (
-    ComfyUIWorkflowConverter, WorkflowNode, load_and_execute_workflow
+    ComfyUIWorkflowConverter, WorkflowNode, NodeOutputCache, load_and_execute_workflow
 )
 from .custom_node_loader import custom_node_loader
 from .node_loader import node_loader, DynamicNodeLoader
@@ -131,6 +131,7 @@ __all__ = [
     # Workflow Converter
     'ComfyUIWorkflowConverter',
     'WorkflowNode',
+    'NodeOutputCache',
     'load_and_execute_workflow',
 
     # Node Loader (dynamic node loading)
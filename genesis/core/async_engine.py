@@ -9,10 +9,11 @@ import torch.nn as nn
 import asyncio
 import threading
 from typing import Optional, Dict, Any, Callable, Awaitable
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
 import logging
 from queue import Queue, Empty
 from dataclasses import dataclass
+from collections import OrderedDict
 import time
 
 
@@ -326,6 +327,11 @@ class AsyncBatchProcessor:
     """
     Async batch processor for efficient inference
     Accumulates requests and processes in batches
+    
+    Requests are grouped into buckets by input shape and dtype. A bucket is
+    flushed as soon as it holds max_batch_size requests or its oldest request
+    has waited max_wait_time. Completed results are kept for result_ttl
+    seconds.
     """
     
     def __init__(
@@ -333,18 +339,24 @@ class AsyncBatchProcessor:
         model: nn.Module,
         device: str = 'cuda',
         max_batch_size: int = 8,
-        max_wait_time: float = 0.1
+        max_wait_time: float = 0.1,
+        result_ttl: float = 60.0
     ):
         self.logger = logging.getLogger('Genesis.AsyncBatch')
         self.model = model
         self.device = torch.device(device)
         self.max_batch_size = max_batch_size
         self.max_wait_time = max_wait_time
+        self.result_ttl = result_ttl
         
-        # Batch queue
-        self.batch_queue = []
-        self.results = {}
-        self.queue_lock = threading.Lock()
+        # Pending requests per (shape, dtype) bucket
+        self.buckets: "OrderedDict[tuple, list]" = OrderedDict()
+        self.futures: Dict[str, Future] = {}
+        self.condition = threading.Condition()
+        
+        # Completed results: task_id -> (expires_at, result)
+        self.results: "OrderedDict[str, tuple]" = OrderedDict()
+        self.results_lock = threading.Lock()
         
         # Worker
         self.worker_running = False
@@ -364,43 +376,68 @@ class AsyncBatchProcessor:
         self.logger.info("Batch processor started")
     
     def stop(self):
-        """Stop batch processor"""
-        self.worker_running = False
+        """Stop batch processor, futures of requests still queued fail with RuntimeError"""
+        with self.condition:
+            self.worker_running = False
+            pending = [task for tasks in self.buckets.values() for task in tasks]
+            self.buckets.clear()
+            futures = [self.futures.pop(task.task_id, None) for task in pending]
+            self.condition.notify_all()
+        
+        for future in futures:
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("BatchProcessor stopped"))
+        
+        if pending:
+            self.logger.warning(f"Batch processor stopped with {len(pending)} queued requests")
+        
         if self.worker_thread:
             self.worker_thread.join(timeout=5.0)
     
+    def _next_batch(self) -> Optional[list]:
+        """
+        Wait until a bucket is ready to flush
+        
+        Returns:
+            Batch of tasks, or None when the processor is stopped
+        """
+        with self.condition:
+            while self.worker_running:
+                now = time.time()
+                next_deadline = None
+                
+                for key, tasks in self.buckets.items():
+                    deadline = tasks[0].created_at + self.max_wait_time
+                    if len(tasks) >= self.max_batch_size or deadline <= now:
+                        batch = tasks[:self.max_batch_size]
+                        remaining = tasks[self.max_batch_size:]
+                        if remaining:
+                            self.buckets[key] = remaining
+                            self.buckets.move_to_end(key)
+                        else:
+                            del self.buckets[key]
+                        return batch
+                    
+                    if next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+                
+                timeout = None if next_deadline is None else next_deadline - now
+                self.condition.wait(timeout=timeout)
+        
+        return None
+    
     def _worker_loop(self):
         """Worker loop for batch processing"""
         while self.worker_running:
-            time.sleep(self.max_wait_time)
-            
-            # Get batch
-            with self.queue_lock:
-                if not self.batch_queue:
-                    continue
-                
-                batch = self.batch_queue[:self.max_batch_size]
-                self.batch_queue = self.batch_queue[self.max_batch_size:]
-            
-            # Process batch
-            self._process_batch(batch)
+            batch = self._next_batch()
+            if batch:
+                self._process_batch(batch)
     
     def _process_batch(self, batch: list):
         """Process batch of tasks"""
         try:
-            # Collect inputs
-            inputs = []
-            task_ids = []
-            
-            for task in batch:
-                inputs.append(task.params['input'])
-                task_ids.append(task.task_id)
-            
-            # Stack inputs
-            batch_input = torch.stack([
-                torch.tensor(inp) if not isinstance(inp, torch.Tensor) else inp
-                for inp in inputs
-            ]).to(self.device)
+            # Stack inputs (all tasks in a bucket share shape and dtype)
+            batch_input = torch.stack([task.params['input'] for task in batch]).to(self.device)
             
             # Batch inference
             with torch.no_grad():
@@ -409,35 +446,54 @@ class AsyncBatchProcessor:
             # Split results
             outputs = torch.unbind(batch_output, dim=0)
             
-            # Store results
-            for task_id, output in zip(task_ids, outputs):
-                self.results[task_id] = {
-                    'task_id': task_id,
+            for task, output in zip(batch, outputs):
+                self._complete_task(task, {
+                    'task_id': task.task_id,
                     'status': 'success',
                     'output': output.cpu().numpy()
-                }
-                
-                # Call callback
-                task = next((t for t in batch if t.task_id == task_id), None)
-                if task and task.callback:
-                    task.callback(self.results[task_id])
+                })
             
         except Exception as e:
             self.logger.error(f"Batch processing failed: {e}")
             
             # Mark all as failed
             for task in batch:
-                self.results[task.task_id] = {
+                self._complete_task(task, {
                     'task_id': task.task_id,
                     'status': 'failed',
                     'error': str(e)
-                }
+                })
     
-    async def submit_async(
+    def _complete_task(self, task: AsyncTask, result: Dict[str, Any]):
+        """Store result, resolve its future and call the callback"""
+        with self.results_lock:
+            self._evict_expired_results()
+            self.results[task.task_id] = (time.time() + self.result_ttl, result)
+        
+        future = self.futures.pop(task.task_id, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+        
+        if task.callback:
+            try:
+                task.callback(result)
+            except Exception as e:
+                self.logger.error(f"Callback failed for task {task.task_id}: {e}")
+    
+    def _evict_expired_results(self):
+        """Drop results older than result_ttl (results_lock must be held)"""
+        now = time.time()
+        while self.results:
+            task_id, (expires_at, _) = next(iter(self.results.items()))
+            if expires_at > now:
+                break
+            del self.results[task_id]
+    
+    def submit(
         self,
         input_data: Any,
         callback: Optional[Callable] = None
-    ) -> str:
+    ) -> Future:
         """
         Submit task for batch processing
         
@@ -446,11 +502,14 @@ class AsyncBatchProcessor:
             callback: Callback function
             
         Returns:
-            Task ID
+            Future resolved with the task result
         """
         import uuid
         task_id = str(uuid.uuid4())
         
+        if not isinstance(input_data, torch.Tensor):
+            input_data = torch.tensor(input_data)
+        
         task = AsyncTask(
             task_id=task_id,
             task_type='inference',
@@ -458,14 +517,75 @@ class AsyncBatchProcessor:
             callback=callback
         )
         
-        with self.queue_lock:
-            self.batch_queue.append(task)
+        future = Future()
+        future.task_id = task_id
+        bucket_key = (tuple(input_data.shape), input_data.dtype)
         
-        return task_id
+        with self.condition:
+            self.futures[task_id] = future
+            self.buckets.setdefault(bucket_key, []).append(task)
+            self.condition.notify()
+        
+        return future
+    
+    async def submit_async(
+        self,
+        input_data: Any,
+        callback: Optional[Callable] = None
+    ) -> str:
+        """
+        Submit task for batch processing
+        
+        Args:
+            input_data: Input data
+            callback: Callback function
+            
+        Returns:
+            Task ID
+        """
+        return self.submit(input_data, callback).task_id
+    
+    async def infer(self, input_data: Any, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Submit task and await its result
+        
+        Args:
+            input_data: Input data
+            timeout: Timeout in seconds
+            
+        Returns:
+            Task result
+        """
+        future = self.submit(input_data)
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+    
+    async def wait_for_result(self, task_id: str, timeout: float = 60.0) -> Optional[Dict[str, Any]]:
+        """
+        Wait for task result
+        
+        Args:
+            task_id: Task ID
+            timeout: Timeout in seconds
+            
+        Returns:
+            Task result or None
+        """
+        future = self.futures.get(task_id)
+        if future is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        
+        return self.get_result(task_id)
     
     def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get result by task ID"""
-        return self.results.get(task_id)
+        with self.results_lock:
+            self._evict_expired_results()
+            entry = self.results.get(task_id)
+        
+        return entry[1] if entry else None
 
 
 async def async_model_warmup(model: nn.Module, input_shape: tuple, device: str = 'cuda', num_iterations: int = 10):
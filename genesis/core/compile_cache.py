@@ -0,0 +1,231 @@
+"""
+Genesis Compile Cache
+Persistent torch.compile caches split by model, shape bucket and torch version
+Author: eddy
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Any
+
+import torch
+
+logger = logging.getLogger('Genesis.CompileCache')
+
+
+# compile_args entries that change the generated code
+COMPILE_KEY_ARGS = ('backend', 'mode', 'dynamic', 'fullgraph', 'compile_transformer_blocks_only')
+
+
+def bucket_seq_len(seq_len: int, bucket_size: int) -> int:
+    """
+    Round a sequence length up to its shape bucket
+
+    Args:
+        seq_len: Token count
+        bucket_size: Bucket granularity in tokens (0 disables bucketing)
+
+    Returns:
+        Padded token count
+    """
+    if bucket_size <= 0:
+        return seq_len
+    return -(-seq_len // bucket_size) * bucket_size
+
+
+class CompileCacheManager:
+    """
+    Persistent inductor / Triton caches per model and shape bucket
+
+    torch.compile only keeps compiled graphs in memory and the inductor FX
+    graph cache shares one directory for everything. Activating a bucket
+    points TORCHINDUCTOR_CACHE_DIR and TRITON_CACHE_DIR at
+    <cache_dir>/torch-<version>/<model key>/bucket-<n>, enables the on-disk
+    FX graph and autotune caches, and records the bucket in a manifest so
+    warmup runs and cleanup know which buckets exist.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize cache
+
+        Args:
+            cache_dir: Cache root (default: ~/.cache/genesis/compile)
+        """
+        if cache_dir is None:
+            cache_dir = Path.home() / '.cache' / 'genesis' / 'compile'
+
+        self.cache_dir = Path(cache_dir)
+        self.manifest_path = self.cache_dir / 'manifest.json'
+        self.lock = threading.Lock()
+        self.active_dir: Optional[Path] = None
+
+        self.stats = {
+            'activations': 0,
+            'new_buckets': 0,
+            'warmups': 0,
+        }
+
+    @property
+    def torch_dir(self) -> Path:
+        """Cache directory of the running torch version"""
+        return self.cache_dir / f"torch-{torch.__version__.replace('+', '_')}"
+
+    def make_key(self, model_id: str, compile_args: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the model key
+
+        Args:
+            model_id: Model file path or name
+            compile_args: torch.compile settings
+
+        Returns:
+            Key string
+        """
+        payload = {
+            'model': os.path.basename(str(model_id)),
+            'args': {k: (compile_args or {}).get(k) for k in COMPILE_KEY_ARGS},
+        }
+        try:
+            payload['size'] = os.path.getsize(model_id)
+        except (OSError, TypeError):
+            pass
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+    def bucket_dir(self, model_key: str, bucket: int) -> Path:
+        return self.torch_dir / model_key / f"bucket-{bucket}"
+
+    def activate(self, model_key: str, bucket: int, model_id: Optional[str] = None) -> Path:
+        """
+        Point the compile caches at a bucket directory
+
+        Must run before the first forward of the bucket, compilation is lazy
+        and reads the cache directories when a graph is compiled.
+
+        Args:
+            model_key: Key from make_key
+            bucket: Padded sequence length
+            model_id: Model file path or name, stored in the manifest
+
+        Returns:
+            Bucket directory
+        """
+        path = self.bucket_dir(model_key, bucket)
+        with self.lock:
+            path.mkdir(parents=True, exist_ok=True)
+            os.environ['TORCHINDUCTOR_CACHE_DIR'] = str(path / 'inductor')
+            os.environ['TRITON_CACHE_DIR'] = str(path / 'triton')
+            try:
+                from torch._inductor import config as inductor_config
+                inductor_config.fx_graph_cache = True
+                if hasattr(inductor_config, 'autotune_local_cache'):
+                    inductor_config.autotune_local_cache = True
+            except Exception as e:
+                logger.warning(f"Could not enable the inductor FX graph cache: {e}")
+
+            self.active_dir = path
+            self.stats['activations'] += 1
+            if self._record(model_key, bucket, model_id):
+                self.stats['new_buckets'] += 1
+                logger.info(f"New compile bucket {bucket} for {model_key}")
+
+        return path
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, model_key: str, bucket: int, model_id: Optional[str]) -> bool:
+        """Add a bucket to the manifest, returns True if it was not listed yet"""
+        manifest = self._load_manifest()
+        entry = manifest.setdefault(f"{self.torch_dir.name}/{model_key}", {'buckets': []})
+        is_new = bucket not in entry['buckets']
+        if is_new:
+            entry['buckets'] = sorted(entry['buckets'] + [bucket])
+        if model_id is not None:
+            entry['model'] = os.path.basename(str(model_id))
+        entry['last_used'] = time.time()
+
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(f"Could not write compile cache manifest: {e}")
+        return is_new
+
+    def get_buckets(self, model_key: str) -> List[int]:
+        """Buckets compiled for a model with the running torch version"""
+        entry = self._load_manifest().get(f"{self.torch_dir.name}/{model_key}", {})
+        return list(entry.get('buckets', []))
+
+    def warmup(self, workflows: Iterable[str], run_workflow) -> int:
+        """
+        Run warmup workflows so their buckets are compiled before real requests
+
+        Each workflow fixes the resolution and frame count, so it compiles
+        (or loads from disk) the bucket the same request shape will use.
+
+        Args:
+            workflows: Paths of workflow JSON files
+            run_workflow: Callable executing a workflow dict, returns a result
+                dict with a 'success' entry
+
+        Returns:
+            Number of workflows that completed
+        """
+        done = 0
+        for path in workflows:
+            start = time.perf_counter()
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    workflow = json.load(f)
+                result = run_workflow(workflow)
+            except Exception as e:
+                logger.warning(f"Compile warmup {os.path.basename(path)} failed: {e}")
+                continue
+            if isinstance(result, dict) and not result.get('success', True):
+                logger.warning(f"Compile warmup {os.path.basename(path)} failed: {result.get('error')}")
+                continue
+            done += 1
+            self.stats['warmups'] += 1
+            logger.info(f"Compile warmup {os.path.basename(path)} done in {time.perf_counter() - start:.1f}s")
+        return done
+
+    def clear(self, model_key: Optional[str] = None):
+        """Remove cached buckets of one model, or everything"""
+        import shutil
+        target = self.torch_dir / model_key if model_key else self.cache_dir
+        if target.exists():
+            shutil.rmtree(target, ignore_errors=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        manifest = self._load_manifest()
+        return {
+            **self.stats,
+            'models': len(manifest),
+            'buckets': sum(len(e.get('buckets', [])) for e in manifest.values()),
+            'active_dir': str(self.active_dir) if self.active_dir else None,
+        }
+
+
+# Global cache instance
+_global_cache = None
+
+
+def get_compile_cache() -> CompileCacheManager:
+    """Get global compile cache instance"""
+    global _global_cache
+    if _global_cache is None:
+        _global_cache = CompileCacheManager()
+    return _global_cache
@@ -4,7 +4,7 @@ Configuration management system
 """
 
 from dataclasses import dataclass, field
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from pathlib import Path
 
 
@@ -35,10 +35,18 @@ class GenesisConfig:
     num_threads: int = 4
     pin_memory: bool = True
     allow_tf32: bool = True
+    # Workflow nodes executed in parallel by the workflow converter (1 = serial, opt in with > 1)
+    workflow_max_workers: int = 1
     
     # Cache configuration
     enable_cache: bool = True
     cache_size_mb: int = 2048
+
+    # torch.compile warmup workflows, run in the background at server start
+    compile_warmup_workflows: List[Path] = field(default_factory=list)
+
+    # Server job queue database
+    job_queue_db: Path = field(default_factory=lambda: Path('genesis_jobs.db'))
     
     # Logging configuration
     log_level: Literal['DEBUG', 'INFO', 'WARNING', 'ERROR'] = 'INFO'
@@ -49,10 +57,11 @@ class GenesisConfig:
         """Post-initialization processing"""
         # Ensure paths are Path objects
         for field_name in ['models_dir', 'checkpoints_dir', 'vae_dir', 'lora_dir', 
-                          'embeddings_dir', 'output_dir', 'temp_dir', 'log_file']:
+                          'embeddings_dir', 'output_dir', 'temp_dir', 'log_file', 'job_queue_db']:
             value = getattr(self, field_name)
             if not isinstance(value, Path):
                 setattr(self, field_name, Path(value))
+        self.compile_warmup_workflows = [Path(p) for p in self.compile_warmup_workflows]
     
     def create_directories(self):
         """Create necessary directories"""
@@ -91,8 +100,11 @@ class GenesisConfig:
             'num_threads': self.num_threads,
             'pin_memory': self.pin_memory,
             'allow_tf32': self.allow_tf32,
+            'workflow_max_workers': self.workflow_max_workers,
             'enable_cache': self.enable_cache,
             'cache_size_mb': self.cache_size_mb,
+            'compile_warmup_workflows': [str(p) for p in self.compile_warmup_workflows],
+            'job_queue_db': str(self.job_queue_db),
             'log_level': self.log_level,
             'log_to_file': self.log_to_file,
             'log_file': str(self.log_file),
@@ -5,20 +5,34 @@ Author: eddy
 """
 
 import sys
+import time
+import threading
 import importlib.util
 import logging
 from pathlib import Path
 from typing import Dict, List, Any
 
+from .node_manifest import get_node_manifest
+
 logger = logging.getLogger(__name__)
 
 
 class CustomNodeLoader:
-    """Loads custom nodes from external directories"""
+    """
+    Loads custom nodes from external directories
+    
+    In lazy mode (default) node names come from the node manifest and a
+    package is imported the first time one of its nodes is requested.
+    """
     
-    def __init__(self):
+    def __init__(self, lazy: bool = True, manifest=None):
         self.loaded_nodes = {}
         self.custom_node_paths = []
+        self.lazy = lazy
+        self.manifest = manifest or get_node_manifest()
+        self.lazy_nodes: Dict[str, Path] = {}
+        self.import_times: Dict[str, float] = {}
+        self._import_lock = threading.RLock()
     
     def add_custom_node_path(self, path: str):
         """Add a custom node directory to search path"""
@@ -31,9 +45,30 @@ class CustomNodeLoader:
     
     def load_custom_nodes(self):
         """Load all custom nodes from registered paths"""
+        if self.lazy:
+            self._register_lazy_nodes()
+            return
+        
         for path in self.custom_node_paths:
             self._load_nodes_from_directory(path)
     
+    def _register_lazy_nodes(self):
+        """Record which package provides each node, without importing"""
+        entries = self.manifest.scan(self.custom_node_paths, module_prefix="genesis_custom_")
+        
+        count = 0
+        for path in self.custom_node_paths:
+            entry = entries[str(path)]
+            if entry['error'] is not None:
+                logger.error(f"Failed to load custom nodes from {path}: {entry['error']}")
+                continue
+            for node_type in entry['nodes']:
+                if node_type not in self.loaded_nodes:
+                    self.lazy_nodes[node_type] = path
+                    count += 1
+        
+        logger.info(f"Registered {count} custom nodes from {len(self.custom_node_paths)} packages (imported on first use)")
+    
     def scan_and_load_custom_nodes(self, base_directory: str):
         """Scan custom_nodes directory and load all subdirectories"""
         base_path = Path(base_directory)
@@ -43,9 +78,6 @@ class CustomNodeLoader:
         
         logger.info(f"Scanning for custom nodes in: {base_path}")
         
-        # Load ComfyUI compatibility layer before loading custom nodes
-        self._ensure_comfy_compatibility()
-        
         # Scan all subdirectories
         for subdir in base_path.iterdir():
             if subdir.is_dir() and not subdir.name.startswith('.') and not subdir.name.startswith('__'):
@@ -70,6 +102,9 @@ class CustomNodeLoader:
         """Load nodes from a specific directory"""
         logger.info(f"Loading custom nodes from: {directory}")
         
+        # Load ComfyUI compatibility layer before loading custom nodes
+        self._ensure_comfy_compatibility()
+        
         # Add to Python path
         if str(directory) not in sys.path:
             sys.path.insert(0, str(directory))
@@ -86,26 +121,52 @@ class CustomNodeLoader:
                 # Set __package__ to avoid relative import errors
                 module.__package__ = module_name
                 
+                start = time.perf_counter()
                 spec.loader.exec_module(module)
+                elapsed = time.perf_counter() - start
+                self.import_times[directory.name] = elapsed
+                self.manifest.record_import_time(directory, elapsed)
                 
                 # Get NODE_CLASS_MAPPINGS if available
                 if hasattr(module, 'NODE_CLASS_MAPPINGS'):
                     mappings = module.NODE_CLASS_MAPPINGS
                     self.loaded_nodes.update(mappings)
-                    logger.info(f"Loaded {len(mappings)} nodes from {directory.name}")
+                    logger.info(f"Loaded {len(mappings)} nodes from {directory.name} ({elapsed:.2f}s)")
                 else:
                     logger.warning(f"No NODE_CLASS_MAPPINGS found in {directory.name}")
                 
             except Exception as e:
                 logger.error(f"Failed to load custom nodes from {directory}: {e}")
     
+    def _load_lazy_package(self, directory: Path):
+        """Import a lazily registered package and drop its pending node names"""
+        with self._import_lock:
+            pending = [name for name, path in self.lazy_nodes.items() if path == directory]
+            if not pending:
+                return
+            self._load_nodes_from_directory(directory)
+            for name in pending:
+                self.lazy_nodes.pop(name, None)
+    
     def get_node_class(self, node_type: str):
-        """Get a custom node class by type"""
+        """Get a custom node class by type, importing its package on first use"""
+        if node_type not in self.loaded_nodes and node_type in self.lazy_nodes:
+            self._load_lazy_package(self.lazy_nodes[node_type])
         return self.loaded_nodes.get(node_type)
     
+    def has_node(self, node_type: str) -> bool:
+        """Check whether a node type is available (loaded or lazy)"""
+        return node_type in self.loaded_nodes or node_type in self.lazy_nodes
+    
     def get_all_nodes(self) -> Dict[str, Any]:
-        """Get all loaded custom nodes"""
+        """Get all custom nodes (imports packages still pending in lazy mode)"""
+        for directory in set(self.lazy_nodes.values()):
+            self._load_lazy_package(directory)
         return self.loaded_nodes.copy()
+    
+    def get_import_times(self) -> Dict[str, float]:
+        """Get import time per package, slowest first"""
+        return dict(sorted(self.import_times.items(), key=lambda x: -x[1]))
 
 
 # Global custom node loader instance
@@ -159,6 +159,7 @@ class GenesisEngine:
         steps: int = 20,
         cfg_scale: float = 7.0,
         seed: Optional[int] = None,
+        task_id: Optional[str] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -172,6 +173,7 @@ class GenesisEngine:
             steps: Sampling steps
             cfg_scale: CFG guidance strength
             seed: Random seed
+            task_id: Task ID (used for cancellation)
             **kwargs: Other parameters
             
         Returns:
@@ -194,7 +196,7 @@ class GenesisEngine:
         }
         
         # Execute generation
-        result = self.executor.execute_generation(params)
+        result = self.executor.execute_generation(params, task_id=task_id)
         
         self.logger.info("[OK] Generation completed")
         return result
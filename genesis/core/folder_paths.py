@@ -5,7 +5,22 @@ Author: eddy
 """
 
 import os
-from typing import Dict, List, Set, Tuple
+import json
+import time
+import struct
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger('Genesis.FolderPaths')
 
 supported_pt_extensions: Set[str] = {
     '.ckpt', '.pt', '.pt2', '.bin', '.pth', '.safetensors', '.pkl', '.sft'
@@ -171,6 +186,310 @@ def get_supported_extensions(folder_name: str) -> Set[str]:
     return set()
 
 
+class _DirectoryIndex:
+    """Entries of one model directory: {name: is_dir}"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, bool] = {}
+        self.mtime_ns: Optional[int] = None
+        self.checked_at = 0.0
+        self.version = 0
+        self.watched = False
+        self.dirty = True
+
+
+class ModelCatalog:
+    """
+    In-memory catalog of model directories
+    
+    - Directory listings are cached and re-read only when the directory
+      mtime changes, checked at most once per refresh_interval
+    - With watchdog installed, watch() switches directories to
+      change notifications (inotify / FSEvents / ReadDirectoryChangesW)
+    - Filename lists are cached per folder name; lookups are dict hits
+    - File info (size, safetensors header, optional sha256) is cached per
+      path and revalidated against the file's size and mtime
+    """
+    
+    def __init__(self, refresh_interval: float = 2.0, hash_cache_path: Optional[str] = None):
+        """
+        Initialize catalog
+        
+        Args:
+            refresh_interval: Seconds between directory mtime checks
+            hash_cache_path: JSON file persisting computed file hashes
+        """
+        self.refresh_interval = refresh_interval
+        self.hash_cache_path = hash_cache_path or os.path.join(
+            os.path.expanduser('~'), '.cache', 'genesis', 'model_hashes.json'
+        )
+        self.lock = threading.RLock()
+        self._directories: Dict[str, _DirectoryIndex] = {}
+        self._lists: Dict[str, Tuple[tuple, List[str]]] = {}
+        self._file_info: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Optional[Dict[str, Dict[str, Any]]] = None
+        self._observer = None
+    
+    def _directory(self, path: str) -> _DirectoryIndex:
+        """Get a directory index, re-reading the directory if it changed"""
+        with self.lock:
+            index = self._directories.get(path)
+            if index is None:
+                index = self._directories[path] = _DirectoryIndex(path)
+            
+            now = time.monotonic()
+            if not index.dirty and (index.watched or now - index.checked_at < self.refresh_interval):
+                return index
+            
+            index.checked_at = now
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            
+            if mtime_ns != index.mtime_ns or index.dirty:
+                entries = {}
+                if mtime_ns is not None:
+                    try:
+                        with os.scandir(path) as it:
+                            for entry in it:
+                                try:
+                                    entries[entry.name] = entry.is_dir()
+                                except OSError:
+                                    continue
+                    except OSError as e:
+                        logger.warning(f"Failed to list {path}: {e}")
+                index.entries = entries
+                index.mtime_ns = mtime_ns
+                index.version += 1
+            
+            index.dirty = False
+            return index
+    
+    def get_filename_list(self, folder_name: str) -> List[str]:
+        """Get sorted filenames for a folder name"""
+        folders = get_folder_paths(folder_name)
+        extensions = get_supported_extensions(folder_name)
+        
+        with self.lock:
+            indexes = [self._directory(folder) for folder in folders]
+            signature = (
+                tuple((index.path, index.version) for index in indexes),
+                tuple(sorted(extensions))
+            )
+            cached = self._lists.get(folder_name)
+            if cached is not None and cached[0] == signature:
+                return list(cached[1])
+            
+            files = []
+            for index in indexes:
+                for filename, is_dir in index.entries.items():
+                    if "folder" in extensions:
+                        if is_dir:
+                            files.append(filename)
+                    elif not is_dir and os.path.splitext(filename)[1].lower() in extensions:
+                        files.append(filename)
+            
+            files.sort()
+            self._lists[folder_name] = (signature, files)
+            return list(files)
+    
+    def find(self, folder_name: str, filename: str) -> Optional[str]:
+        """
+        Find a file in the folders of a folder name
+        
+        Top-level names are answered from the index; names with a
+        subdirectory, or names the index has not seen yet, are checked on disk.
+        """
+        folders = get_folder_paths(folder_name)
+        nested = os.sep in filename or '/' in filename
+        
+        if not nested:
+            with self.lock:
+                for folder in folders:
+                    if filename in self._directory(folder).entries:
+                        return os.path.join(folder, filename)
+        
+        for folder in folders:
+            full_path = os.path.join(folder, filename)
+            if os.path.exists(full_path):
+                if not nested:
+                    self.invalidate(folder)
+                return full_path
+        
+        return None
+    
+    def get_file_info(self, path: str, compute_hash: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get size, mtime, safetensors header metadata and (optionally) sha256
+        
+        Args:
+            path: Full path to the file
+            compute_hash: Compute the sha256 if it is not cached yet
+            
+        Returns:
+            File info dictionary, or None if the file does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        
+        with self.lock:
+            info = self._file_info.get(path)
+            if info is None or info['size'] != stat.st_size or info['mtime_ns'] != stat.st_mtime_ns:
+                info = {
+                    'path': path,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'metadata': None,
+                    'tensor_count': None,
+                    'sha256': None
+                }
+                if path.endswith(('.safetensors', '.sft')):
+                    header = read_safetensors_header(path)
+                    if header is not None:
+                        info['metadata'] = header.pop('__metadata__', None)
+                        info['tensor_count'] = len(header)
+                info['sha256'] = self._cached_hash(path, stat)
+                self._file_info[path] = info
+        
+        if compute_hash and info['sha256'] is None:
+            digest = _sha256_file(path)
+            with self.lock:
+                info['sha256'] = digest
+                self._store_hash(path, stat, digest)
+        
+        return dict(info)
+    
+    def _load_hashes(self) -> Dict[str, Dict[str, Any]]:
+        if self._hashes is None:
+            self._hashes = {}
+            if os.path.exists(self.hash_cache_path):
+                try:
+                    with open(self.hash_cache_path, 'r', encoding='utf-8') as f:
+                        self._hashes = json.load(f)
+                except Exception as e:
+                    logger.warning(f"Failed to read model hash cache: {e}")
+        return self._hashes
+    
+    def _cached_hash(self, path: str, stat: os.stat_result) -> Optional[str]:
+        entry = self._load_hashes().get(path)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry.get('sha256')
+        return None
+    
+    def _store_hash(self, path: str, stat: os.stat_result, digest: str):
+        hashes = self._load_hashes()
+        hashes[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        try:
+            os.makedirs(os.path.dirname(self.hash_cache_path), exist_ok=True)
+            tmp_path = self.hash_cache_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(hashes, f)
+            os.replace(tmp_path, self.hash_cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to save model hash cache: {e}")
+    
+    def invalidate(self, path: Optional[str] = None):
+        """Mark one directory (or all directories) for re-reading"""
+        with self.lock:
+            if path is None:
+                for index in self._directories.values():
+                    index.dirty = True
+            elif path in self._directories:
+                self._directories[path].dirty = True
+    
+    def watch(self) -> bool:
+        """
+        Watch all model directories for changes (requires watchdog)
+        
+        Returns:
+            True if watching started
+        """
+        if not WATCHDOG_AVAILABLE:
+            logger.info("watchdog not installed, model directories are checked by mtime")
+            return False
+        
+        catalog = self
+        
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for event_path in (event.src_path, getattr(event, 'dest_path', None)):
+                    if event_path:
+                        catalog.invalidate(os.path.dirname(event_path))
+        
+        with self.lock:
+            if self._observer is None:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            
+            handler = _Handler()
+            for paths, _ in folder_names_and_paths.values():
+                for path in paths:
+                    index = self._directory(path)
+                    if index.watched or not os.path.isdir(path):
+                        continue
+                    self._observer.schedule(handler, path, recursive=False)
+                    index.watched = True
+        return True
+    
+    def stop_watching(self):
+        """Stop change notifications, falling back to mtime checks"""
+        with self.lock:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer = None
+            for index in self._directories.values():
+                index.watched = False
+                index.dirty = True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog statistics"""
+        with self.lock:
+            return {
+                'directories': len(self._directories),
+                'entries': sum(len(i.entries) for i in self._directories.values()),
+                'watched': sum(1 for i in self._directories.values() if i.watched),
+                'cached_lists': len(self._lists),
+                'file_info': len(self._file_info)
+            }
+
+
+def read_safetensors_header(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the JSON header of a safetensors file without loading tensors
+    
+    Args:
+        path: Path to the .safetensors file
+        
+    Returns:
+        Header dictionary (tensor entries plus optional __metadata__), or None
+    """
+    try:
+        with open(path, 'rb') as f:
+            header_size = struct.unpack('<Q', f.read(8))[0]
+            # Headers are small; anything huge is not a safetensors file
+            if header_size > 100 * 1024 * 1024:
+                return None
+            return json.loads(f.read(header_size))
+    except Exception:
+        return None
+
+
+def _sha256_file(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+catalog = ModelCatalog()
+
+
 def get_filename_list(folder_name: str) -> List[str]:
     """
     Get list of files in a folder
@@ -181,24 +500,7 @@ def get_filename_list(folder_name: str) -> List[str]:
     Returns:
         List of filenames
     """
-    folders = get_folder_paths(folder_name)
-    extensions = get_supported_extensions(folder_name)
-    
-    files = []
-    for folder in folders:
-        if not os.path.exists(folder):
-            continue
-            
-        for filename in os.listdir(folder):
-            if "folder" in extensions:
-                if os.path.isdir(os.path.join(folder, filename)):
-                    files.append(filename)
-            else:
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in extensions:
-                    files.append(filename)
-    
-    return sorted(files)
+    return catalog.get_filename_list(folder_name)
 
 
 def get_full_path(folder_name: str, filename: str) -> str:
@@ -212,19 +514,64 @@ def get_full_path(folder_name: str, filename: str) -> str:
     Returns:
         Full path to the file
     """
-    folders = get_folder_paths(folder_name)
-    
-    for folder in folders:
-        full_path = os.path.join(folder, filename)
-        if os.path.exists(full_path):
-            return full_path
+    full_path = catalog.find(folder_name, filename)
+    if full_path is not None:
+        return full_path
     
+    folders = get_folder_paths(folder_name)
     if folders:
         return os.path.join(folders[0], filename)
     
     return filename
 
 
+def get_file_info(folder_name: str, filename: str, compute_hash: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Get cached file info: size, safetensors metadata and optional sha256
+    
+    Args:
+        folder_name: Name of the folder type
+        filename: Name of the file
+        compute_hash: Compute the sha256 if it is not cached yet
+        
+    Returns:
+        File info dictionary, or None if the file is not found
+    """
+    full_path = catalog.find(folder_name, filename)
+    if full_path is None:
+        return None
+    return catalog.get_file_info(full_path, compute_hash=compute_hash)
+
+
+def invalidate_catalog(folder_name: Optional[str] = None):
+    """
+    Force model directories to be re-read on next access
+    
+    Args:
+        folder_name: Folder type to invalidate, or None for all
+    """
+    if folder_name is None:
+        catalog.invalidate()
+        return
+    for path in get_folder_paths(folder_name):
+        catalog.invalidate(path)
+
+
+def get_output_directory() -> str:
+    """Get output directory (ComfyUI API)"""
+    return output_directory
+
+
+def get_temp_directory() -> str:
+    """Get temp directory (ComfyUI API)"""
+    return temp_directory
+
+
+def get_input_directory() -> str:
+    """Get input directory (ComfyUI API)"""
+    return input_directory
+
+
 def ensure_directories():
     """Create all model directories if they don't exist"""
     for folder_name, (paths, _) in folder_names_and_paths.items():
@@ -252,10 +599,9 @@ def get_full_path_or_raise(folder_name: str, filename: str) -> str:
     """
     folders = get_folder_paths(folder_name)
 
-    for folder in folders:
-        full_path = os.path.join(folder, filename)
-        if os.path.exists(full_path):
-            return full_path
+    full_path = catalog.find(folder_name, filename)
+    if full_path is not None:
+        return full_path
 
     # Check models directory directly as fallback
     models_path = os.path.join("e:\\chai fream\\models", folder_name, filename)
@@ -5,7 +5,6 @@ Author: eddy
 """
 
 import os
-import glob
 from . import folder_paths
 
 
@@ -23,6 +22,8 @@ def add_model_folder_path(folder_name, paths):
         if path not in current_paths:
             current_paths.append(path)
 
+    folder_paths.invalidate_catalog(folder_name)
+
 
 def get_folder_paths(folder_name):
     """Get folder paths for a given folder name"""
@@ -32,28 +33,17 @@ def get_folder_paths(folder_name):
 
 
 def get_filename_list(folder_name):
-    """Get list of files in a folder"""
-    paths = get_folder_paths(folder_name)
-    files = []
-
-    if folder_name in folder_paths.folder_names_and_paths:
-        extensions = folder_paths.folder_names_and_paths[folder_name][1]
-        for path in paths:
-            if os.path.exists(path):
-                for ext in extensions:
-                    pattern = os.path.join(path, f"*{ext}")
-                    files.extend([os.path.basename(f) for f in glob.glob(pattern)])
-
-    return list(set(files))
+    """Get list of files in a folder (served from the model catalog)"""
+    return folder_paths.catalog.get_filename_list(folder_name)
 
 
 def get_full_path(folder_name, filename):
     """Get full path for a file in a folder"""
+    full_path = folder_paths.catalog.find(folder_name, filename)
+    if full_path is not None:
+        return full_path
+
     paths = get_folder_paths(folder_name)
-    for path in paths:
-        full_path = os.path.join(path, filename)
-        if os.path.exists(full_path):
-            return full_path
 
     # Fallback to first path
     if paths:
@@ -0,0 +1,266 @@
+"""
+Genesis Node Manifest
+Cached custom node discovery, so startup does not import every package
+Author: eddy
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_VERSION = 1
+
+# Prefixes the JSON result line printed by the scan subprocess, packages may print anything else
+SCAN_MARKER = '__GENESIS_NODE_MANIFEST__'
+
+# Directories that never contain node code
+SKIP_DIRS = {'__pycache__', 'node_modules', 'web', 'js', 'docs', 'examples', 'tests'}
+
+# Runs in a fresh interpreter: imports one package and prints its node mappings
+_SCAN_SCRIPT = r'''
+import os, sys, json, time, importlib.util
+package_path, module_name, genesis_parent, marker = sys.argv[1:5]
+for path in (genesis_parent, os.path.dirname(package_path), package_path):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+result = {'nodes': {}, 'import_time': 0.0, 'error': None}
+try:
+    try:
+        from genesis.compat import comfy_complete
+    except Exception:
+        pass
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(package_path, '__init__.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    result['import_time'] = time.perf_counter() - start
+    display_names = getattr(module, 'NODE_DISPLAY_NAME_MAPPINGS', None) or {}
+    for name, node_class in (getattr(module, 'NODE_CLASS_MAPPINGS', None) or {}).items():
+        description = getattr(node_class, 'DESCRIPTION', None) or (node_class.__doc__ or '').strip()
+        result['nodes'][str(name)] = {
+            'category': str(getattr(node_class, 'CATEGORY', 'misc')),
+            'display_name': str(display_names.get(name, getattr(node_class, 'DISPLAY_NAME', name))),
+            'description': str(description),
+        }
+except BaseException as e:
+    result['error'] = f'{type(e).__name__}: {e}'
+sys.stdout.write('\n' + marker + json.dumps(result) + '\n')
+sys.stdout.flush()
+os._exit(0)
+'''
+
+
+def package_fingerprint(package_path: Path) -> str:
+    """
+    Fingerprint of a package's Python sources
+
+    Args:
+        package_path: Package directory
+
+    Returns:
+        Hash over relative path, mtime and size of every .py file
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(package_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS)
+        for filename in sorted(files):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            relative = os.path.relpath(path, package_path)
+            digest.update(f"{relative}|{stat.st_mtime_ns}|{stat.st_size}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class NodeManifest:
+    """
+    Manifest of custom node packages
+
+    Records each package's NODE_CLASS_MAPPINGS keys (with category, display
+    name and description) and import time, keyed on the package fingerprint.
+    Packages missing from the manifest or changed on disk are scanned in
+    parallel subprocesses, so broken or slow packages cannot stall startup.
+    Failed scans are not cached, so installing a missing dependency takes
+    effect on the next start.
+    """
+
+    def __init__(
+        self,
+        manifest_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        scan_timeout: float = 300.0
+    ):
+        """
+        Initialize manifest
+
+        Args:
+            manifest_path: Manifest JSON file (default: ~/.cache/genesis/node_manifest.json)
+            max_workers: Parallel scan subprocesses (default: CPU count, at most 8)
+            scan_timeout: Seconds allowed to import one package
+        """
+        if manifest_path is None:
+            manifest_path = Path.home() / '.cache' / 'genesis' / 'node_manifest.json'
+
+        self.manifest_path = Path(manifest_path)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.scan_timeout = scan_timeout
+        self.lock = threading.Lock()
+        self._packages: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._packages is not None:
+            return self._packages
+
+        self._packages = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self._packages = data.get('packages', {})
+            except Exception as e:
+                logger.warning(f"Failed to read node manifest {self.manifest_path}: {e}")
+        return self._packages
+
+    def _save(self):
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'packages': self._packages}, f, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            logger.warning(f"Failed to save node manifest {self.manifest_path}: {e}")
+
+    def scan(self, package_paths: List[Path], module_prefix: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get manifest entries for packages, scanning the ones not cached
+
+        Args:
+            package_paths: Package directories
+            module_prefix: Module name prefix the loader imports packages under
+
+        Returns:
+            Dictionary of {package path: entry}; entry has 'nodes',
+            'import_time', 'cached' and 'error' (None on success)
+        """
+        start = time.perf_counter()
+        fingerprints = {str(p): package_fingerprint(p) for p in package_paths}
+
+        results = {}
+        misses = []
+        with self.lock:
+            packages = self._load()
+            for path in package_paths:
+                entry = packages.get(str(path))
+                if entry is not None and entry.get('fingerprint') == fingerprints[str(path)]:
+                    results[str(path)] = {**entry, 'cached': True, 'error': None}
+                else:
+                    misses.append(path)
+
+        if misses:
+            logger.info(f"Scanning {len(misses)} custom node packages ({len(results)} cached)")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                scanned = list(pool.map(lambda p: self._scan_package(p, module_prefix + p.name), misses))
+
+            with self.lock:
+                packages = self._load()
+                for path, entry in zip(misses, scanned):
+                    results[str(path)] = {**entry, 'cached': False}
+                    if entry['error'] is None:
+                        packages[str(path)] = {
+                            'fingerprint': fingerprints[str(path)],
+                            'nodes': entry['nodes'],
+                            'import_time': entry['import_time']
+                        }
+                    else:
+                        packages.pop(str(path), None)
+                self._save()
+
+            for path, entry in sorted(zip(misses, scanned), key=lambda x: -x[1]['import_time']):
+                if entry['error'] is None:
+                    logger.info(f"  {path.name}: {len(entry['nodes'])} nodes, import {entry['import_time']:.2f}s")
+                else:
+                    logger.warning(f"  {path.name}: scan failed: {entry['error']}")
+
+        logger.info(f"Node manifest ready in {time.perf_counter() - start:.2f}s")
+        return results
+
+    def _scan_package(self, package_path: Path, module_name: str) -> Dict[str, Any]:
+        """Import one package in a subprocess and collect its node mappings"""
+        genesis_parent = str(Path(__file__).resolve().parent.parent.parent)
+        try:
+            completed = subprocess.run(
+                [sys.executable, '-c', _SCAN_SCRIPT, str(package_path), module_name, genesis_parent, SCAN_MARKER],
+                cwd=str(package_path),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=self.scan_timeout
+            )
+        except subprocess.TimeoutExpired:
+            return {'nodes': {}, 'import_time': self.scan_timeout, 'error': f"Import timed out after {self.scan_timeout}s"}
+        except Exception as e:
+            return {'nodes': {}, 'import_time': 0.0, 'error': str(e)}
+
+        stdout = completed.stdout.decode('utf-8', errors='replace')
+        for line in reversed(stdout.splitlines()):
+            if line.startswith(SCAN_MARKER):
+                return json.loads(line[len(SCAN_MARKER):])
+
+        stderr = completed.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        error = stderr[-1] if stderr else f"Scan process exited with code {completed.returncode}"
+        return {'nodes': {}, 'import_time': 0.0, 'error': error}
+
+    def record_import_time(self, package_path: Path, seconds: float):
+        """Record the in-process import time of a package"""
+        with self.lock:
+            entry = self._load().get(str(package_path))
+            if entry is not None:
+                entry['import_time'] = seconds
+                self._save()
+
+    def invalidate(self, package_path: Optional[Path] = None):
+        """Drop one package (or all packages) from the manifest"""
+        with self.lock:
+            packages = self._load()
+            if package_path is None:
+                packages.clear()
+            else:
+                packages.pop(str(package_path), None)
+            self._save()
+
+    def get_import_times(self) -> Dict[str, float]:
+        """Get recorded import time per package, slowest first"""
+        with self.lock:
+            packages = self._load()
+            times = {Path(p).name: e.get('import_time', 0.0) for p, e in packages.items()}
+        return dict(sorted(times.items(), key=lambda x: -x[1]))
+
+
+# Global manifest instance
+_global_manifest = None
+
+
+def get_node_manifest() -> NodeManifest:
+    """Get global node manifest instance"""
+    global _global_manifest
+    if _global_manifest is None:
+        _global_manifest = NodeManifest()
+    return _global_manifest
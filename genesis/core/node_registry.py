@@ -8,19 +8,63 @@ import logging
 from typing import Dict, Any, List, Optional, Type, Callable
 from collections import defaultdict
 import inspect
+import threading
 
 logger = logging.getLogger(__name__)
 
 
 class NodeInfo:
-    """Node information container"""
+    """
+    Node information container
+
+    A lazy node is created with a loader instead of a class; the loader
+    runs (importing the node's package) on first access to node_class.
+    """
 
-    def __init__(self, name: str, node_class: Type, module: str = None):
+    def __init__(
+        self,
+        name: str,
+        node_class: Optional[Type],
+        module: str = None,
+        loader: Optional[Callable[[], Type]] = None,
+        summary: Optional[Dict[str, Any]] = None
+    ):
         self.name = name
-        self.node_class = node_class
         self.module = module
+        self._node_class = node_class
+        self._loader = loader
+        self._load_lock = threading.Lock()
+        self._summary = summary or {}
         self._cached_info = None
 
+    @property
+    def node_class(self) -> Type:
+        if self._node_class is None and self._loader is not None:
+            with self._load_lock:
+                if self._node_class is None:
+                    self._node_class = self._loader()
+                    self._loader = None
+        return self._node_class
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the node class has been imported"""
+        return self._node_class is not None
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Get name, category and description without importing a lazy node"""
+        if self.is_loaded:
+            info = self.get_info()
+        else:
+            info = self._summary
+        return {
+            'name': self.name,
+            'display_name': info.get('display_name', self.name),
+            'module': self.module,
+            'category': info.get('category', 'misc'),
+            'description': info.get('description', ''),
+        }
+
     def get_info(self) -> Dict[str, Any]:
         """Get detailed node information"""
         if self._cached_info is not None:
@@ -145,6 +189,50 @@ class NodeRegistry:
 
         self.logger.info(f"Registered node: {name} (category: {category})")
 
+    def register_lazy(
+        self,
+        name: str,
+        loader: Callable[[], Type],
+        module: str = None,
+        category: str = 'misc',
+        display_name: str = None,
+        description: str = ''
+    ):
+        """
+        Register a node whose class is imported on first use
+
+        Args:
+            name: Node name (unique identifier)
+            loader: Function returning the node class
+            module: Module name (for organization)
+            category: Node category, as recorded in the node manifest
+            display_name: Display name
+            description: Node description
+        """
+        if name in self._nodes:
+            self.logger.warning(f"Node '{name}' already registered, overwriting")
+
+        self._nodes[name] = NodeInfo(
+            name,
+            None,
+            module,
+            loader=loader,
+            summary={
+                'category': category,
+                'display_name': display_name or name,
+                'description': description
+            }
+        )
+
+        if name not in self._categories[category]:
+            self._categories[category].append(name)
+
+        if module:
+            if name not in self._modules[module]:
+                self._modules[module].append(name)
+
+        self.logger.debug(f"Registered lazy node: {name} (category: {category})")
+
     def register_batch(self, node_mappings: Dict[str, Type], module: str = None):
         """
         Register multiple nodes at once (ComfyUI-compatible)
@@ -163,12 +251,11 @@ class NodeRegistry:
             return
 
         node_info = self._nodes[name]
-        info = node_info.get_info()
 
-        # Remove from category index
-        category = info.get('category', 'misc')
-        if name in self._categories[category]:
-            self._categories[category].remove(name)
+        # Remove from category index (without importing lazy nodes)
+        for nodes in self._categories.values():
+            if name in nodes:
+                nodes.remove(name)
 
         # Remove from module index
         if node_info.module and name in self._modules[node_info.module]:
@@ -211,10 +298,15 @@ class NodeRegistry:
         return node_info.node_class if node_info else None
 
     def get_info(self, name: str) -> Optional[Dict[str, Any]]:
-        """Get detailed node information"""
+        """Get detailed node information (imports a lazy node's package)"""
         node_info = self.get(name)
         return node_info.get_info() if node_info else None
 
+    def get_summary(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get name, category and description without importing a lazy node"""
+        node_info = self.get(name)
+        return node_info.get_summary() if node_info else None
+
     def has(self, name: str) -> bool:
         """Check if node exists"""
         return name in self._nodes or name in self._aliases
@@ -256,11 +348,19 @@ class NodeRegistry:
         return sorted(list(self._categories.keys()))
 
     def get_all_node_info(self) -> Dict[str, Dict[str, Any]]:
-        """Get information for all nodes"""
-        return {
-            name: node_info.get_info()
-            for name, node_info in self._nodes.items()
-        }
+        """
+        Get information for all nodes
+
+        Loaded nodes get detailed information, lazy nodes only their summary
+        so listing does not import every package.
+        """
+        all_info = {}
+        for name, node_info in self._nodes.items():
+            try:
+                all_info[name] = node_info.get_info() if node_info.is_loaded else node_info.get_summary()
+            except Exception as e:
+                self.logger.error(f"Failed to get info for {name}: {e}")
+        return all_info
 
     def search(self, query: str, search_in: List[str] = None) -> List[str]:
         """
@@ -280,7 +380,7 @@ class NodeRegistry:
         results = []
 
         for name, node_info in self._nodes.items():
-            info = node_info.get_info()
+            info = node_info.get_summary()
 
             # Search in name
             if 'name' in search_in and query_lower in name.lower():
@@ -314,6 +414,7 @@ class NodeRegistry:
             'total_categories': len(self._categories),
             'total_modules': len(self._modules),
             'total_aliases': len(self._aliases),
+            'lazy_nodes': sum(1 for n in self._nodes.values() if not n.is_loaded),
             'nodes_by_category': {
                 cat: len(nodes) for cat, nodes in self._categories.items()
             }
@@ -6,14 +6,18 @@ Author: eddy
 
 import os
 import sys
+import time
 import importlib
 import importlib.util
 import logging
+import threading
+from functools import partial
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Set
 import traceback
 
 from .node_registry import get_node_registry
+from .node_manifest import get_node_manifest
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +29,19 @@ class NodeScanner:
     Features:
     - Scan built-in nodes
     - Scan custom nodes
+    - Lazy custom nodes: registered from the node manifest, imported on first use
     - ComfyUI-compatible
     - Error handling and logging
     """
 
-    def __init__(self, registry=None):
+    def __init__(self, registry=None, lazy: bool = True, manifest=None):
         self.registry = registry or get_node_registry()
+        self.lazy = lazy
+        self.manifest = manifest or get_node_manifest()
         self.loaded_modules: Set[str] = set()
         self.failed_modules: Dict[str, str] = {}
+        self.import_times: Dict[str, float] = {}
+        self._import_lock = threading.RLock()
         self.logger = logging.getLogger(f"{__name__}.NodeScanner")
 
     def scan_builtin_nodes(self, builtin_path: str = None) -> int:
@@ -105,8 +114,8 @@ class NodeScanner:
         self.logger.info(f"Scanning custom nodes from: {custom_nodes_path}")
 
         # Scan all subdirectories
-        count = 0
-        for subdir in custom_nodes_path.iterdir():
+        packages = []
+        for subdir in sorted(custom_nodes_path.iterdir()):
             if not subdir.is_dir():
                 continue
 
@@ -120,6 +129,13 @@ class NodeScanner:
                 self.logger.debug(f"Skipping {subdir.name}: no __init__.py found")
                 continue
 
+            packages.append(subdir)
+
+        if self.lazy:
+            return self._register_lazy_packages(packages)
+
+        count = 0
+        for subdir in packages:
             try:
                 nodes_loaded = self._load_custom_node_package(subdir)
                 count += nodes_loaded
@@ -132,6 +148,78 @@ class NodeScanner:
         self.logger.info(f"Loaded {count} custom nodes total")
         return count
 
+    def _register_lazy_packages(self, packages: List[Path]) -> int:
+        """
+        Register custom nodes from the node manifest without importing them
+
+        Args:
+            packages: Custom node package directories
+
+        Returns:
+            Number of nodes registered
+        """
+        entries = self.manifest.scan(packages, module_prefix="genesis_custom_nodes.")
+
+        count = 0
+        for package_path in packages:
+            entry = entries[str(package_path)]
+            if entry['error'] is not None:
+                self.logger.error(f"Failed to load custom node {package_path.name}: {entry['error']}")
+                self.failed_modules[str(package_path)] = entry['error']
+                continue
+
+            label = f"custom:{package_path.name}"
+            for node_name, node in entry['nodes'].items():
+                self.registry.register_lazy(
+                    node_name,
+                    partial(self._resolve_lazy_node, package_path, node_name),
+                    module=label,
+                    category=node.get('category', 'misc'),
+                    display_name=node.get('display_name'),
+                    description=node.get('description', '')
+                )
+            count += len(entry['nodes'])
+            self.logger.debug(f"Registered {len(entry['nodes'])} lazy nodes from custom node: {package_path.name}")
+
+        self.logger.info(f"Registered {count} custom nodes (imported on first use)")
+        return count
+
+    def _resolve_lazy_node(self, package_path: Path, node_name: str):
+        """Import the package providing a lazy node and return the node class"""
+        module = self._import_custom_package(package_path)
+        node_mappings = getattr(module, 'NODE_CLASS_MAPPINGS', None) or {}
+        if node_name not in node_mappings:
+            self.manifest.invalidate(package_path)
+            raise ImportError(f"Node {node_name} is no longer provided by {package_path.name}")
+        return node_mappings[node_name]
+
+    def _import_custom_package(self, package_path: Path):
+        """Import a custom node package once, recording its import time"""
+        module_name = f"genesis_custom_nodes.{package_path.name}"
+
+        with self._import_lock:
+            if module_name in self.loaded_modules and module_name in sys.modules:
+                return sys.modules[module_name]
+
+            parent_dir = str(package_path.parent)
+            if parent_dir not in sys.path:
+                sys.path.insert(0, parent_dir)
+
+            start = time.perf_counter()
+            try:
+                module = self._import_module(package_path / "__init__.py", module_name)
+            except Exception as e:
+                self.failed_modules[str(package_path)] = str(e)
+                raise
+            elapsed = time.perf_counter() - start
+
+            self._apply_display_names(module)
+            self.loaded_modules.add(module_name)
+            self.import_times[f"custom:{package_path.name}"] = elapsed
+            self.manifest.record_import_time(package_path, elapsed)
+            self.logger.info(f"Imported custom node {package_path.name} on first use ({elapsed:.2f}s)")
+            return module
+
     def _load_node_module(
         self,
         module_path: Path,
@@ -155,18 +243,9 @@ class NodeScanner:
         self.logger.debug(f"Loading module: {module_name} from {module_path}")
 
         # Load module
-        try:
-            spec = importlib.util.spec_from_file_location(module_name, module_path)
-            if spec is None or spec.loader is None:
-                raise ImportError(f"Cannot load module spec from {module_path}")
-
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-
-        except Exception as e:
-            self.logger.error(f"Failed to import module {module_name}: {e}")
-            raise
+        start = time.perf_counter()
+        module = self._import_module(module_path, module_name)
+        self.import_times[module_label] = time.perf_counter() - start
 
         # Check for NODE_CLASS_MAPPINGS
         if not hasattr(module, 'NODE_CLASS_MAPPINGS'):
@@ -187,19 +266,36 @@ class NodeScanner:
             except Exception as e:
                 self.logger.error(f"Failed to register node {node_name}: {e}")
 
-        # Check for NODE_DISPLAY_NAME_MAPPINGS
-        if hasattr(module, 'NODE_DISPLAY_NAME_MAPPINGS'):
-            display_names = module.NODE_DISPLAY_NAME_MAPPINGS
-            for node_name, display_name in display_names.items():
-                node_info = self.registry.get(node_name)
-                if node_info:
-                    node_class = node_info.node_class
-                    if not hasattr(node_class, 'DISPLAY_NAME'):
-                        node_class.DISPLAY_NAME = display_name
+        self._apply_display_names(module)
 
         self.loaded_modules.add(module_name)
         return count
 
+    def _import_module(self, module_path: Path, module_name: str):
+        """Execute a module file and add it to sys.modules"""
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, module_path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"Cannot load module spec from {module_path}")
+
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+            return module
+
+        except Exception as e:
+            self.logger.error(f"Failed to import module {module_name}: {e}")
+            raise
+
+    def _apply_display_names(self, module):
+        """Set DISPLAY_NAME on node classes from NODE_DISPLAY_NAME_MAPPINGS"""
+        display_names = getattr(module, 'NODE_DISPLAY_NAME_MAPPINGS', None) or {}
+        node_mappings = getattr(module, 'NODE_CLASS_MAPPINGS', None) or {}
+        for node_name, display_name in display_names.items():
+            node_class = node_mappings.get(node_name)
+            if node_class is not None and not hasattr(node_class, 'DISPLAY_NAME'):
+                node_class.DISPLAY_NAME = display_name
+
     def _load_custom_node_package(self, package_path: Path) -> int:
         """
         Load a custom node package
@@ -314,6 +410,7 @@ class NodeScanner:
             'failed_modules': self.failed_modules.copy(),
             'total_loaded': len(self.loaded_modules),
             'total_failed': len(self.failed_modules),
+            'import_times': dict(sorted(self.import_times.items(), key=lambda x: -x[1])),
             'registry_stats': self.registry.get_statistics()
         }
 
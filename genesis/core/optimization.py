@@ -5,6 +5,7 @@ Author: eddy
 Date: 2025-11-12
 """
 
+import os
 import torch
 import logging
 import platform
@@ -525,13 +526,21 @@ class CoreOptimizer:
             logger.warning(f"FP8 quantization failed: {e}")
             return tensor
 
-    def quantize_model_fp8(self, model: torch.nn.Module, fp8_format: str = "e4m3fn") -> torch.nn.Module:
+    def quantize_model_fp8(
+        self,
+        model: torch.nn.Module,
+        fp8_format: str = "e4m3fn",
+        source_path: Optional[str] = None
+    ) -> torch.nn.Module:
         """
         Quantize entire model to FP8
 
         Args:
             model: Model to quantize
             fp8_format: FP8 format
+            source_path: Weights file the model was loaded from; when given the
+                quantized weights are stored in (or loaded from) the quantized
+                artifact cache
 
         Returns:
             Quantized model
@@ -541,9 +550,20 @@ class CoreOptimizer:
             return model
 
         try:
-            for name, param in model.named_parameters():
-                if param.requires_grad:
-                    param.data = self.quantize_fp8_tensor(param.data, fp8_format)
+            params = {name: param for name, param in model.named_parameters() if param.requires_grad}
+
+            artifact_key = self._fp8_artifact_key(params, fp8_format, source_path) if source_path is not None else None
+            if artifact_key is not None and self._load_fp8_artifact(params, artifact_key):
+                logger.info(f"[OK] Model quantized to FP8 ({fp8_format}) from cache")
+                return model
+
+            for name, param in params.items():
+                param.data = self.quantize_fp8_tensor(param.data, fp8_format)
+
+            if artifact_key is not None:
+                from .quantized_cache import get_quantized_cache
+                get_quantized_cache().put(artifact_key, {name: param.data for name, param in params.items()},
+                                          metadata={'source': os.path.basename(source_path), 'format': fp8_format})
 
             logger.info(f"[OK] Model quantized to FP8 ({fp8_format})")
             return model
@@ -552,6 +572,30 @@ class CoreOptimizer:
             logger.warning(f"Model FP8 quantization failed: {e}")
             return model
 
+    def _fp8_artifact_key(self, params: Dict[str, torch.nn.Parameter], fp8_format: str, source_path: str) -> Optional[str]:
+        """Quantized artifact key of a model, computed before quantizing"""
+        from .quantized_cache import get_quantized_cache
+        try:
+            # Parameters left unquantized (requires_grad=False) play the role of the keep list
+            return get_quantized_cache().make_key(
+                [source_path], f"fp8_{fp8_format}",
+                extra={'quantized': sorted(params), 'dtypes': sorted({str(p.dtype) for p in params.values()})}
+            )
+        except OSError as e:
+            logger.warning(f"Quantized artifact cache disabled for {source_path}: {e}")
+            return None
+
+    def _load_fp8_artifact(self, params: Dict[str, torch.nn.Parameter], artifact_key: str) -> bool:
+        """Assign cached quantized weights, returns False on a cache miss"""
+        from .quantized_cache import get_quantized_cache
+        cached = get_quantized_cache().get(artifact_key)
+        if cached is None or any(name not in cached for name in params):
+            return False
+
+        for name, param in params.items():
+            param.data = cached[name].to(param.device)
+        return True
+
     def get_optimal_dtype(self) -> torch.dtype:
         """
         Get optimal dtype for current device
@@ -0,0 +1,236 @@
+"""
+Genesis Quantized Artifact Cache
+Stores fp8/fp4 quantized weights on disk so repeat loads skip conversion
+Author: eddy
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Any
+
+import torch
+
+from ..compat.safetensors_mmap import load_safetensors_mmap, save_safetensors_streaming
+
+logger = logging.getLogger('Genesis.QuantizedCache')
+
+
+# Bump when the conversion rules change, so old artifacts are not reused
+ARTIFACT_VERSION = 1
+
+# Bytes hashed from the start and the end of a source file
+FINGERPRINT_SAMPLE_BYTES = 16 * 1024 * 1024
+
+
+class QuantizedArtifactCache:
+    """
+    Disk cache of quantized state dicts
+
+    Artifacts are safetensors files keyed by the source file fingerprint, the
+    quantization format and the layers kept in base precision. The first load
+    writes the converted weights tensor by tensor; later loads memory-map the
+    artifact, so no conversion runs and both precisions are never held in
+    memory at once.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_gb: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            cache_dir: Artifact directory (default: ~/.cache/genesis/quantized)
+            max_size_gb: Total artifact size limit, least recently used artifacts
+                are removed past it (default: no limit)
+        """
+        if cache_dir is None:
+            cache_dir = Path.home() / '.cache' / 'genesis' / 'quantized'
+
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(max_size_gb * 1024**3) if max_size_gb else None
+        self.lock = threading.Lock()
+        self._fingerprints: Dict[tuple, str] = {}
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+        }
+
+    def fingerprint(self, path: str) -> str:
+        """
+        Fingerprint of a source file
+
+        Hashes size, mtime and the first and last FINGERPRINT_SAMPLE_BYTES
+        instead of the whole file, which would take longer than the conversion
+        the cache avoids. Results are memoized per (path, size, mtime).
+
+        Args:
+            path: Source weights file
+
+        Returns:
+            Hex digest
+        """
+        stat = os.stat(path)
+        memo_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self._fingerprints.get(memo_key)
+        if cached is not None:
+            return cached
+
+        digest = hashlib.sha256(f"{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            if stat.st_size > 2 * FINGERPRINT_SAMPLE_BYTES:
+                f.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+                digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+
+        result = digest.hexdigest()
+        with self.lock:
+            self._fingerprints[memo_key] = result
+        return result
+
+    def make_key(
+        self,
+        source_paths: Iterable[str],
+        quant_format: str,
+        keep_layers: Iterable[str] = (),
+        extra: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build the artifact key
+
+        Args:
+            source_paths: Files the state dict was built from
+            quant_format: Quantization format name (e.g. fp8_e4m3fn)
+            keep_layers: Layer name patterns kept in base precision
+            extra: Other settings that change the converted weights
+
+        Returns:
+            Key string
+        """
+        payload = {
+            'version': ARTIFACT_VERSION,
+            'sources': [self.fingerprint(p) for p in source_paths],
+            'format': quant_format,
+            'keep_layers': sorted(set(keep_layers)),
+            'extra': extra or {},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+    def _artifact_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.safetensors"
+
+    def get(self, key: str) -> Optional[Dict[str, torch.Tensor]]:
+        """
+        Memory-map a cached artifact
+
+        Args:
+            key: Artifact key
+
+        Returns:
+            State dict backed by the artifact file, or None on a miss
+        """
+        path = self._artifact_path(key)
+        if not path.exists():
+            self.stats['misses'] += 1
+            return None
+
+        try:
+            sd, _ = load_safetensors_mmap(str(path))
+        except Exception as e:
+            logger.warning(f"Dropping unreadable quantized artifact {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.stats['misses'] += 1
+            return None
+
+        # Recency for eviction
+        os.utime(path, None)
+        self.stats['hits'] += 1
+        logger.info(f"Loaded quantized artifact {path.name}")
+        return sd
+
+    def put(
+        self,
+        key: str,
+        tensors: Dict[str, torch.Tensor],
+        dtypes: Optional[Dict[str, torch.dtype]] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict[str, torch.Tensor]]:
+        """
+        Write an artifact, converting tensors one at a time
+
+        Args:
+            key: Artifact key
+            tensors: Source state dict (may be memory-mapped)
+            dtypes: Target dtype per tensor name, others keep their dtype
+            metadata: String metadata stored in the artifact
+
+        Returns:
+            State dict backed by the new artifact, or None if writing failed
+        """
+        path = self._artifact_path(key)
+        start = time.perf_counter()
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            save_safetensors_streaming(str(path), tensors, dtypes, metadata)
+        except Exception as e:
+            logger.warning(f"Failed to write quantized artifact {path.name}: {e}")
+            return None
+
+        self.stats['writes'] += 1
+        logger.info(f"Wrote quantized artifact {path.name} ({path.stat().st_size / 1024**3:.2f}GB) "
+                    f"in {time.perf_counter() - start:.1f}s")
+        self._evict(keep=path)
+
+        sd, _ = load_safetensors_mmap(str(path))
+        return sd
+
+    def _evict(self, keep: Optional[Path] = None):
+        """Remove least recently used artifacts past the size limit"""
+        if self.max_size_bytes is None or not self.cache_dir.exists():
+            return
+
+        artifacts = sorted(self.cache_dir.glob('*.safetensors'), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in artifacts)
+        for path in artifacts:
+            if total <= self.max_size_bytes:
+                break
+            if path == keep:
+                continue
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            self.stats['evictions'] += 1
+            logger.info(f"Evicted quantized artifact {path.name}")
+
+    def clear(self):
+        """Remove all artifacts"""
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*.safetensors'):
+                path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        artifacts = list(self.cache_dir.glob('*.safetensors')) if self.cache_dir.exists() else []
+        return {
+            **self.stats,
+            'artifacts': len(artifacts),
+            'size_gb': sum(p.stat().st_size for p in artifacts) / 1024**3,
+        }
+
+
+# Global cache instance
+_global_cache = None
+
+
+def get_quantized_cache() -> QuantizedArtifactCache:
+    """Get global quantized artifact cache instance"""
+    global _global_cache
+    if _global_cache is None:
+        _global_cache = QuantizedArtifactCache()
+    return _global_cache
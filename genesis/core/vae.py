@@ -6,10 +6,16 @@ Author: eddy
 
 import torch
 import torch.nn as nn
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Callable
 import logging
 
 
+# Approximate peak activation memory per pixel and per byte of dtype
+# (encode: per image pixel, decode: per latent pixel)
+ENCODE_MEMORY_PER_PIXEL = 1767
+DECODE_MEMORY_PER_PIXEL = 2178 * 64
+
+
 class VAE:
     """
     VAE wrapper for encoding and decoding
@@ -36,6 +42,25 @@ class VAE:
             self.model.to(self.device)
             self.model.eval()
     
+    def _encode_raw(self, images: torch.Tensor) -> torch.Tensor:
+        """Run model encoder and extract latent (unscaled)"""
+        latent_dist = self.model.encode(images)
+        
+        # Sample from distribution (use mean for deterministic)
+        if hasattr(latent_dist, 'sample'):
+            return latent_dist.sample()
+        elif hasattr(latent_dist, 'latent_dist'):
+            return latent_dist.latent_dist.sample()
+        return latent_dist
+    
+    def _decode_raw(self, latent: torch.Tensor) -> torch.Tensor:
+        """Run model decoder (input unscaled)"""
+        images = self.model.decode(latent)
+        
+        if hasattr(images, 'sample'):
+            images = images.sample
+        return images
+    
     def encode(self, images: torch.Tensor) -> torch.Tensor:
         """
         Encode images to latent space
@@ -52,19 +77,8 @@ class VAE:
         with torch.no_grad():
             images = images.to(self.device)
             
-            # Encode
-            latent_dist = self.model.encode(images)
-            
-            # Sample from distribution (use mean for deterministic)
-            if hasattr(latent_dist, 'sample'):
-                latent = latent_dist.sample()
-            elif hasattr(latent_dist, 'latent_dist'):
-                latent = latent_dist.latent_dist.sample()
-            else:
-                latent = latent_dist
-            
-            # Scale
-            latent = latent * self.scale_factor
+            # Encode and scale
+            latent = self._encode_raw(images) * self.scale_factor
             
         return latent
     
@@ -84,56 +98,267 @@ class VAE:
         with torch.no_grad():
             latent = latent.to(self.device)
             
-            # Unscale
-            latent = latent / self.scale_factor
-            
-            # Decode
-            images = self.model.decode(latent)
-            
-            if hasattr(images, 'sample'):
-                images = images.sample
+            # Unscale and decode
+            images = self._decode_raw(latent / self.scale_factor)
             
         return images
     
     def encode_tiled(
         self,
         images: torch.Tensor,
-        tile_size: int = 512,
-        overlap: int = 64
+        tile_size: Optional[int] = 512,
+        overlap: int = 64,
+        tile_batch_size: int = 4,
+        callback: Optional[Callable[[int, int], None]] = None
     ) -> torch.Tensor:
         """
         Encode images using tiling (for large images)
         
+        Tiles overlap and are blended with feathered weights to hide seams.
+        
         Args:
-            images: Image tensor
-            tile_size: Tile size in pixels
-            overlap: Overlap between tiles
+            images: Image tensor [B, C, H, W] in range [-1, 1]
+            tile_size: Tile size in pixels (None = largest tile fitting in free memory)
+            overlap: Overlap between tiles in pixels
+            tile_batch_size: Tiles per encoder forward
+            callback: Called with (tiles_done, total_tiles) after each forward;
+                may raise to abort (e.g. Executor.checkpoint)
             
         Returns:
             Latent tensor
         """
-        # TODO: Implement tiled encoding for memory efficiency
-        return self.encode(images)
+        if self.model is None:
+            raise RuntimeError("VAE model not loaded")
+        
+        if tile_size is None:
+            tile_size = self._auto_tile_size(
+                images.shape, ENCODE_MEMORY_PER_PIXEL, tile_batch_size, step=64, min_tile=128
+            )
+        
+        with torch.no_grad():
+            latent = self._process_tiled(
+                images, self._encode_raw, tile_size, overlap, tile_batch_size, align=8, callback=callback
+            )
+        
+        return latent * self.scale_factor
     
     def decode_tiled(
         self,
         latent: torch.Tensor,
-        tile_size: int = 64,
-        overlap: int = 8
+        tile_size: Optional[int] = 64,
+        overlap: int = 8,
+        tile_batch_size: int = 4,
+        callback: Optional[Callable[[int, int], None]] = None
     ) -> torch.Tensor:
         """
         Decode latent using tiling (for large images)
         
+        Tiles overlap and are blended with feathered weights to hide seams.
+        
         Args:
-            latent: Latent tensor
-            tile_size: Tile size in latent space
-            overlap: Overlap between tiles
+            latent: Latent tensor [B, 4, h, w]
+            tile_size: Tile size in latent space (None = largest tile fitting in free memory)
+            overlap: Overlap between tiles in latent space
+            tile_batch_size: Tiles per decoder forward
+            callback: Called with (tiles_done, total_tiles) after each forward;
+                may raise to abort (e.g. Executor.checkpoint)
             
         Returns:
             Image tensor
         """
-        # TODO: Implement tiled decoding for memory efficiency
-        return self.decode(latent)
+        if self.model is None:
+            raise RuntimeError("VAE model not loaded")
+        
+        if tile_size is None:
+            tile_size = self._auto_tile_size(
+                latent.shape, DECODE_MEMORY_PER_PIXEL, tile_batch_size, step=8, min_tile=16
+            )
+        
+        with torch.no_grad():
+            images = self._process_tiled(
+                latent / self.scale_factor, self._decode_raw, tile_size, overlap, tile_batch_size, align=1,
+                callback=callback
+            )
+        
+        return images
+    
+    def _get_free_memory(self) -> Optional[int]:
+        """Free memory on the VAE device in bytes (None if not limited)"""
+        if self.device.type == 'cuda' and torch.cuda.is_available():
+            free, _ = torch.cuda.mem_get_info(self.device)
+            # Memory cached by the allocator is reusable as well
+            reserved = torch.cuda.memory_reserved(self.device) - torch.cuda.memory_allocated(self.device)
+            return free + reserved
+        return None
+    
+    def _auto_tile_size(
+        self,
+        shape: torch.Size,
+        memory_per_pixel: int,
+        tile_batch_size: int,
+        step: int,
+        min_tile: int
+    ) -> int:
+        """
+        Pick the largest square tile whose batched forward fits in free memory
+        
+        Args:
+            shape: Input shape [B, C, H, W]
+            memory_per_pixel: Estimated bytes per input pixel per dtype byte
+            tile_batch_size: Tiles per forward
+            step: Tile size granularity
+            min_tile: Smallest tile to consider
+            
+        Returns:
+            Tile size in input pixels
+        """
+        batch, _, height, width = shape
+        max_tile = max(height, width)
+        free_memory = self._get_free_memory()
+        
+        if free_memory is None:
+            return max_tile
+        
+        dtype_size = 4
+        if self.model is not None:
+            param = next(self.model.parameters(), None)
+            if param is not None:
+                dtype_size = param.element_size()
+        
+        budget = free_memory * 0.8
+        tile = max_tile
+        while tile > min_tile:
+            tile_pixels = min(tile, height) * min(tile, width)
+            if tile_pixels * batch * tile_batch_size * memory_per_pixel * dtype_size <= budget:
+                break
+            tile = (tile - 1) // step * step
+        
+        tile = max(tile, min_tile)
+        self.logger.info(f"Auto tile size: {tile} (free memory {free_memory / 1e9:.2f} GB)")
+        return tile
+    
+    @staticmethod
+    def _tile_starts(length: int, tile: int, overlap: int, align: int = 1) -> List[int]:
+        """Start offsets of overlapping tiles covering [0, length), multiples of align"""
+        if length <= tile:
+            return [0]
+        
+        starts = list(range(0, length - tile, tile - overlap))
+        last = (length - tile) // align * align
+        if last > starts[-1]:
+            starts.append(last)
+        return starts
+    
+    @staticmethod
+    def _feather(
+        length: int,
+        overlap: int,
+        ramp_start: bool,
+        ramp_end: bool,
+        device: torch.device,
+        align: int = 1
+    ) -> torch.Tensor:
+        """1D blend weights, linearly ramped on edges shared with neighbouring tiles"""
+        weight = torch.ones(length, device=device)
+        # Clamp before aligning, so the ramp stays a multiple of align
+        overlap = min(overlap, length // 2) // align * align
+        
+        if overlap > 0:
+            ramp = torch.arange(1, overlap + 1, device=device, dtype=torch.float32) / (overlap + 1)
+            if ramp_start:
+                weight[:overlap] = ramp
+            if ramp_end:
+                weight[-overlap:] = torch.minimum(weight[-overlap:], ramp.flip(0))
+        
+        return weight
+    
+    def _process_tiled(
+        self,
+        x: torch.Tensor,
+        process_fn: Callable[[torch.Tensor], torch.Tensor],
+        tile_size: int,
+        overlap: int,
+        tile_batch_size: int,
+        align: int,
+        callback: Optional[Callable[[int, int], None]] = None
+    ) -> torch.Tensor:
+        """
+        Apply process_fn over overlapping tiles and blend the results
+        
+        Several tiles are concatenated along the batch dimension per forward.
+        The output/input scale is inferred from the first processed batch.
+        
+        Args:
+            x: Input tensor [B, C, H, W]
+            process_fn: Encoder or decoder function
+            tile_size: Tile size in input pixels
+            overlap: Overlap in input pixels
+            tile_batch_size: Tiles per forward
+            align: Tile offsets and sizes are multiples of this
+            callback: Progress callback(tiles_done, total_tiles)
+            
+        Returns:
+            Blended output tensor
+        """
+        batch, _, height, width = x.shape
+        if height % align or width % align:
+            # Only whole multiples of align map onto the output grid
+            height, width = height // align * align, width // align * align
+            self.logger.debug(f"Tiled processing: input cropped to {height}x{width} (multiple of {align})")
+            x = x[:, :, :height, :width]
+        tile_h = min(max(tile_size // align * align, align), height)
+        tile_w = min(max(tile_size // align * align, align), width)
+        # Clamp before aligning, tile_h // 2 or tile_w // 2 need not be multiples of align
+        overlap = min(overlap, tile_h // 2, tile_w // 2) // align * align
+        
+        tiles = [
+            (y, x0)
+            for y in self._tile_starts(height, tile_h, overlap, align)
+            for x0 in self._tile_starts(width, tile_w, overlap, align)
+        ]
+        self.logger.debug(f"Tiled processing: {len(tiles)} tiles of {tile_h}x{tile_w}, overlap {overlap}")
+        
+        output = None
+        weights = None
+        out_dtype = None
+        scale = 1.0
+        
+        for i in range(0, len(tiles), max(tile_batch_size, 1)):
+            group = tiles[i:i + max(tile_batch_size, 1)]
+            tile_input = torch.cat(
+                [x[:, :, y:y + tile_h, x0:x0 + tile_w] for y, x0 in group], dim=0
+            ).to(self.device)
+            
+            result = process_fn(tile_input)
+            out_h, out_w = result.shape[-2:]
+            
+            if output is None:
+                out_dtype = result.dtype
+                scale = out_h / tile_h
+                output = torch.zeros(
+                    batch, result.shape[1], round(height * scale), round(width * scale),
+                    dtype=torch.float32, device=result.device
+                )
+                weights = torch.zeros(1, 1, output.shape[2], output.shape[3], device=result.device)
+            
+            out_overlap = round(overlap * scale)
+            out_align = max(round(align * scale), 1)
+            for j, (y, x0) in enumerate(group):
+                oy, ox = round(y * scale), round(x0 * scale)
+                mask = (
+                    self._feather(out_h, out_overlap, y > 0, y + tile_h < height, result.device, out_align)[:, None]
+                    * self._feather(out_w, out_overlap, x0 > 0, x0 + tile_w < width, result.device, out_align)[None, :]
+                )
+                
+                output[:, :, oy:oy + out_h, ox:ox + out_w] += result[j * batch:(j + 1) * batch].float() * mask
+                weights[:, :, oy:oy + out_h, ox:ox + out_w] += mask
+            
+            del tile_input, result
+            
+            if callback:
+                callback(min(i + len(group), len(tiles)), len(tiles))
+        
+        return (output / weights).to(out_dtype)
     
     def get_latent_size(self, image_size: Tuple[int, int]) -> Tuple[int, int]:
         """
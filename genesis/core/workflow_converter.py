@@ -5,7 +5,13 @@ Author: eddy
 """
 
 import json
-from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import math
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from pathlib import Path
 import logging
 
@@ -27,6 +33,74 @@ class WorkflowNode:
         return f"WorkflowNode(id={self.node_id}, type={self.class_type})"
 
 
+# Class name keywords used to classify nodes without a RESOURCE_TYPE attribute
+GPU_NODE_KEYWORDS = ('Sampler', 'Decode', 'Encode', 'Upscale')
+
+
+class NodeOutputCache:
+    """
+    Bounded LRU cache of node outputs keyed by node signature
+    
+    Survives across workflow runs so unchanged nodes (model loaders,
+    text encoders, ...) are not re-executed on resubmission.
+    """
+    
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, signature: str) -> Tuple[bool, Any]:
+        """
+        Look up cached outputs
+        
+        Args:
+            signature: Node signature
+            
+        Returns:
+            (found, outputs) tuple
+        """
+        with self.lock:
+            if signature in self._entries:
+                self._entries.move_to_end(signature)
+                self.hits += 1
+                return True, self._entries[signature]
+            
+            self.misses += 1
+            return False, None
+    
+    def put(self, signature: str, outputs: Any):
+        """Store node outputs, evicting least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        
+        with self.lock:
+            self._entries[signature] = outputs
+            self._entries.move_to_end(signature)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all cached outputs"""
+        with self.lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
 class ComfyUIWorkflowConverter:
     """
     Convert and execute ComfyUI workflow
@@ -36,12 +110,24 @@ class ComfyUIWorkflowConverter:
     - Dynamic node creation
     - Connection resolution
     - Execution order calculation
+    - Incremental execution (only dirty nodes re-run)
+    - Parallel execution of independent branches
     - Result extraction
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size: int = 64,
+        max_workers: int = 1,
+        output_cache: Optional[NodeOutputCache] = None
+    ):
         self.nodes: Dict[str, WorkflowNode] = {}
         self.execution_order: List[str] = []
+        # Converters may share one cache, each keeps its own parsed workflow
+        self.output_cache = output_cache if output_cache is not None else NodeOutputCache(cache_size)
+        self.max_workers = max_workers
+        # Nodes sharing a locked resource never run concurrently
+        self.resource_locks: Dict[str, threading.Lock] = {'gpu': threading.Lock()}
         self.logger = logging.getLogger(__name__)
     
     def load_workflow(self, workflow_path: str) -> Dict[str, Any]:
@@ -167,70 +253,248 @@ class ComfyUIWorkflowConverter:
         
         return input_value
     
-    def execute_workflow(self, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _get_node_class(self, class_type: str):
+        """Find node class (Genesis native nodes first, then custom nodes)"""
+        node_class = COMFYUI_NODE_REGISTRY.get(class_type)
+        if not node_class:
+            node_class = custom_node_loader.get_node_class(class_type)
+        return node_class
+    
+    @staticmethod
+    def _hash_literal(value: Any) -> str:
+        """Stable text form of a literal input value"""
+        try:
+            return json.dumps(value, sort_keys=True, default=repr)
+        except (TypeError, ValueError):
+            return repr(value)
+    
+    def _calculate_signatures(self) -> Dict[str, str]:
+        """
+        Calculate node signatures for incremental execution
+        
+        A signature covers class_type, literal inputs and the signatures of
+        upstream nodes, so any change propagates to all dependents. Nodes
+        whose IS_CHANGED returns NaN are always treated as dirty.
+        
+        Returns:
+            Dictionary of node_id -> signature
+        """
+        signatures = {}
+        
+        for node_id in self.execution_order:
+            node = self.nodes[node_id]
+            parts = [node.class_type]
+            literal_inputs = {}
+            
+            for input_name in sorted(node.inputs.keys()):
+                input_value = node.inputs[input_name]
+                if isinstance(input_value, list) and len(input_value) == 2:
+                    dep_node_id = str(input_value[0])
+                    if dep_node_id in signatures:
+                        parts.append(f"{input_name}=<{signatures[dep_node_id]}:{input_value[1]}>")
+                        continue
+                literal_inputs[input_name] = input_value
+                parts.append(f"{input_name}={self._hash_literal(input_value)}")
+            
+            node_class = self._get_node_class(node.class_type)
+            is_changed = getattr(node_class, 'IS_CHANGED', None) if node_class else None
+            if callable(is_changed):
+                try:
+                    changed = is_changed(**literal_inputs)
+                except Exception as e:
+                    self.logger.debug(f"IS_CHANGED failed for node {node_id}: {e}")
+                    changed = float('nan')
+                
+                if isinstance(changed, float) and math.isnan(changed):
+                    # Unique across converters sharing the cache
+                    changed = f"volatile-{uuid.uuid4().hex}"
+                parts.append(f"IS_CHANGED={self._hash_literal(changed)}")
+            
+            signatures[node_id] = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+        
+        return signatures
+    
+    def _get_dependency_graph(self) -> Tuple[Dict[str, set], Dict[str, set]]:
+        """
+        Build dependency graph
+        
+        Returns:
+            (dependencies, dependents) dictionaries of node_id -> node_id set
+        """
+        dependencies = {node_id: set() for node_id in self.nodes}
+        dependents = {node_id: set() for node_id in self.nodes}
+        
+        for node_id, node in self.nodes.items():
+            for input_value in node.inputs.values():
+                if isinstance(input_value, list) and len(input_value) == 2:
+                    dep_node_id = str(input_value[0])
+                    if dep_node_id in self.nodes:
+                        dependencies[node_id].add(dep_node_id)
+                        dependents[dep_node_id].add(node_id)
+        
+        return dependencies, dependents
+    
+    def _get_node_resource(self, node_class, class_type: str) -> str:
+        """
+        Classify the resource a node mainly uses ('gpu', 'disk' or 'cpu')
+        
+        Nodes may declare RESOURCE_TYPE explicitly, otherwise the class name
+        is used as a hint.
+        """
+        resource = getattr(node_class, 'RESOURCE_TYPE', None)
+        if resource:
+            return resource
+        
+        if class_type.startswith('Load') or 'Loader' in class_type:
+            return 'disk'
+        if any(keyword in class_type for keyword in GPU_NODE_KEYWORDS):
+            return 'gpu'
+        return 'cpu'
+    
+    def _execute_node(
+        self,
+        node_id: str,
+        signature: Optional[str],
+        depends_on_failed: bool
+    ) -> Dict[str, Any]:
+        """
+        Execute single node (or reuse its cached outputs)
+        
+        Args:
+            node_id: Node ID
+            signature: Node signature, None disables caching
+            depends_on_failed: Whether an upstream node failed
+            
+        Returns:
+            Node result entry
+        """
+        node = self.nodes[node_id]
+        
+        if signature is not None:
+            found, cached_output = self.output_cache.get(signature)
+            if found:
+                node.outputs = cached_output
+                node.executed = True
+                
+                self.logger.info(f"Node {node_id} ({node.class_type}) unchanged, using cached outputs")
+                return {
+                    'success': True,
+                    'outputs': cached_output,
+                    'class_type': node.class_type,
+                    'cached': True
+                }
+        
+        self.logger.info(f"Executing node: {node_id} ({node.class_type})")
+        
+        resolved_inputs = {}
+        for input_name, input_value in node.inputs.items():
+            resolved_inputs[input_name] = self._resolve_input(input_value)
+        
+        node_class = self._get_node_class(node.class_type)
+        
+        if not node_class:
+            self.logger.warning(f"Node class {node.class_type} not registered, skipping")
+            node.executed = True
+            return {
+                'success': False,
+                'error': f"Node class {node.class_type} not found",
+                'class_type': node.class_type
+            }
+        
+        node_instance = node_class()
+        lock = self.resource_locks.get(self._get_node_resource(node_class, node.class_type))
+        
+        try:
+            if lock is not None:
+                with lock:
+                    output = node_instance.execute(**resolved_inputs)
+            else:
+                output = node_instance.execute(**resolved_inputs)
+            node.outputs = output
+            node.executed = True
+            
+            # Outputs computed from failed upstream nodes are not reusable
+            if signature is not None and not depends_on_failed:
+                self.output_cache.put(signature, output)
+            
+            self.logger.info(f"Node {node_id} executed successfully")
+            return {
+                'success': True,
+                'outputs': output,
+                'class_type': node.class_type
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Node {node_id} execution failed: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'class_type': node.class_type
+            }
+    
+    def execute_workflow(
+        self,
+        context: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Execute workflow
         
+        Nodes whose signature matches a cached output from a previous run
+        are not re-executed; only the dirty subgraph runs. With more than
+        one worker, nodes are dispatched as soon as their dependencies
+        complete, so independent branches (model loads, text/vision/audio
+        encoders) overlap.
+        
         Args:
             context: Execution context (engine, models, etc.)
+            use_cache: Reuse cached node outputs across runs
+            max_workers: Parallel node workers (default: converter setting)
             
         Returns:
             Execution results
         """
         context = context or {}
+        max_workers = max_workers or self.max_workers
         results = {}
+        cached_nodes = []
+        failed_nodes = set()
         
         try:
-            for node_id in self.execution_order:
-                node = self.nodes[node_id]
-                
-                self.logger.info(f"Executing node: {node_id} ({node.class_type})")
-                
-                resolved_inputs = {}
-                for input_name, input_value in node.inputs.items():
-                    resolved_inputs[input_name] = self._resolve_input(input_value)
-                
-                # Try Genesis native nodes first, then custom nodes
-                node_class = COMFYUI_NODE_REGISTRY.get(node.class_type)
-                if not node_class:
-                    node_class = custom_node_loader.get_node_class(node.class_type)
-                
-                if node_class:
-                    node_instance = node_class()
-                    
-                    try:
-                        output = node_instance.execute(**resolved_inputs)
-                        node.outputs = output
-                        node.executed = True
-                        
-                        results[node_id] = {
-                            'success': True,
-                            'outputs': output,
-                            'class_type': node.class_type
-                        }
-                        
-                        self.logger.info(f"Node {node_id} executed successfully")
-                        
-                    except Exception as e:
-                        self.logger.error(f"Node {node_id} execution failed: {e}")
-                        results[node_id] = {
-                            'success': False,
-                            'error': str(e),
-                            'class_type': node.class_type
-                        }
-                else:
-                    self.logger.warning(f"Node class {node.class_type} not registered, skipping")
-                    node.executed = True
-                    results[node_id] = {
-                        'success': False,
-                        'error': f"Node class {node.class_type} not found",
-                        'class_type': node.class_type
-                    }
+            signatures = self._calculate_signatures() if use_cache else {}
+            dependencies, dependents = self._get_dependency_graph()
+            
+            def record(node_id: str, entry: Dict[str, Any]):
+                results[node_id] = entry
+                if entry.get('cached'):
+                    cached_nodes.append(node_id)
+                if not entry['success'] or dependencies[node_id] & failed_nodes:
+                    failed_nodes.add(node_id)
+            
+            if max_workers <= 1:
+                for node_id in self.execution_order:
+                    entry = self._execute_node(
+                        node_id,
+                        signatures.get(node_id),
+                        bool(dependencies[node_id] & failed_nodes)
+                    )
+                    record(node_id, entry)
+            else:
+                self._execute_parallel(
+                    signatures, dependencies, dependents, failed_nodes, record, max_workers
+                )
+            
+            if cached_nodes:
+                self.logger.info(
+                    f"Reused cached outputs for {len(cached_nodes)}/{len(self.execution_order)} nodes"
+                )
             
             return {
                 'success': True,
                 'results': results,
-                'execution_order': self.execution_order
+                'execution_order': self.execution_order,
+                'cached_nodes': cached_nodes
             }
             
         except Exception as e:
@@ -241,6 +505,45 @@ class ComfyUIWorkflowConverter:
                 'results': results
             }
     
+    def _execute_parallel(
+        self,
+        signatures: Dict[str, str],
+        dependencies: Dict[str, set],
+        dependents: Dict[str, set],
+        failed_nodes: set,
+        record: Callable[[str, Dict[str, Any]], None],
+        max_workers: int
+    ):
+        """Dispatch ready nodes to a thread pool until the graph is drained"""
+        order_index = {node_id: i for i, node_id in enumerate(self.execution_order)}
+        pending = {node_id: set(deps) for node_id, deps in dependencies.items()}
+        ready = [node_id for node_id in self.execution_order if not pending[node_id]]
+        running = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='GenesisWorkflow') as pool:
+            while ready or running:
+                for node_id in ready:
+                    future = pool.submit(
+                        self._execute_node,
+                        node_id,
+                        signatures.get(node_id),
+                        bool(dependencies[node_id] & failed_nodes)
+                    )
+                    running[future] = node_id
+                ready = []
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    record(node_id, future.result())
+                    
+                    for dep_node_id in dependents[node_id]:
+                        pending[dep_node_id].discard(node_id)
+                        if not pending[dep_node_id]:
+                            ready.append(dep_node_id)
+                
+                ready.sort(key=order_index.get)
+    
     def get_output_nodes(self) -> List[WorkflowNode]:
         """Get output nodes (nodes with no dependents)"""
         output_nodes = []
@@ -319,13 +622,19 @@ class ComfyUIWorkflowConverter:
                 }
                 for node_id, node in self.nodes.items()
             },
-            'execution_order': self.execution_order
+            'execution_order': self.execution_order,
+            'cache': self.output_cache.get_stats()
         }
+    
+    def clear_cache(self):
+        """Drop cached node outputs from previous runs"""
+        self.output_cache.clear()
 
 
 def load_and_execute_workflow(
     workflow_path: str,
-    context: Optional[Dict[str, Any]] = None
+    context: Optional[Dict[str, Any]] = None,
+    max_workers: int = 1
 ) -> Dict[str, Any]:
     """
     Convenience function to load and execute workflow
@@ -333,11 +642,12 @@ def load_and_execute_workflow(
     Args:
         workflow_path: Path to workflow JSON
         context: Execution context
+        max_workers: Parallel node workers (1 = serial)
         
     Returns:
         Execution results
     """
-    converter = ComfyUIWorkflowConverter()
+    converter = ComfyUIWorkflowConverter(max_workers=max_workers)
     
     workflow = converter.load_workflow(workflow_path)
     
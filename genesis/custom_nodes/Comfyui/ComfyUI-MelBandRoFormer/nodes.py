@@ -6,6 +6,12 @@ from tqdm import tqdm
 import librosa
 import folder_paths
 
+try:
+    import torchaudio
+    TORCHAUDIO_AVAILABLE = True
+except ImportError:
+    TORCHAUDIO_AVAILABLE = False
+
 from .model.mel_band_roformer import MelBandRoformer
 
 script_directory = os.path.dirname(os.path.abspath(__file__))
@@ -23,6 +29,180 @@ def get_windowing_array(window_size, fade_size, device):
     window[:fade_size] *= fadein
     return window.to(device)
 
+def get_windows(window_size, fade_size, device):
+    # first chunk has no fade in, last chunk no fade out
+    middle = get_windowing_array(window_size, fade_size, device)
+    first = middle.clone()
+    first[:fade_size] = 1
+    last = middle.clone()
+    last[-fade_size:] = 1
+    return first, middle, last
+
+def resample(audio, orig_sr, target_sr):
+    if TORCHAUDIO_AVAILABLE:
+        return torchaudio.functional.resample(audio.to(device), orig_sr, target_sr)
+    resampled = librosa.resample(audio.cpu().numpy(), orig_sr=orig_sr, target_sr=target_sr, axis=-1)
+    return torch.from_numpy(resampled)
+
+def auto_batch_size(model, part, max_batch_size=16):
+    """Runs one chunk to measure its peak memory, returns the output and how many chunks fit in free memory"""
+    with torch.no_grad():
+        if part.device.type != "cuda":
+            return model(part), 1
+        torch.cuda.reset_peak_memory_stats(part.device)
+        allocated = torch.cuda.memory_allocated(part.device)
+        x = model(part)
+        per_chunk = max(torch.cuda.max_memory_allocated(part.device) - allocated, 1)
+    free_memory = mm.get_free_memory(part.device)
+    return x, max(1, min(max_batch_size, int(free_memory * 0.8 // per_chunk)))
+
+def separate_stream(model, audio, sample_rate, batch_size=0, chunk_size=352800, num_overlap=2, pbar=None):
+    """
+    Separates vocals chunk by chunk, yielding (vocals, instruments) [channels, samples] at 44100Hz
+    once all chunks overlapping a range are done, so long inputs can be consumed incrementally.
+    On CUDA batches are uploaded from pinned staging buffers and results are copied back without
+    syncing, each range is yielded one batch late while the next batch runs.
+
+    audio: [channels, samples] waveform, batch_size: chunks per forward, 0 sizes batches to free memory,
+    pbar: optional ProgressBar updated per batch
+    """
+    sr = 44100
+
+    if audio.shape[0] == 1:
+        # Convert mono to stereo by duplicating the channel
+        audio = audio.repeat(2, 1)
+        print("Converted mono input to stereo.")
+
+    if sample_rate != sr:
+        print(f"Resampling input {sample_rate} to {sr}")
+        audio = resample(audio, sample_rate, sr)
+    original_audio = audio.cpu()
+    audio_length = original_audio.shape[-1]
+
+    C = chunk_size
+    step = C // num_overlap
+    fade_size = C // 10
+    border = C - step
+
+    pad = border if audio_length > 2 * border and border > 0 else 0
+    audio_input = F.pad(original_audio, (pad, pad), mode='reflect') if pad else original_audio
+    use_cuda = device.type == "cuda"
+
+    window_first, window_middle, window_last = get_windows(C, fade_size, device)
+
+    total_length = audio_input.shape[1]
+    starts = list(range(0, total_length, step))
+
+    # overlap-add accumulators, only cover [base, base + width) of the padded signal
+    base = 0
+    vocals = torch.zeros(audio_input.shape[0], 0, device=device)
+    counter = torch.zeros(1, 0, device=device)
+
+    model.to(device)
+
+    def get_part(i):
+        part = audio_input[:, i:i + C]
+        length = part.shape[-1]
+        if length < C:
+            if length > C // 2 + 1:
+                part = F.pad(input=part, pad=(0, C - length), mode='reflect')
+            else:
+                part = F.pad(input=part, pad=(0, C - length, 0, 0), mode='constant', value=0)
+        return part, length
+
+    # two pinned staging buffers, a batch is stacked into one while the other may still be uploading
+    staging, staging_events = [], [None, None]
+    uploads = 0
+
+    def upload(parts):
+        nonlocal uploads
+        if not use_cuda:
+            return torch.stack(parts).to(device)
+        if not staging:
+            staging.extend(torch.empty((batch_size,) + parts[0].shape, dtype=parts[0].dtype, pin_memory=True) for _ in range(2))
+        k = uploads % 2
+        uploads += 1
+        # the previous upload from this buffer must have landed before it is overwritten
+        if staging_events[k] is not None:
+            staging_events[k].synchronize()
+        buffer = staging[k][:len(parts)]
+        torch.stack(parts, out=buffer)
+        x = buffer.to(device, non_blocking=True)
+        staging_events[k] = torch.cuda.Event()
+        staging_events[k].record()
+        return x
+
+    def download(x):
+        # copy to pinned memory without syncing, the event tells when the copy has landed
+        if not use_cuda:
+            return x.cpu(), None
+        out = torch.empty(x.shape, dtype=x.dtype, pin_memory=True)
+        out.copy_(x, non_blocking=True)
+        event = torch.cuda.Event()
+        event.record()
+        return out, event
+
+    def finish(pending):
+        estimated, event, out_start, out_end = pending
+        if event is not None:
+            event.synchronize()
+        return estimated, original_audio[:, out_start - pad:out_end - pad] - estimated
+
+    index = 0
+    first_output = None
+    # output of the previous batch, yielded after the current batch is queued so the GPU never waits on the consumer
+    pending = None
+    try:
+        while index < len(starts):
+            if batch_size <= 0:
+                part, _ = get_part(starts[0])
+                first_output, batch_size = auto_batch_size(model, part.to(device).unsqueeze(0))
+                print(f"Mel-Band RoFormer batch size: {batch_size}")
+
+            batch_starts = starts[index:index + (1 if first_output is not None else batch_size)]
+            parts, lengths = zip(*[get_part(i) for i in batch_starts])
+            if first_output is not None:
+                x, first_output = first_output, None
+            else:
+                with torch.no_grad():
+                    x = model(upload(parts))
+
+            end = batch_starts[-1] + lengths[-1]
+            if end - base > vocals.shape[-1]:
+                grow = end - base - vocals.shape[-1]
+                vocals = F.pad(vocals, (0, grow))
+                counter = F.pad(counter, (0, grow))
+
+            for j, (i, length) in enumerate(zip(batch_starts, lengths)):
+                if i == 0:
+                    window = window_first
+                elif i + C >= total_length:
+                    window = window_last
+                else:
+                    window = window_middle
+                vocals[..., i - base:i - base + length] += x[j, ..., :length] * window[:length]
+                counter[..., i - base:i - base + length] += window[:length]
+
+            index += len(batch_starts)
+            if pbar is not None:
+                pbar.update_absolute(index, len(starts))
+
+            # everything before the next chunk start is final
+            done = starts[index] if index < len(starts) else total_length
+            out_start, out_end = max(base, pad), min(done, total_length - pad)
+            if out_end > out_start:
+                estimated, event = download(vocals[..., out_start - base:out_end - base] / counter[..., out_start - base:out_end - base])
+                if pending is not None:
+                    yield finish(pending)
+                pending = (estimated, event, out_start, out_end)
+            vocals = vocals[..., done - base:]
+            counter = counter[..., done - base:]
+            base = done
+        if pending is not None:
+            yield finish(pending)
+    finally:
+        model.to(offload_device)
+
 class MelBandRoFormerModelLoader:
     @classmethod
     def INPUT_TYPES(s):
@@ -77,6 +257,9 @@ class MelBandRoFormerSampler:
                 "model": ("MELROFORMERMODEL",),
                 "audio": ("AUDIO",),
             },
+            "optional": {
+                "batch_size": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1, "tooltip": "Chunks per model forward, 0 sizes the batch to free memory"}),
+            },
         }
 
     RETURN_TYPES = ("AUDIO","AUDIO",)
@@ -84,85 +267,22 @@ class MelBandRoFormerSampler:
     FUNCTION = "process"
     CATEGORY = "Mel-Band RoFormer"
 
-    def process(self, model, audio):
-
-        audio_input = audio["waveform"]
-        sample_rate = audio["sample_rate"]
-
-        B, audio_channels, audio_length = audio_input.shape
-
+    def process(self, model, audio, batch_size=0):
         sr = 44100
+        audio_input = audio["waveform"][0]
 
-        if audio_channels == 1:
-            # Convert mono to stereo by duplicating the channel
-            audio_input = audio_input.repeat(1, 2, 1)
-            audio_channels = 2
-            print("Converted mono input to stereo.")
-
-        if sample_rate != sr:
-            print(f"Resampling input {sample_rate} to {sr}")
-            audio_np = audio_input.cpu().numpy()
-            resampled = librosa.resample(audio_np, orig_sr=sample_rate, target_sr=sr, axis=-1)
-            audio_input = torch.from_numpy(resampled)
-        audio_input = original_audio = audio_input[0]
-
-        C = 352800
-        N = 2
-        step = C // N
-        fade_size = C // 10
-        border = C - step
-
-        if audio_length > 2 * border and border > 0:
-            audio_input = F.pad(audio_input, (border, border), mode='reflect')
-
-        windowing_array = get_windowing_array(C, fade_size, device)
-
-
-        audio_input = audio_input.to(device)
-        vocals = torch.zeros_like(audio_input, dtype=torch.float32).to(device)
-        counter = torch.zeros_like(audio_input, dtype=torch.float32).to(device)
-
-        total_length = audio_input.shape[1]
-        num_chunks = (total_length + step - 1) // step
-
-        model.to(device)
-
-        comfy_pbar = ProgressBar(num_chunks)
-
-        for i in tqdm(range(0, total_length, step), desc="Processing chunks"):
-            part = audio_input[:, i:i + C]
-            length = part.shape[-1]
-            if length < C:
-                if length > C // 2 + 1:
-                    part = F.pad(input=part, pad=(0, C - length), mode='reflect')
-                else:
-                    part = F.pad(input=part, pad=(0, C - length, 0, 0), mode='constant', value=0)
-
-            x = model(part.unsqueeze(0))[0]
-
-            window = windowing_array.clone()
-            if i == 0:
-                window[:fade_size] = 1
-            elif i + C >= total_length:
-                window[-fade_size:] = 1
-
-            vocals[..., i:i+length] += x[..., :length] * window[..., :length]
-            counter[..., i:i+length] += window[..., :length]
-            comfy_pbar.update(1)
-
-        model.to(offload_device)
-
-        estimated_sources = vocals / counter
-
-        if audio_length > 2 * border and border > 0:
-            estimated_sources = estimated_sources[..., border:-border]
+        comfy_pbar = ProgressBar(1)
+        vocals, instruments = [], []
+        for vocals_part, instruments_part in tqdm(separate_stream(model, audio_input, audio["sample_rate"], batch_size=batch_size, pbar=comfy_pbar), desc="Processing chunks"):
+            vocals.append(vocals_part)
+            instruments.append(instruments_part)
 
         vocals_out = {
-            "waveform": estimated_sources.unsqueeze(0).cpu(),
+            "waveform": torch.cat(vocals, -1).unsqueeze(0),
             "sample_rate": sr,
         }
         instruments_out = {
-            "waveform": (original_audio.to(device) - estimated_sources).unsqueeze(0).cpu(),
+            "waveform": torch.cat(instruments, -1).unsqueeze(0),
             "sample_rate": sr,
         }
 
@@ -1,5 +1,10 @@
 import torch
 import weakref
+try:
+    from genesis.core.compile_cache import get_compile_cache
+    COMPILE_CACHE_AVAILABLE = True
+except ImportError:
+    COMPILE_CACHE_AVAILABLE = False
 COMPILED_FORWARD_CACHE = weakref.WeakKeyDictionary()
 
 
@@ -22,6 +27,8 @@ class TorchCompileSpeedSettings:
             "optional": {
                 "ptx_cache_dir": ("STRING", {"default": ""}),
                 "dynamo_recompile_limit": ("INT", {"default": 128, "min": 0, "max": 1024, "step": 1, "tooltip": "torch._dynamo.config.recompile_limit"}),
+                "seq_len_bucket": ("INT", {"default": 0, "min": 0, "max": 65536, "step": 256, "tooltip": "Pad WanVideo seq_len up to a multiple of this, so nearby resolutions share one compiled graph (0 = off, needs flash attention)"}),
+                "persistent_cache": ("BOOLEAN", {"default": False, "tooltip": "Keep inductor/Triton caches on disk per model + shape bucket + torch version (~/.cache/genesis/compile)"}),
             },
         }
     RETURN_TYPES = ("WANCOMPILEARGS",)
@@ -37,11 +44,13 @@ Speed Mode Features:
 - Enables all Triton autotune optimizations
 - First run: comprehensive autotune (slower)
 - Second run: cached execution (extremely fast)
+- seq_len_bucket + persistent_cache: compiled graphs reused across
+  nearby shapes and server restarts
 
 Author: eddy
 """
 
-    def set_args(self, backend, fullgraph, mode, dynamic, dynamo_cache_size_limit, compile_transformer_blocks_only, reuse_if_similar, experimental_ptx, ptx_fast_math, warmup_runs, ptx_cache_dir="", dynamo_recompile_limit=128):
+    def set_args(self, backend, fullgraph, mode, dynamic, dynamo_cache_size_limit, compile_transformer_blocks_only, reuse_if_similar, experimental_ptx, ptx_fast_math, warmup_runs, ptx_cache_dir="", dynamo_recompile_limit=128, seq_len_bucket=0, persistent_cache=False):
 
         if mode == "speed":
             backend = "inductor"
@@ -67,6 +76,8 @@ Author: eddy
             "warmup_runs": warmup_runs,
             "ptx_cache_dir": ptx_cache_dir,
             "speed_preset": speed_preset,
+            "seq_len_bucket": seq_len_bucket,
+            "persistent_cache": persistent_cache,
         }
 
         return (compile_args, )
@@ -123,6 +134,16 @@ Author: eddy
         except Exception as e:
             print(f"[TorchCompileSpeed] Warning: Could not set dynamo config: {e}")
 
+        if compile_args.get("persistent_cache", False):
+            if COMPILE_CACHE_AVAILABLE:
+                cache = get_compile_cache()
+                # Generic models have no seq_len, everything shares bucket 0
+                model_id = type(model.model).__name__
+                cache_dir = cache.activate(cache.make_key(model_id, compile_args), 0, model_id=model_id)
+                print(f"[TorchCompileSpeed] Persistent compile cache: {cache_dir}")
+            else:
+                print("[TorchCompileSpeed] Warning: persistent_cache requires the Genesis core")
+
         if compile_args.get("experimental_ptx", False):
             try:
                 import os
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+import onnxruntime
+import torch
+
+from ..pose_utils.pose2d_utils import keypoints_from_heatmaps
+
+
+class SimpleOnnxInference:
+    """ONNX session wrapper running batches through IO binding.
+
+    Inputs that are CUDA torch tensors are bound in place, numpy inputs are copied once,
+    outputs stay on the execution device until the whole batch is done.
+    """
+    def __init__(self, checkpoint, device="CUDAExecutionProvider", batch_size=1):
+        if not os.path.exists(checkpoint):
+            raise RuntimeError(f"{checkpoint} does not exist")
+        self.checkpoint = checkpoint
+        self.provider = device
+        self.batch_size = batch_size
+        self.session = None
+        self.reinit()
+
+    def reinit(self):
+        if self.session is not None:
+            return
+        providers = [self.provider]
+        if self.provider != "CPUExecutionProvider":
+            providers.append("CPUExecutionProvider")
+        self.session = onnxruntime.InferenceSession(self.checkpoint, providers=providers)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+        self.input_resolution = np.array(model_input.shape[2:])
+        # exported with a fixed batch dimension: batches are split (and padded) to it
+        self.fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) and model_input.shape[0] > 0 else None
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        self.on_cuda = self.session.get_providers()[0] == "CUDAExecutionProvider"
+
+    def cleanup(self):
+        self.session = None
+
+    def _run(self, x):
+        binding = self.session.io_binding()
+        if isinstance(x, torch.Tensor) and x.is_cuda and self.on_cuda:
+            x = x.to(torch.float16 if self.input_dtype == np.float16 else torch.float32).contiguous()
+            binding.bind_input(self.input_name, "cuda", x.device.index or 0, self.input_dtype, tuple(x.shape), x.data_ptr())
+            # onnxruntime runs on its own stream, the kernels writing x on torch's stream must be done first
+            torch.cuda.current_stream(x.device).synchronize()
+        else:
+            if isinstance(x, torch.Tensor):
+                x = x.cpu().numpy()
+            binding.bind_cpu_input(self.input_name, np.ascontiguousarray(x, dtype=self.input_dtype))
+        for name in self.output_names:
+            binding.bind_output(name, "cuda" if self.on_cuda else "cpu")
+        # x stays referenced here until the run is done, the binding only holds its pointer
+        self.session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()
+
+    def run(self, x, batch_size=None):
+        """Run x [N, C, H, W] in chunks of batch_size, returns the outputs concatenated over N."""
+        batch_size = max(1, batch_size or self.batch_size)
+        if self.fixed_batch is not None:
+            batch_size = self.fixed_batch
+        n = x.shape[0]
+        results = []
+        for start in range(0, n, batch_size):
+            chunk = x[start:start + batch_size]
+            count = chunk.shape[0]
+            if self.fixed_batch is not None and count < self.fixed_batch:
+                pad = (self.fixed_batch - count,) + tuple(chunk.shape[1:])
+                if isinstance(chunk, torch.Tensor):
+                    chunk = torch.cat([chunk, chunk.new_zeros(pad)], 0)
+                else:
+                    chunk = np.concatenate([chunk, np.zeros(pad, dtype=chunk.dtype)], 0)
+            results.append([out[:count] for out in self._run(chunk)])
+        return [np.concatenate(outs, 0) for outs in zip(*results)]
+
+    def __call__(self, *args, **kwargs):
+        return self.forward(*args, **kwargs)
+
+
+class Yolo(SimpleOnnxInference):
+    """YOLOv10 person detector, input [N, 3, 640, 640] RGB in 0..1, output [N, 300, 6] (x1, y1, x2, y2, score, class)."""
+    def __init__(self, checkpoint, device="CUDAExecutionProvider", batch_size=8, threshold_conf=0.05, cat_id=0):
+        super().__init__(checkpoint, device, batch_size)
+        self.threshold_conf = threshold_conf
+        self.cat_id = cat_id
+
+    def postprocess(self, output, shape):
+        """Per image list of person dicts, largest first. [{"bbox": None}] when nobody was found."""
+        in_h, in_w = self.input_resolution
+        results = []
+        for i, dets in enumerate(output):
+            h, w = shape[i] if len(shape) > 1 else shape[0]
+            dets = dets[(dets[:, 5].round() == self.cat_id) & (dets[:, 4] >= self.threshold_conf)]
+            if len(dets) == 0:
+                results.append([{"bbox": None}])
+                continue
+            boxes = dets[:, :5].astype(np.float64)
+            boxes[:, [0, 2]] = (boxes[:, [0, 2]] * w / in_w).clip(0, w)
+            boxes[:, [1, 3]] = (boxes[:, [1, 3]] * h / in_h).clip(0, h)
+            area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            results.append([{"bbox": box} for box in boxes[np.argsort(-area)]])
+        return results
+
+    def forward(self, img, shape, batch_size=None):
+        """img: [N, 3, 640, 640] numpy array or torch tensor, shape: [[H, W]] (shared) or [N, 2]"""
+        output = self.run(img, batch_size)[0]
+        if output.ndim != 3 or output.shape[-1] != 6:
+            raise ValueError(f"Unsupported detector output shape {output.shape}, expected a YOLOv10 model with [N, 300, 6] output")
+        return self.postprocess(output, shape)
+
+
+class ViTPose(SimpleOnnxInference):
+    """ViTPose wholebody, input [N, 3, 256, 192] normalized crops, returns keypoints [N, 133, 3] (x, y, score) in image space."""
+    def __init__(self, checkpoint, device="CUDAExecutionProvider", batch_size=16):
+        super().__init__(checkpoint, device, batch_size)
+
+    def forward(self, img, center, scale, batch_size=None):
+        heatmaps = self.run(img, batch_size)[0]
+        points, prob = keypoints_from_heatmaps(heatmaps=heatmaps, center=center, scale=scale * 200, unbiased=True, use_udp=False)
+        return np.concatenate([points, prob], axis=2)
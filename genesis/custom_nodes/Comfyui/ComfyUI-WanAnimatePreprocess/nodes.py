@@ -5,6 +5,7 @@ import numpy as np
 import folder_paths
 import cv2
 import json
+import torch.nn.functional as F
 script_directory = os.path.dirname(os.path.abspath(__file__))
 
 from comfy import model_management as mm
@@ -15,11 +16,37 @@ offload_device = mm.unet_offload_device()
 folder_paths.add_model_folder_path("detection", os.path.join(folder_paths.models_dir, "detection"))
 
 from .models.onnx_models import ViTPose, Yolo
-from .pose_utils.pose2d_utils import load_pose_metas_from_kp2ds_seq, crop, bbox_from_detector
+from .pose_utils.pose2d_utils import load_pose_metas_from_kp2ds_seq, crop, bbox_from_detector, transform
 from .utils import get_face_bboxes, padding_resize, resize_by_area, resize_to_bounds
 from .pose_utils.human_visualization import AAPoseMeta, draw_aapose_by_meta_new, draw_aaface_by_meta
 from .retarget_pose import get_retarget_pose
 
+def resize_batch(images, size):
+    """[N, H, W, C] -> [N, C, size[0], size[1]], bilinear like cv2.INTER_LINEAR"""
+    return F.interpolate(images.movedim(-1, 1), size=size, mode="bilinear", align_corners=False)
+
+def crop_batch(images, centers, scales, res):
+    """Batched pose2d_utils.crop: [N, H, W, C] images cropped around center/scale and resized to res (rows, cols), returns [N, C, rows, cols]"""
+    N, H, W, C = images.shape
+    rows, cols = res
+    boxes = []
+    for center, scale in zip(centers, scales):
+        ul = np.array(transform([1, 1], center, max(scale), res, invert=1)) - 1
+        br = np.array(transform([cols + 1, rows + 1], center, max(scale), res, invert=1)) - 1
+        boxes.append(np.concatenate([ul, br]))
+    boxes = torch.tensor(np.stack(boxes), dtype=torch.float32, device=images.device)
+    x0, y0, x1, y1 = boxes.unbind(1)
+    # source pixel of each output pixel like cv2.resize of the crop, clamped to the crop (border replicate)
+    xs = x0[:, None] + (torch.arange(cols, device=images.device) + 0.5)[None] * ((x1 - x0) / cols)[:, None] - 0.5
+    ys = y0[:, None] + (torch.arange(rows, device=images.device) + 0.5)[None] * ((y1 - y0) / rows)[:, None] - 0.5
+    xs = torch.minimum(torch.maximum(xs, x0[:, None]), (x1 - 1)[:, None])
+    ys = torch.minimum(torch.maximum(ys, y0[:, None]), (y1 - 1)[:, None])
+    # outside of the image is zero like the padded crop
+    grid_x = ((2 * xs + 1) / W - 1)[:, None, :].expand(N, rows, cols)
+    grid_y = ((2 * ys + 1) / H - 1)[:, :, None].expand(N, rows, cols)
+    grid = torch.stack([grid_x, grid_y], dim=-1)
+    return F.grid_sample(images.movedim(-1, 1).float(), grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+
 class OnnxDetectionModelLoader:
     @classmethod
     def INPUT_TYPES(s):
@@ -64,6 +91,10 @@ class PoseAndFaceDetection:
             },
             "optional": {
                 "retarget_image": ("IMAGE", {"default": None, "tooltip": "Optional reference image for pose retargeting"}),
+                "det_batch_size": ("INT", {"default": 8, "min": 1, "max": 256, "step": 1, "tooltip": "Frames per YOLO run, models exported with a fixed batch size use that instead"}),
+                "pose_batch_size": ("INT", {"default": 16, "min": 1, "max": 256, "step": 1, "tooltip": "Crops per ViTPose run, models exported with a fixed batch size use that instead"}),
+                "detection_interval": ("INT", {"default": 1, "min": 1, "max": 64, "step": 1, "tooltip": "Run the detector every k frames and reuse the last bbox in between, 1 detects every frame"}),
+                "min_pose_confidence": ("FLOAT", {"default": 0.3, "min": 0.0, "max": 1.0, "step": 0.01, "tooltip": "With detection_interval > 1, frames whose mean body keypoint score is below this are detected again"}),
             },
         }
 
@@ -73,7 +104,7 @@ class PoseAndFaceDetection:
     CATEGORY = "WanAnimatePreprocess"
     DESCRIPTION = "Detects human poses and face images from input images. Optionally retargets poses based on a reference image."
 
-    def process(self, model, images, width, height, retarget_image=None):
+    def process(self, model, images, width, height, retarget_image=None, det_batch_size=8, pose_batch_size=16, detection_interval=1, min_pose_confidence=0.3):
         detector = model["yolo"]
         pose_model = model["vitpose"]
         B, H, W, C = images.shape
@@ -107,41 +138,68 @@ class PoseAndFaceDetection:
             ref_keypoints = pose_model(img_norm[None], np.array(center)[None], np.array(scale)[None])
             refer_pose_meta = load_pose_metas_from_kp2ds_seq(ref_keypoints, width=retarget_image.shape[2], height=retarget_image.shape[1])[0]
 
+        # resize/crop/normalize whole batches on the device the ONNX models run on, CUDA inputs are bound without a copy
+        prep_device = device if pose_model.on_cuda else torch.device("cpu")
+        norm_mean = torch.tensor(IMG_NORM_MEAN, dtype=torch.float32, device=prep_device).view(1, 3, 1, 1)
+        norm_std = torch.tensor(IMG_NORM_STD, dtype=torch.float32, device=prep_device).view(1, 3, 1, 1)
+
         comfy_pbar = ProgressBar(B*2)
         progress = 0
-        bboxes = []
-        for img in tqdm(images_np, total=len(images_np), desc="Detecting bboxes"):
-            bboxes.append(detector(
-                cv2.resize(img, (640, 640)).transpose(2, 0, 1)[None],
-                shape
-                )[0][0]["bbox"])
-            progress += 1
-            if progress % 10 == 0:
-                comfy_pbar.update_absolute(progress)
-
-        detector.cleanup()
 
-        kp2ds = []
-        for img, bbox in tqdm(zip(images_np, bboxes), total=len(images_np), desc="Extracting keypoints"):
-            if bbox is None or bbox[-1] <= 0 or (bbox[2] - bbox[0]) < 10 or (bbox[3] - bbox[1]) < 10:
-                bbox = np.array([0, 0, img.shape[1], img.shape[0]])
-
-            bbox_xywh = bbox
-            center, scale = bbox_from_detector(bbox_xywh, input_resolution, rescale=rescale)
-            img = crop(img, center, scale, (input_resolution[0], input_resolution[1]))[0]
-
-            img_norm = (img - IMG_NORM_MEAN) / IMG_NORM_STD
-            img_norm = img_norm.transpose(2, 0, 1).astype(np.float32)
-
-            keypoints = pose_model(img_norm[None], np.array(center)[None], np.array(scale)[None])
-            kp2ds.append(keypoints)
-            progress += 1
-            if progress % 10 == 0:
-                comfy_pbar.update_absolute(progress)
+        def detect(indices):
+            nonlocal progress
+            for start in tqdm(range(0, len(indices), det_batch_size), desc="Detecting bboxes"):
+                batch_indices = indices[start:start + det_batch_size]
+                batch = resize_batch(images[batch_indices].to(prep_device), (640, 640))
+                for idx, result in zip(batch_indices, detector(batch, shape, det_batch_size)):
+                    bboxes[idx] = result[0]["bbox"]
+                progress += len(batch_indices)
+                comfy_pbar.update_absolute(min(progress, B * 2))
+
+        def estimate(indices):
+            nonlocal progress
+            centers, scales = [], []
+            for idx in indices:
+                bbox = bboxes[idx]
+                if bbox is None or bbox[-1] <= 0 or (bbox[2] - bbox[0]) < 10 or (bbox[3] - bbox[1]) < 10:
+                    bbox = np.array([0, 0, W, H])
+                center, scale = bbox_from_detector(bbox, input_resolution, rescale=rescale)
+                centers.append(center)
+                scales.append(scale)
+            centers, scales = np.stack(centers), np.stack(scales)
+
+            keypoints = []
+            for start in tqdm(range(0, len(indices), pose_batch_size), desc="Extracting keypoints"):
+                end = start + pose_batch_size
+                crops = crop_batch(images[indices[start:end]].to(prep_device), centers[start:end], scales[start:end], input_resolution)
+                crops = (crops - norm_mean) / norm_std
+                keypoints.append(pose_model(crops, centers[start:end], scales[start:end], pose_batch_size))
+                progress += crops.shape[0]
+                comfy_pbar.update_absolute(min(progress, B * 2))
+            return np.concatenate(keypoints, 0)
+
+        # bbox tracking: detect on every detection_interval-th frame, the frames in between reuse the last bbox
+        bboxes = [None] * B
+        key_frames = list(range(0, B, detection_interval))
+        detect(key_frames)
+        key_frame_set = set(key_frames)
+        for idx in range(1, B):
+            if idx not in key_frame_set:
+                bboxes[idx] = bboxes[idx - 1]
+
+        kp2ds = estimate(list(range(B)))
+
+        if detection_interval > 1 and min_pose_confidence > 0:
+            body_confidence = kp2ds[:, :17, 2].mean(axis=1)
+            redetect = [idx for idx in range(B) if idx not in key_frame_set and body_confidence[idx] < min_pose_confidence]
+            if len(redetect) > 0:
+                tqdm.write(f"Pose confidence below {min_pose_confidence} on {len(redetect)} tracked frames, detecting again")
+                detect(redetect)
+                kp2ds[redetect] = estimate(redetect)
 
+        detector.cleanup()
         pose_model.cleanup()
 
-        kp2ds = np.concatenate(kp2ds, 0)
         pose_metas = load_pose_metas_from_kp2ds_seq(kp2ds, width=W, height=H)
 
         face_images = []
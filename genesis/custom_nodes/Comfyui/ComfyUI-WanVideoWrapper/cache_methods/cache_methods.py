@@ -1,8 +1,13 @@
 from ..utils import log
+import os
+import json
+import time
 import torch
+from collections import OrderedDict
 
 def set_transformer_cache_method(transformer, timesteps, cache_args=None):      
     transformer.cache_device = cache_args["cache_device"]
+    transformer.cache_telemetry = None
     if cache_args["cache_type"] == "TeaCache":
         log.info(f"TeaCache: Using cache device: {transformer.cache_device}")
         transformer.teacache_state.clear_all()
@@ -27,87 +32,374 @@ def set_transformer_cache_method(transformer, timesteps, cache_args=None):
         transformer.easycache_start_step = cache_args["start_step"]
         transformer.easycache_end_step = len(timesteps)-1 if cache_args["end_step"] == -1 else cache_args["end_step"]
         transformer.easycache_thresh = cache_args["easycache_thresh"]
+    cache_state = {"TeaCache": transformer.teacache_state, "MagCache": transformer.magcache_state, "EasyCache": transformer.easycache_state}.get(cache_args["cache_type"])
+    if cache_state is not None:
+        budget_gb = cache_args.get("residual_budget_gb", 0.0)
+        residual_dtype = RESIDUAL_DTYPES.get(cache_args.get("residual_dtype", "default"))
+        cache_state.residual_store.configure(int(budget_gb * 1024**3) if budget_gb > 0 else None, residual_dtype)
+        if budget_gb > 0 or residual_dtype is not None:
+            log.info(f"{cache_args['cache_type']}: residual budget {f'{budget_gb:.2f}GB' if budget_gb > 0 else 'unlimited'}, "
+                     f"residual dtype {cache_args.get('residual_dtype', 'default')}")
+    if cache_args.get("record_telemetry", False):
+        threshold_key = THRESHOLD_KEYS[cache_args["cache_type"]]
+        settings = {k: v for k, v in cache_args.items() if k not in ("cache_device", "cache_type", "record_telemetry", threshold_key)}
+        settings["end_step"] = len(timesteps)-1 if cache_args["end_step"] == -1 else cache_args["end_step"]
+        transformer.cache_telemetry = CacheTelemetry(cache_args["cache_type"], cache_args[threshold_key], settings, len(timesteps))
     return transformer
 
-class TeaCacheState:
+THRESHOLD_KEYS = {"TeaCache": "rel_l1_thresh", "MagCache": "magcache_thresh", "EasyCache": "easycache_thresh"}
+
+class CacheTelemetry:
+    """
+    Per-step record of cache decisions for one sampling run.
+
+    Each entry holds the per-step metric that is accumulated against the threshold (TeaCache: rescaled
+    rel-L1 of the time embedding, MagCache: magnitude ratio, EasyCache: predicted output change), the
+    accumulated value at the decision, whether the step was skipped, the norm of the residual written
+    on computed steps and the step latency. tune_cache_thresholds replays saved traces against other
+    thresholds.
+    """
+    def __init__(self, cache_type, threshold, settings, total_steps):
+        self.cache_type = cache_type
+        self.threshold = threshold
+        self.settings = settings
+        self.total_steps = total_steps
+        self.steps = []
+
+    def record(self, pred_id, step, metric, accumulated, skipped, residual_norm=None, latency_ms=None):
+        self.steps.append({
+            "pred_id": pred_id,
+            "step": step,
+            "metric": None if metric is None else float(metric),
+            "accumulated": None if accumulated is None else float(accumulated),
+            "skipped": bool(skipped),
+            "residual_norm": None if residual_norm is None else float(residual_norm),
+            "latency_ms": latency_ms,
+        })
+
+    def to_dict(self):
+        return {
+            "cache_type": self.cache_type,
+            "threshold": self.threshold,
+            "settings": self.settings,
+            "total_steps": self.total_steps,
+            "steps": self.steps,
+        }
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.cache_type.lower()}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1, default=str)
+        return path
+
+def load_cache_trace(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _replay_prediction(cache_type, steps, threshold, settings):
+    """Replay one prediction's trace with another threshold, returns the skip decision and error estimate per step"""
+    decisions = []
+    accumulated = 0.0
+    ratio, mag_steps = 1.0, 0
+    magcache_K = settings.get("magcache_K", 4)
+    for entry in steps:
+        metric = entry["metric"]
+        if metric is None:
+            # First step of a prediction is always computed
+            decisions.append((False, 0.0))
+            accumulated, ratio, mag_steps = 0.0, 1.0, 0
+            continue
+        if cache_type == "MagCache":
+            ratio *= metric
+            accumulated += abs(1 - ratio)
+            mag_steps += 1
+            skip = accumulated <= threshold and mag_steps <= magcache_K
+        else:
+            accumulated += metric
+            skip = accumulated < threshold
+        decisions.append((skip, accumulated if skip else 0.0))
+        if not skip:
+            accumulated, ratio, mag_steps = 0.0, 1.0, 0
+    return decisions
+
+def tune_cache_thresholds(trace, thresholds):
+    """
+    Predict the speedup and error of candidate thresholds from a recorded trace, without running the model.
+
+    MagCache metrics don't depend on earlier decisions, so its replay is exact. TeaCache and EasyCache
+    measure change against the last computed step, so their replay is an estimate. TeaCache traces must be
+    recorded with caching disabled (rel_l1_thresh 0, no skipped steps): every recorded rel-L1 is then taken
+    between consecutive steps and replay sums them as the distance to the last computed step. EasyCache
+    estimates get less reliable the further a candidate is from the recorded threshold.
+
+    Speedup is relative to computing every recorded step, using the mean recorded latency of computed and
+    skipped steps. Error is the sum of the accumulated metric over skipped steps, comparable between
+    thresholds of the same trace.
+    """
+    cache_type = trace["cache_type"]
+    settings = trace.get("settings", {})
+    if cache_type == "TeaCache" and any(e["skipped"] for e in trace["steps"]):
+        raise ValueError("TeaCache traces must be recorded with caching disabled (rel_l1_thresh 0), "
+                         "rel-L1 of skipped steps is measured against the last computed step and can't be replayed")
+    predictions = {}
+    for entry in sorted(trace["steps"], key=lambda e: (e["pred_id"], e["step"])):
+        predictions.setdefault(entry["pred_id"], []).append(entry)
+
+    computed_latency = [e["latency_ms"] for e in trace["steps"] if not e["skipped"] and e["latency_ms"] is not None]
+    skipped_latency = [e["latency_ms"] for e in trace["steps"] if e["skipped"] and e["latency_ms"] is not None]
+    compute_ms = sum(computed_latency) / len(computed_latency) if computed_latency else 1.0
+    skip_ms = sum(skipped_latency) / len(skipped_latency) if skipped_latency else 0.0
+
+    results = []
+    for threshold in thresholds:
+        skipped = error = 0
+        total = 0
+        for steps in predictions.values():
+            for skip, step_error in _replay_prediction(cache_type, steps, threshold, settings):
+                total += 1
+                skipped += skip
+                error += step_error
+        cost = (total - skipped) * compute_ms + skipped * skip_ms
+        results.append({
+            "threshold": threshold,
+            "steps": total,
+            "skipped_steps": skipped,
+            "predicted_speedup": (total * compute_ms) / cost if cost > 0 else float("inf"),
+            "predicted_error": error,
+        })
+    return results
+
+def format_tuning_report(trace, results):
+    lines = [f"{trace['cache_type']} trace recorded at threshold {trace['threshold']}, {trace['total_steps']} sampling steps"]
+    lines.append(f"{'threshold':>10} {'skipped':>9} {'speedup':>8} {'error':>10}")
+    for r in results:
+        lines.append(f"{r['threshold']:>10.4f} {r['skipped_steps']:>4}/{r['steps']:<4} {r['predicted_speedup']:>7.2f}x {r['predicted_error']:>10.4f}")
+    return "\n".join(lines)
+
+# State entries that hold activation-sized tensors, these go through the ResidualStore
+RESIDUAL_KEYS = {"previous_residual", "residual_cache", "cache", "cache_ovi", "previous_raw_input", "previous_raw_output"}
+
+RESIDUAL_DTYPES = {
+    "fp16": torch.float16,
+    "bf16": torch.bfloat16,
+    "fp8_e4m3fn": torch.float8_e4m3fn,
+}
+
+FP8_MAX = 448.0
+
+class ResidualStore:
+    """
+    Byte-budgeted storage for cached residuals.
+
+    Residuals can be kept in reduced precision (fp16/bf16, or fp8 with a per-tensor scale). Entries on a
+    CUDA device count against budget_bytes; when a new residual doesn't fit, the least recently used ones
+    are spilled to pinned CPU memory. Spilled residuals are copied back on a side stream by prefetch(),
+    which the model calls at the start of the forward so the copy overlaps with the embedding work, and
+    moved back to the device on get() when the budget allows.
+    """
+    def __init__(self, budget_bytes=None, storage_dtype=None):
+        self.budget_bytes = budget_bytes
+        self.storage_dtype = storage_dtype
+        self.entries = OrderedDict()
+        self.device_bytes = 0
+        self.copy_stream = None
+        self.stats = {"spills": 0, "prefetches": 0, "peak_device_bytes": 0}
+
+    def configure(self, budget_bytes=None, storage_dtype=None):
+        self.clear()
+        self.budget_bytes = budget_bytes
+        self.storage_dtype = storage_dtype
+
+    @staticmethod
+    def _nbytes(tensor):
+        return tensor.numel() * tensor.element_size()
+
+    def _encode(self, tensor):
+        dtype = self.storage_dtype
+        if dtype is None or not tensor.is_floating_point() or tensor.element_size() <= torch.empty((), dtype=dtype).element_size():
+            return tensor, None
+        if dtype == torch.float8_e4m3fn:
+            scale = (tensor.abs().amax().float() / FP8_MAX).clamp_(min=1e-12)
+            return (tensor / scale).to(dtype), scale
+        return tensor.to(dtype), None
+
+    def put(self, key, tensor):
+        self.discard(key)
+        stored, scale = self._encode(tensor.detach())
+        entry = {"tensor": stored, "dtype": tensor.dtype, "scale": scale, "device": stored.device, "cpu": None, "ready": None, "prefetched": None}
+        self.entries[key] = entry
+        if stored.device.type == "cuda":
+            nbytes = self._nbytes(stored)
+            if self.budget_bytes is not None:
+                self._make_room(nbytes, keep=key)
+            if self.budget_bytes is not None and self.device_bytes + nbytes > self.budget_bytes:
+                self._spill(entry, counted=False)
+            else:
+                self.device_bytes += nbytes
+                self.stats["peak_device_bytes"] = max(self.stats["peak_device_bytes"], self.device_bytes)
+
+    def _make_room(self, nbytes, keep=None):
+        for other_key, other in list(self.entries.items()):
+            if self.device_bytes + nbytes <= self.budget_bytes:
+                break
+            if other_key != keep and self._resident(other):
+                self._spill(other)
+
+    def _spill(self, entry, counted=True):
+        tensor = entry["tensor"]
+        # The device tensor can be freed before this copy finishes, reuse is ordered on the same stream
+        cpu = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+        cpu.copy_(tensor, non_blocking=True)
+        entry["ready"] = torch.cuda.Event()
+        entry["ready"].record()
+        entry["cpu"], entry["tensor"] = cpu, None
+        if counted:
+            self.device_bytes -= self._nbytes(tensor)
+        self.stats["spills"] += 1
+
+    @staticmethod
+    def _resident(entry):
+        return entry["tensor"] is not None and entry["device"].type == "cuda"
+
+    def prefetch(self, key_prefix):
+        """Start copying back every spilled residual whose key starts with key_prefix"""
+        for key, entry in self.entries.items():
+            if key[0] != key_prefix or entry["tensor"] is not None or entry["prefetched"] is not None:
+                continue
+            if self.copy_stream is None:
+                self.copy_stream = torch.cuda.Stream(device=entry["device"])
+            with torch.cuda.stream(self.copy_stream):
+                self.copy_stream.wait_event(entry["ready"])
+                tensor = entry["cpu"].to(entry["device"], non_blocking=True)
+                done = torch.cuda.Event()
+                done.record(self.copy_stream)
+            entry["prefetched"] = (tensor, done)
+            self.stats["prefetches"] += 1
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        tensor = entry["tensor"]
+        if tensor is None:
+            if entry["prefetched"] is not None:
+                tensor, done = entry["prefetched"]
+                entry["prefetched"] = None
+                torch.cuda.current_stream(entry["device"]).wait_event(done)
+                tensor.record_stream(torch.cuda.current_stream(entry["device"]))
+            else:
+                tensor = entry["cpu"].to(entry["device"], non_blocking=True)
+            # Keep it on the device again if that fits without spilling anything
+            nbytes = self._nbytes(tensor)
+            if self.budget_bytes is None or self.device_bytes + nbytes <= self.budget_bytes:
+                entry["tensor"], entry["cpu"], entry["ready"] = tensor, None, None
+                self.device_bytes += nbytes
+                self.stats["peak_device_bytes"] = max(self.stats["peak_device_bytes"], self.device_bytes)
+        if entry["scale"] is not None:
+            return tensor.to(entry["dtype"]) * entry["scale"].to(tensor.device)
+        return tensor.to(entry["dtype"])
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None and self._resident(entry):
+            self.device_bytes -= self._nbytes(entry["tensor"])
+
+    def clear(self):
+        self.entries.clear()
+        self.device_bytes = 0
+
+    def get_stats(self):
+        return {**self.stats, "entries": len(self.entries), "device_bytes": self.device_bytes,
+                "spilled": sum(1 for e in self.entries.values() if e["tensor"] is None)}
+
+_STORED = object()
+
+class PredictionState(dict):
+    """State of one prediction, RESIDUAL_KEYS tensors are kept in the ResidualStore"""
+    def __init__(self, store, pred_id, values):
+        super().__init__()
+        self._store = store
+        self._pred_id = pred_id
+        for key, value in values.items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        if key in RESIDUAL_KEYS and isinstance(value, torch.Tensor):
+            self._store.put((self._pred_id, key), value)
+            value = _STORED
+        elif super().get(key) is _STORED:
+            self._store.discard((self._pred_id, key))
+        super().__setitem__(key, value)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        return self._store.get((self._pred_id, key)) if value is _STORED else value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+class CacheState:
     def __init__(self, cache_device='cpu'):
         self.cache_device = cache_device
         self.states = {}
         self._next_pred_id = 0
-    
+        self.residual_store = ResidualStore()
+
+    def initial_state(self):
+        raise NotImplementedError
+
     def new_prediction(self, cache_device='cpu'):
         """Create new prediction state and return its ID"""
         self.cache_device = cache_device
         pred_id = self._next_pred_id
         self._next_pred_id += 1
-        self.states[pred_id] = {
-            'previous_residual': None,
-            'accumulated_rel_l1_distance': 0,
-            'previous_modulated_input': None,
-            'skipped_steps': [],
-        }
+        self.states[pred_id] = PredictionState(self.residual_store, pred_id, self.initial_state())
         return pred_id
-    
+
     def update(self, pred_id, **kwargs):
         """Update state for specific prediction"""
         if pred_id not in self.states:
             return None
         for key, value in kwargs.items():
             self.states[pred_id][key] = value
-    
+
     def get(self, pred_id):
         return self.states.get(pred_id, {})
-    
+
+    def prefetch(self, pred_id):
+        """Start copying this prediction's spilled residuals back to the device"""
+        if pred_id in self.states and self.residual_store.budget_bytes is not None:
+            self.residual_store.prefetch(pred_id)
+
     def clear_all(self):
         self.states = {}
         self._next_pred_id = 0
+        self.residual_store.clear()
 
-class MagCacheState:
-    def __init__(self, cache_device='cpu'):
-        self.cache_device = cache_device
-        self.states = {}
-        self._next_pred_id = 0
-    
-    def new_prediction(self, cache_device='cpu'):
-        """Create new prediction state and return its ID"""
-        self.cache_device = cache_device
-        pred_id = self._next_pred_id
-        self._next_pred_id += 1
-        self.states[pred_id] = {
+class TeaCacheState(CacheState):
+    def initial_state(self):
+        return {
+            'previous_residual': None,
+            'accumulated_rel_l1_distance': 0,
+            'previous_modulated_input': None,
+            'skipped_steps': [],
+        }
+
+class MagCacheState(CacheState):
+    def initial_state(self):
+        return {
             'residual_cache': None,
             'accumulated_ratio': 1.0,
             'accumulated_steps': 0,
             'accumulated_err': 0,
             'skipped_steps': [],
         }
-        return pred_id
-    
-    def update(self, pred_id, **kwargs):
-        """Update state for specific prediction"""
-        if pred_id not in self.states:
-            return None
-        for key, value in kwargs.items():
-            self.states[pred_id][key] = value
-    
-    def get(self, pred_id):
-        return self.states.get(pred_id, {})
-    
-    def clear_all(self):
-        self.states = {}
-        self._next_pred_id = 0
-
-class EasyCacheState:
-    def __init__(self, cache_device='cpu'):
-        self.cache_device = cache_device
-        self.states = {}
-        self._next_pred_id = 0
 
-    def new_prediction(self, cache_device='cpu'):
-        """Create a new prediction state and return its ID."""
-        self.cache_device = cache_device
-        pred_id = self._next_pred_id
-        self._next_pred_id += 1
-        self.states[pred_id] = {
+class EasyCacheState(CacheState):
+    def initial_state(self):
+        return {
             'previous_raw_input': None,
             'previous_raw_output': None,
             'cache': None,
@@ -115,21 +407,6 @@ class EasyCacheState:
             'skipped_steps': [],
             'cache_ovi': None,
         }
-        return pred_id
-
-    def update(self, pred_id, **kwargs):
-        """Update state for a specific prediction."""
-        if pred_id not in self.states:
-            return None
-        for key, value in kwargs.items():
-            self.states[pred_id][key] = value
-
-    def get(self, pred_id):
-        return self.states.get(pred_id, {})
-
-    def clear_all(self):
-        self.states = {}
-        self._next_pred_id = 0
 
 def relative_l1_distance(last_tensor, current_tensor):
     l1_distance = torch.abs(last_tensor.to(current_tensor.device) - current_tensor).mean()
@@ -153,6 +430,12 @@ def cache_report(transformer, cache_args):
         name = state_names.get(pred_id, f"prediction_{pred_id}")
         if 'skipped_steps' in state:
             log.info(f"{cache_type} skipped: {len(state['skipped_steps'])} {name} steps: {state['skipped_steps']}")
+    telemetry = getattr(transformer, "cache_telemetry", None)
+    if telemetry is not None and telemetry.steps:
+        import folder_paths
+        path = telemetry.save(os.path.join(folder_paths.get_output_directory(), "wanvideo_cache_traces"))
+        log.info(f"{cache_type} telemetry: {len(telemetry.steps)} step records saved to {path}")
+    transformer.cache_telemetry = None
     transformer.teacache_state.clear_all()
     transformer.magcache_state.clear_all()
     transformer.easycache_state.clear_all()
@@ -14,6 +14,9 @@ class WanVideoTeaCache:
             },
             "optional": {
                 "mode": (["e", "e0"], {"default": "e", "tooltip": "Choice between using e (time embeds, default) or e0 (modulated time embeds)"}),
+                "record_telemetry": ("BOOLEAN", {"default": False, "tooltip": "Record the per-step cache decisions and latency to output/wanvideo_cache_traces, the traces can be replayed against other thresholds with the WanVideo Cache Threshold Tuner node. Set rel_l1_thresh to 0 for traces meant for tuning"}),
+                "residual_budget_gb": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1024.0, "step": 0.1, "tooltip": "Maximum GPU memory for cached residuals when caching to the main device, least recently used residuals are spilled to pinned CPU memory and prefetched back before they are needed. 0 = unlimited"}),
+                "residual_dtype": (["default", "fp16", "bf16", "fp8_e4m3fn"], {"default": "default", "tooltip": "Precision the cached residuals are stored in, fp8 uses a per-tensor scale. Lower precision saves memory but can add small errors on skipped steps"}),
             },
         }
     RETURN_TYPES = ("CACHEARGS",)
@@ -43,7 +46,7 @@ Official recommended values https://github.com/ali-vilab/TeaCache/tree/main/TeaC
 </pre> 
 """
 
-    def process(self, rel_l1_thresh, start_step, end_step, cache_device, use_coefficients, mode="e"):
+    def process(self, rel_l1_thresh, start_step, end_step, cache_device, use_coefficients, mode="e", record_telemetry=False, residual_budget_gb=0.0, residual_dtype="default"):
         if cache_device == "main_device":
             cache_device = mm.get_torch_device()
         else:
@@ -56,6 +59,9 @@ Official recommended values https://github.com/ali-vilab/TeaCache/tree/main/TeaC
             "cache_device": cache_device,
             "use_coefficients": use_coefficients,
             "mode": mode,
+            "record_telemetry": record_telemetry,
+            "residual_budget_gb": residual_budget_gb,
+            "residual_dtype": residual_dtype,
         }
         return (cache_args,)
     
@@ -70,6 +76,11 @@ class WanVideoMagCache:
                 "end_step": ("INT", {"default": -1, "min": -1, "max": 9999, "step": 1, "tooltip": "Step to end applying MagCache"}),
                 "cache_device": (["main_device", "offload_device"], {"default": "offload_device", "tooltip": "Device to cache to"}),
             },
+            "optional": {
+                "record_telemetry": ("BOOLEAN", {"default": False, "tooltip": "Record the per-step cache decisions and latency to output/wanvideo_cache_traces, the traces can be replayed against other thresholds with the WanVideo Cache Threshold Tuner node"}),
+                "residual_budget_gb": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1024.0, "step": 0.1, "tooltip": "Maximum GPU memory for cached residuals when caching to the main device, least recently used residuals are spilled to pinned CPU memory and prefetched back before they are needed. 0 = unlimited"}),
+                "residual_dtype": (["default", "fp16", "bf16", "fp8_e4m3fn"], {"default": "default", "tooltip": "Precision the cached residuals are stored in, fp8 uses a per-tensor scale. Lower precision saves memory but can add small errors on skipped steps"}),
+            },
         }
     RETURN_TYPES = ("CACHEARGS",)
     RETURN_NAMES = ("cache_args",)
@@ -78,7 +89,7 @@ class WanVideoMagCache:
     EXPERIMENTAL = True
     DESCRIPTION = "MagCache for WanVideoWrapper, source https://github.com/Zehong-Ma/MagCache"
 
-    def setargs(self, magcache_thresh, magcache_K, start_step, end_step, cache_device):
+    def setargs(self, magcache_thresh, magcache_K, start_step, end_step, cache_device, record_telemetry=False, residual_budget_gb=0.0, residual_dtype="default"):
         if cache_device == "main_device":
             cache_device = mm.get_torch_device()
         else:
@@ -91,6 +102,9 @@ class WanVideoMagCache:
             "start_step": start_step,
             "end_step": end_step,
             "cache_device": cache_device,
+            "record_telemetry": record_telemetry,
+            "residual_budget_gb": residual_budget_gb,
+            "residual_dtype": residual_dtype,
         }
         return (cache_args,)
     
@@ -104,6 +118,11 @@ class WanVideoEasyCache:
                 "end_step": ("INT", {"default": -1, "min": -1, "max": 9999, "step": 1, "tooltip": "Step to end applying EasyCache"}),
                 "cache_device": (["main_device", "offload_device"], {"default": "offload_device", "tooltip": "Device to cache to"}),
             },
+            "optional": {
+                "record_telemetry": ("BOOLEAN", {"default": False, "tooltip": "Record the per-step cache decisions and latency to output/wanvideo_cache_traces, the traces can be replayed against other thresholds with the WanVideo Cache Threshold Tuner node"}),
+                "residual_budget_gb": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1024.0, "step": 0.1, "tooltip": "Maximum GPU memory for cached residuals when caching to the main device, least recently used residuals are spilled to pinned CPU memory and prefetched back before they are needed. 0 = unlimited"}),
+                "residual_dtype": (["default", "fp16", "bf16", "fp8_e4m3fn"], {"default": "default", "tooltip": "Precision the cached residuals are stored in, fp8 uses a per-tensor scale. Lower precision saves memory but can add small errors on skipped steps"}),
+            },
         }
     RETURN_TYPES = ("CACHEARGS",)
     RETURN_NAMES = ("cache_args",)
@@ -112,7 +131,7 @@ class WanVideoEasyCache:
     EXPERIMENTAL = True
     DESCRIPTION = "EasyCache for WanVideoWrapper, source https://github.com/H-EmbodVis/EasyCache"
 
-    def setargs(self, easycache_thresh, start_step, end_step, cache_device):
+    def setargs(self, easycache_thresh, start_step, end_step, cache_device, record_telemetry=False, residual_budget_gb=0.0, residual_dtype="default"):
         if cache_device == "main_device":
             cache_device = mm.get_torch_device()
         else:
@@ -124,17 +143,62 @@ class WanVideoEasyCache:
             "start_step": start_step,
             "end_step": end_step,
             "cache_device": cache_device,
+            "record_telemetry": record_telemetry,
+            "residual_budget_gb": residual_budget_gb,
+            "residual_dtype": residual_dtype,
         }
         return (cache_args,)
 
-    
+
+class WanVideoCacheThresholdTuner:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "trace_file": ("STRING", {"default": "", "tooltip": "Telemetry trace recorded with record_telemetry, absolute path or relative to output/wanvideo_cache_traces"}),
+                "thresholds": ("STRING", {"default": "0.1, 0.15, 0.2, 0.25, 0.3", "tooltip": "Comma separated candidate thresholds to replay"}),
+            },
+        }
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("report",)
+    FUNCTION = "tune"
+    CATEGORY = "WanVideoWrapper"
+    EXPERIMENTAL = True
+    DESCRIPTION = """
+Replays a recorded TeaCache/MagCache/EasyCache trace against candidate thresholds  
+and predicts skipped steps, speedup and accumulated error without running the model.  
+MagCache replays are exact, TeaCache and EasyCache replays are estimates.  
+TeaCache traces have to be recorded with rel_l1_thresh 0, so no step is skipped.
+"""
+
+    def tune(self, trace_file, thresholds):
+        import os
+        import folder_paths
+        from .cache_methods import load_cache_trace, tune_cache_thresholds, format_tuning_report
+        from ..utils import log
+
+        if not os.path.isabs(trace_file):
+            trace_file = os.path.join(folder_paths.get_output_directory(), "wanvideo_cache_traces", trace_file)
+        if not os.path.exists(trace_file):
+            raise FileNotFoundError(f"Cache trace not found: {trace_file}")
+        candidates = [float(t) for t in thresholds.replace(";", ",").split(",") if t.strip()]
+        if not candidates:
+            raise ValueError("No candidate thresholds given")
+
+        trace = load_cache_trace(trace_file)
+        report = format_tuning_report(trace, tune_cache_thresholds(trace, candidates))
+        log.info(report)
+        return (report,)
+
 NODE_CLASS_MAPPINGS = {
     "WanVideoTeaCache": WanVideoTeaCache,
     "WanVideoMagCache": WanVideoMagCache,
     "WanVideoEasyCache": WanVideoEasyCache,
+    "WanVideoCacheThresholdTuner": WanVideoCacheThresholdTuner,
     }
 NODE_DISPLAY_NAME_MAPPINGS = {
     "WanVideoTeaCache": "WanVideo TeaCache",
     "WanVideoMagCache": "WanVideo MagCache",
-    "WanVideoEasyCache": "WanVideo EasyCache"
+    "WanVideoEasyCache": "WanVideo EasyCache",
+    "WanVideoCacheThresholdTuner": "WanVideo Cache Threshold Tuner",
     }
\ No newline at end of file
@@ -184,55 +184,74 @@ def get_total_steps(
         for i in range(len(timesteps))
     )
 
-def create_window_mask(noise_pred_context, c, latent_video_length, context_overlap, looped=False, window_type="linear"):
-    window_mask = torch.ones_like(noise_pred_context)
-    
+def window_weights(length, latent_video_length, context_overlap, first, last, looped=False, window_type="linear"):
+    """Per-frame blend weights of a context window as a 1D float32 tensor"""
+    weights = torch.ones(length)
+
     if window_type == "pyramid":
         # Create pyramid weights that peak in the middle
-        length = noise_pred_context.shape[1]
         if length % 2 == 0:
             max_weight = length // 2
             weight_sequence = list(range(1, max_weight + 1, 1)) + list(range(max_weight, 0, -1))
         else:
             max_weight = (length + 1) // 2
             weight_sequence = list(range(1, max_weight, 1)) + [max_weight] + list(range(max_weight - 1, 0, -1))
-        
+
         # Normalize weights to range from 0 to 1
         max_val = max(weight_sequence)
-        weight_sequence = [w / max_val for w in weight_sequence]
-        
-        # Apply the weights to create the mask
-        weights_tensor = torch.tensor(weight_sequence, device=noise_pred_context.device)
-        weights_tensor = weights_tensor.view(1, -1, 1, 1)
-        window_mask = weights_tensor.expand_as(window_mask).clone()
-        
+        weights = torch.tensor([w / max_val for w in weight_sequence])
+
         # Adjust for position in sequence if needed
         if not looped:
-            if min(c) == 0:  # First chunk
-                left_ramp = torch.linspace(0, 1, context_overlap, device=noise_pred_context.device).view(1, -1, 1, 1)
-                # Clone to avoid in-place memory conflict
-                left_section = window_mask[:, :context_overlap].clone()
-                window_mask[:, :context_overlap] = torch.maximum(left_section, left_ramp)
-                
-            if max(c) == latent_video_length - 1:  # Last chunk
-                right_ramp = torch.linspace(1, 0, context_overlap, device=noise_pred_context.device).view(1, -1, 1, 1)
-                # Clone to avoid in-place memory conflict
-                right_section = window_mask[:, -context_overlap:].clone()
-                window_mask[:, -context_overlap:] = torch.maximum(right_section, right_ramp)
+            if first:  # First chunk
+                weights[:context_overlap] = torch.maximum(weights[:context_overlap], torch.linspace(0, 1, context_overlap))
+            if last:  # Last chunk
+                weights[-context_overlap:] = torch.maximum(weights[-context_overlap:], torch.linspace(1, 0, context_overlap))
     else:  # Original "linear" window masking
         # Apply left-side blending for all except first chunk (or always in loop mode)
-        if min(c) > 0 or (looped and max(c) == latent_video_length - 1):
-            ramp_up = torch.linspace(0, 1, context_overlap, device=noise_pred_context.device)
-            ramp_up = ramp_up.view(1, -1, 1, 1)
-            window_mask[:, :context_overlap] = ramp_up
-            
+        if not first or (looped and last):
+            weights[:context_overlap] = torch.linspace(0, 1, context_overlap)
         # Apply right-side blending for all except last chunk (or always in loop mode)
-        if max(c) < latent_video_length - 1 or (looped and min(c) == 0):
-            ramp_down = torch.linspace(1, 0, context_overlap, device=noise_pred_context.device)
-            ramp_down = ramp_down.view(1, -1, 1, 1)
-            window_mask[:, -context_overlap:] = ramp_down
-            
-    return window_mask
+        if not last or (looped and first):
+            weights[-context_overlap:] = torch.linspace(1, 0, context_overlap)
+
+    return weights
+
+class WindowMaskCache:
+    """
+    Window masks only depend on the window length, whether it touches either end of the video and the
+    fuse settings, so a schedule needs a handful of them. They are built once per device/dtype and
+    returned as [1, T, 1, 1] tensors that broadcast over channels and space.
+    """
+    def __init__(self):
+        self.masks = {}
+
+    def get(self, c, latent_video_length, context_overlap, looped=False, window_type="linear", device="cpu", dtype=torch.float32):
+        first = min(c) == 0
+        last = max(c) == latent_video_length - 1
+        key = (len(c), latent_video_length, context_overlap, first, last, looped, window_type, str(device), dtype)
+        mask = self.masks.get(key)
+        if mask is None:
+            weights = window_weights(len(c), latent_video_length, context_overlap, first, last, looped, window_type)
+            mask = weights.to(device, dtype).view(1, -1, 1, 1)
+            self.masks[key] = mask
+        return mask
+
+    def precompute(self, context_queue, latent_video_length, context_overlap, looped=False, window_type="linear", device="cpu", dtype=torch.float32):
+        return [self.get(c, latent_video_length, context_overlap, looped, window_type, device, dtype) for c in context_queue]
+
+_window_mask_cache = WindowMaskCache()
+
+def get_window_batch_size(max_batch_size, window_bytes, free_memory, reserve=0.1):
+    """Number of context windows to pack in one forward, from the measured memory of a single window and free VRAM"""
+    if max_batch_size <= 1 or not window_bytes:
+        return 1
+    return max(1, min(max_batch_size, int(free_memory * (1.0 - reserve) // window_bytes)))
+
+def create_window_mask(noise_pred_context, c, latent_video_length, context_overlap, looped=False, window_type="linear"):
+    mask = _window_mask_cache.get(c, latent_video_length, context_overlap, looped, window_type,
+                                  device=noise_pred_context.device, dtype=noise_pred_context.dtype)
+    return mask.expand_as(noise_pred_context)
 
 class WindowTracker:
     def __init__(self, verbose=False):
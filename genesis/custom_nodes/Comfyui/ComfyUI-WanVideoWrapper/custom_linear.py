@@ -2,6 +2,9 @@ import torch
 import torch.nn as nn
 from accelerate import init_empty_weights
 from comfy.ops import cast_bias_weight
+from .fp8_optimization import get_lora_stack, lora_linear_delta, merge_lora_cached, clear_lora_cache, apply_lora as _apply_lora
+
+LORA_MODES = ["low_rank", "merged_cache"]
 
 #based on https://github.com/huggingface/diffusers/blob/main/src/diffusers/quantizers/gguf/utils.py
 def _replace_linear(model, compute_dtype, state_dict, prefix="", patches=None, scale_weights=None):
@@ -35,12 +38,12 @@ def _replace_linear(model, compute_dtype, state_dict, prefix="", patches=None, s
 
     return model
 
-def set_lora_params(module, patches, module_prefix=""):
+def set_lora_params(module, patches, module_prefix="", lora_mode="low_rank"):
     remove_lora_from_module(module)
     # Recursively set lora_diffs and lora_strengths for all CustomLinear layers
     for name, child in module.named_children():
         child_prefix = (f"{module_prefix}{name}.")
-        set_lora_params(child, patches, child_prefix)
+        set_lora_params(child, patches, child_prefix, lora_mode)
     if isinstance(module, CustomLinear):
         key = f"diffusion_model.{module_prefix}weight"
         patch = patches.get(key, [])
@@ -63,6 +66,7 @@ def set_lora_params(module, patches, module_prefix=""):
                     continue
             lora_strengths = [p[0] for p in patch]
             module.lora = (lora_diffs, lora_strengths)
+            module.lora_mode = lora_mode
             module.step = 0  # Initialize step for LoRA scheduling
 
 
@@ -79,6 +83,7 @@ class CustomLinear(nn.Linear):
         super().__init__(in_features, out_features, bias, device)
         self.compute_dtype = compute_dtype
         self.lora = None
+        self.lora_mode = "low_rank"
         self.step = 0
         self.scale_weight = scale_weight
         self.bias_function = []
@@ -93,29 +98,28 @@ class CustomLinear(nn.Linear):
             else:
                 input = input * self.scale_weight
 
-        if self.lora is not None:
-            weight = self.apply_lora(weight).to(self.compute_dtype)
+        if self.lora is None:
+            return torch.nn.functional.linear(input, weight, bias)
+
+        if self.lora_mode == "merged_cache":
+            weight = merge_lora_cached(self, weight, self.step).to(self.compute_dtype)
+            return torch.nn.functional.linear(input, weight, bias)
 
-        return torch.nn.functional.linear(input, weight, bias)
+        # Low-rank path: only full-diff patches touch the weight, LoRA pairs are applied to the activations
+        stack = get_lora_stack(self)
+        if stack.dense:
+            weight = stack.apply_dense(weight, stack.strengths_at(self.step))
+        out = torch.nn.functional.linear(input, weight.to(self.compute_dtype), bias)
+        # Same (possibly scaled) input as the base matmul, like adding the delta to the weight
+        lora_out = lora_linear_delta(self, input, self.step, out.dtype)
+        if lora_out is not None:
+            out = out + lora_out
+        return out
 
-    @torch.compiler.disable()
     def apply_lora(self, weight):
-        for lora_diff, lora_strength in zip(self.lora[0], self.lora[1]):
-            if isinstance(lora_strength, list):
-                lora_strength = lora_strength[self.step]
-                if lora_strength == 0.0:
-                    continue
-            elif lora_strength == 0.0:
-                continue
-            patch_diff = torch.mm(
-                lora_diff[0].flatten(start_dim=1).to(weight.device),
-                lora_diff[1].flatten(start_dim=1).to(weight.device)
-            ).reshape(weight.shape)
-            alpha = lora_diff[2] / lora_diff[1].shape[0] if lora_diff[2] is not None else 1.0
-            scale = lora_strength * alpha
-            weight = weight.add(patch_diff, alpha=scale)
-        return weight
+        return _apply_lora(weight, self.lora, self.step)
     
 def remove_lora_from_module(module):
     for name, submodule in module.named_modules():
-        submodule.lora = None
\ No newline at end of file
+        submodule.lora = None
+        clear_lora_cache(submodule)
\ No newline at end of file
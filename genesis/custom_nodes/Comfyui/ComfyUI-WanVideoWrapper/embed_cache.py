@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .utils import log
+
+try:
+    from safetensors.torch import save_file, safe_open
+    SAFETENSORS_AVAILABLE = True
+except ImportError:
+    SAFETENSORS_AVAILABLE = False
+
+
+def text_encoder_key(name, dtype, quantization="disabled"):
+    """Identity of a text encoder for cache keys: model file, compute dtype and quantization"""
+    return f"{name}|{str(dtype).replace('torch.', '')}|{quantization}"
+
+
+def t5_encoder_key(t5):
+    """Encoder identity and max token length for a WANTEXTENCODER dict"""
+    encoder = t5["model"]
+    return text_encoder_key(t5.get("name", "unknown"), t5["dtype"], encoder.quantization), encoder.text_len
+
+
+class TextEmbedCache:
+    """
+    Content-addressed text embedding cache.
+
+    Entries are keyed on (text encoder identity, dtype, max_length, prompt). Recently used
+    embeddings are kept in an in-memory LRU, everything else lives in safetensors shards on
+    disk described by a single index file, which is read once and kept in memory. When the
+    shards exceed max_disk_bytes, the least recently used shards are deleted.
+
+    Tensors going in and out of the in-memory LRU are copies, so callers can modify the
+    returned embeddings in place without corrupting the cache.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, cache_dir, max_disk_bytes=2 * 1024**3, max_memory_entries=256):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_entries = max_memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+
+    @staticmethod
+    def make_key(encoder_key, max_length, prompt):
+        return hashlib.sha256(f"{encoder_key}|{max_length}|{prompt.strip()}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def prompt_hash(prompt):
+        return hashlib.sha256(prompt.strip().encode("utf-8")).hexdigest()
+
+    # region index
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_NAME)
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        self._index = {"entries": {}, "shards": {}, "by_prompt": {}}
+        path = self._index_path()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._index.update(json.load(f))
+            except Exception as e:
+                log.warning(f"Failed to read text embed cache index: {e}, starting empty.")
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path())
+    # endregion
+
+    def _remember(self, key, tensor):
+        self.memory[key] = tensor
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, encoder_key, max_length, prompts, device=None):
+        """
+        Look up embeddings for a list of prompts.
+        With encoder_key None, the most recently stored embedding for the prompt text is used.
+        Returns a list with a tensor or None per prompt.
+        """
+        with self.lock:
+            index = self._load_index()
+            results = [None] * len(prompts)
+            from_disk = {}
+
+            for i, prompt in enumerate(prompts):
+                if encoder_key is None:
+                    key = index["by_prompt"].get(self.prompt_hash(prompt))
+                else:
+                    key = self.make_key(encoder_key, max_length, prompt)
+                if key is None:
+                    continue
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    results[i] = self.memory[key]
+                elif key in index["entries"]:
+                    from_disk.setdefault(index["entries"][key]["shard"], []).append((i, key))
+
+            # One file open per shard, regardless of how many prompts it holds
+            now = time.time()
+            for shard, items in from_disk.items():
+                shard_path = os.path.join(self.cache_dir, shard)
+                try:
+                    with safe_open(shard_path, framework="pt", device="cpu") as f:
+                        for i, key in items:
+                            tensor = f.get_tensor(key)
+                            self._remember(key, tensor)
+                            results[i] = tensor
+                    index["shards"][shard]["last_used"] = now
+                except Exception as e:
+                    log.warning(f"Failed to read text embed cache shard {shard}: {e}, will re-encode.")
+                    self._drop_shard(shard)
+
+            found = sum(r is not None for r in results)
+            self.hits += found
+            self.misses += len(prompts) - found
+
+        if device is not None:
+            return [r.to(device, copy=True) if r is not None else None for r in results]
+        return [r.clone() if r is not None else None for r in results]
+
+    def put_many(self, encoder_key, max_length, prompts, embeds):
+        """Store embeddings for a list of prompts, written to disk as one new shard."""
+        with self.lock:
+            index = self._load_index()
+            tensors = {}
+            for prompt, embed in zip(prompts, embeds):
+                key = self.make_key(encoder_key, max_length, prompt)
+                tensor = embed.detach().to("cpu", copy=True).contiguous()
+                self._remember(key, tensor)
+                index["by_prompt"][self.prompt_hash(prompt)] = key
+                if key not in index["entries"]:
+                    tensors[key] = tensor
+
+            if not tensors or not SAFETENSORS_AVAILABLE:
+                return
+
+            shard = f"shard_{uuid.uuid4().hex[:12]}.safetensors"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                save_file(tensors, os.path.join(self.cache_dir, shard))
+            except Exception as e:
+                log.warning(f"Failed to save text embed cache shard: {e}")
+                return
+
+            size = sum(t.numel() * t.element_size() for t in tensors.values())
+            index["shards"][shard] = {"bytes": size, "keys": list(tensors.keys()), "last_used": time.time()}
+            for key in tensors:
+                index["entries"][key] = {"shard": shard}
+            log.info(f"Saved {len(tensors)} prompt embeds to cache shard: {shard}")
+
+            self._evict()
+            self._save_index()
+
+    def encode(self, encoder_key, max_length, prompts, encode_fn, device=None):
+        """
+        Return embeddings for all prompts, encoding only the cache misses.
+        encode_fn receives the list of missing (deduplicated) prompts and is called at most once.
+        """
+        results = self.get_many(encoder_key, max_length, prompts, device=device)
+        missing = list(OrderedDict.fromkeys(p for p, r in zip(prompts, results) if r is None))
+        if missing:
+            log.info(f"Encoding {len(missing)} uncached prompt(s) in one batch")
+            encoded = dict(zip(missing, encode_fn(missing)))
+            self.put_many(encoder_key, max_length, missing, [encoded[p] for p in missing])
+            results = [r if r is not None else encoded[p] for p, r in zip(prompts, results)]
+        return results
+
+    def _drop_shard(self, shard):
+        index = self._load_index()
+        info = index["shards"].pop(shard, None)
+        if info is None:
+            return
+        dropped = set(info["keys"])
+        for key in dropped:
+            index["entries"].pop(key, None)
+        index["by_prompt"] = {p: k for p, k in index["by_prompt"].items() if k not in dropped or k in self.memory}
+        try:
+            os.remove(os.path.join(self.cache_dir, shard))
+        except OSError:
+            pass
+
+    def _evict(self):
+        index = self._load_index()
+        total = sum(s["bytes"] for s in index["shards"].values())
+        for shard in sorted(index["shards"], key=lambda s: index["shards"][s]["last_used"]):
+            if total <= self.max_disk_bytes:
+                break
+            total -= index["shards"][shard]["bytes"]
+            log.info(f"Evicting text embed cache shard: {shard}")
+            self._drop_shard(shard)
+
+    def clear(self):
+        with self.lock:
+            index = self._load_index()
+            for shard in list(index["shards"]):
+                self._drop_shard(shard)
+            self.memory.clear()
+            index["by_prompt"] = {}
+            self._save_index()
+
+    def stats(self):
+        with self.lock:
+            index = self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self.memory),
+                "disk_entries": len(index["entries"]),
+                "disk_bytes": sum(s["bytes"] for s in index["shards"].values()),
+            }
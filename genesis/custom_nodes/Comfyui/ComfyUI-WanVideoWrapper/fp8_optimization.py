@@ -25,6 +25,13 @@ def fp8_linear_forward(cls, base_dtype, input):
             else:
                 scale_weight = scale_weight.to(input.device)
             
+            # Unmerged LoRAs are added as a low-rank term; full diffs need the dense weight
+            lora_out = None
+            if getattr(cls, "lora", None) is not None:
+                if get_lora_stack(cls).dense:
+                    return cls.original_forward(input.to(base_dtype))
+                lora_out = lora_linear_delta(cls, input, getattr(cls, "step", 0), base_dtype)
+
             scale_input = torch.ones((), device=input.device, dtype=torch.float32)
             input = torch.clamp(input, min=-448, max=448, out=input)
             inn = input.reshape(-1, input_shape[2]).to(torch.float8_e4m3fn).contiguous() #always e4m3fn because e5m2 * e5m2 is not supported
@@ -33,30 +40,157 @@ def fp8_linear_forward(cls, base_dtype, input):
 
             o = torch._scaled_mm(inn, cls.weight.t(), out_dtype=base_dtype, bias=bias, scale_a=scale_input, scale_b=scale_weight)
 
-            return o.reshape((-1, input_shape[1], cls.weight.shape[0]))
+            o = o.reshape((-1, input_shape[1], cls.weight.shape[0]))
+            if lora_out is not None:
+                o = o + lora_out
+            return o
         else:
             return cls.original_forward(input.to(base_dtype))
     else:
         return cls.original_forward(input)
 
 
+def get_lora_strength(lora_strength, step=None):
+    if isinstance(lora_strength, list):
+        return lora_strength[step or 0]
+    return lora_strength
+
+
+class LoraStack:
+    """
+    Stacked factors of all LoRAs patching one linear layer.
+
+    Plain up/down pairs are concatenated along the rank dimension, so any number of LoRAs is applied
+    with two thin matmuls, (x @ down.T * scale) @ up.T, instead of rebuilding a weight-sized delta per
+    LoRA. Entries that are not a low-rank pair for this layer (full diffs) are kept for dense merging.
+    Factors and the per-rank scale vector are cached on the compute device.
+    """
+    def __init__(self, lora, out_features, in_features):
+        self.lora = lora
+        self.strengths = lora[1]
+        self.low_rank = []
+        self.dense = []
+        self.ranks = []
+        self.alphas = []
+        self._ups = []
+        self._downs = []
+        for i, lora_diff in enumerate(lora[0]):
+            try:
+                up = lora_diff[0].flatten(start_dim=1)
+                down = lora_diff[1].flatten(start_dim=1)
+                is_low_rank = up.shape == (out_features, down.shape[0]) and down.shape[1] == in_features
+            except (TypeError, IndexError, AttributeError):
+                is_low_rank = False
+            if not is_low_rank:
+                self.dense.append(i)
+                continue
+            self.low_rank.append(i)
+            self.ranks.append(down.shape[0])
+            self.alphas.append(lora_diff[2] / down.shape[0] if lora_diff[2] is not None else 1.0)
+            self._ups.append(up)
+            self._downs.append(down)
+        self._factors = None
+        self._scale = None
+
+    def strengths_at(self, step):
+        return [get_lora_strength(s, step) for s in self.strengths]
+
+    def factors(self, device, dtype):
+        if self._factors is None or self._factors[0] != device or self._factors[1] != dtype:
+            down = torch.cat([d.to(device, dtype) for d in self._downs], dim=0)
+            up = torch.cat([u.to(device, dtype) for u in self._ups], dim=1)
+            self._factors = (device, dtype, down, up)
+        return self._factors[2], self._factors[3]
+
+    def scale(self, strengths, device, dtype):
+        key = (tuple(strengths[i] for i in self.low_rank), device, dtype)
+        if self._scale is None or self._scale[0] != key:
+            values = torch.tensor([strengths[i] * alpha for i, alpha in zip(self.low_rank, self.alphas)], dtype=torch.float32)
+            scale = values.repeat_interleave(torch.tensor(self.ranks)).to(device, dtype)
+            self._scale = (key, scale)
+        return self._scale[1]
+
+    def has_active_low_rank(self, strengths):
+        return any(strengths[i] != 0.0 for i in self.low_rank)
+
+    def apply_dense(self, weight, strengths):
+        for i in self.dense:
+            if strengths[i] == 0.0:
+                continue
+            lora_diff = self.lora[0][i]
+            patch_diff = torch.mm(
+                lora_diff[0].flatten(start_dim=1).to(weight.device),
+                lora_diff[1].flatten(start_dim=1).to(weight.device)
+            ).reshape(weight.shape)
+            alpha = lora_diff[2] / lora_diff[1].shape[0] if lora_diff[2] is not None else 1.0
+            weight = weight.add(patch_diff, alpha=strengths[i] * alpha)
+        return weight
+
+    def merge(self, weight, strengths):
+        weight = self.apply_dense(weight, strengths)
+        if not self.has_active_low_rank(strengths):
+            return weight
+        down, up = self.factors(weight.device, weight.dtype)
+        scaled_down = down * self.scale(strengths, weight.device, weight.dtype)[:, None]
+        return torch.addmm(weight.flatten(start_dim=1), up, scaled_down).reshape(weight.shape)
+
+
+def get_lora_stack(module):
+    stack = getattr(module, "_lora_stack", None)
+    if stack is None or stack.lora is not module.lora:
+        stack = LoraStack(module.lora, module.out_features, module.in_features)
+        module._lora_stack = stack
+        module._lora_merged = None
+    return stack
+
+
+@torch.compiler.disable()
+def _lora_factors(module, step, device, dtype):
+    stack = get_lora_stack(module)
+    strengths = stack.strengths_at(step)
+    if not stack.low_rank or not stack.has_active_low_rank(strengths):
+        return None
+    down, up = stack.factors(device, dtype)
+    return down, up, stack.scale(strengths, device, dtype)
+
+
+def lora_linear_delta(module, input, step=None, dtype=None):
+    """Low-rank LoRA output for a linear layer: (x @ down.T * scale) @ up.T, or None if no LoRA is active"""
+    dtype = dtype or input.dtype
+    factors = _lora_factors(module, step, input.device, dtype)
+    if factors is None:
+        return None
+    down, up, scale = factors
+    return torch.nn.functional.linear(torch.nn.functional.linear(input.to(dtype), down) * scale, up)
+
+
+@torch.compiler.disable()
+def merge_lora_cached(module, weight, step=None):
+    """
+    Merged LoRA weight, cached on the module until the effective strengths (or the base weight) change,
+    so a constant or piecewise-constant strength schedule only merges when the schedule actually moves.
+    """
+    stack = get_lora_stack(module)
+    strengths = stack.strengths_at(step)
+    base = module.weight
+    key = (tuple(strengths), weight.device, weight.dtype, base.data_ptr(), base._version)
+    cached = getattr(module, "_lora_merged", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    merged = stack.merge(weight, strengths)
+    module._lora_merged = (key, merged)
+    return merged
+
+
+def clear_lora_cache(module):
+    module._lora_stack = None
+    module._lora_merged = None
+
+
 @torch.compiler.disable()
 def apply_lora(weight, lora, step=None):
-    for lora_diff, lora_strength in zip(lora[0], lora[1]):
-        if isinstance(lora_strength, list):
-            lora_strength = lora_strength[step]
-            if lora_strength == 0.0:
-                continue
-        elif lora_strength == 0.0:
-            continue
-        patch_diff = torch.mm(
-            lora_diff[0].flatten(start_dim=1).to(weight.device),
-            lora_diff[1].flatten(start_dim=1).to(weight.device)
-        ).reshape(weight.shape)
-        alpha = lora_diff[2] / lora_diff[1].shape[0] if lora_diff[2] is not None else 1.0
-        scale = lora_strength * alpha
-        weight = weight.add(patch_diff, alpha=scale)
-    return weight
+    stack = LoraStack(lora, weight.shape[0], weight.flatten(start_dim=1).shape[1])
+    return stack.merge(weight, stack.strengths_at(step))
 
 def convert_fp8_linear(module, base_dtype, params_to_keep={}, scale_weight_keys=None):
     log.info("FP8 matmul enabled")
@@ -1,17 +1,20 @@
 import torch
 import torch.nn as nn
 import numpy as np
+import warnings
 from diffusers.quantizers.gguf.utils import GGUFParameter, dequantize_gguf_tensor
 import gguf
 from diffusers.utils import is_accelerate_available
 from contextlib import nullcontext
 from ..utils import log
+from ..fp8_optimization import get_lora_stack, lora_linear_delta, merge_lora_cached, apply_lora
 if is_accelerate_available():
     from accelerate import init_empty_weights
 
 def load_gguf(model_path):
     from gguf import GGUFReader
-    reader = GGUFReader(model_path)
+    # Copy-on-write mapping, tensor data can be wrapped without copying and writes stay private
+    reader = GGUFReader(model_path, mode="c")
     parsed_parameters = {}
     for tensor in reader.tensors:
         # if the tensor is a torch supported dtype do not use GGUFParameter
@@ -20,6 +23,18 @@ def load_gguf(model_path):
         parsed_parameters[tensor.name] = GGUFParameter(meta_tensor, quant_type=tensor.tensor_type) if is_gguf_quant else meta_tensor
     return parsed_parameters, reader
 
+def gguf_tensor_to_device(data, device):
+    """Wrap memory-mapped GGUF tensor data without a host copy and move it to device"""
+    if data.flags.writeable:
+        return torch.from_numpy(data).to(device)
+    if torch.device(device).type == "cpu":
+        # Read-only mapping, the parameter must not alias it
+        return torch.from_numpy(data.copy())
+    with warnings.catch_warnings():
+        # The read-only view is only used as the source of the device copy
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(data).to(device)
+
 #based on https://github.com/huggingface/diffusers/blob/main/src/diffusers/quantizers/gguf/utils.py
 def _replace_with_gguf_linear(model, compute_dtype, state_dict, prefix="", modules_to_not_convert=[], patches=None):
     def _should_convert_to_gguf(state_dict, prefix):
@@ -57,11 +72,11 @@ def _replace_with_gguf_linear(model, compute_dtype, state_dict, prefix="", modul
             model._modules[name].requires_grad_(False)
     return model
 
-def set_lora_params_gguf(module, patches, module_prefix=""):
+def set_lora_params_gguf(module, patches, module_prefix="", lora_mode="low_rank"):
     # Recursively set lora_diffs and lora_strengths for all GGUFLinear layers
     for name, child in module.named_children():
         child_prefix = (f"{module_prefix}{name}.")
-        set_lora_params_gguf(child, patches, child_prefix)
+        set_lora_params_gguf(child, patches, child_prefix, lora_mode)
     if isinstance(module, GGUFLinear):
         key = f"diffusion_model.{module_prefix}weight"
         patch = patches.get(key, [])
@@ -80,6 +95,7 @@ def set_lora_params_gguf(module, patches, module_prefix=""):
                     continue
             lora_strengths = [p[0] for p in patch]
             module.lora = (lora_diffs, lora_strengths)
+            module.lora_mode = lora_mode
             module.step = 0  # Initialize step for LoRA scheduling
 
 
@@ -95,6 +111,7 @@ class GGUFLinear(nn.Linear):
         super().__init__(in_features, out_features, bias, device)
         self.compute_dtype = compute_dtype
         self.lora = None
+        self.lora_mode = "low_rank"
         self.step = 0
 
     def forward(self, inputs):
@@ -102,30 +119,25 @@ class GGUFLinear(nn.Linear):
         weight = weight.to(self.compute_dtype)
         bias = self.bias.to(self.compute_dtype) if self.bias is not None else None
 
-        if hasattr(self, "lora") and self.lora is not None:
-            weight = self.apply_lora(weight, self.step).to(self.compute_dtype)
+        if getattr(self, "lora", None) is None:
+            return torch.nn.functional.linear(inputs, weight, bias)
+
+        if getattr(self, "lora_mode", "low_rank") == "merged_cache":
+            weight = merge_lora_cached(self, weight, self.step).to(self.compute_dtype)
+            return torch.nn.functional.linear(inputs, weight, bias)
 
+        stack = get_lora_stack(self)
+        if stack.dense:
+            weight = stack.apply_dense(weight, stack.strengths_at(self.step)).to(self.compute_dtype)
         output = torch.nn.functional.linear(inputs, weight, bias)
+        lora_out = lora_linear_delta(self, inputs, self.step, output.dtype)
+        if lora_out is not None:
+            output = output + lora_out
         return output
     
     @torch.compiler.disable()
     def dequantize_without_compile(self):
         return dequantize_gguf_tensor(self.weight)
 
-    @torch.compiler.disable()
     def apply_lora(self, weight, step=None):
-        for lora_diff, lora_strength in zip(self.lora[0], self.lora[1]):
-            if isinstance(lora_strength, list):
-                lora_strength = lora_strength[step]
-                if lora_strength == 0.0:
-                    continue
-            elif lora_strength == 0.0:
-                continue
-            patch_diff = torch.mm(
-                lora_diff[0].flatten(start_dim=1).to(weight.device),
-                lora_diff[1].flatten(start_dim=1).to(weight.device)
-            ).reshape(weight.shape)
-            alpha = lora_diff[2] / lora_diff[1].shape[0] if lora_diff[2] is not None else 1.0
-            scale = lora_strength * alpha
-            weight = weight.add(patch_diff, alpha=scale)
-        return weight
\ No newline at end of file
+        return apply_lora(weight, self.lora, step)
\ No newline at end of file
@@ -8,13 +8,36 @@ import comfy.utils
 from comfy.latent_formats import Wan21, Wan22
 from .utils import log
 import struct
+import time
 
 from .taehv import TAEHV
 
 MAX_PREVIEW_RESOLUTION = args.preview_size
+# Minimum seconds between decoded step previews, steps in between only report progress
+PREVIEW_INTERVAL = 0.5
+
+# TAEHV models by (file, device, single frame), loaded once and reused across sampler runs
+_taehv_cache = {}
+
+def load_taehv(taehv_path, device, animated=True):
+    key = (taehv_path, str(device), animated)
+    if key not in _taehv_cache:
+        if animated:
+            _taehv_cache[key] = TAEHV(comfy.utils.load_torch_file(taehv_path)).to(device)
+        else:
+            # Single frame previews: no temporal upscale and one less spatial upscale
+            _taehv_cache[key] = TAEHV(comfy.utils.load_torch_file(taehv_path), decoder_time_upscale=(False, False),
+                                      decoder_space_upscale=(True, True, False)).to(device, torch.float16)
+    return _taehv_cache[key]
+
+def previews_wanted():
+    """Under Genesis, auto previews are only decoded while a client is subscribed to them"""
+    wanted = getattr(comfy.utils, "previews_wanted", None)
+    if wanted is None or args.preview_method != LatentPreviewMethod.Auto:
+        return True
+    return wanted()
 
 def preview_to_image(latent_image):
-        print("latent_image shape: ", latent_image.shape)#torch.Size([60, 104, 3])
         latents_ubyte = (((latent_image + 1.0) / 2.0).clamp(0, 1)  # change scale from -1..1 to 0..1
                             .mul(0xFF)  # to 0..255
                             )
@@ -36,14 +59,11 @@ class TAESDPreviewerImpl(LatentPreviewer):
     def __init__(self, taesd):
         self.taesd = taesd
 
-    # def decode_latent_to_preview(self, x0):
-    #     #x_sample = self.taesd.decode(x0[:1])[0].movedim(0, 2)
-    #     print("x0 shape: ", x0.shape) #torch.Size([5, 16, 60, 104])
-    #     x0 = x0.unsqueeze(0)
-    #     print("x0 shape: ", x0.shape) #torch.Size([5, 16, 60, 104])
-    #     x_sample = self.taesd.decode_video(x0, parallel=False)[0].permute(0, 2, 3, 1)[0]
-    #     print("x_sample shape: ", x_sample.shape) 
-    #     return preview_to_image(x_sample)
+    def decode_latent_to_preview(self, x0):
+        # x0: [T, C, H, W], decode only the middle latent frame
+        mid = x0.shape[0] // 2
+        x_sample = self.taesd.decode_video(x0[mid:mid + 1].unsqueeze(0).to(self.taesd.dtype), parallel=True, show_progress_bar=False)
+        return preview_to_image(x_sample[0, -1].permute(1, 2, 0).float() * 2.0 - 1.0)
 
 
 class Latent2RGBPreviewer(LatentPreviewer):
@@ -61,7 +81,7 @@ class Latent2RGBPreviewer(LatentPreviewer):
         if x0.ndim == 5:
             x0 = x0[0, :, 0]
         else:
-            x0 = x0[0]
+            x0 = x0[x0.shape[0] // 2]
 
         latent_image = torch.nn.functional.linear(x0.movedim(0, -1), self.latent_rgb_factors, bias=self.latent_rgb_factors_bias)
         # latent_image = x0[0].permute(1, 2, 0) @ self.latent_rgb_factors
@@ -69,10 +89,11 @@ class Latent2RGBPreviewer(LatentPreviewer):
         return preview_to_image(latent_image)
 
 
-def get_previewer(device, latent_format):
+def get_previewer(device, latent_format, animated=True, latent_channels=None):
+    """animated=False returns a previewer for one image per step instead of the VHS animated previews"""
     previewer = None
     method = args.preview_method
-    if method != LatentPreviewMethod.NoPreviews:
+    if method not in (LatentPreviewMethod.NoPreviews, getattr(LatentPreviewMethod, "Disabled", None)):
         if method == LatentPreviewMethod.Auto:
             method = LatentPreviewMethod.Latent2RGB
 
@@ -82,18 +103,24 @@ def get_previewer(device, latent_format):
                     taehv_path = folder_paths.get_full_path("vae_approx", "taew2_2.safetensors")
                 else:
                     taehv_path = folder_paths.get_full_path("vae_approx", "taew2_1.safetensors")
-                taesd = TAEHV(comfy.utils.load_torch_file(taehv_path)).to(device)
-                previewer = TAESDPreviewerImpl(taesd)
-                previewer = WrappedPreviewer(previewer, rate=16)
+                taesd = load_taehv(taehv_path, device, animated)
+                if animated:
+                    previewer = WrappedPreviewer(TAESDPreviewerImpl(taesd), rate=16)
+                else:
+                    previewer = TAESDPreviewerImpl(taesd)
             except:
                 log.info("Could not find TAEW model file 'taew2_1.safetensors' from models/vae_approx. You can download it from https://huggingface.co/Kijai/WanVideo_comfy/blob/main/taew2_1.safetensors")
                 log.info("Using Latent2RGB previewer instead.")
                 method = LatentPreviewMethod.Latent2RGB
                 
         if previewer is None:
-            if latent_format.latent_rgb_factors is not None:
-                previewer = Latent2RGBPreviewer(latent_format.latent_rgb_factors, latent_format.latent_rgb_factors_bias)
-                previewer = WrappedPreviewer(previewer, rate=4)
+            latent_rgb_factors = getattr(latent_format, "latent_rgb_factors", None)
+            if latent_rgb_factors is not None and latent_channels is not None and len(latent_rgb_factors[0]) != latent_channels:
+                log.info(f"Latent2RGB factors are for {len(latent_rgb_factors[0])} channels, the model has {latent_channels}, previews disabled")
+            elif latent_rgb_factors is not None:
+                previewer = Latent2RGBPreviewer(latent_rgb_factors, getattr(latent_format, "latent_rgb_factors_bias", None))
+                if animated:
+                    previewer = WrappedPreviewer(previewer, rate=4)
     return previewer
 
 def prepare_callback(model, steps, x0_output_dict=None):
@@ -101,19 +128,35 @@ def prepare_callback(model, steps, x0_output_dict=None):
     if preview_format not in ["JPEG", "PNG"]:
         preview_format = "JPEG"
 
-    # Disable previewer to avoid dimension mismatch errors
-    previewer = None  # get_previewer(model.load_device, model.model.latent_format)
+    # One preview image per step, with the factors checked against the model's latent channels.
+    # Built on the first step anyone wants a preview, runs without subscribers never decode
+    previewer = None
+    previewer_ready = False
+    def build_previewer():
+        try:
+            diffusion_model = model.model.diffusion_model
+            latent_channels = getattr(diffusion_model, "out_dim", None)
+            return get_previewer(model.load_device, model.model.latent_format, animated=False, latent_channels=latent_channels)
+        except Exception as e:
+            log.warning(f"Latent previews disabled: {e}")
+            return None
+    last_preview = [0.0]
 
     if steps is not None:
         pbar = comfy.utils.ProgressBar(steps)
     def callback(step, x0, x, total_steps):
+        nonlocal previewer, previewer_ready
         if x0_output_dict is not None:
             x0_output_dict["x0"] = x0
 
         preview_bytes = None
-        # Skip preview generation to avoid errors
-        # if previewer:
-        #     preview_bytes = previewer.decode_latent_to_preview_image(preview_format, x0)
+        if time.time() - last_preview[0] >= PREVIEW_INTERVAL and previews_wanted():
+            if not previewer_ready:
+                previewer, previewer_ready = build_previewer(), True
+            if previewer is not None:
+                last_preview[0] = time.time()
+                with torch.no_grad():
+                    preview_bytes = previewer.decode_latent_to_preview_image(preview_format, x0)
         if step is not None:
             # Fix: only pass 2 arguments when preview_bytes is None
             if preview_bytes is not None:
@@ -127,7 +170,6 @@ import server
 from threading import Thread
 import torch.nn.functional as F
 import io
-import time
 import struct
 from importlib.util import find_spec
 serv = server.PromptServer.instance
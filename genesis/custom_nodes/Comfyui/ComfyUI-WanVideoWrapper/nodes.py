@@ -2,12 +2,12 @@ import os, gc, math
 import torch
 import torch.nn.functional as F
 import numpy as np
-import hashlib
 
 from .wanvideo.schedulers import get_scheduler, scheduler_list
 
 from .utils import(log, clip_encode_image_tiled, add_noise_to_reference_video, set_module_tensor_to_device)
 from .taehv import TAEHV
+from .embed_cache import TextEmbedCache, text_encoder_key, t5_encoder_key
 
 from comfy import model_management as mm
 from comfy.utils import ProgressBar, common_upscale
@@ -154,39 +154,10 @@ class WanVideoBlockList:
 _extender_cache = {}
 
 cache_dir = os.path.join(script_directory, 'text_embed_cache')
+text_embed_cache = TextEmbedCache(cache_dir)
 
-def get_cache_path(prompt):
-    cache_key = prompt.strip()
-    cache_hash = hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
-    return os.path.join(cache_dir, f"{cache_hash}.pt")
-
-def get_cached_text_embeds(positive_prompt, negative_prompt):
-    
-    os.makedirs(cache_dir, exist_ok=True)
-
-    context = None
-    context_null = None
-
-    pos_cache_path = get_cache_path(positive_prompt)
-    neg_cache_path = get_cache_path(negative_prompt)
-
-    # Try to load positive prompt embeds
-    if os.path.exists(pos_cache_path):
-        try:
-            log.info(f"Loading prompt embeds from cache: {pos_cache_path}")
-            context = torch.load(pos_cache_path)
-        except Exception as e:
-            log.warning(f"Failed to load cache: {e}, will re-encode.")
-
-    # Try to load negative prompt embeds
-    if os.path.exists(neg_cache_path):
-        try:
-            log.info(f"Loading prompt embeds from cache: {neg_cache_path}")
-            context_null = torch.load(neg_cache_path)
-        except Exception as e:
-            log.warning(f"Failed to load cache: {e}, will re-encode.")
-
-    return context, context_null
+# T5 max token length used by LoadWanVideoT5TextEncoder
+T5_TEXT_LEN = 512
 
 class WanVideoTextEncodeCached:
     @classmethod
@@ -225,8 +196,6 @@ of the original Wan templates or a custom system prompt.
         from .nodes_model_loading import LoadWanVideoT5TextEncoder
         pbar = ProgressBar(3)
 
-        echoshot = True if "[1]" in positive_prompt else False
-
         # Handle prompt extension with in-memory cache
         orig_prompt = positive_prompt
         if extender_args is not None:
@@ -255,15 +224,15 @@ of the original Wan templates or a custom system prompt.
                 del qwen
             pbar.update(1)
 
-        # Now check disk cache using the (possibly extended) prompt
+        # Now check disk cache using the (possibly extended) prompt, T5 is not loaded on a full hit
         if use_disk_cache:
-            context, context_null = get_cached_text_embeds(positive_prompt, negative_prompt)
-            if context is not None and context_null is not None:
-                return{
-                    "prompt_embeds": context,
-                    "negative_prompt_embeds": context_null,
-                    "echoshot": echoshot,
-                },{"prompt_embeds": context_null}, positive_prompt
+            dtype = {"fp32": torch.float32, "bf16": torch.bfloat16}[precision]
+            # Same quantization the loader resolves, entries are stored under t5_encoder_key of the loaded encoder
+            encoder_key = text_encoder_key(model_name, dtype, LoadWanVideoT5TextEncoder.resolve_quantization(model_name, quantization))
+            device_to = mm.get_torch_device() if device == "gpu" else torch.device("cpu")
+            prompt_embeds_dict = WanVideoTextEncode().load_cached(positive_prompt, negative_prompt, encoder_key, T5_TEXT_LEN, device_to)
+            if prompt_embeds_dict is not None:
+                return prompt_embeds_dict, {"prompt_embeds": prompt_embeds_dict["negative_prompt_embeds"]}, positive_prompt
 
         t5, = LoadWanVideoT5TextEncoder().loadmodel(model_name, precision, "main_device", quantization)
         pbar.update(1)
@@ -307,34 +276,8 @@ class WanVideoTextEncode:
     DESCRIPTION = "Encodes text prompts into text embeddings. For rudimentary prompt travel you can input multiple prompts separated by '|', they will be equally spread over the video length"
 
 
-    def process(self, positive_prompt, negative_prompt, t5=None, force_offload=True, model_to_offload=None, use_disk_cache=False, device="gpu"):
-        if t5 is None and not use_disk_cache:
-            raise ValueError("T5 encoder is required for text encoding. Please provide a valid T5 encoder or enable disk cache.")
-
-        echoshot = True if "[1]" in positive_prompt else False
-
-        if use_disk_cache:
-            context, context_null = get_cached_text_embeds(positive_prompt, negative_prompt)
-            if context is not None and context_null is not None:
-                return{
-                    "prompt_embeds": context,
-                    "negative_prompt_embeds": context_null,
-                    "echoshot": echoshot,
-                },
-            
-        if t5 is None:
-            raise ValueError("No cached text embeds found for prompts, please provide a T5 encoder.")
-
-        if model_to_offload is not None and device == "gpu":
-            try:
-                log.info(f"Moving video model to {offload_device}")
-                model_to_offload.model.to(offload_device)
-            except:
-                pass
-
-        encoder = t5["model"]
-        dtype = t5["dtype"]
-        
+    def split_prompts(self, positive_prompt):
+        """Split positive prompt into individual prompts and their (text:weight) weights"""
         positive_prompts = []
         all_weights = []
 
@@ -356,13 +299,70 @@ class WanVideoTextEncode:
             positive_prompts.append(cleaned_prompt)
             all_weights.append(weights)
 
-        mm.soft_empty_cache()
+        return positive_prompts, all_weights
+
+    def build_embeds(self, embeds, all_weights, echoshot):
+        """Build text embeds dict from [*positive, negative] embeddings, applying prompt weights"""
+        context = list(embeds[:-1])
+        # Apply weights to embeddings if any were extracted
+        for i, weights in enumerate(all_weights):
+            for text, weight in weights.items():
+                log.info(f"Applying weight {weight} to prompt: {text}")
+                if len(weights) > 0:
+                    context[i] = context[i] * weight
+
+        return {
+            "prompt_embeds": context,
+            "negative_prompt_embeds": [embeds[-1]],
+            "echoshot": echoshot,
+        }
+
+    def load_cached(self, positive_prompt, negative_prompt, encoder_key, max_length, device_to):
+        """Text embeds dict if every prompt is in the cache, otherwise None"""
+        positive_prompts, all_weights = self.split_prompts(positive_prompt)
+        embeds = text_embed_cache.get_many(encoder_key, max_length, positive_prompts + [negative_prompt], device=device_to)
+        if any(e is None for e in embeds):
+            return None
+        log.info("Loaded all prompt embeds from cache")
+        return self.build_embeds(embeds, all_weights, "[1]" in positive_prompt)
+
+    def process(self, positive_prompt, negative_prompt, t5=None, force_offload=True, model_to_offload=None, use_disk_cache=False, device="gpu"):
+        if t5 is None and not use_disk_cache:
+            raise ValueError("T5 encoder is required for text encoding. Please provide a valid T5 encoder or enable disk cache.")
+
+        echoshot = True if "[1]" in positive_prompt else False
 
         if device == "gpu":
             device_to = mm.get_torch_device()
         else:
             device_to = torch.device("cpu")
 
+        # Without an encoder the cache falls back to the most recent entry for each prompt text
+        encoder_key, max_length = t5_encoder_key(t5) if t5 is not None else (None, None)
+
+        if use_disk_cache:
+            prompt_embeds_dict = self.load_cached(positive_prompt, negative_prompt, encoder_key, max_length, device_to)
+            if prompt_embeds_dict is not None:
+                return (prompt_embeds_dict,)
+            
+        if t5 is None:
+            raise ValueError("No cached text embeds found for prompts, please provide a T5 encoder.")
+
+        if model_to_offload is not None and device == "gpu":
+            try:
+                log.info(f"Moving video model to {offload_device}")
+                model_to_offload.model.to(offload_device)
+            except:
+                pass
+
+        encoder = t5["model"]
+        dtype = t5["dtype"]
+
+        positive_prompts, all_weights = self.split_prompts(positive_prompt)
+        all_prompts = positive_prompts + [negative_prompt]
+
+        mm.soft_empty_cache()
+
         if encoder.quantization == "fp8_e4m3fn":
             cast_dtype = torch.float8_e4m3fn
         else:
@@ -378,52 +378,19 @@ class WanVideoTextEncode:
             mm.soft_empty_cache()
             gc.collect()
 
+        # Positive and negative prompts (only the cache misses when caching) are encoded in one forward
         with torch.autocast(device_type=mm.get_autocast_device(device_to), dtype=encoder.dtype, enabled=encoder.quantization != 'disabled'):
-            # Encode positive if not loaded from cache
-            if use_disk_cache and context is not None:
-                pass
-            else:
-                context = encoder(positive_prompts, device_to)
-                # Apply weights to embeddings if any were extracted
-                for i, weights in enumerate(all_weights):
-                    for text, weight in weights.items():
-                        log.info(f"Applying weight {weight} to prompt: {text}")
-                        if len(weights) > 0:
-                            context[i] = context[i] * weight
-
-            # Encode negative if not loaded from cache
-            if use_disk_cache and context_null is not None:
-                pass
+            if use_disk_cache:
+                embeds = text_embed_cache.encode(encoder_key, max_length, all_prompts, lambda texts: encoder(texts, device_to), device=device_to)
             else:
-                context_null = encoder([negative_prompt], device_to)
+                embeds = encoder(all_prompts, device_to)
 
         if force_offload:
             encoder.model.to(offload_device)
             mm.soft_empty_cache()
             gc.collect()
 
-        prompt_embeds_dict = {
-            "prompt_embeds": context,
-            "negative_prompt_embeds": context_null,
-            "echoshot": echoshot,
-        }
-
-        # Save each part to its own cache file if needed
-        if use_disk_cache:
-            pos_cache_path = get_cache_path(positive_prompt)
-            neg_cache_path = get_cache_path(negative_prompt)
-            try:
-                if not os.path.exists(pos_cache_path):
-                    torch.save(context, pos_cache_path)
-                    log.info(f"Saved prompt embeds to cache: {pos_cache_path}")
-            except Exception as e:
-                log.warning(f"Failed to save cache: {e}")
-            try:
-                if not os.path.exists(neg_cache_path):
-                    torch.save(context_null, neg_cache_path)
-                    log.info(f"Saved prompt embeds to cache: {neg_cache_path}")
-            except Exception as e:
-                log.warning(f"Failed to save cache: {e}")
+        prompt_embeds_dict = self.build_embeds(embeds, all_weights, echoshot)
 
         return (prompt_embeds_dict,)
     
@@ -469,23 +436,20 @@ class WanVideoTextEncodeSingle:
     DESCRIPTION = "Encodes text prompt into text embedding."
 
     def process(self, prompt, t5=None, force_offload=True, model_to_offload=None, use_disk_cache=False, device="gpu"):
-        # Unified cache logic: use a single cache file per unique prompt
         encoded = None
         echoshot = True if "[1]" in prompt else False
+
+        if device == "gpu":
+            device_to = mm.get_torch_device()
+        else:
+            device_to = torch.device("cpu")
+
+        encoder_key, max_length = t5_encoder_key(t5) if t5 is not None else (None, None)
         if use_disk_cache:
-            cache_dir = os.path.join(script_directory, 'text_embed_cache')
-            os.makedirs(cache_dir, exist_ok=True)
-            def get_cache_path(prompt):
-                cache_key = prompt.strip()
-                cache_hash = hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
-                return os.path.join(cache_dir, f"{cache_hash}.pt")
-            cache_path = get_cache_path(prompt)
-            if os.path.exists(cache_path):
-                try:
-                    log.info(f"Loading prompt embeds from cache: {cache_path}")
-                    encoded = torch.load(cache_path)
-                except Exception as e:
-                    log.warning(f"Failed to load cache: {e}, will re-encode.")
+            cached = text_embed_cache.get_many(encoder_key, max_length, [prompt], device=device_to)
+            if cached[0] is not None:
+                log.info("Loaded prompt embeds from cache")
+                encoded = cached
 
         if t5 is None and encoded is None:
             raise ValueError("No cached text embeds found for prompts, please provide a T5 encoder.")
@@ -502,11 +466,6 @@ class WanVideoTextEncodeSingle:
             encoder = t5["model"]
             dtype = t5["dtype"]
 
-            if device == "gpu":
-                device_to = mm.get_torch_device()
-            else:
-                device_to = torch.device("cpu")
-
             if encoder.quantization == "fp8_e4m3fn":
                 cast_dtype = torch.float8_e4m3fn
             else:
@@ -529,12 +488,7 @@ class WanVideoTextEncodeSingle:
 
             # Save to cache if enabled
             if use_disk_cache:
-                try:
-                    if not os.path.exists(cache_path):
-                        torch.save(encoded, cache_path)
-                        log.info(f"Saved prompt embeds to cache: {cache_path}")
-                except Exception as e:
-                    log.warning(f"Failed to save cache: {e}")
+                text_embed_cache.put_many(encoder_key, max_length, [prompt], encoded)
 
         prompt_embeds_dict = {
             "prompt_embeds": encoded,
@@ -1656,6 +1610,7 @@ class WanVideoContextOptions:
             "optional": {
                 "fuse_method": (["linear", "pyramid"], {"default": "linear", "tooltip": "Window weight function: linear=ramps at edges only, pyramid=triangular weights peaking in middle"}),
                 "reference_latent": ("LATENT", {"tooltip": "Image to be used as init for I2V models for windows where first frame is not the actual first frame. Mostly useful with MAGREF model"}),
+                "window_batch_size": ("INT", {"default": 1, "min": 1, "max": 64, "step": 1, "tooltip": "Maximum number of context windows to run in one batched model pass, limited further by free VRAM. Only used when the windows differ in latent and image conditioning alone (no teacache, VACE, audio etc.)"}),
             }
         }
 
@@ -1665,7 +1620,7 @@ class WanVideoContextOptions:
     CATEGORY = "WanVideoWrapper"
     DESCRIPTION = "Context options for WanVideo, allows splitting the video into context windows and attemps blending them for longer generations than the model and memory otherwise would allow."
 
-    def process(self, context_schedule, context_frames, context_stride, context_overlap, freenoise, verbose, image_cond_start_step=6, image_cond_window_count=2, vae=None, fuse_method="linear", reference_latent=None):
+    def process(self, context_schedule, context_frames, context_stride, context_overlap, freenoise, verbose, image_cond_start_step=6, image_cond_window_count=2, vae=None, fuse_method="linear", reference_latent=None, window_batch_size=1):
         context_options = {
             "context_schedule":context_schedule,
             "context_frames":context_frames,
@@ -1675,6 +1630,7 @@ class WanVideoContextOptions:
             "verbose":verbose,
             "fuse_method":fuse_method,
             "reference_latent":reference_latent["samples"] if reference_latent is not None else None,
+            "window_batch_size":window_batch_size,
         }
 
         return (context_options,)
@@ -2047,6 +2003,44 @@ class WanVideoDecode:
 
         return (images.permute(1, 2, 3, 0),)
 
+class WanVideoDecodeStream:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {"required": {
+                    "vae": ("WANVAE",),
+                    "samples": ("LATENT",),
+                    },
+                }
+
+    RETURN_TYPES = ("VIDEO_FRAME_STREAM",)
+    RETURN_NAMES = ("frames",)
+    FUNCTION = "decode"
+    CATEGORY = "WanVideoWrapper"
+    DESCRIPTION = ("Decodes lazily while the connected Video Combine node encodes: the VAE runs one latent frame at a time, frames are converted to uint8 on the GPU "
+                   "and piped to ffmpeg as they are ready, so the full video never sits in RAM as float32. Doesn't support tiling, end frame or looped latents, use WanVideo Decode for those. "
+                   "Video Combine has no images output for a stream, leave it unconnected.")
+
+    def decode(self, vae, samples):
+        from .video_stream import VideoFrameStream
+        if samples.get("video", None) is not None:
+            raise ValueError("Samples are already decoded, use WanVideo Decode instead")
+        if type(vae).__name__ == "TAEHV":
+            raise ValueError("Streaming decode is not supported for TAEHV, use WanVideo Decode instead")
+        if samples.get("end_image", None) is not None or samples.get("looped", False):
+            raise ValueError("Streaming decode doesn't support end frame or looped latents, use WanVideo Decode instead")
+
+        latents = samples["samples"][0]
+        if samples.get("has_ref", False):
+            latents = latents[:, 1:]
+        if samples.get("drop_last", False):
+            latents = latents[:, :-1]
+        latents = latents.to(device=device, dtype=vae.dtype)
+
+        num_frames = (latents.shape[1] - 1) * 4 + 1
+        height, width = latents.shape[2] * vae.upsampling_factor, latents.shape[3] * vae.upsampling_factor
+        log.info(f"WanVideoDecodeStream: {num_frames} frames at {width}x{height} will be decoded while encoding")
+        return (VideoFrameStream(vae, latents, device, offload_device, num_frames, height, width),)
+
 #region VideoEncode
 class WanVideoEncodeLatentBatch:
     @classmethod
@@ -2162,6 +2156,7 @@ class WanVideoEncode:
 
 NODE_CLASS_MAPPINGS = {
     "WanVideoDecode": WanVideoDecode,
+    "WanVideoDecodeStream": WanVideoDecodeStream,
     "WanVideoTextEncode": WanVideoTextEncode,
     "WanVideoTextEncodeSingle": WanVideoTextEncodeSingle,
     "WanVideoClipVisionEncode": WanVideoClipVisionEncode,
@@ -2201,6 +2196,7 @@ NODE_CLASS_MAPPINGS = {
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "WanVideoDecode": "WanVideo Decode",
+    "WanVideoDecodeStream": "WanVideo Decode (Stream)",
     "WanVideoTextEncode": "WanVideo TextEncode",
     "WanVideoTextEncodeSingle": "WanVideo TextEncodeSingle",
     "WanVideoTextImageEncode": "WanVideo TextImageEncode (IP2V)",
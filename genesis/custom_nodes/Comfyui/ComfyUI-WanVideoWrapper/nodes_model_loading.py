@@ -20,13 +20,19 @@ from comfy.utils import load_torch_file, ProgressBar
 import comfy.model_base
 from comfy.sd import load_lora_for_models
 try:
-    from .gguf.gguf import _replace_with_gguf_linear, GGUFParameter
+    from .gguf.gguf import _replace_with_gguf_linear, GGUFParameter, gguf_tensor_to_device
     from gguf import GGMLQuantizationType
 except:
     pass
 
 from .svd_model_loader import SVDModelLoader
 
+try:
+    from genesis.core.quantized_cache import get_quantized_cache
+    QUANTIZED_CACHE_AVAILABLE = True
+except ImportError:
+    QUANTIZED_CACHE_AVAILABLE = False
+
 script_directory = os.path.dirname(os.path.abspath(__file__))
 
 device = mm.get_torch_device()
@@ -283,7 +289,7 @@ class WanVideoBlockSwap:
             "optional": {
                 "use_non_blocking": ("BOOLEAN", {"default": False, "tooltip": "Use non-blocking memory transfer for offloading, reserves more RAM but is faster"}),
                 "vace_blocks_to_swap": ("INT", {"default": 0, "min": 0, "max": 15, "step": 1, "tooltip": "Number of VACE blocks to swap, the VACE model has 15 blocks"}),
-                "prefetch_blocks": ("INT", {"default": 0, "min": 0, "max": 40, "step": 1, "tooltip": "Number of blocks to prefetch ahead, can speed up processing but increases memory usage. 1 is usually enough to offset speed loss from block swapping, use the debug option to confirm it for your system"}),
+                "prefetch_blocks": ("INT", {"default": 0, "min": 0, "max": 40, "step": 1, "tooltip": "Number of blocks to prefetch ahead on a separate copy stream, swapped blocks are pinned in RAM and streamed through reusable GPU buffers. Can speed up processing but increases memory usage. 1 is usually enough to offset speed loss from block swapping, the debug option logs per-block transfer and compute times to confirm it for your system"}),
                 "block_swap_debug": ("BOOLEAN", {"default": False, "tooltip": "Enable debug logging for block swapping"}),
             },
         }
@@ -327,6 +333,8 @@ class WanVideoTorchCompileSettings:
             },
             "optional": {
                 "dynamo_recompile_limit": ("INT", {"default": 128, "min": 0, "max": 1024, "step": 1, "tooltip": "torch._dynamo.config.recompile_limit"}),
+                "seq_len_bucket": ("INT", {"default": 0, "min": 0, "max": 65536, "step": 256, "tooltip": "Pad seq_len up to a multiple of this so nearby resolutions and frame counts reuse one compiled graph, 0 to disable. Only used with flash_attn_2/3, which mask the padding, and rope_function 'default'"}),
+                "persistent_cache": ("BOOLEAN", {"default": False, "tooltip": "Keep the inductor and Triton caches on disk per model, seq_len bucket and torch version, requires the Genesis core"}),
             },
         }
     RETURN_TYPES = ("WANCOMPILEARGS",)
@@ -335,7 +343,7 @@ class WanVideoTorchCompileSettings:
     CATEGORY = "WanVideoWrapper"
     DESCRIPTION = "torch.compile settings, when connected to the model loader, torch.compile of the selected layers is attempted. Requires Triton and torch > 2.7.0 is recommended"
 
-    def set_args(self, backend, fullgraph, mode, dynamic, dynamo_cache_size_limit, compile_transformer_blocks_only, dynamo_recompile_limit=128):
+    def set_args(self, backend, fullgraph, mode, dynamic, dynamo_cache_size_limit, compile_transformer_blocks_only, dynamo_recompile_limit=128, seq_len_bucket=0, persistent_cache=False):
 
         compile_args = {
             "backend": backend,
@@ -345,6 +353,8 @@ class WanVideoTorchCompileSettings:
             "dynamo_cache_size_limit": dynamo_cache_size_limit,
             "dynamo_recompile_limit": dynamo_recompile_limit,
             "compile_transformer_blocks_only": compile_transformer_blocks_only,
+            "seq_len_bucket": seq_len_bucket,
+            "persistent_cache": persistent_cache,
         }
 
         return (compile_args, )
@@ -699,6 +709,7 @@ def load_lora_for_models_mod(model, lora, strength_model):
 class WanVideoSetLoRAs:
     @classmethod
     def INPUT_TYPES(s):
+        from .custom_linear import LORA_MODES
         return {
             "required": 
             {
@@ -706,6 +717,7 @@ class WanVideoSetLoRAs:
             },
             "optional": {
                 "lora": ("WANVIDLORA", ),
+                "lora_mode": (LORA_MODES, {"default": "low_rank", "tooltip": "low_rank: apply the stacked LoRA factors to the activations, no weight-sized deltas. merged_cache: merge into a cached copy of each weight, re-merged only when the strength schedule changes; faster steps but an extra copy of every patched weight in memory"}),
             }
         }
 
@@ -716,11 +728,12 @@ class WanVideoSetLoRAs:
     EXPERIMENTAL = True
     DESCRIPTION = "Sets the LoRA weights to be used directly in linear layers of the model, this does NOT merge LoRAs"
 
-    def setlora(self, model, lora=None):
+    def setlora(self, model, lora=None, lora_mode="low_rank"):
         if lora is None:
             return (model,)
         
         patcher = model.clone()
+        patcher.model_options['transformer_options']["lora_mode"] = lora_mode
         
         merge_loras = False
         for l in lora:
@@ -772,10 +785,54 @@ def rename_fuser_block(name):
             new_name = name.replace(f"face_adapter.fuser_blocks.{fuser_block_num}.", f"blocks.{main_block_num}.fuser_block.")
     return new_name
 
+WEIGHT_PARAMS_TO_KEEP = {"time_in", "patch_embedding", "time_", "modulation", "text_embedding",
+                         "adapter", "add", "ref_conv", "casual_audio_encoder", "cond_encoder", "frame_packer", "audio_proj_glob", "face_encoder", "fuser_block"}
+
+def get_weight_dtype(name, value_dtype, weight_dtype, base_dtype):
+    """Dtype a non-GGUF weight is loaded in, layers matching WEIGHT_PARAMS_TO_KEEP stay in base_dtype"""
+    dtype_to_use = base_dtype if any(keyword in name for keyword in WEIGHT_PARAMS_TO_KEEP) else weight_dtype
+    dtype_to_use = weight_dtype if value_dtype == weight_dtype else dtype_to_use
+    if "modulation" in name or "norm" in name or "bias" in name or "img_emb" in name:
+        dtype_to_use = base_dtype
+    if "patch_embedding" in name or "motion_encoder" in name:
+        dtype_to_use = torch.float32
+    return dtype_to_use
+
+def load_quantized_sd(sd, source_paths, quantization, weight_dtype, base_dtype):
+    """
+    Swap a state dict for its cached quantized artifact, writing the artifact on the first load.
+
+    Weights load_weights would cast to weight_dtype are stored already cast, everything else as is,
+    so later loads memory-map the artifact and skip the conversion. Returns sd unchanged when the
+    cache is unavailable.
+    """
+    if not QUANTIZED_CACHE_AVAILABLE:
+        log.warning("Quantized artifact cache requires the Genesis core, loading without it")
+        return sd
+    cache = get_quantized_cache()
+    try:
+        key = cache.make_key(source_paths, quantization, WEIGHT_PARAMS_TO_KEEP,
+                             extra={"weight_dtype": str(weight_dtype), "base_dtype": str(base_dtype), "keys": sorted(sd.keys())})
+    except OSError as e:
+        log.warning(f"Quantized artifact cache disabled: {e}")
+        return sd
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    dtypes = {}
+    for name, value in sd.items():
+        if isinstance(value, torch.Tensor) and value.is_floating_point():
+            dtype_to_use = get_weight_dtype(name, value.dtype, weight_dtype, base_dtype)
+            if dtype_to_use == weight_dtype:
+                dtypes[name] = weight_dtype
+    log.info(f"Writing quantized artifact for {len(dtypes)} {weight_dtype} weights, later loads will reuse it")
+    cached = cache.put(key, sd, dtypes, metadata={"quantization": quantization, "source": os.path.basename(source_paths[0])})
+    return cached if cached is not None else sd
+
 def load_weights(transformer, sd=None, weight_dtype=None, base_dtype=None, 
                  transformer_load_device=None, block_swap_args=None, gguf=False, reader=None, patcher=None):
-    params_to_keep = {"time_in", "patch_embedding", "time_", "modulation", "text_embedding", 
-                      "adapter", "add", "ref_conv", "casual_audio_encoder", "cond_encoder", "frame_packer", "audio_proj_glob", "face_encoder", "fuser_block"}
     param_count = sum(1 for _ in transformer.named_parameters())
     pbar = ProgressBar(param_count)
     cnt = 0
@@ -821,7 +878,7 @@ def load_weights(transformer, sd=None, weight_dtype=None, base_dtype=None,
                         load_device = offload_device
                         
             is_gguf_quant = tensor.tensor_type not in [GGMLQuantizationType.F32, GGMLQuantizationType.F16]
-            weights = torch.from_numpy(tensor.data.copy()).to(load_device)
+            weights = gguf_tensor_to_device(tensor.data, load_device)
             sd[name] = GGUFParameter(weights, quant_type=tensor.tensor_type) if is_gguf_quant else weights
         sd.update(extra_sd)
         del all_tensors, extra_sd
@@ -861,12 +918,7 @@ def load_weights(transformer, sd=None, weight_dtype=None, base_dtype=None,
         if gguf:
             dtype_to_use = torch.float32 if "patch_embedding" in name or "motion_encoder" in name else base_dtype
         else:
-            dtype_to_use = base_dtype if any(keyword in name for keyword in params_to_keep) else weight_dtype
-            dtype_to_use = weight_dtype if sd[name.replace("_orig_mod.", "")].dtype == weight_dtype else dtype_to_use
-            if "modulation" in name or "norm" in name or "bias" in name or "img_emb" in name:
-                dtype_to_use = base_dtype
-            if "patch_embedding" in name or "motion_encoder" in name:
-                dtype_to_use = torch.float32
+            dtype_to_use = get_weight_dtype(name, sd[name.replace("_orig_mod.", "")].dtype, weight_dtype, base_dtype)
 
         load_device = transformer_load_device
         if block_swap_args is not None:
@@ -1000,6 +1052,7 @@ class WanVideoModelLoader:
                 "multitalk_model": ("MULTITALKMODEL", {"default": None, "tooltip": "Multitalk model"}),
                 "fantasyportrait_model": ("FANTASYPORTRAITMODEL", {"default": None, "tooltip": "FantasyPortrait model"}),
                 "rms_norm_function": (["default", "pytorch"], {"default": "default", "tooltip": "RMSNorm function to use, 'pytorch' is the new native torch RMSNorm, which is faster (when not using torch.compile mostly) but changes results slightly. 'default' is the original WanRMSNorm"}),
+                "cache_quantized": ("BOOLEAN", {"default": False, "tooltip": "Store the fp8 quantized weights on disk the first time this model is loaded with this quantization, later loads memory-map them instead of converting again. Needs free disk space about the size of the quantized model"}),
             }
         }
 
@@ -1010,7 +1063,7 @@ class WanVideoModelLoader:
 
     def loadmodel(self, model, base_precision, load_device,  quantization,
                   compile_args=None, attention_mode="sdpa", block_swap_args=None, lora=None, vram_management_args=None, extra_model=None, vace_model=None,
-                  fantasytalking_model=None, multitalk_model=None, fantasyportrait_model=None, rms_norm_function="default"):
+                  fantasytalking_model=None, multitalk_model=None, fantasyportrait_model=None, rms_norm_function="default", cache_quantized=False):
         assert not (vram_management_args is not None and block_swap_args is not None), "Can't use both block_swap_args and vram_management_args at the same time"
         if vace_model is not None:
             extra_model = vace_model
@@ -1051,7 +1104,8 @@ class WanVideoModelLoader:
                 log.info("Detected SVD compressed model, loading with reconstruction...")
                 sd = SVDModelLoader.load_svd_compressed_model(model_path, device='cuda' if torch.cuda.is_available() else 'cpu')
             else:
-                sd = load_torch_file(model_path, device=transformer_load_device, safe_load=True)
+                # Memory-mapped, load_weights reads each tensor straight to its device and dtype
+                sd = load_torch_file(model_path, device="cpu", safe_load=True)
         else:
             gguf_reader=[]
             from .gguf.gguf import load_gguf
@@ -1165,7 +1219,7 @@ class WanVideoModelLoader:
             else:
                 if extra_model["path"].endswith(".gguf"):
                     raise ValueError("With GGUF extra model the main model must also be GGUF quantized model")
-                extra_sd = load_torch_file(extra_model["path"], device=transformer_load_device, safe_load=True)
+                extra_sd = load_torch_file(extra_model["path"], device="cpu", safe_load=True)
             sd.update(extra_sd)
             del extra_sd
 
@@ -1494,6 +1548,14 @@ class WanVideoModelLoader:
             weight_dtype = torch.float8_e5m2
         else:
             weight_dtype = base_dtype
+
+        if cache_quantized and weight_dtype != base_dtype:
+            if gguf or is_scaled_model or (lora is not None and merge_loras) or fantasytalking_model is not None or fantasyportrait_model is not None:
+                log.warning("cache_quantized only applies to unscaled safetensors models without merged LoRAs or FantasyTalking/FantasyPortrait weights, loading without it")
+            else:
+                source_paths = [model_path] + [p for p in (extra_model["path"] if extra_model is not None else None,
+                                                           multitalk_model["model_path"] if multitalk_model is not None else None) if p is not None]
+                sd = load_quantized_sd(sd, source_paths, quantization, weight_dtype, base_dtype)
         
         params_to_keep = {"norm", "bias", "time_in", "patch_embedding", "time_", "img_emb", "modulation", "text_embedding", "adapter", "add", "ref_conv", "audio_proj"}
 
@@ -1579,16 +1641,12 @@ class WanVideoModelLoader:
                 transformer.patched_linear = True
 
         if "fast" in quantization or quantization == "fp4_scaled_fast":
-            if lora is not None and not merge_loras:
-                raise NotImplementedError("fast quantization modes are not supported with unmerged LoRAs")
             from .fp8_optimization import convert_fp8_linear
             if "fp4" in quantization:
                 log.info("FP4 fast mode: Using FP8 weights with fast matmul + FP4 attention")
                 log.info("Make sure to select 'sageattn_3_fp4' in attention_mode for full FP4 acceleration")
             convert_fp8_linear(transformer, base_dtype, params_to_keep, scale_weight_keys=scale_weights)
         elif "fp4" in quantization:
-            if lora is not None and not merge_loras:
-                raise NotImplementedError("fp4 quantization modes are not supported with unmerged LoRAs")
             from .fp8_optimization import convert_fp4_linear
             if "scaled" in quantization:
                 log.info("FP4 scaled mode: Using scaled FP8 weights + FP4 attention")
@@ -1871,6 +1929,27 @@ class LoadWanVideoT5TextEncoder:
     CATEGORY = "WanVideoWrapper"
     DESCRIPTION = "Loads Wan text_encoder model from 'ComfyUI/models/LLM'"
 
+    @staticmethod
+    def resolve_quantization(model_name, quantization="disabled"):
+        """
+        The quantization loadmodel ends up using for this file without loading it, fp8 checkpoints force fp8_e4m3fn.
+        Only safetensors headers are inspected, other formats return the requested quantization.
+        """
+        if quantization != "disabled":
+            return quantization
+        model_path = folder_paths.get_full_path("text_encoders", model_name)
+        if model_path is None or not model_path.endswith(".safetensors"):
+            return quantization
+        try:
+            from safetensors import safe_open
+            with safe_open(model_path, framework="pt", device="cpu") as f:
+                for k in f.keys():
+                    if f.get_slice(k).get_dtype() == "F8_E4M3":
+                        return "fp8_e4m3fn"
+        except Exception as e:
+            log.warning(f"Could not read T5 header to detect quantization: {e}")
+        return quantization
+
     def loadmodel(self, model_name, precision, load_device="offload_device", quantization="disabled"):
         text_encoder_load_device = device if load_device == "main_device" else offload_device
 
@@ -12,7 +12,7 @@ from .wanvideo.schedulers import get_scheduler, get_sampling_sigmas, retrieve_ti
 from .gguf.gguf import set_lora_params_gguf
 from .multitalk.multitalk import timestep_transform, add_noise
 from .utils import(log, print_memory, apply_lora, clip_encode_image_tiled, fourier_filter, optimized_scale, setup_radial_attention,
-                   compile_model, dict_to_device, tangential_projection, set_module_tensor_to_device, get_raag_guidance, temporal_score_rescaling)
+                   compile_model, compile_bucket, dict_to_device, tangential_projection, set_module_tensor_to_device, get_raag_guidance, temporal_score_rescaling)
 from .cache_methods.cache_methods import cache_report
 from .nodes_model_loading import load_weights
 from .enhance_a_video.globals import set_enhance_weight, set_num_frames
@@ -51,6 +51,12 @@ def offload_transformer(transformer):
     transformer.magcache_state.clear_all()
     transformer.easycache_state.clear_all()
 
+    # Free the block prefetch staging slots, the next forward builds a new prefetcher that also re-pins
+    # weights reloaded after a meta offload
+    if getattr(transformer, "block_prefetcher", None) is not None:
+        transformer.block_prefetcher.release_buffers()
+        transformer.block_prefetcher = None
+
     if transformer.patched_linear:
         for name, param in transformer.named_parameters():
             if "loras" in name or "controlnet" in name:
@@ -166,7 +172,6 @@ class WanVideoSampler:
 
         dtype = model["base_dtype"]
         weight_dtype = model["weight_dtype"]
-        fp8_matmul = model["fp8_matmul"]
         gguf_reader = model["gguf_reader"]
         control_lora = model["control_lora"]
 
@@ -174,7 +179,6 @@ class WanVideoSampler:
         tiled_vae = image_embeds.get("tiled_vae", False)
 
         transformer_options = patcher.model_options.get("transformer_options", None)
-        merge_loras = transformer_options["merge_loras"]
 
         block_swap_args = transformer_options.get("block_swap_args", None)
         if block_swap_args is not None:
@@ -198,13 +202,11 @@ class WanVideoSampler:
 
         if gguf_reader is not None: #handle GGUF
             load_weights(transformer, patcher.model["sd"], base_dtype=dtype, transformer_load_device=device, patcher=patcher, gguf=True, reader=gguf_reader, block_swap_args=block_swap_args)
-            set_lora_params_gguf(transformer, patcher.patches)
+            set_lora_params_gguf(transformer, patcher.patches, lora_mode=transformer_options.get("lora_mode", "low_rank"))
             transformer.patched_linear = True
         elif len(patcher.patches) != 0: #handle patched linear layers (unmerged loras, fp8 scaled)
             log.info(f"Using {len(patcher.patches)} LoRA weight patches for WanVideo model")
-            if not merge_loras and fp8_matmul:
-                raise NotImplementedError("FP8 matmul with unmerged LoRAs is not supported")
-            set_lora_params(transformer, patcher.patches)
+            set_lora_params(transformer, patcher.patches, lora_mode=transformer_options.get("lora_mode", "low_rank"))
         else:
             remove_lora_from_module(transformer) #clear possible unmerged lora weights
 
@@ -703,8 +705,9 @@ class WanVideoSampler:
                     noise[:, place_idx:place_idx + delta, :, :] = noise[:, list_idx, :, :]
 
             log.info(f"Context schedule enabled: {context_frames} frames, {context_stride} stride, {context_overlap} overlap")
-            from .context_windows.context import get_context_scheduler, create_window_mask, WindowTracker
+            from .context_windows.context import get_context_scheduler, create_window_mask, WindowTracker, WindowMaskCache, get_window_batch_size
             self.window_tracker = WindowTracker(verbose=context_options["verbose"])
+            self.window_mask_cache = WindowMaskCache()
             context = get_context_scheduler(context_schedule)
 
         #MTV Crafter
@@ -1048,6 +1051,17 @@ class WanVideoSampler:
             for block in transformer.vace_blocks:
                 block.rope_func = rope_function
 
+        # torch.compile shape bucket, per-token timesteps are sized to the unpadded latent so those models keep the exact length,
+        # comfy RoPE freqs only cover the real F*H*W tokens so only the original RoPE can run on the padded sequence
+        if model["compile_args"] is not None and model["auto_cpu_offload"] is False:
+            compile_args = model["compile_args"]
+            if is_5b or is_pusa:
+                compile_args = {**compile_args, "seq_len_bucket": 0}
+            elif compile_args.get("seq_len_bucket", 0) > 0 and not ("default" in rope_function or bidirectional_sampling):
+                log.warning(f"seq_len_bucket needs rope_function 'default', compiling for the exact seq_len {seq_len}")
+                compile_args = {**compile_args, "seq_len_bucket": 0}
+            seq_len = compile_bucket(transformer, compile_args, model["base_path"], seq_len)
+
         # Lynx
         lynx_ref_buffer = None
         lynx_embeds = image_embeds.get("lynx_embeds", None)
@@ -1121,6 +1135,9 @@ class WanVideoSampler:
             nonlocal transformer
             nonlocal audio_cfg_scale
 
+            # z and image_cond can be lists of context windows that run as one batched forward
+            window_batch = isinstance(z, list)
+
             autocast_enabled = ("fp8" in model["quantization"] and not transformer.patched_linear)
             with torch.autocast(device_type=mm.get_autocast_device(device), dtype=dtype) if autocast_enabled else nullcontext():
 
@@ -1179,6 +1196,8 @@ class WanVideoSampler:
                             torch.flip(image_cond[:4], dims=[1]),
                             torch.flip(image_cond[4:], dims=[1])
                         ]).to(z)
+                    elif window_batch:
+                        image_cond_input = [cond.to(z[0]) for cond in image_cond]
                     else:
                         image_cond_input = image_cond.to(z)
 
@@ -1301,8 +1320,8 @@ class WanVideoSampler:
                     z = torch.cat([z, extra_channel_latents_input])
 
                 base_params = {
-                    'x': [z], # latent
-                    'y': [image_cond_input] if image_cond_input is not None else None, # image cond
+                    'x': z if window_batch else [z], # latent
+                    'y': (image_cond_input if window_batch else [image_cond_input]) if image_cond_input is not None else None, # image cond
                     'clip_fea': clip_fea, # clip features
                     'seq_len': seq_len, # sequence length
                     'device': device, # main device
@@ -1376,7 +1395,7 @@ class WanVideoSampler:
                             vace_data=vace_data, attn_cond=attn_cond,
                             **base_params
                         )
-                        noise_pred_cond = noise_pred_cond[0]
+                        noise_pred_cond = torch.stack(noise_pred_cond) if window_batch else noise_pred_cond[0]
                         noise_pred_ovi = noise_pred_ovi[0] if noise_pred_ovi is not None else None
                         if math.isclose(cfg_scale, 1.0):
                             if use_fresca:
@@ -1398,7 +1417,7 @@ class WanVideoSampler:
                             pred_id=cache_state[1] if cache_state else None,
                             vace_data=vace_data, attn_cond=attn_cond_neg,
                             **base_params)
-                        noise_pred_uncond = noise_pred_uncond[0]
+                        noise_pred_uncond = torch.stack(noise_pred_uncond) if window_batch else noise_pred_uncond[0]
                         noise_pred_ovi_uncond = noise_pred_ovi_uncond[0] if noise_pred_ovi_uncond is not None else None
 
                         # HuMo
@@ -1548,6 +1567,19 @@ class WanVideoSampler:
 
         intermediate_device = device
 
+        # Context windows can share one batched forward when only the latent and image cond differ per window
+        window_bytes = None
+        batch_context_windows = (context_options is not None and context_options.get("window_batch_size", 1) > 1
+            and cache_args is None and not batched_cfg and device.type == "cuda"
+            and not (use_cfg_zero_star or use_tangential or use_fresca or raag_alpha > 0)
+            and text_embeds.get("nag_prompt_embeds", None) is None
+            and all(v is None for v in (clip_fea_neg, control_embeds, control_camera_latents, vace_data, unianim_data, fantasytalking_embeds,
+                fantasy_portrait_input, mtv_input, s2v_audio_input, s2v_pose, add_cond, wananim_face_pixels, wananim_pose_latents, LQ_images,
+                humo_image_cond, humo_audio, multitalk_audio_embeds, extra_channel_latents, recammaster, minimax_latents, controlnet_latents,
+                uni3c_data, phantom_latents, fun_ref_image, ATI_tracks, lynx_embeds, standin_input)))
+        if context_options is not None and context_options.get("window_batch_size", 1) > 1 and not batch_context_windows:
+            log.info("Context window batching is not supported with the current inputs, processing windows one at a time")
+
         # Differential diffusion prep
         masks = None
         if not multitalk_sampling and samples is not None and noise_mask is not None:
@@ -1826,6 +1858,17 @@ class WanVideoSampler:
                             if not all(0 <= idx < max_idx for idx in window_indices):
                                 raise ValueError(f"Invalid context window indices {window_indices} for latent_model_input with shape {latent_model_input.shape}")
 
+                        window_masks = self.window_mask_cache.precompute(context_queue, latent_video_length, context_overlap, looped=is_looped,
+                                                                         window_type=context_options["fuse_method"], device=device, dtype=noise_pred.dtype)
+
+                        # First window of the run is measured alone, after that windows are packed to fit free VRAM
+                        window_batch_size = 1
+                        if batch_context_windows and window_bytes is not None and len(timestep.shape) == 1:
+                            window_batch_size = get_window_batch_size(context_options["window_batch_size"], window_bytes, mm.get_free_memory(device))
+                            if context_options["verbose"]:
+                                log.info(f"Context window batch size: {window_batch_size}")
+                        pending_windows = []
+
                         for i, c in enumerate(context_queue):
                             window_id = self.window_tracker.get_window_id(c)
 
@@ -1969,24 +2012,49 @@ class WanVideoSampler:
                                 partial_timestep = timestep
                             #print("Partial timestep:", partial_timestep)
 
-                            noise_pred_context, _, new_teacache = predict_with_cfg(
-                                partial_latent_model_input,
-                                cfg[idx], positive,
-                                text_embeds["negative_prompt_embeds"],
-                                partial_timestep, idx, partial_img_emb, clip_fea, partial_control_latents, partial_vace_context, partial_unianim_data,partial_audio_proj,
-                                partial_control_camera_latents, partial_add_cond, current_teacache, context_window=c, fantasy_portrait_input=partial_fantasy_portrait_input,
-                                mtv_motion_tokens=partial_mtv_motion_tokens, s2v_audio_input=partial_s2v_audio_input, s2v_motion_frames=[1, 0], s2v_pose=partial_s2v_pose,
-                                humo_image_cond=humo_image_cond, humo_image_cond_neg=humo_image_cond_neg, humo_audio=humo_audio, humo_audio_neg=humo_audio_neg,
-                                wananim_face_pixels=partial_wananim_face_pixels, wananim_pose_latents=partial_wananim_pose_latents, multitalk_audio_embeds=multitalk_audio_embeds,
-                                flashvsr_LQ_latent=partial_flashvsr_LQ_latent)
+                            if window_batch_size > 1:
+                                pending_windows.append((i, c, partial_latent_model_input, partial_img_emb, positive[0]))
+                                next_window = context_queue[i + 1] if i + 1 < len(context_queue) else None
+                                if len(pending_windows) < window_batch_size and next_window is not None and len(next_window) == len(c):
+                                    continue
+                                window_clip_fea = torch.cat([clip_fea] * len(pending_windows)) if clip_fea is not None else None
+                                noise_pred_windows, _, _ = predict_with_cfg(
+                                    [w[2] for w in pending_windows],
+                                    cfg[idx], [w[4] for w in pending_windows],
+                                    text_embeds["negative_prompt_embeds"],
+                                    partial_timestep, idx, [w[3] for w in pending_windows] if image_cond is not None else None, window_clip_fea)
+                                finished_windows = [(w[0], w[1], pred) for w, pred in zip(pending_windows, noise_pred_windows)]
+                                pending_windows = []
+                            else:
+                                measure_window = batch_context_windows and window_bytes is None
+                                if measure_window:
+                                    torch.cuda.reset_peak_memory_stats(device)
+                                    allocated = torch.cuda.memory_allocated(device)
+
+                                noise_pred_context, _, new_teacache = predict_with_cfg(
+                                    partial_latent_model_input,
+                                    cfg[idx], positive,
+                                    text_embeds["negative_prompt_embeds"],
+                                    partial_timestep, idx, partial_img_emb, clip_fea, partial_control_latents, partial_vace_context, partial_unianim_data,partial_audio_proj,
+                                    partial_control_camera_latents, partial_add_cond, current_teacache, context_window=c, fantasy_portrait_input=partial_fantasy_portrait_input,
+                                    mtv_motion_tokens=partial_mtv_motion_tokens, s2v_audio_input=partial_s2v_audio_input, s2v_motion_frames=[1, 0], s2v_pose=partial_s2v_pose,
+                                    humo_image_cond=humo_image_cond, humo_image_cond_neg=humo_image_cond_neg, humo_audio=humo_audio, humo_audio_neg=humo_audio_neg,
+                                    wananim_face_pixels=partial_wananim_face_pixels, wananim_pose_latents=partial_wananim_pose_latents, multitalk_audio_embeds=multitalk_audio_embeds,
+                                    flashvsr_LQ_latent=partial_flashvsr_LQ_latent)
 
-                            if cache_args is not None:
-                                self.window_tracker.cache_states[window_id] = new_teacache
+                                if measure_window:
+                                    window_bytes = torch.cuda.max_memory_allocated(device) - allocated
+                                    log.info(f"Context window activation memory: {window_bytes / 1024**3:.2f} GB")
+
+                                if cache_args is not None:
+                                    self.window_tracker.cache_states[window_id] = new_teacache
+                                finished_windows = [(i, c, noise_pred_context)]
 
-                            window_mask = create_window_mask(noise_pred_context, c, latent_video_length, context_overlap, looped=is_looped, window_type=context_options["fuse_method"])
-                            noise_pred[:, c] += noise_pred_context * window_mask
-                            counter[:, c] += window_mask
-                            context_pbar.update_absolute(step_start_progress + (i + 1) * fraction_per_context, len(timesteps))
+                            for window_index, window, noise_pred_window in finished_windows:
+                                window_mask = window_masks[window_index]
+                                noise_pred[:, window] += noise_pred_window * window_mask
+                                counter[:, window] += window_mask
+                                context_pbar.update_absolute(step_start_progress + (window_index + 1) * fraction_per_context, len(timesteps))
                         noise_pred /= counter
                     #region multitalk
                     elif multitalk_sampling:
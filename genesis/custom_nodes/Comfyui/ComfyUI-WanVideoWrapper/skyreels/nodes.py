@@ -150,12 +150,10 @@ class WanVideoDiffusionForcingSampler:
 
         dtype = model["base_dtype"]
         weight_dtype = model["weight_dtype"]
-        fp8_matmul = model["fp8_matmul"]
         gguf_reader = model["gguf_reader"]
         control_lora = model["control_lora"]
 
         transformer_options = patcher.model_options.get("transformer_options", None)
-        merge_loras = transformer_options["merge_loras"]
 
         block_swap_args = transformer_options.get("block_swap_args", None)
         if block_swap_args is not None:
@@ -179,13 +177,11 @@ class WanVideoDiffusionForcingSampler:
 
         if gguf_reader is not None: #handle GGUF
             load_weights(transformer, patcher.model["sd"], base_dtype=dtype, transformer_load_device=device, patcher=patcher, gguf=True, reader=gguf_reader, block_swap_args=block_swap_args)
-            set_lora_params_gguf(transformer, patcher.patches)
+            set_lora_params_gguf(transformer, patcher.patches, lora_mode=transformer_options.get("lora_mode", "low_rank"))
             transformer.patched_linear = True
         elif len(patcher.patches) != 0: #handle patched linear layers (unmerged loras, fp8 scaled)
             log.info(f"Using {len(patcher.patches)} LoRA weight patches for WanVideo model")
-            if not merge_loras and fp8_matmul:
-                raise NotImplementedError("FP8 matmul with unmerged LoRAs is not supported")
-            set_lora_params(transformer, patcher.patches)
+            set_lora_params(transformer, patcher.patches, lora_mode=transformer_options.get("lora_mode", "low_rank"))
         else:
             remove_lora_from_module(transformer) #clear possible unmerged lora weights
 
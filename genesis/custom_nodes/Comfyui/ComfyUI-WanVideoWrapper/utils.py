@@ -15,6 +15,12 @@ import folder_paths
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
+try:
+    from genesis.core.compile_cache import get_compile_cache, bucket_seq_len
+    COMPILE_CACHE_AVAILABLE = True
+except ImportError:
+    COMPILE_CACHE_AVAILABLE = False
+
 def check_device_same(first_device, second_device):
     if first_device.type != second_device.type:
         return False
@@ -69,9 +75,9 @@ def set_module_tensor_to_device(module, tensor_name, device, value=None, dtype=N
 
     if value is not None:
         if dtype is None:
-            value = value.to(old_value.dtype)
-        elif not str(value.dtype).startswith(("torch.uint", "torch.int", "torch.bool")):
-            value = value.to(dtype)
+            dtype = old_value.dtype
+        elif str(value.dtype).startswith(("torch.uint", "torch.int", "torch.bool")):
+            dtype = value.dtype
 
     device_quantization = None
     with torch.no_grad():
@@ -84,7 +90,8 @@ def set_module_tensor_to_device(module, tensor_name, device, value=None, dtype=N
                 if not is_buffer:
                     module._parameters[tensor_name] = param_cls(new_value, requires_grad=old_value.requires_grad)
         elif isinstance(value, torch.Tensor):
-            new_value = value.to(device)
+            # Cast and move in one copy, a memory-mapped value is read straight into the target device
+            new_value = value.to(device=device, dtype=dtype)
         else:
             new_value = torch.tensor(value, device=device)
         if device_quantization is not None:
@@ -522,6 +529,35 @@ def compile_model(transformer, compile_args=None):
         transformer = torch.compile(transformer, fullgraph=compile_args["fullgraph"], dynamic=compile_args["dynamic"], backend=compile_args["backend"], mode=compile_args["mode"])
     return transformer
 
+# Attention modes that ignore keys past k_lens, padded tokens don't change their output
+MASKED_ATTENTION_MODES = ("flash_attn_2", "flash_attn_3")
+
+def compile_bucket(transformer, compile_args, model_path, seq_len):
+    """
+    Pads seq_len up to its compile shape bucket, so nearby resolutions and frame counts reuse one compiled graph,
+    and points the inductor/triton caches at the on-disk cache of that model + bucket + torch version.
+    Returns the (possibly padded) seq_len.
+    """
+    if compile_args is None:
+        return seq_len
+    bucket = seq_len
+    bucket_size = compile_args.get("seq_len_bucket", 0)
+    if bucket_size > 0:
+        if transformer.attention_mode in MASKED_ATTENTION_MODES and COMPILE_CACHE_AVAILABLE:
+            bucket = bucket_seq_len(seq_len, bucket_size)
+        else:
+            log.warning(f"seq_len_bucket needs the Genesis core and attention_mode {' or '.join(MASKED_ATTENTION_MODES)}, compiling for the exact seq_len {seq_len}")
+    if compile_args.get("persistent_cache", False):
+        if COMPILE_CACHE_AVAILABLE:
+            cache = get_compile_cache()
+            cache_dir = cache.activate(cache.make_key(model_path, compile_args), bucket, model_id=model_path)
+            log.info(f"Compile cache: {cache_dir}")
+        else:
+            log.warning("persistent_cache requires the Genesis core, compile caches stay in the default location")
+    if bucket != seq_len:
+        log.info(f"Padding seq_len {seq_len} to compile bucket {bucket}")
+    return bucket
+
 #https://5410tiffany.github.io/tcfg.github.io/
 def tangential_projection(pred_cond: torch.Tensor, pred_uncond: torch.Tensor) -> torch.Tensor:
     cond_dtype = pred_cond.dtype
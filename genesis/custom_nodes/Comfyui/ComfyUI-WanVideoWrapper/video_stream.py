@@ -0,0 +1,87 @@
+import queue
+import threading
+
+import torch
+
+from .utils import log
+
+
+def to_uint8_frames(images):
+    """[3, T, H, W] decoder output in -1..1 to [T, H, W, 3] uint8, rounded the same way as VideoCombine"""
+    images = images.clamp(-1.0, 1.0).add_(1.0).mul_(127.5).add_(0.5)
+    return images.clamp_(0, 255).to(torch.uint8).permute(1, 2, 3, 0)
+
+
+class VideoFrameStream:
+    """
+    Lazily decoded video for a video encoder.
+
+    Iterating runs the causal VAE decode one latent frame at a time on a background thread, converts
+    each chunk to uint8 on the GPU and yields [H, W, 3] uint8 numpy frames, so only a few frames are
+    ever held in host memory and encoding overlaps decoding. Only the latent is kept, every iteration
+    decodes it again from the start.
+    """
+    is_frame_stream = True
+
+    def __init__(self, vae, latent, device, offload_device, num_frames, height, width, max_queued_chunks=2):
+        self.vae = vae
+        self.latent = latent
+        self.device = device
+        self.offload_device = offload_device
+        self.num_frames = num_frames
+        self.height = height
+        self.width = width
+        self.max_queued_chunks = max_queued_chunks
+
+    def __len__(self):
+        return self.num_frames
+
+    @property
+    def shape(self):
+        return (self.num_frames, self.height, self.width, 3)
+
+    @staticmethod
+    def _put(chunks, stop, item):
+        # Blocks while the encoder is behind, gives up once the consumer has stopped
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _decode(self, chunks, stop):
+        try:
+            self.vae.to(self.device)
+            with torch.inference_mode():
+                for chunk in self.vae.stream_decode(self.latent, self.device):
+                    if not self._put(chunks, stop, to_uint8_frames(chunk).cpu().numpy()):
+                        return
+            self._put(chunks, stop, None)
+        except BaseException as e:
+            self._put(chunks, stop, e)
+        finally:
+            self.vae.to(self.offload_device)
+
+    def __iter__(self):
+        chunks = queue.Queue(maxsize=self.max_queued_chunks)
+        stop = threading.Event()
+        worker = threading.Thread(target=self._decode, args=(chunks, stop), daemon=True, name="WanVideoStreamDecode")
+        worker.start()
+
+        count = 0
+        try:
+            while True:
+                frames = chunks.get()
+                if frames is None:
+                    break
+                if isinstance(frames, BaseException):
+                    raise frames
+                for frame in frames:
+                    count += 1
+                    yield frame
+        finally:
+            stop.set()
+            worker.join()
+            log.info(f"Streamed {count} decoded frames")
@@ -0,0 +1,257 @@
+import torch
+
+from ...utils import log
+
+ALIGNMENT = 256
+# Average wait per block below this counts as hidden (event timing resolution is ~0.5us)
+STALL_THRESHOLD_MS = 0.05
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class BlockPrefetcher:
+    """
+    Streams swapped transformer blocks into a ring of reusable GPU staging buffers.
+
+    The offloaded weights stay in pinned CPU memory for the whole run. Loading a block copies its
+    parameters and buffers into a staging slot on a dedicated copy stream and points the module
+    tensors at views of that slot, offloading just points them back at the CPU copies, so no
+    device to host copies or per-block allocations happen during sampling. Block i + k is copied
+    while block i computes, ordering between the two streams is done with events only.
+
+    Blocks holding tensor subclasses (GGUF) can't be viewed into a flat buffer and fall back to
+    module.to() on the copy stream.
+    """
+    def __init__(self, blocks, swap_start_idx, prefetch_blocks, device, pin_memory=True):
+        self.blocks = blocks
+        self.swap_start_idx = swap_start_idx
+        self.prefetch_blocks = max(1, prefetch_blocks)
+        self.device = device
+        self.copy_stream = torch.cuda.Stream(device=device)
+        self.layouts = {}
+        self.fallback = set()
+
+        slot_bytes = 0
+        for b in range(swap_start_idx, len(blocks)):
+            layout, nbytes = self._layout(blocks[b])
+            if layout is None:
+                self.fallback.add(b)
+                continue
+            if pin_memory:
+                self._pin(layout)
+            self.layouts[b] = layout
+            slot_bytes = max(slot_bytes, nbytes)
+
+        # One slot per block in flight: the computing block plus the prefetched ones
+        num_slots = min(self.prefetch_blocks + 1, max(1, len(self.layouts)))
+        self.slots = [torch.empty(slot_bytes, dtype=torch.uint8, device=device) for _ in range(num_slots)] if self.layouts else []
+        self.slot_free = [None] * len(self.slots)
+        # Slots not held by a loaded block, a slot is only reused after its block was released
+        self.free_slots = list(range(len(self.slots)))
+        self.loaded = {}
+
+        self.timings = {}
+        self.pending_timings = []
+
+        log.info(f"Block prefetch: {len(self.layouts)} blocks staged through {len(self.slots)} x {slot_bytes / 1024**2:.2f}MB GPU buffers, "
+                 f"{len(self.fallback)} using module.to(), prefetching {self.prefetch_blocks} ahead")
+
+    @staticmethod
+    def _layout(block):
+        layout = []
+        offset = 0
+        for module in block.modules():
+            for kind, tensors in (("param", module._parameters), ("buffer", module._buffers)):
+                for name, tensor in tensors.items():
+                    if tensor is None:
+                        continue
+                    data = tensor.data if kind == "param" else tensor
+                    if type(data) is not torch.Tensor:
+                        return None, 0
+                    nbytes = data.numel() * data.element_size()
+                    layout.append((module, kind, name, offset, nbytes, data.dtype, data.shape))
+                    offset = _align(offset + nbytes)
+        return layout, offset
+
+    @staticmethod
+    def _get(module, kind, name):
+        return module._parameters[name].data if kind == "param" else module._buffers[name]
+
+    @staticmethod
+    def _set(module, kind, name, tensor):
+        if kind == "param":
+            module._parameters[name].data = tensor
+        else:
+            module._buffers[name] = tensor
+
+    def _pin(self, layout):
+        try:
+            for module, kind, name, *_ in layout:
+                tensor = self._get(module, kind, name)
+                if tensor.device.type == "cpu" and not tensor.is_pinned():
+                    self._set(module, kind, name, tensor.pin_memory())
+        except RuntimeError as e:
+            log.warning(f"Block prefetch: could not pin offloaded weights ({e}), transfers will be slower")
+
+    def matches(self, blocks, swap_start_idx, prefetch_blocks, device):
+        return self.blocks is blocks and self.swap_start_idx == swap_start_idx and self.prefetch_blocks == max(1, prefetch_blocks) and self.device == device
+
+    def begin(self):
+        self._collect_timings()
+
+    def prefetch(self, b):
+        """Queue the copies for blocks b .. b + prefetch_blocks that are not loaded yet"""
+        for idx in range(b, min(b + self.prefetch_blocks + 1, len(self.blocks))):
+            if idx >= self.swap_start_idx and idx not in self.loaded:
+                if not self._load(idx):
+                    break
+
+    def _load(self, b):
+        """Queue the copy of block b, returns False if no staging slot is free"""
+        layout = self.layouts.get(b)
+        if layout is not None and not self.free_slots:
+            return False
+        start = torch.cuda.Event(enable_timing=True)
+        ready = torch.cuda.Event(enable_timing=True)
+
+        if layout is None:
+            with torch.cuda.stream(self.copy_stream):
+                start.record(self.copy_stream)
+                self.blocks[b].to(self.device, non_blocking=True)
+                ready.record(self.copy_stream)
+            self.loaded[b] = (None, None, start, ready)
+            return True
+
+        slot_idx = self.free_slots.pop(0)
+        with torch.cuda.stream(self.copy_stream):
+            # The slot is free once the compute stream is done with the block that used it last
+            if self.slot_free[slot_idx] is not None:
+                self.copy_stream.wait_event(self.slot_free[slot_idx])
+            start.record(self.copy_stream)
+            slot = self.slots[slot_idx]
+            originals = []
+            for module, kind, name, offset, nbytes, dtype, shape in layout:
+                src = self._get(module, kind, name)
+                if src.dtype != dtype or src.shape != shape:
+                    # Weights were replaced since the layout was built, copy this one separately
+                    dst = src.to(self.device, non_blocking=True)
+                else:
+                    dst = slot[offset:offset + nbytes].view(dtype).view(shape)
+                    dst.copy_(src, non_blocking=True)
+                originals.append((src, dst))
+            ready.record(self.copy_stream)
+        self.loaded[b] = (slot_idx, originals, start, ready)
+        return True
+
+    def acquire(self, b):
+        """Make block b usable on the compute stream, returns the (needed, compute start) events"""
+        if b not in self.loaded and not self._load(b):
+            # Every slot is held, by blocks prefetched out of order or left loaded by an interrupted pass
+            if not self._reclaim_slot(b) or not self._load(b):
+                raise RuntimeError(f"Block prefetch: no staging slot free for block {b} ({len(self.slots)} slots, loaded blocks {sorted(self.loaded)})")
+        slot_idx, originals, start, ready = self.loaded[b]
+        compute_stream = torch.cuda.current_stream(self.device)
+        # Recorded before the wait: when the compute stream reached the block, ready after this means it stalled
+        needed = torch.cuda.Event(enable_timing=True)
+        needed.record(compute_stream)
+        compute_stream.wait_event(ready)
+        if originals is not None:
+            for (module, kind, name, offset, nbytes, dtype, shape), (src, dst) in zip(self.layouts[b], originals):
+                if src.dtype != dtype or src.shape != shape:
+                    dst.record_stream(compute_stream)
+                self._set(module, kind, name, dst)
+        compute_start = torch.cuda.Event(enable_timing=True)
+        compute_start.record(compute_stream)
+        return needed, compute_start
+
+    def _reclaim_slot(self, b):
+        """Free the staging slot of the oldest other loaded block, returns False if there is none"""
+        for other, (slot_idx, originals, start, ready) in self.loaded.items():
+            if other == b or originals is None:
+                continue
+            del self.loaded[other]
+            for (module, kind, name, *_), (src, dst) in zip(self.layouts[other], originals):
+                self._set(module, kind, name, src)
+            # Work already queued on the compute stream may still read the slot
+            slot_free = torch.cuda.Event()
+            slot_free.record(torch.cuda.current_stream(self.device))
+            self.slot_free[slot_idx] = slot_free
+            self.free_slots.append(slot_idx)
+            log.warning(f"Block prefetch: reclaimed the staging slot of block {other} for block {b}")
+            return True
+        return False
+
+    def release(self, b, events, offload_device):
+        """Point block b back at its offloaded weights once its compute is queued"""
+        slot_idx, originals, start, ready = self.loaded.pop(b)
+        needed, compute_start = events
+        compute_stream = torch.cuda.current_stream(self.device)
+        compute_end = torch.cuda.Event(enable_timing=True)
+        compute_end.record(compute_stream)
+        if originals is None:
+            self.blocks[b].to(offload_device)
+        else:
+            for (module, kind, name, *_), (src, dst) in zip(self.layouts[b], originals):
+                self._set(module, kind, name, src)
+            self.slot_free[slot_idx] = compute_end
+            self.free_slots.append(slot_idx)
+        self.pending_timings.append((b, start, ready, needed, compute_start, compute_end))
+
+    def _collect_timings(self, wait=False):
+        remaining = []
+        for timing in self.pending_timings:
+            b, start, ready, needed, compute_start, compute_end = timing
+            if wait:
+                compute_end.synchronize()
+            elif not compute_end.query():
+                remaining.append(timing)
+                continue
+            stats = self.timings.setdefault(b, {"transfer_ms": 0.0, "compute_ms": 0.0, "stall_ms": 0.0, "count": 0})
+            stats["transfer_ms"] += start.elapsed_time(ready)
+            stats["compute_ms"] += compute_start.elapsed_time(compute_end)
+            # Positive when the copy finished after the compute stream reached the block
+            stats["stall_ms"] += max(0.0, needed.elapsed_time(ready))
+            stats["count"] += 1
+        self.pending_timings = remaining
+
+    def get_timings(self, wait=True):
+        """Average per-block transfer and compute times in ms"""
+        self._collect_timings(wait=wait)
+        return {
+            b: {
+                "transfer_ms": s["transfer_ms"] / s["count"],
+                "compute_ms": s["compute_ms"] / s["count"],
+                "stall_ms": s["stall_ms"] / s["count"],
+                "stalled": s["stall_ms"] / s["count"] > STALL_THRESHOLD_MS,
+            }
+            for b, s in sorted(self.timings.items()) if s["count"]
+        }
+
+    def log_timings(self):
+        timings = self.get_timings()
+        if not timings:
+            return
+        for b, t in timings.items():
+            stalled_msg = f" (stalled {t['stall_ms']:.2f}ms)" if t["stalled"] else ""
+            log.info(f"Block {b}: transfer_time={t['transfer_ms']:.2f}ms, compute_time={t['compute_ms']:.2f}ms{stalled_msg}")
+        transfer = sum(t["transfer_ms"] for t in timings.values())
+        compute = sum(t["compute_ms"] for t in timings.values())
+        stalled = sum(t["stalled"] for t in timings.values())
+        log.info(f"Swapped blocks: transfer {transfer:.1f}ms vs compute {compute:.1f}ms per pass, {stalled}/{len(timings)} blocks waited on transfer")
+        if stalled == 0 and transfer < compute:
+            log.info("Transfers are fully hidden behind compute, blocks_to_swap can be increased to save VRAM")
+        elif stalled:
+            log.info("Compute is waiting on transfers, increase prefetch_blocks or lower blocks_to_swap")
+
+    def release_buffers(self):
+        self._collect_timings(wait=True)
+        for b in list(self.loaded):
+            slot_idx, originals, *_ = self.loaded.pop(b)
+            if originals is not None:
+                for (module, kind, name, *_), (src, dst) in zip(self.layouts[b], originals):
+                    self._set(module, kind, name, src)
+        self.slots = []
+        self.slot_free = []
+        self.free_slots = []
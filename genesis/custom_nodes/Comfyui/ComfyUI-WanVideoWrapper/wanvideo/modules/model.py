@@ -13,6 +13,7 @@ except:
     pass
 
 from .attention import attention
+from .block_prefetch import BlockPrefetcher
 import numpy as np
 from tqdm import tqdm
 import gc
@@ -1709,6 +1710,8 @@ class WanModel(torch.nn.Module):
         self.easycache_end_step = -1
         self.easycache_state = EasyCacheState(cache_device=self.cache_device)
 
+        self.cache_telemetry = None
+
         self.slg_blocks = None
         self.slg_start_percent = 0.0
         self.slg_end_percent = 1.0
@@ -1716,6 +1719,7 @@ class WanModel(torch.nn.Module):
         self.use_non_blocking = False
         self.prefetch_blocks = 0
         self.block_swap_debug = False
+        self.block_prefetcher = None
 
         self.video_attention_split_steps = []
         self.lora_scheduling_enabled = False
@@ -1904,6 +1908,9 @@ class WanModel(torch.nn.Module):
         
         log.info(f"Swapping {blocks_to_swap} transformer blocks")
         self.blocks_to_swap = blocks_to_swap
+        if self.block_prefetcher is not None:
+            self.block_prefetcher.release_buffers()
+            self.block_prefetcher = None
         self.prefetch_blocks = prefetch_blocks
         self.block_swap_debug = block_swap_debug
         
@@ -2236,6 +2243,12 @@ class WanModel(torch.nn.Module):
         # params
         device = self.main_device
 
+        # Start copying spilled cache residuals back while the embeddings are computed
+        if pred_id is not None:
+            for cache_enabled, cache_state in ((self.enable_teacache, self.teacache_state), (self.enable_magcache, self.magcache_state), (self.enable_easycache, self.easycache_state)):
+                if cache_enabled:
+                    cache_state.prefetch(pred_id)
+
         if freqs is not None and freqs.device != device:
            freqs = freqs.to(device)
 
@@ -2575,8 +2588,13 @@ class WanModel(torch.nn.Module):
                 humo_audio_input = torch.nn.functional.pad(humo_audio_input, (0, 0, 0, pad_len))
 
         should_calc = True
+        # Cache decision telemetry
+        cache_active = False
+        cache_metric = cache_accumulated = cache_residual = None
+        cache_step_start = time.perf_counter() if self.cache_telemetry is not None else None
         #TeaCache
         if self.enable_teacache and self.teacache_start_step <= current_step <= self.teacache_end_step:
+            cache_active = True
             accumulated_rel_l1_distance = torch.tensor(0.0, dtype=torch.float32, device=device)
             if pred_id is None:
                 pred_id = self.teacache_state.new_prediction(cache_device=self.cache_device)
@@ -2584,22 +2602,21 @@ class WanModel(torch.nn.Module):
             else:
                 previous_modulated_input = self.teacache_state.get(pred_id)['previous_modulated_input']
                 previous_modulated_input = previous_modulated_input.to(device)
-                previous_residual = self.teacache_state.get(pred_id)['previous_residual']
                 accumulated_rel_l1_distance = self.teacache_state.get(pred_id)['accumulated_rel_l1_distance']
 
                 if self.teacache_use_coefficients:
                     rescale_func = np.poly1d(self.teacache_coefficients[self.teacache_mode])
                     temb = e if self.teacache_mode == 'e' else e0
-                    accumulated_rel_l1_distance += rescale_func((
+                    cache_metric = rescale_func((
                         (temb.to(device) - previous_modulated_input).abs().mean() / previous_modulated_input.abs().mean()
                         ).cpu().item())
+                    accumulated_rel_l1_distance += cache_metric
                     del temb
                 else:
-                    temb_relative_l1 = relative_l1_distance(previous_modulated_input, e0)
-                    accumulated_rel_l1_distance = accumulated_rel_l1_distance.to(e0.device) + temb_relative_l1
-                    del temb_relative_l1
-
+                    cache_metric = relative_l1_distance(previous_modulated_input, e0)
+                    accumulated_rel_l1_distance = accumulated_rel_l1_distance.to(e0.device) + cache_metric
 
+                cache_accumulated = accumulated_rel_l1_distance
                 if accumulated_rel_l1_distance < self.rel_l1_thresh:
                     should_calc = False
                 else:
@@ -2610,6 +2627,7 @@ class WanModel(torch.nn.Module):
             previous_modulated_input = e.to(self.cache_device).clone() if (self.teacache_use_coefficients and self.teacache_mode == 'e') else e0.to(self.cache_device).clone()
            
             if not should_calc:
+                previous_residual = self.teacache_state.get(pred_id)['previous_residual']
                 x = x.to(previous_residual.dtype) + previous_residual.to(x.device)
                 self.teacache_state.update(
                     pred_id,
@@ -2619,6 +2637,7 @@ class WanModel(torch.nn.Module):
 
         # MagCache
         if self.enable_magcache and self.magcache_start_step <= current_step <= self.magcache_end_step:
+            cache_active = True
             if pred_id is None:
                 pred_id = self.magcache_state.new_prediction(cache_device=self.cache_device)
                 should_calc = True
@@ -2633,6 +2652,7 @@ class WanModel(torch.nn.Module):
                 accumulated_ratio *= cur_mag_ratio
                 accumulated_err += np.abs(1-accumulated_ratio)
                 accumulated_steps += 1
+                cache_metric, cache_accumulated = cur_mag_ratio, accumulated_err
 
                 self.magcache_state.update(
                     pred_id,
@@ -2656,6 +2676,7 @@ class WanModel(torch.nn.Module):
 
         # EasyCache
         if self.enable_easycache and self.easycache_start_step <= current_step <= self.easycache_end_step:
+            cache_active = True
             if pred_id is None:
                 pred_id = self.easycache_state.new_prediction(cache_device=self.cache_device)
                 should_calc = True
@@ -2678,6 +2699,7 @@ class WanModel(torch.nn.Module):
                     combined_pred_change = (raw_input_change / output_norm) * k
 
                     accumulated_error += combined_pred_change
+                    cache_metric, cache_accumulated = combined_pred_change, accumulated_error
 
                     # Predict output change
                     if accumulated_error < self.easycache_thresh:
@@ -2797,6 +2819,16 @@ class WanModel(torch.nn.Module):
                 events = None
                 swap_start_idx = len(self.blocks)
 
+            # Prefetch engine: pinned offloaded weights, copy stream and reusable GPU staging buffers
+            prefetcher = None
+            if self.prefetch_blocks > 0 and self.blocks_to_swap > 0 and torch.cuda.is_available() and torch.device(self.main_device).type == "cuda":
+                if self.block_prefetcher is None or not self.block_prefetcher.matches(self.blocks, swap_start_idx, self.prefetch_blocks, self.main_device):
+                    if self.block_prefetcher is not None:
+                        self.block_prefetcher.release_buffers()
+                    self.block_prefetcher = BlockPrefetcher(self.blocks, swap_start_idx, self.prefetch_blocks, self.main_device)
+                prefetcher = self.block_prefetcher
+                prefetcher.begin()
+
             # lynx ref
             if lynx_ref_buffer is None and lynx_ref_feature_extractor:
                 lynx_ref_buffer = {}
@@ -2812,7 +2844,9 @@ class WanModel(torch.nn.Module):
                 if flashvsr_LQ_latent is not None and b < len(flashvsr_LQ_latent):
                     x += flashvsr_LQ_latent[b].to(x) * flashvsr_strength
                 # Prefetch blocks if enabled
-                if self.prefetch_blocks > 0:
+                if prefetcher is not None:
+                    prefetcher.prefetch(b)
+                elif self.prefetch_blocks > 0:
                     for prefetch_offset in range(1, self.prefetch_blocks + 1):
                         prefetch_idx = b + prefetch_offset
                         if prefetch_idx < len(self.blocks) and self.blocks_to_swap > 0 and prefetch_idx >= swap_start_idx:
@@ -2821,15 +2855,17 @@ class WanModel(torch.nn.Module):
                                 self.blocks[prefetch_idx].to(self.main_device, non_blocking=self.use_non_blocking)
                                 if events is not None:
                                     events[prefetch_idx].record(cuda_stream)
-                if self.block_swap_debug:
+                if self.block_swap_debug and prefetcher is None:
                     transfer_start = time.perf_counter()
                 # Wait for block to be ready
-                if b >= swap_start_idx and self.blocks_to_swap > 0:
+                if prefetcher is not None and b >= swap_start_idx:
+                    block_events = prefetcher.acquire(b)
+                elif b >= swap_start_idx and self.blocks_to_swap > 0:
                     if self.prefetch_blocks > 0 and events is not None:
                         if not events[b].query():
                             events[b].synchronize()
                     block.to(self.main_device)
-                if self.block_swap_debug:
+                if self.block_swap_debug and prefetcher is None:
                     transfer_end = time.perf_counter()
                     transfer_time = transfer_end - transfer_start
                     compute_start = time.perf_counter()
@@ -2837,19 +2873,23 @@ class WanModel(torch.nn.Module):
                 if self.slg_blocks is not None:
                     if b in self.slg_blocks and is_uncond:
                         if self.slg_start_percent <= current_step_percentage <= self.slg_end_percent:
+                            if prefetcher is not None and b >= swap_start_idx:
+                                prefetcher.release(b, block_events, self.offload_device)
                             continue
                 x, x_ip, lynx_ref_feature, x_ovi = block(x, x_ip=x_ip, lynx_ref_feature=lynx_ref_feature, x_ovi=x_ovi, **kwargs) #run block
                 if self.audio_injector is not None and s2v_audio_input is not None:
                     x = self.audio_injector_forward(b, x, merged_audio_emb, scale=s2v_audio_scale) #s2v
                 if block.has_face_fuser_block and motion_vec is not None:
                     x = self.wananimate_forward(block, x, motion_vec, strength=wananim_face_strength)
-                if self.block_swap_debug:
+                if self.block_swap_debug and prefetcher is None:
                     compute_end = time.perf_counter()
                     compute_time = compute_end - compute_start
                     to_cpu_transfer_start = time.perf_counter()
-                if b >= swap_start_idx and self.blocks_to_swap > 0:
+                if prefetcher is not None and b >= swap_start_idx:
+                    prefetcher.release(b, block_events, self.offload_device)
+                elif b >= swap_start_idx and self.blocks_to_swap > 0:
                     block.to(self.offload_device, non_blocking=self.use_non_blocking)
-                if self.block_swap_debug:
+                if self.block_swap_debug and prefetcher is None:
                     to_cpu_transfer_end = time.perf_counter()
                     to_cpu_transfer_time = to_cpu_transfer_end - to_cpu_transfer_start
                     log.info(f"Block {b}: transfer_time={transfer_time:.4f}s, compute_time={compute_time:.4f}s, to_cpu_transfer_time={to_cpu_transfer_time:.4f}s")
@@ -2865,30 +2905,36 @@ class WanModel(torch.nn.Module):
                 if (controlnet is not None) and (b % controlnet["controlnet_stride"] == 0) and (b // controlnet["controlnet_stride"] < len(controlnet["controlnet_states"])):
                     x[:, :self.original_seq_len] += controlnet["controlnet_states"][b // controlnet["controlnet_stride"]].to(x) * controlnet["controlnet_weight"]
 
+            if prefetcher is not None and self.block_swap_debug:
+                prefetcher.log_timings()
+
             if lynx_ref_feature_extractor:
                 return lynx_ref_buffer
 
             if self.enable_teacache and (self.teacache_start_step <= current_step <= self.teacache_end_step) and pred_id is not None:
+                cache_residual = x.to(original_x.device) - original_x
                 self.teacache_state.update(
                     pred_id,
-                    previous_residual=(x.to(original_x.device) - original_x),
+                    previous_residual=cache_residual,
                     accumulated_rel_l1_distance=accumulated_rel_l1_distance,
                     previous_modulated_input=previous_modulated_input
                 )
             elif self.enable_magcache and (self.magcache_start_step <= current_step <= self.magcache_end_step) and pred_id is not None:
+                cache_residual = x.to(original_x.device) - original_x
                 self.magcache_state.update(
                     pred_id,
-                    residual_cache=(x.to(original_x.device) - original_x)
+                    residual_cache=cache_residual
                 )
             elif self.enable_easycache and (self.easycache_start_step <= current_step <= self.easycache_end_step) and pred_id is not None:
                 x_out = x.clone().to(original_x.device)
                 output_change = (x_out - original_x).abs().mean()
                 input_change = (original_x - x_out).abs().mean()
+                cache_residual = x.to(original_x.device) - original_x
                 self.easycache_state.update(
                     pred_id,
                     previous_raw_input=original_x,
                     previous_raw_output=x_out,
-                    cache=x.to(original_x.device) - original_x,
+                    cache=cache_residual,
                     k = output_change / input_change,
                     accumulated_error = 0.0,
                     cache_ovi = x_ovi.clone().to(original_x.device) - original_x_ovi if x_ovi is not None else None
@@ -2901,6 +2947,14 @@ class WanModel(torch.nn.Module):
                 pred_id,
                 previous_raw_output=x.clone(),
             )
+
+        if cache_step_start is not None and cache_active and pred_id is not None:
+            if x.device.type == "cuda":
+                torch.cuda.synchronize(x.device)
+            latency_ms = (time.perf_counter() - cache_step_start) * 1000
+            residual_norm = torch.linalg.vector_norm(cache_residual, dtype=torch.float32) if cache_residual is not None else None
+            self.cache_telemetry.record(pred_id, current_step, cache_metric, cache_accumulated, not should_calc,
+                                        residual_norm=residual_norm, latency_ms=latency_ms)
                 
         if self.ref_conv is not None and fun_ref is not None:
             fun_ref_length = fun_ref.size(1)
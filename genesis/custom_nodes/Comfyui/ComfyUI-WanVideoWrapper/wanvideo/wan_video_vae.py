@@ -1116,6 +1116,20 @@ class VideoVAE_(nn.Module):
         self.clear_cache()
         return out
 
+    def decode_stream(self, z):
+        # z: [b,c,t,h,w], yields the decoded frames of each latent frame, the causal state lives in feat_cache
+        self.clear_cache()
+        try:
+            z = z / self.inv_std.to(z) + self.mean.to(z)
+            x = self.conv2(z)
+            for i in range(z.shape[2]):
+                self._conv_idx = [0]
+                yield self.decoder(x[:, :, i:i + 1, :, :],
+                                   feat_cache=self._feat_map,
+                                   feat_idx=self._conv_idx)
+        finally:
+            self.clear_cache()
+
     def reparameterize(self, mu, log_var):
         std = torch.exp(0.5 * log_var)
         eps = torch.randn_like(std)
@@ -1314,6 +1328,12 @@ class WanVideoVAE(nn.Module):
         video = self.model.decode(hidden_state, pbar=pbar)
         return video
 
+    def stream_decode(self, hidden_state, device):
+        """Decode a single [C, T, H, W] latent chunk by chunk, yielding [3, t, H, W] frames as soon as they are decoded"""
+        hidden_state = hidden_state.unsqueeze(0).to(device)
+        for chunk in self.model.decode_stream(hidden_state):
+            yield chunk.squeeze(0)
+
     def double_encode(self, video, device, pbar=True, sample=False):
         print('double_encode')
         video = video.to(device)
@@ -1450,6 +1470,21 @@ class VideoVAE38_(VideoVAE_):
         self.clear_cache()
         return out
 
+    def decode_stream(self, z):
+        self.clear_cache()
+        try:
+            z = z / self.inv_std.to(z) + self.mean.to(z)
+            x = self.conv2(z)
+            for i in range(z.shape[2]):
+                self._conv_idx = [0]
+                out = self.decoder(x[:, :, i:i + 1, :, :],
+                                   feat_cache=self._feat_map,
+                                   feat_idx=self._conv_idx,
+                                   first_chunk=(i == 0))
+                yield unpatchify(out, patch_size=2)
+        finally:
+            self.clear_cache()
+
 
 class WanVideoVAE38(WanVideoVAE):
 
@@ -6,7 +6,7 @@ from torchaudio.pipelines import HDEMUCS_HIGH_MUSDB_PLUS
 
 import comfy.model_management
 
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 from ._types import AUDIO
 from .utils import ensure_stereo
 
@@ -45,6 +45,15 @@ class AudioSeparation:
                         "tooltip": "The overlap between each segment (chunk) in seconds. A higher overlap may be necessary if chunks are too short or the audio changes rapidly.",
                     },
                 ),
+                "chunks_per_batch": (
+                    "INT",
+                    {
+                        "default": 1,
+                        "min": 1,
+                        "max": 64,
+                        "tooltip": "Number of segments (chunks) run through the model in one forward pass, for every track in the batch. Above 1 the separated audio is accumulated in CPU memory instead of on the GPU. Higher values use more VRAM but keep the GPU busier.",
+                    },
+                ),
             },
         }
 
@@ -60,11 +69,12 @@ class AudioSeparation:
         chunk_fade_shape: str = "linear",
         chunk_length: float = 10.0,
         chunk_overlap: float = 0.1,
+        chunks_per_batch: int = 1,
     ) -> Tuple[AUDIO, AUDIO, AUDIO, AUDIO]:
 
         device: torch.device = comfy.model_management.get_torch_device()
         waveform: torch.Tensor = audio["waveform"]
-        waveform = waveform.squeeze(0).to(device)
+        waveform = waveform.to(device)
         self.input_sample_rate_: int = audio["sample_rate"]
 
         bundle = HDEMUCS_HIGH_MUSDB_PLUS
@@ -80,21 +90,28 @@ class AudioSeparation:
             )
             waveform = resample(waveform)
 
-        ref = waveform.mean(0)
-        waveform = (waveform - ref.mean()) / ref.std()  # Zs
+        # Normalize each track of the batch on its own
+        ref = waveform.mean(1)
+        ref_mean = ref.mean(-1)[:, None, None]
+        ref_std = ref.std(-1)[:, None, None]
+        waveform = (waveform - ref_mean) / ref_std  # Zs
 
         sources = self.separate_sources(
             model,
-            waveform[None],
+            waveform,
             self.model_sample_rate,
             segment=chunk_length,
             overlap=chunk_overlap,
             device=device,
             chunk_fade_shape=chunk_fade_shape,
-        )[0]
-        sources = sources * ref.std() + ref.mean()
+            chunks_per_batch=chunks_per_batch,
+        )
+        # [batch, sources, channels, length] -> per source [batch, channels, length]
+        sources = sources * ref_std[:, None].to(sources.device) + ref_mean[
+            :, None
+        ].to(sources.device)
         sources_list = model.sources
-        sources = list(sources)
+        sources = list(sources.transpose(0, 1))
 
         return self.sources_to_tuple(dict(zip(sources_list, sources)))
 
@@ -109,7 +126,7 @@ class AudioSeparation:
                 raise ValueError(f"Missing source {source} in the output")
             outputs.append(
                 {
-                    "waveform": sources[source].cpu().unsqueeze(0),
+                    "waveform": sources[source].cpu(),
                     "sample_rate": self.model_sample_rate,
                 }
             )
@@ -124,6 +141,7 @@ class AudioSeparation:
         overlap: float = 0.1,
         device: torch.device = None,
         chunk_fade_shape: str = "linear",
+        chunks_per_batch: int = 1,
     ) -> torch.Tensor:
         """
         From: https://pytorch.org/audio/stable/tutorials/hybrid_demucs_tutorial.html
@@ -136,6 +154,9 @@ class AudioSeparation:
                 execute the computation, otherwise `mix.device` is assumed.
                 When `device` is different from `mix.device`, only local computations will
                 be on `device`, while the entire tracks will be stored on `mix.device`.
+            chunks_per_batch (int): segments of equal length stacked into one forward,
+                together with all tracks of the batch. Above 1 the output is accumulated
+                in (pinned) CPU memory, copies of one forward overlap the next forward.
         """
         if device is None:
             device = mix.device
@@ -145,27 +166,96 @@ class AudioSeparation:
         batch, channels, length = mix.shape
 
         chunk_len = int(sample_rate * segment * (1 + overlap))
-        start = 0
-        end = chunk_len
         overlap_frames = overlap * sample_rate
-        fade = Fade(
-            fade_in_len=0, fade_out_len=int(overlap_frames), fade_shape=chunk_fade_shape
-        )
-
-        final = torch.zeros(batch, len(model.sources), channels, length, device=device)
 
+        # Same segment layout as the tutorial loop: (start, end, fade_in_len, fade_out_len)
+        segments: List[Tuple[int, int, int, int]] = []
+        start = 0
+        end = chunk_len
+        fade_in_len = 0
+        fade_out_len = int(overlap_frames)
         while start < length - overlap_frames:
-            chunk = mix[:, :, start:end]
-            with torch.no_grad():
-                out = model.forward(chunk)
-            out = fade(out)
-            final[:, :, :, start:end] += out
+            segments.append((start, min(end, length), fade_in_len, fade_out_len))
             if start == 0:
-                fade.fade_in_len = int(overlap_frames)
+                fade_in_len = int(overlap_frames)
                 start += int(chunk_len - overlap_frames)
             else:
                 start += chunk_len
             end += chunk_len
             if end >= length:
-                fade.fade_out_len = 0
+                fade_out_len = 0
+
+        # Consecutive segments of the same length share a forward
+        groups: List[List[Tuple[int, int, int, int]]] = []
+        for seg in segments:
+            if (
+                groups
+                and len(groups[-1]) < chunks_per_batch
+                and groups[-1][0][1] - groups[-1][0][0] == seg[1] - seg[0]
+            ):
+                groups[-1].append(seg)
+            else:
+                groups.append([seg])
+
+        accumulate_on_cpu = chunks_per_batch > 1 and device.type == "cuda"
+        if accumulate_on_cpu:
+            final = torch.zeros(
+                batch, len(model.sources), channels, length, pin_memory=True
+            )
+        else:
+            final = torch.zeros(
+                batch, len(model.sources), channels, length, device=device
+            )
+
+        def accumulate(pending):
+            out, group, event = pending
+            if event is not None:
+                event.synchronize()
+            for j, (seg_start, seg_end, _, _) in enumerate(group):
+                final[:, :, :, seg_start:seg_end] += out[j * batch : (j + 1) * batch]
+
+        fades = {}
+        # Two pinned buffers per output shape: one being copied into, one being accumulated
+        staging_buffers = {}
+        pending = None
+        for group in groups:
+            chunk = torch.cat(
+                [mix[:, :, seg_start:seg_end] for seg_start, seg_end, _, _ in group]
+            ).to(device)
+            with torch.no_grad():
+                out = model.forward(chunk)
+
+            faded = []
+            for j, (_, _, fade_in, fade_out) in enumerate(group):
+                if (fade_in, fade_out) not in fades:
+                    fades[(fade_in, fade_out)] = Fade(
+                        fade_in_len=fade_in,
+                        fade_out_len=fade_out,
+                        fade_shape=chunk_fade_shape,
+                    )
+                fade = fades[(fade_in, fade_out)]
+                faded.append(fade(out[j * batch : (j + 1) * batch]))
+            out = torch.cat(faded)
+
+            event = None
+            if accumulate_on_cpu:
+                buffers = staging_buffers.setdefault(tuple(out.shape), [])
+                if len(buffers) < 2:
+                    buffers.insert(
+                        0, torch.empty(out.shape, dtype=out.dtype, pin_memory=True)
+                    )
+                staging = buffers.pop(0)
+                buffers.append(staging)
+                staging.copy_(out, non_blocking=True)
+                event = torch.cuda.Event()
+                event.record()
+                out = staging
+
+            # Add the previous forward while this one runs
+            if pending is not None:
+                accumulate(pending)
+            pending = (out, group, event)
+
+        if pending is not None:
+            accumulate(pending)
         return final
@@ -128,8 +128,13 @@ def tensor_to_int(tensor, bits):
     tensor = tensor * (2**bits-1) + 0.5
     return np.clip(tensor, 0, (2**bits-1))
 def tensor_to_shorts(tensor):
+    if isinstance(tensor, np.ndarray) and tensor.dtype == np.uint8:
+        return tensor.astype(np.uint16) * 257
     return tensor_to_int(tensor, 16).astype(np.uint16)
 def tensor_to_bytes(tensor):
+    # 流式解码的帧已经是 uint8
+    if isinstance(tensor, np.ndarray) and tensor.dtype == np.uint8:
+        return tensor
     return tensor_to_int(tensor, 8).astype(np.uint8)
 
 def ffmpeg_process(args, video_format, video_metadata, file_path, env):
@@ -227,6 +232,17 @@ def gifski_process(args, dimensions, video_format, file_path, env):
     if len(outgs) > 0:
         print(outgs.decode(*ENCODE_ARGS))
 
+def output_is_linked(prompt, unique_id, output_index):
+    """Whether any node of the prompt takes the given output of node unique_id as input"""
+    if not isinstance(prompt, dict) or unique_id is None:
+        return False
+    for node in prompt.values():
+        for value in node.get("inputs", {}).values():
+            if isinstance(value, list) and len(value) == 2 \
+                    and str(value[0]) == str(unique_id) and value[1] == output_index:
+                return True
+    return False
+
 def to_pingpong(inp):
     if not hasattr(inp, "__getitem__"):
         inp = list(inp)
@@ -303,6 +319,15 @@ class VideoCombine:
             else:
                 vae = None
 
+        # 流式帧（例如 WanVideo Decode (Stream)）边解码边送入 ffmpeg，不会生成完整的 IMAGE 张量，
+        # 因此流式输入时 images 输出始终为 None，连接该输出会直接报错
+        is_frame_stream = getattr(images, "is_frame_stream", False)
+        if is_frame_stream:
+            if output_is_linked(prompt, unique_id, 1):
+                raise ValueError("Video Combine has no images output for a frame stream input, "
+                                 "use WanVideo Decode instead of WanVideo Decode (Stream) to get the frames")
+            original_images = None
+
         if isinstance(images, torch.Tensor) and images.size(0) == 0:
             return ((save_output, []), original_images)
         num_frames = len(images)
@@ -327,6 +352,10 @@ class VideoCombine:
             #A single image has 3 dimensions. Discard higher dimensions
             while len(first_image.shape) > 3:
                 first_image = first_image[0]
+        elif is_frame_stream:
+            images = iter(images)
+            first_image = next(images)
+            images = itertools.chain([first_image], images)
         else:
             first_image = images[0]
             images = iter(images)
@@ -447,6 +476,8 @@ class VideoCombine:
                            to_pad[1]//2, to_pad[1] - to_pad[1]//2)
                 padfunc = torch.nn.ReplicationPad2d(padding)
                 def pad(image):
+                    if isinstance(image, np.ndarray):
+                        image = torch.from_numpy(image).float() / 255
                     image = image.permute((2,0,1))#HWC to CHW
                     padded = padfunc(image.to(dtype=torch.float32))
                     return padded.permute((1,2,0))
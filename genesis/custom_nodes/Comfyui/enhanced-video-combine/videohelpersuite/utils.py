@@ -55,7 +55,7 @@ class MultiInput(str):
         if self.allowed_types == "*" or other == "*":
             return False
         return other not in self.allowed_types
-imageOrLatent = MultiInput("IMAGE", ["IMAGE", "LATENT"])
+imageOrLatent = MultiInput("IMAGE", ["IMAGE", "LATENT", "VIDEO_FRAME_STREAM"])
 floatOrInt = MultiInput("FLOAT", ["FLOAT", "INT"])
 
 class ContainsAll(dict):
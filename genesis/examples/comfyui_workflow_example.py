@@ -139,7 +139,7 @@ def demo_workflow_conversion():
     print("\nOriginal ComfyUI Workflow:")
     print(json.dumps(workflow, indent=2))
     
-    converter = ComfyUIWorkflowConverter()
+    converter = ComfyUIWorkflowConverter(max_workers=4)
     
     print("\nParsing workflow...")
     if converter.parse_workflow(workflow):
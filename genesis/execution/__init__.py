@@ -1,5 +1,5 @@
 """Genesis Execution - Execution Engine Module"""
 
-from .executor import Executor
+from .executor import Executor, ExecutionCancelled
 
-__all__ = ['Executor']
+__all__ = ['Executor', 'ExecutionCancelled']
@@ -5,11 +5,35 @@ Author: eddy
 """
 
 import logging
-from typing import Dict, Any, Optional, Callable
+import threading
+from typing import Dict, Any, Optional, Callable, List, Set
 import time
 from pathlib import Path
 
 
+class ExecutionCancelled(Exception):
+    """Raised at a cancellation checkpoint when the running task was cancelled"""
+    pass
+
+
+def _set_processing_interrupted(value: bool):
+    """Set the global interrupt flag of the comfy compatibility layer"""
+    try:
+        from ..compat.model_management import manager
+    except ImportError:
+        return
+    manager.interrupt_current_processing(value)
+
+
+class ExecutionContext:
+    """State of one (possibly preempted) execution"""
+    
+    def __init__(self, task_id: Optional[str] = None):
+        self.task_id = task_id
+        self.cancel_event = threading.Event()
+        self.started_at = time.time()
+
+
 class Executor:
     """
     Executor
@@ -34,6 +58,17 @@ class Executor:
         self.sd_pipeline = None
         self.progress_callback = None
         
+        # Active executions, innermost last (preempting tasks run nested)
+        self._contexts: List[ExecutionContext] = []
+        self._contexts_lock = threading.Lock()
+        self._in_preemption = False
+        
+        # Tasks cancelled before their execution began
+        self._pending_cancels: Set[str] = set()
+        
+        # Called at checkpoints; may run higher-priority work before returning
+        self.preempt_handler: Optional[Callable[[], None]] = None
+        
     def set_progress_callback(self, callback: Optional[Callable[[int, int], None]]):
         """
         Set progress callback
@@ -43,6 +78,69 @@ class Executor:
         """
         self.progress_callback = callback
 
+    def _begin(self, task_id: Optional[str]) -> ExecutionContext:
+        """Enter an execution (nested only while preempting another one)"""
+        with self._contexts_lock:
+            if self.is_executing and not self._in_preemption:
+                raise RuntimeError("Another task is currently executing")
+            
+            if not self._contexts:
+                # Drop an interrupt left over from a task that finished before it was seen
+                _set_processing_interrupted(False)
+            
+            context = ExecutionContext(task_id)
+            if task_id in self._pending_cancels:
+                self._pending_cancels.discard(task_id)
+                context.cancel_event.set()
+            self._contexts.append(context)
+            self.is_executing = True
+            self.current_task = task_id
+            return context
+    
+    def _end(self, context: ExecutionContext):
+        """Leave an execution"""
+        with self._contexts_lock:
+            if context in self._contexts:
+                self._contexts.remove(context)
+            if self._contexts:
+                # The global interrupt flag follows the innermost execution, a resumed task keeps running
+                _set_processing_interrupted(self._contexts[-1].cancel_event.is_set())
+            self.is_executing = bool(self._contexts)
+            self.current_task = self._contexts[-1].task_id if self._contexts else None
+    
+    def checkpoint(self, stage: str = "", preempt: bool = False):
+        """
+        Cooperative cancellation and preemption point
+        
+        Call between sampler steps, VAE decode chunks and before saving.
+        Preemption only happens at stage boundaries (preempt=True): a
+        preempting task reuses the shared pipeline, so it must not run while
+        a sampler loop holds scheduler state and activations.
+        
+        Args:
+            stage: Stage name for logging
+            preempt: Run queued higher-priority work here
+            
+        Raises:
+            ExecutionCancelled: If the current execution was cancelled
+        """
+        with self._contexts_lock:
+            context = self._contexts[-1] if self._contexts else None
+        
+        if context is not None and context.cancel_event.is_set():
+            raise ExecutionCancelled(f"Task {context.task_id} cancelled at {stage or 'checkpoint'}")
+        
+        if preempt and self.preempt_handler is not None and not self._in_preemption:
+            self._in_preemption = True
+            try:
+                self.preempt_handler()
+            finally:
+                self._in_preemption = False
+            
+            # The outer task may have been cancelled while it was paused
+            if context is not None and context.cancel_event.is_set():
+                raise ExecutionCancelled(f"Task {context.task_id} cancelled at {stage or 'checkpoint'}")
+
     def initialize_pipeline(self, model_path: Optional[str] = None):
         """
         Initialize Stable Diffusion pipeline
@@ -67,23 +165,23 @@ class Executor:
 
         self.logger.info("[OK] Pipeline initialized")
 
-    def execute_generation(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    def execute_generation(self, params: Dict[str, Any], task_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute image generation
 
         Args:
             params: Generation parameters
+            task_id: Task ID (used for cancellation)
 
         Returns:
             Generation result
         """
-        if self.is_executing:
-            raise RuntimeError("Another task is currently executing")
-
-        self.is_executing = True
+        context = self._begin(task_id)
         start_time = time.time()
 
         try:
+            self.checkpoint("generation start", preempt=True)
+
             if self.sd_pipeline is None:
                 self.initialize_pipeline()
 
@@ -104,8 +202,9 @@ class Executor:
                 if self.progress_callback:
                     self.progress_callback(step, total)
                 self.logger.debug(f"Progress: {step}/{total}")
+                self.checkpoint(f"sampling step {step}/{total}")
 
-            image = self.sd_pipeline.generate(
+            latents = self.sd_pipeline.generate(
                 prompt=prompt,
                 negative_prompt=negative_prompt,
                 width=width,
@@ -113,8 +212,19 @@ class Executor:
                 steps=steps,
                 cfg_scale=cfg_scale,
                 seed=seed,
-                callback=progress_wrapper
+                callback=progress_wrapper,
+                output_type='latent'
+            )
+            
+            # Decode through the tiled VAE so cancellation is checked between decode chunks
+            from ..core.vae import VAE
+            vae = VAE(self.sd_pipeline.vae, str(self.device))
+            images = vae.decode_tiled(
+                latents,
+                callback=lambda done, total: self.checkpoint(f"VAE decode {done}/{total}")
             )
+            image = self.sd_pipeline.to_image(images)
+            del latents, images
 
             output_dir = Path(self.config.output_dir) if hasattr(self.config, 'output_dir') else Path('outputs')
             output_dir.mkdir(exist_ok=True)
@@ -123,6 +233,8 @@ class Executor:
             filename = f"genesis_{timestamp}.png"
             output_path = output_dir / filename
 
+            # Sampler state and activations are released here, higher-priority tasks may run
+            self.checkpoint("save", preempt=True)
             image.save(str(output_path))
             self.logger.info(f"[OK] Image saved: {output_path}")
 
@@ -144,6 +256,14 @@ class Executor:
             self.logger.info(f"[OK] Generation completed in {result['execution_time']:.2f}s")
             return result
 
+        except ExecutionCancelled as e:
+            self.logger.warning(str(e))
+            return {
+                'success': False,
+                'error': str(e),
+                'execution_time': time.time() - start_time,
+                'status': 'cancelled'
+            }
         except Exception as e:
             self.logger.error(f"Generation failed: {e}", exc_info=True)
             return {
@@ -153,25 +273,24 @@ class Executor:
                 'status': 'failed'
             }
         finally:
-            self.is_executing = False
+            self._end(context)
     
-    def execute_pipeline(self, pipeline) -> Dict[str, Any]:
+    def execute_pipeline(self, pipeline, task_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute Pipeline
         
         Args:
             pipeline: Pipeline object
+            task_id: Task ID (used for cancellation)
             
         Returns:
             Execution result
         """
-        if self.is_executing:
-            raise RuntimeError("Another task is currently executing")
-        
-        self.is_executing = True
+        context = self._begin(task_id)
         start_time = time.time()
         
         try:
+            self.checkpoint("pipeline start", preempt=True)
             self.logger.info(f"Executing pipeline: {pipeline.name}")
             
             # Validate Pipeline
@@ -191,6 +310,14 @@ class Executor:
             self.logger.info(f"[OK] Pipeline executed in {result['execution_time']:.2f}s")
             return result
             
+        except ExecutionCancelled as e:
+            self.logger.warning(str(e))
+            return {
+                'success': False,
+                'error': str(e),
+                'execution_time': time.time() - start_time,
+                'status': 'cancelled'
+            }
         except Exception as e:
             self.logger.error(f"Pipeline execution failed: {e}")
             return {
@@ -200,11 +327,39 @@ class Executor:
                 'status': 'failed'
             }
         finally:
-            self.is_executing = False
+            self._end(context)
     
-    def cancel(self):
-        """Cancel current execution"""
-        if self.is_executing:
-            self.logger.warning("Cancelling current execution...")
-            # TODO: Implement cancel logic
-            self.is_executing = False
+    def cancel(self, task_id: Optional[str] = None) -> bool:
+        """
+        Cancel execution
+        
+        The running task stops at its next checkpoint (sampler step,
+        VAE decode chunk or save). A task paused by preemption is only
+        marked cancelled and stops when it resumes, the task running in
+        its place is not interrupted. A task that has not begun executing
+        yet is cancelled at its first checkpoint.
+        
+        Args:
+            task_id: Task to cancel (None = innermost running task)
+            
+        Returns:
+            True if a running execution was signalled
+        """
+        with self._contexts_lock:
+            if task_id is None:
+                targets = self._contexts[-1:]
+            else:
+                targets = [c for c in self._contexts if c.task_id == task_id]
+                if not targets:
+                    self._pending_cancels.add(task_id)
+            innermost = self._contexts[-1] if self._contexts else None
+        
+        for context in targets:
+            self.logger.warning(f"Cancelling execution of task {context.task_id}...")
+            context.cancel_event.set()
+        
+        if innermost is not None and innermost in targets:
+            # Custom nodes poll comfy.model_management.throw_exception_if_processing_interrupted
+            _set_processing_interrupted(True)
+        
+        return bool(targets)
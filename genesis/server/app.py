@@ -6,6 +6,7 @@ Author: eddy
 
 import os
 import logging
+import threading
 from pathlib import Path
 from typing import Optional
 
@@ -25,6 +26,9 @@ from genesis.core.node_scanner import get_node_scanner
 
 logger = logging.getLogger(__name__)
 
+# Queue priority of compile warmup workflows
+WARMUP_PRIORITY = -100
+
 
 class GenesisServer:
     """
@@ -71,6 +75,10 @@ class GenesisServer:
         self.app = None
         self.socketio = None
 
+        # Workflow job queue
+        self.job_queue = None
+        self.previews = None
+
         # Initialize
         self._initialized = False
 
@@ -105,9 +113,15 @@ class GenesisServer:
         # Register WebSocket handlers
         self._register_websocket_handlers()
 
+        # Start job queue
+        self._start_job_queue()
+
         self._initialized = True
         logger.info("Genesis Server initialized successfully")
 
+        # Compile warmup
+        self._start_compile_warmup()
+
     def _load_all_nodes(self):
         """Load all nodes (built-in + custom)"""
         logger.info("Loading nodes...")
@@ -132,6 +146,51 @@ class GenesisServer:
         for category, count in reg_stats['nodes_by_category'].items():
             logger.info(f"    - {category}: {count} nodes")
 
+    def _start_job_queue(self):
+        """Open the job database and start the background executor"""
+        from .execution.executor import WorkflowExecutor
+        from .execution.job_queue import JobStore, JobQueueService
+        from .websocket.previews import PreviewStreamer
+
+        self.previews = PreviewStreamer(self.socketio)
+        self.job_queue = JobQueueService(
+            JobStore(str(self.config.job_queue_db)),
+            lambda: WorkflowExecutor(self.registry, self.engine),
+            on_event=self._emit_job_event,
+            on_preview=self.previews.submit,
+            wants_preview=self.previews.has_subscribers
+        )
+        self.job_queue.start()
+
+    def _emit_job_event(self, event: str, data: dict, room: Optional[str] = None):
+        """Send a job event to the clients in the job's room"""
+        self.socketio.emit(event, data, room=room)
+        if event in ('workflow_completed', 'workflow_failed') or data.get('status') == 'cancelled':
+            self.previews.finish(data['prompt_id'])
+
+    def _start_compile_warmup(self):
+        """Queue configured warmup workflows so their torch.compile buckets are ready"""
+        workflows = [str(p) for p in self.config.compile_warmup_workflows]
+        if not workflows:
+            return
+
+        from genesis.core.compile_cache import get_compile_cache
+
+        def run_workflow(workflow):
+            # Lowest priority, real requests submitted meanwhile run first
+            job = self.job_queue.submit(workflow, client_id='compile-warmup', priority=WARMUP_PRIORITY)
+            job = self.job_queue.wait(job['prompt_id'])
+            if job is None:
+                return {'success': False, 'error': 'job removed from the queue'}
+            return {'success': job['status'] == 'completed', 'error': job['error']}
+
+        def run():
+            done = get_compile_cache().warmup(workflows, run_workflow)
+            logger.info(f"Compile warmup finished: {done}/{len(workflows)} workflows")
+
+        logger.info(f"Starting compile warmup ({len(workflows)} workflows)")
+        threading.Thread(target=run, daemon=True, name="GenesisCompileWarmup").start()
+
     def _register_websocket_handlers(self):
         """Register WebSocket event handlers"""
         from .websocket.handlers import register_handlers
@@ -157,6 +216,10 @@ class GenesisServer:
     def shutdown(self):
         """Shutdown server"""
         logger.info("Shutting down Genesis Server...")
+        if self.job_queue:
+            self.job_queue.stop()
+        if self.previews:
+            self.previews.stop()
         if self.engine:
             self.engine.cleanup()
         logger.info("Server shutdown complete")
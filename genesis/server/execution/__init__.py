@@ -4,5 +4,6 @@ Author: eddy
 """
 
 from .executor import WorkflowExecutor
+from .job_queue import JobStatus, JobStore, JobQueueService
 
-__all__ = ['WorkflowExecutor']
+__all__ = ['WorkflowExecutor', 'JobStatus', 'JobStore', 'JobQueueService']
@@ -5,9 +5,11 @@ Author: eddy
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from collections import defaultdict, deque
 
+from genesis.compat.progress import set_executing_node
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,13 +37,19 @@ class WorkflowExecutor:
         self.engine = engine
         self.logger = logging.getLogger(f"{__name__}.WorkflowExecutor")
 
-    def execute(self, workflow: Dict[str, Any], prompt_id: str = None) -> Dict[str, Any]:
+    def execute(
+        self,
+        workflow: Dict[str, Any],
+        prompt_id: str = None,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None
+    ) -> Dict[str, Any]:
         """
         Execute a workflow
 
         Args:
             workflow: ComfyUI workflow JSON
             prompt_id: Prompt ID for tracking
+            progress_callback: Called with (node_id, index, node_count) before each node
 
         Returns:
             Execution results
@@ -62,8 +70,10 @@ class WorkflowExecutor:
 
             # Execute nodes
             outputs = {}
-            for node_id in execution_order:
+            for index, node_id in enumerate(execution_order):
                 self.logger.info(f"Executing node: {node_id}")
+                if progress_callback is not None:
+                    progress_callback(node_id, index, len(execution_order))
                 node_output = self._execute_node(node_id, nodes, connections, outputs)
                 outputs[node_id] = node_output
 
@@ -268,7 +278,11 @@ class WorkflowExecutor:
             # Call node function
             if hasattr(node_instance, function_name):
                 node_function = getattr(node_instance, function_name)
-                result = node_function(**inputs)
+                set_executing_node(node_id)
+                try:
+                    result = node_function(**inputs)
+                finally:
+                    set_executing_node(None)
             else:
                 raise ValueError(f"Node {class_type} has no function '{function_name}'")
 
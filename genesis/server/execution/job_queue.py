@@ -0,0 +1,484 @@
+"""
+Genesis Job Queue
+Persistent workflow queue backed by SQLite, drained by a background executor
+Author: eddy
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+from genesis.compat.progress import set_progress_bar_global_hook, set_preview_wanted_hook
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    """Job status constants"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+def to_json_safe(value: Any, depth: int = 0) -> Any:
+    """
+    Summarize node outputs for storage
+
+    Tensors and arrays become shape/dtype descriptions, other objects their
+    type name, so results of any workflow can be stored and served as JSON.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if depth >= 6:
+        return {'type': type(value).__name__}
+    if isinstance(value, dict):
+        return {str(k): to_json_safe(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(v, depth + 1) for v in value]
+    shape = getattr(value, 'shape', None)
+    if shape is not None:
+        return {'type': type(value).__name__, 'shape': list(shape), 'dtype': str(getattr(value, 'dtype', ''))}
+    return {'type': type(value).__name__}
+
+
+class JobStore:
+    """
+    SQLite table of queued, running and finished workflow jobs
+
+    Pending jobs are claimed by highest priority first, FIFO within a
+    priority. One connection is shared by all threads behind a lock; the
+    database uses WAL so readers don't block the executor's writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            prompt_id TEXT UNIQUE NOT NULL,
+            client_id TEXT,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL,
+            workflow TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            current_node TEXT,
+            step INTEGER,
+            steps INTEGER,
+            result TEXT,
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            completed_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, seq);
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the job database
+
+        Args:
+            path: SQLite file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.executescript(self.SCHEMA)
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        with self.lock:
+            return self.conn.execute(sql, params).rowcount
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, include_workflow: bool = False) -> Dict[str, Any]:
+        def timestamp(value):
+            return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+        job = {
+            'prompt_id': row['prompt_id'],
+            'client_id': row['client_id'],
+            'priority': row['priority'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'current_node': row['current_node'],
+            'step': row['step'],
+            'steps': row['steps'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'cancel_requested': bool(row['cancel_requested']),
+            'created_at': timestamp(row['created_at']),
+            'started_at': timestamp(row['started_at']),
+            'completed_at': timestamp(row['completed_at']),
+        }
+        if include_workflow:
+            job['workflow'] = json.loads(row['workflow'])
+        return job
+
+    def add(self, prompt_id: str, workflow: Dict[str, Any], client_id: Optional[str] = None, priority: int = 0) -> Dict[str, Any]:
+        """Queue a workflow, raises ValueError if the prompt_id exists"""
+        try:
+            self._execute(
+                "INSERT INTO jobs (prompt_id, client_id, priority, status, workflow, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (prompt_id, client_id, int(priority), JobStatus.PENDING, json.dumps(workflow), time.time())
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Job {prompt_id} already exists")
+        return self.get(prompt_id)
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the next pending job as running and return it with its workflow"""
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute(
+                    "SELECT prompt_id FROM jobs WHERE status = ? ORDER BY priority DESC, seq LIMIT 1",
+                    (JobStatus.PENDING,)
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ? WHERE prompt_id = ?",
+                        (JobStatus.RUNNING, time.time(), row['prompt_id'])
+                    )
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        return self.get(row['prompt_id'], include_workflow=True) if row is not None else None
+
+    def update_progress(self, prompt_id: str, progress: float, current_node: Optional[str] = None,
+                        step: Optional[int] = None, steps: Optional[int] = None):
+        self._execute(
+            "UPDATE jobs SET progress = ?, current_node = ?, step = ?, steps = ? WHERE prompt_id = ?",
+            (progress, current_node, step, steps, prompt_id)
+        )
+
+    def finish(self, prompt_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, completed_at = ?, "
+            "progress = CASE WHEN ? = ? THEN 1.0 ELSE progress END WHERE prompt_id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(),
+             status, JobStatus.COMPLETED, prompt_id)
+        )
+
+    def request_cancel(self, prompt_id: str) -> Optional[str]:
+        """
+        Cancel a job
+
+        Pending jobs are cancelled at once, running jobs are flagged and
+        stopped by the executor.
+
+        Returns:
+            Job status after the request, None if the job does not exist
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, completed_at = ? WHERE prompt_id = ? AND status = ?",
+                (JobStatus.CANCELLED, time.time(), prompt_id, JobStatus.PENDING)
+            )
+            self.conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE prompt_id = ? AND status = ?",
+                (prompt_id, JobStatus.RUNNING)
+            )
+            row = self.conn.execute("SELECT status FROM jobs WHERE prompt_id = ?", (prompt_id,)).fetchone()
+        return row['status'] if row is not None else None
+
+    def is_cancel_requested(self, prompt_id: str) -> bool:
+        row = self._fetchone("SELECT cancel_requested FROM jobs WHERE prompt_id = ?", (prompt_id,))
+        return bool(row and row['cancel_requested'])
+
+    def get(self, prompt_id: str, include_workflow: bool = False) -> Optional[Dict[str, Any]]:
+        row = self._fetchone("SELECT * FROM jobs WHERE prompt_id = ?", (prompt_id,))
+        return self._to_dict(row, include_workflow) if row is not None else None
+
+    def list(self, statuses: Optional[List[str]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Jobs in queue order, optionally filtered by status"""
+        if statuses:
+            placeholders = ','.join('?' * len(statuses))
+            rows = self._fetchall(
+                f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY priority DESC, seq LIMIT ?",
+                (*statuses, limit)
+            )
+        else:
+            rows = self._fetchall("SELECT * FROM jobs ORDER BY seq DESC LIMIT ?", (limit,))
+        return [self._to_dict(row) for row in rows]
+
+    def position(self, prompt_id: str) -> Optional[int]:
+        """Number of pending jobs that run before a pending job"""
+        row = self._fetchone(
+            "SELECT priority, seq FROM jobs WHERE prompt_id = ? AND status = ?",
+            (prompt_id, JobStatus.PENDING)
+        )
+        if row is None:
+            return None
+        ahead = self._fetchone(
+            "SELECT COUNT(*) AS n FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND seq < ?))",
+            (JobStatus.PENDING, row['priority'], row['priority'], row['seq'])
+        )
+        return ahead['n']
+
+    def count(self, status: str) -> int:
+        return self._fetchone("SELECT COUNT(*) AS n FROM jobs WHERE status = ?", (status,))['n']
+
+    def recover(self) -> int:
+        """Requeue jobs left running by a previous process"""
+        return self._execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, progress = 0, current_node = NULL, step = NULL, steps = NULL "
+            "WHERE status = ?",
+            (JobStatus.PENDING, JobStatus.RUNNING)
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class JobQueueService:
+    """
+    Background executor draining a JobStore
+
+    - submit() stores the workflow and returns at once
+    - one worker thread runs jobs in priority order through WorkflowExecutor
+    - progress from node order and ProgressBar steps is written to the store
+      (throttled) and emitted as events to the job's room
+    - step previews attached to ProgressBar updates go to on_preview
+    - cancel() interrupts a running job through the comfy interrupt flag
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        executor_factory: Callable[[], Any],
+        on_event: Optional[Callable[[str, Dict[str, Any], Optional[str]], None]] = None,
+        progress_interval: float = 0.5,
+        on_preview: Optional[Callable[..., None]] = None,
+        wants_preview: Optional[Callable[[str], bool]] = None
+    ):
+        """
+        Initialize service
+
+        Args:
+            store: Job store
+            executor_factory: Returns a WorkflowExecutor
+            on_event: Called with (event, data, room) for status and progress events
+            progress_interval: Minimum seconds between stored progress updates
+            on_preview: Called with (prompt_id, preview, node_id, step, steps) for step previews
+            wants_preview: Called with prompt_id, samplers only decode previews while it returns True
+        """
+        self.store = store
+        self.executor_factory = executor_factory
+        self.on_event = on_event
+        self.progress_interval = progress_interval
+        self.on_preview = on_preview
+        self.wants_preview = wants_preview
+
+        self.wakeup = threading.Event()
+        self.running = False
+        self.worker: Optional[threading.Thread] = None
+
+        self.current_job: Optional[str] = None
+        self._node = (None, 0, 1)
+        self._last_progress = 0.0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Requeue interrupted jobs and start the worker thread"""
+        if self.running:
+            return
+        recovered = self.store.recover()
+        if recovered:
+            logger.info(f"Requeued {recovered} jobs interrupted by the last shutdown")
+        self.running = True
+        set_progress_bar_global_hook(self._progress_hook)
+        set_preview_wanted_hook(self._preview_wanted)
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True, name="GenesisJobQueue")
+        self.worker.start()
+        logger.info(f"Job queue started ({self.store.count(JobStatus.PENDING)} pending, db={self.store.path})")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker, a running job is requeued on the next start"""
+        self.running = False
+        self.wakeup.set()
+        if self.worker is not None:
+            self.worker.join(timeout)
+            self.worker = None
+        set_progress_bar_global_hook(None)
+        set_preview_wanted_hook(None)
+
+    def submit(self, workflow: Dict[str, Any], prompt_id: Optional[str] = None,
+               client_id: Optional[str] = None, priority: int = 0) -> Dict[str, Any]:
+        """
+        Queue a workflow
+
+        Args:
+            workflow: ComfyUI workflow JSON
+            prompt_id: Job ID (default: new UUID)
+            client_id: Submitting client
+            priority: Higher runs first
+
+        Returns:
+            Job record with its queue position
+        """
+        prompt_id = prompt_id or str(uuid.uuid4())
+        job = self.store.add(prompt_id, workflow, client_id=client_id, priority=priority)
+        job['position'] = self.store.position(prompt_id)
+        self.wakeup.set()
+        self._emit('workflow_status', {'prompt_id': prompt_id, 'status': JobStatus.PENDING, 'position': job['position']})
+        return job
+
+    def get(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(prompt_id)
+        if job is not None and job['status'] == JobStatus.PENDING:
+            job['position'] = self.store.position(prompt_id)
+        return job
+
+    def get_queue(self, limit: int = 100) -> Dict[str, Any]:
+        return {
+            'running': self.store.list([JobStatus.RUNNING]),
+            'pending': self.store.list([JobStatus.PENDING], limit=limit),
+            'pending_count': self.store.count(JobStatus.PENDING),
+        }
+
+    def cancel(self, prompt_id: str) -> Optional[str]:
+        """Cancel a pending or running job, returns its status or None if unknown"""
+        status = self.store.request_cancel(prompt_id)
+        if status == JobStatus.RUNNING and prompt_id == self.current_job:
+            from genesis.compat.model_management import manager
+            manager.interrupt_current_processing(True)
+        elif status == JobStatus.CANCELLED:
+            self._emit('workflow_status', {'prompt_id': prompt_id, 'status': JobStatus.CANCELLED})
+        return status
+
+    def wait(self, prompt_id: str, timeout: Optional[float] = None, poll_interval: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Block until a job finishes, returns the job (None if unknown or timed out)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            job = self.store.get(prompt_id)
+            if job is None or job['status'] in JobStatus.FINISHED:
+                return job
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event, data, data.get('prompt_id'))
+        except Exception as e:
+            logger.debug(f"Failed to emit {event}: {e}")
+
+    def _worker_loop(self):
+        while self.running:
+            job = self.store.claim_next()
+            if job is None:
+                self.wakeup.wait(timeout=1.0)
+                self.wakeup.clear()
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Job {job['prompt_id']} could not be run: {e}")
+                self.store.finish(job['prompt_id'], JobStatus.FAILED, error=str(e))
+
+    def _run(self, job: Dict[str, Any]):
+        prompt_id = job['prompt_id']
+        self.current_job = prompt_id
+        self._node = (None, 0, 1)
+        self._last_progress = 0.0
+        self._emit('workflow_status', {'prompt_id': prompt_id, 'status': JobStatus.RUNNING})
+        start = time.perf_counter()
+
+        try:
+            executor = self.executor_factory()
+            result = executor.execute(job['workflow'], prompt_id, progress_callback=self._node_started)
+        except Exception as e:
+            result = {'success': False, 'prompt_id': prompt_id, 'error': str(e)}
+        finally:
+            self.current_job = None
+            from genesis.compat.model_management import manager
+            manager.interrupt_current_processing(False)
+
+        elapsed = time.perf_counter() - start
+        if self.store.is_cancel_requested(prompt_id):
+            self.store.finish(prompt_id, JobStatus.CANCELLED, error='Cancelled')
+            logger.info(f"Job {prompt_id} cancelled after {elapsed:.1f}s")
+            self._emit('workflow_status', {'prompt_id': prompt_id, 'status': JobStatus.CANCELLED})
+        elif result.get('success'):
+            outputs = to_json_safe(result.get('outputs'))
+            self.store.finish(prompt_id, JobStatus.COMPLETED, result=outputs)
+            logger.info(f"Job {prompt_id} completed in {elapsed:.1f}s")
+            self._emit('workflow_completed', {'prompt_id': prompt_id, 'result': outputs})
+        else:
+            self.store.finish(prompt_id, JobStatus.FAILED, error=result.get('error'))
+            logger.warning(f"Job {prompt_id} failed after {elapsed:.1f}s: {result.get('error')}")
+            self._emit('workflow_failed', {'prompt_id': prompt_id, 'error': result.get('error')})
+
+    def _node_started(self, node_id: str, index: int, count: int):
+        if self.current_job is not None and self.store.is_cancel_requested(self.current_job):
+            from genesis.compat.model_management import InterruptProcessingException
+            raise InterruptProcessingException()
+        self._node = (node_id, index, max(count, 1))
+        self._report(index / self._node[2], node_id, None, None, force=True)
+
+    def _progress_hook(self, value, total, preview=None, node_id=None):
+        """ProgressBar hook, called from the node running on the worker thread"""
+        if self.current_job is None or threading.current_thread() is not self.worker:
+            return
+        current_node, index, count = self._node
+        fraction = min(value / total, 1.0) if total else 0.0
+        self._report((index + fraction) / count, node_id or current_node, value, total, force=bool(total) and value >= total)
+        if preview is not None and self.on_preview is not None:
+            try:
+                self.on_preview(self.current_job, preview, node_id or current_node, value, total)
+            except Exception as e:
+                logger.debug(f"Failed to forward preview: {e}")
+
+    def _preview_wanted(self) -> bool:
+        """Preview hook, True while a client is subscribed to the job running on this thread"""
+        if self.current_job is None or threading.current_thread() is not self.worker:
+            return False
+        if self.on_preview is None or self.wants_preview is None:
+            return False
+        return self.wants_preview(self.current_job)
+
+    def _report(self, progress: float, node_id: Optional[str], step: Optional[int], steps: Optional[int], force: bool = False):
+        now = time.time()
+        if not force and now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        self.store.update_progress(self.current_job, progress, node_id, step, steps)
+        self._emit('workflow_progress', {
+            'prompt_id': self.current_job,
+            'progress': progress,
+            'node': node_id,
+            'value': step,
+            'max': steps,
+        })
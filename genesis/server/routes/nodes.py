@@ -43,7 +43,8 @@ def list_nodes():
         # Build response
         nodes = []
         for name in node_names:
-            node_info = registry.get_info(name)
+            # Summaries come from the registered metadata, lazy node packages are not imported
+            node_info = registry.get_summary(name)
             if node_info:
                 nodes.append({
                     'name': name,
@@ -73,14 +74,22 @@ def get_node_info(node_name):
         server = current_app.genesis_server
         registry = server.registry
 
-        node_info = registry.get_info(node_name)
-
-        if not node_info:
+        if not registry.has(node_name):
             return jsonify({
                 'success': False,
                 'error': f'Node not found: {node_name}'
             }), 404
 
+        # Imports the node's package on first access
+        try:
+            node_info = registry.get_info(node_name)
+        except Exception as e:
+            logger.error(f"Failed to load node {node_name}: {e}")
+            return jsonify({
+                'success': False,
+                'error': f'Failed to load node {node_name}: {e}'
+            }), 500
+
         return jsonify({
             'success': True,
             'node': node_info
@@ -148,7 +157,8 @@ def search_nodes():
         # Build response
         nodes = []
         for name in node_names:
-            node_info = registry.get_info(name)
+            # Summaries come from the registered metadata, lazy node packages are not imported
+            node_info = registry.get_summary(name)
             if node_info:
                 nodes.append({
                     'name': name,
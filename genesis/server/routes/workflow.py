@@ -7,7 +7,6 @@ Author: eddy
 from flask import Blueprint, jsonify, request, current_app
 import logging
 import uuid
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +16,18 @@ workflow_bp = Blueprint('workflow', __name__)
 @workflow_bp.route('/execute', methods=['POST'])
 def execute_workflow():
     """
-    Execute a workflow
+    Queue a workflow for execution
+
+    Returns at once, the job runs on the server's job queue. Poll
+    /status/<prompt_id> or join the prompt_id room on the websocket for
+    progress and results.
 
     Request body:
     {
         "workflow": {...},  // ComfyUI workflow JSON
         "client_id": "...",  // Optional client ID
-        "prompt_id": "..."  // Optional prompt ID
+        "prompt_id": "...",  // Optional prompt ID
+        "priority": 0  // Optional, higher runs first
     }
     """
     try:
@@ -47,37 +51,40 @@ def execute_workflow():
                 'error': 'Workflow must be a JSON object'
             }), 400
 
-        # Get executor from server
-        from ..execution.executor import WorkflowExecutor
-        executor = WorkflowExecutor(server.registry, server.engine)
+        try:
+            priority = int(data.get('priority', 0))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'priority must be an integer'
+            }), 400
 
-        # Queue workflow execution
-        task = {
-            'prompt_id': prompt_id,
-            'client_id': client_id,
-            'workflow': workflow,
-            'status': 'queued',
-            'created_at': datetime.now().isoformat()
-        }
+        # Reject invalid workflows before they reach the queue
+        from ..execution.executor import WorkflowExecutor
+        errors = WorkflowExecutor(server.registry, server.engine).validate(workflow)
+        if errors:
+            return jsonify({
+                'success': False,
+                'error': 'Workflow validation failed',
+                'errors': errors
+            }), 400
 
-        # Start execution (async in real implementation)
         try:
-            result = executor.execute(workflow, prompt_id)
-            task['status'] = 'completed'
-            task['result'] = result
-        except Exception as e:
-            task['status'] = 'failed'
-            task['error'] = str(e)
-            logger.error(f"Workflow execution failed: {e}")
+            task = server.job_queue.submit(workflow, prompt_id=prompt_id, client_id=client_id, priority=priority)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 409
 
         return jsonify({
             'success': True,
             'prompt_id': prompt_id,
             'task': task
-        })
+        }), 202
 
     except Exception as e:
-        logger.error(f"Failed to execute workflow: {e}")
+        logger.error(f"Failed to queue workflow: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -121,14 +128,22 @@ def validate_workflow():
 
 @workflow_bp.route('/status/<prompt_id>', methods=['GET'])
 def get_workflow_status(prompt_id):
-    """Get workflow execution status"""
+    """Get workflow execution status, progress and result"""
     try:
-        # In a real implementation, this would query a task queue
+        server = current_app.genesis_server
+        task = server.job_queue.get(prompt_id)
+
+        if task is None:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown prompt_id: {prompt_id}'
+            }), 404
+
         return jsonify({
             'success': True,
             'prompt_id': prompt_id,
-            'status': 'completed',
-            'message': 'Status tracking not yet implemented'
+            'status': task['status'],
+            'task': task
         })
 
     except Exception as e:
@@ -139,16 +154,45 @@ def get_workflow_status(prompt_id):
         }), 500
 
 
+@workflow_bp.route('/cancel/<prompt_id>', methods=['POST'])
+def cancel_workflow(prompt_id):
+    """Cancel a queued or running workflow"""
+    try:
+        server = current_app.genesis_server
+        status = server.job_queue.cancel(prompt_id)
+
+        if status is None:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown prompt_id: {prompt_id}'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'prompt_id': prompt_id,
+            'status': status
+        })
+
+    except Exception as e:
+        logger.error(f"Failed to cancel workflow: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @workflow_bp.route('/queue', methods=['GET'])
 def get_queue():
     """Get current execution queue"""
     try:
-        # In a real implementation, this would return the task queue
+        server = current_app.genesis_server
+        queue = server.job_queue.get_queue()
+
         return jsonify({
             'success': True,
-            'queue': [],
-            'running': [],
-            'pending': 0
+            'queue': queue['pending'],
+            'running': queue['running'],
+            'pending': queue['pending_count']
         })
 
     except Exception as e:
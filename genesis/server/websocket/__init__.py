@@ -4,5 +4,6 @@ Author: eddy
 """
 
 from .handlers import register_handlers
+from .previews import PreviewStreamer
 
-__all__ = ['register_handlers']
+__all__ = ['register_handlers', 'PreviewStreamer']
@@ -4,10 +4,14 @@ Real-time communication with clients
 Author: eddy
 """
 
+import math
+import uuid
 import logging
 from flask_socketio import emit, join_room, leave_room
 from flask import request
 
+from ..execution.job_queue import JobStatus
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +24,39 @@ def register_handlers(socketio, server):
         server: GenesisServer instance
     """
 
+    def subscribe_previews(prompt_id, options):
+        """
+        Stream step previews of a job to the calling client
+
+        Opt-in: options must be True or {format, max_fps}, and prompt_id a
+        job of the job queue that has not finished.
+
+        Returns:
+            Error message for invalid options, None otherwise
+        """
+        if options is True:
+            options = {}
+        if not isinstance(options, dict) or server.previews is None or server.job_queue is None:
+            return None
+
+        try:
+            max_fps = float(options.get('max_fps', 2.0))
+        except (TypeError, ValueError):
+            max_fps = -1.0
+        if not math.isfinite(max_fps) or max_fps < 0:
+            return f"Invalid preview max_fps: {options.get('max_fps')!r}"
+
+        job = server.job_queue.get(prompt_id)
+        if job is None or job['status'] in JobStatus.FINISHED:
+            return None
+        server.previews.subscribe(
+            prompt_id,
+            request.sid,
+            image_format=str(options.get('format', 'jpeg')).lower(),
+            max_fps=max_fps
+        )
+        return None
+
     @socketio.on('connect')
     def handle_connect():
         """Handle client connection"""
@@ -37,6 +74,8 @@ def register_handlers(socketio, server):
         """Handle client disconnection"""
         client_id = request.sid
         logger.info(f"Client disconnected: {client_id}")
+        if server.previews is not None:
+            server.previews.remove_client(client_id)
 
     @socketio.on('get_nodes')
     def handle_get_nodes(data):
@@ -59,7 +98,7 @@ def register_handlers(socketio, server):
             # Build response
             nodes = []
             for name in node_names:
-                node_info = registry.get_info(name)
+                node_info = registry.get_summary(name)
                 if node_info:
                     nodes.append({
                         'name': name,
@@ -110,17 +149,22 @@ def register_handlers(socketio, server):
     @socketio.on('execute_workflow')
     def handle_execute_workflow(data):
         """
-        Execute a workflow
+        Queue a workflow
+
+        Status, progress and result events are sent to the prompt_id room,
+        step previews as binary 'latent_preview' events to this client.
 
         Args:
             data: {
                 workflow: dict,
-                prompt_id: optional string
+                prompt_id: optional string,
+                priority: optional int,
+                preview: optional true or {format: jpeg|webp|png, max_fps: float}
             }
         """
         try:
             workflow = data.get('workflow')
-            prompt_id = data.get('prompt_id', 'default')
+            prompt_id = data.get('prompt_id') or str(uuid.uuid4())
 
             if not workflow:
                 emit('error', {'error': 'workflow is required'})
@@ -129,44 +173,50 @@ def register_handlers(socketio, server):
             # Join room for this prompt
             join_room(prompt_id)
 
-            # Emit status
-            emit('workflow_status', {
-                'prompt_id': prompt_id,
-                'status': 'started'
-            }, room=prompt_id)
-
-            # Execute workflow
-            from ..execution.executor import WorkflowExecutor
-            executor = WorkflowExecutor(server.registry, server.engine)
-
-            # This should be async in production
-            result = executor.execute(workflow, prompt_id)
-
-            # Emit result
-            if result['success']:
-                emit('workflow_completed', {
-                    'prompt_id': prompt_id,
-                    'result': result
-                }, room=prompt_id)
-            else:
-                emit('workflow_failed', {
-                    'prompt_id': prompt_id,
-                    'error': result.get('error')
-                }, room=prompt_id)
+            server.job_queue.submit(
+                workflow,
+                prompt_id=prompt_id,
+                client_id=request.sid,
+                priority=int(data.get('priority', 0))
+            )
+
+            error = subscribe_previews(prompt_id, data.get('preview'))
+            if error:
+                emit('error', {'error': error})
 
         except Exception as e:
-            logger.error(f"Failed to execute workflow: {e}")
+            logger.error(f"Failed to queue workflow: {e}")
             emit('workflow_failed', {
                 'prompt_id': data.get('prompt_id', 'default'),
                 'error': str(e)
             })
 
+    @socketio.on('cancel_workflow')
+    def handle_cancel_workflow(data):
+        """
+        Cancel a queued or running workflow
+
+        Args:
+            data: {prompt_id: string}
+        """
+        prompt_id = data.get('prompt_id') if data else None
+        if not prompt_id:
+            emit('error', {'error': 'prompt_id is required'})
+            return
+
+        status = server.job_queue.cancel(prompt_id)
+        if status is None:
+            emit('error', {'error': f'Unknown prompt_id: {prompt_id}'})
+
     @socketio.on('join_room')
     def handle_join_room(data):
-        """Join a room for receiving updates"""
+        """Join a room for receiving updates (previews of a prompt_id room with the 'preview' option)"""
         room = data.get('room')
         if room:
             join_room(room)
+            error = subscribe_previews(room, data.get('preview'))
+            if error:
+                emit('error', {'error': error})
             emit('joined_room', {'room': room})
 
     @socketio.on('leave_room')
@@ -175,8 +225,16 @@ def register_handlers(socketio, server):
         room = data.get('room')
         if room:
             leave_room(room)
+            if server.previews is not None:
+                server.previews.unsubscribe(room, request.sid)
             emit('left_room', {'room': room})
 
+    @socketio.on('preview_ack')
+    def handle_preview_ack(data):
+        """Acknowledge a preview frame, for clients that cannot answer emit callbacks"""
+        if server.previews is not None and data and 'frame_id' in data:
+            server.previews.acknowledge(request.sid, int(data['frame_id']))
+
     @socketio.on('ping')
     def handle_ping():
         """Handle ping request"""
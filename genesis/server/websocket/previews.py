@@ -0,0 +1,263 @@
+"""
+Genesis Preview Streaming
+Per-step latent previews sent to websocket clients as compressed binary frames
+Author: eddy
+"""
+
+import io
+import time
+import struct
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# Binary frame image type, same values as ComfyUI's preview messages (WEBP added)
+IMAGE_TYPES = {'jpeg': 1, 'png': 2, 'webp': 3}
+
+
+class PreviewClient:
+    """Preview settings and in-flight frames of one websocket client"""
+
+    def __init__(self, sid: str, image_format: str = 'jpeg', max_fps: float = 2.0):
+        self.sid = sid
+        self.image_format = image_format if image_format in IMAGE_TYPES else 'jpeg'
+        self.max_fps = max_fps
+        self.last_sent = 0.0
+        # Send times of frames not acknowledged yet
+        self.in_flight: Dict[int, float] = {}
+        self.sent = 0
+        self.dropped = 0
+
+
+class PreviewStreamer:
+    """
+    Encodes step previews and sends them to the clients of a job
+
+    - the sampler thread only stores the newest preview per job (submit is
+      non-blocking), an encoder thread compresses it to JPEG/WebP once per
+      format and sends it as a binary 'latent_preview' event
+    - per client rate limit (max_fps)
+    - backpressure: a client with max_in_flight unacknowledged frames gets no
+      new frames, newer previews replace the ones it could not take (drop
+      policy keeps only the latest). Frames not acknowledged within
+      ack_timeout are considered lost, so clients without acks still receive
+      previews at a reduced rate
+    """
+
+    def __init__(self, socketio, max_size: int = 512, quality: int = 80,
+                 max_in_flight: int = 2, ack_timeout: float = 5.0):
+        """
+        Initialize streamer
+
+        Args:
+            socketio: Flask-SocketIO instance
+            max_size: Longest preview side in pixels
+            quality: JPEG/WebP quality
+            max_in_flight: Unacknowledged frames allowed per client
+            ack_timeout: Seconds after which an unacknowledged frame is dropped from the window
+        """
+        self.socketio = socketio
+        self.max_size = max_size
+        self.quality = quality
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+
+        self.lock = threading.Lock()
+        self.subscribers: Dict[str, Dict[str, PreviewClient]] = {}
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self.wakeup = threading.Event()
+        self.running = True
+        self._frame_id = 0
+
+        self.stats = {
+            'submitted': 0,
+            'replaced': 0,
+            'sent': 0,
+            'dropped': 0,
+        }
+
+        self.worker = threading.Thread(target=self._encode_loop, daemon=True, name="GenesisPreviewEncoder")
+        self.worker.start()
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, prompt_id: str, sid: str, image_format: str = 'jpeg', max_fps: float = 2.0):
+        """Send previews of a job to a client"""
+        with self.lock:
+            self.subscribers.setdefault(prompt_id, {})[sid] = PreviewClient(sid, image_format, max_fps)
+
+    def unsubscribe(self, prompt_id: str, sid: str):
+        with self.lock:
+            clients = self.subscribers.get(prompt_id)
+            if clients is not None:
+                clients.pop(sid, None)
+                if not clients:
+                    del self.subscribers[prompt_id]
+
+    def remove_client(self, sid: str):
+        """Forget a disconnected client"""
+        with self.lock:
+            for prompt_id in list(self.subscribers):
+                self.subscribers[prompt_id].pop(sid, None)
+                if not self.subscribers[prompt_id]:
+                    del self.subscribers[prompt_id]
+
+    def has_subscribers(self, prompt_id: str) -> bool:
+        """Whether any client receives previews of a job"""
+        with self.lock:
+            return bool(self.subscribers.get(prompt_id))
+
+    def finish(self, prompt_id: str):
+        """Drop state of a finished job"""
+        with self.lock:
+            self.subscribers.pop(prompt_id, None)
+            self.latest.pop(prompt_id, None)
+
+    # ------------------------------------------------------------------
+    # Frames
+    # ------------------------------------------------------------------
+
+    def submit(self, prompt_id: str, preview: Any, node_id: Optional[str] = None,
+               step: Optional[int] = None, steps: Optional[int] = None):
+        """
+        Queue a preview of a job, replacing one that was not encoded yet
+
+        Args:
+            prompt_id: Job ID
+            preview: ProgressBar preview: (format, PIL image, max size) or a PIL image
+            node_id: Node that produced the preview
+            step: Current step
+            steps: Total steps
+        """
+        with self.lock:
+            if prompt_id not in self.subscribers:
+                return
+            if prompt_id in self.latest:
+                self.stats['replaced'] += 1
+            self.latest[prompt_id] = {'preview': preview, 'node': node_id, 'step': step, 'steps': steps}
+            self.stats['submitted'] += 1
+        self.wakeup.set()
+
+    def acknowledge(self, sid: str, frame_id: int):
+        """Client received a frame"""
+        with self.lock:
+            for clients in self.subscribers.values():
+                client = clients.get(sid)
+                if client is not None:
+                    client.in_flight.pop(frame_id, None)
+
+    def _encode(self, preview: Any, image_format: str) -> Optional[bytes]:
+        max_size = self.max_size
+        if isinstance(preview, tuple):
+            _, image, preview_max = preview
+            max_size = min(max_size, preview_max or max_size)
+        else:
+            image = preview
+        if not PIL_AVAILABLE or not isinstance(image, Image.Image):
+            return None
+
+        if max(image.size) > max_size:
+            image = image.copy()
+            image.thumbnail((max_size, max_size), Image.BILINEAR)
+        buffer = io.BytesIO()
+        if image_format == 'webp':
+            image.save(buffer, format='WEBP', quality=self.quality, method=0)
+        elif image_format == 'png':
+            image.save(buffer, format='PNG', compress_level=1)
+        else:
+            image.convert('RGB').save(buffer, format='JPEG', quality=self.quality)
+        return buffer.getvalue()
+
+    def _ready_clients(self, prompt_id: str, now: float):
+        """Clients of a job that take a frame now, counts the others as dropped"""
+        ready = []
+        for client in self.subscribers.get(prompt_id, {}).values():
+            for frame_id, sent_at in list(client.in_flight.items()):
+                if now - sent_at > self.ack_timeout:
+                    del client.in_flight[frame_id]
+            if client.max_fps > 0 and now - client.last_sent < 1.0 / client.max_fps:
+                client.dropped += 1
+                self.stats['dropped'] += 1
+            elif len(client.in_flight) >= self.max_in_flight:
+                client.dropped += 1
+                self.stats['dropped'] += 1
+            else:
+                ready.append(client)
+        return ready
+
+    def _encode_loop(self):
+        while self.running:
+            self.wakeup.wait(timeout=1.0)
+            self.wakeup.clear()
+            with self.lock:
+                pending, self.latest = self.latest, {}
+
+            for prompt_id, frame in pending.items():
+                now = time.time()
+                with self.lock:
+                    clients = self._ready_clients(prompt_id, now)
+                if not clients:
+                    continue
+
+                encoded = {}
+                for client in clients:
+                    if client.image_format not in encoded:
+                        try:
+                            encoded[client.image_format] = self._encode(frame['preview'], client.image_format)
+                        except Exception as e:
+                            logger.warning(f"Preview encoding failed: {e}")
+                            encoded[client.image_format] = None
+                    data = encoded[client.image_format]
+                    if data is None:
+                        continue
+                    self._send(prompt_id, client, frame, data)
+
+    def _send(self, prompt_id: str, client: PreviewClient, frame: Dict[str, Any], data: bytes):
+        with self.lock:
+            self._frame_id += 1
+            frame_id = self._frame_id
+            client.in_flight[frame_id] = time.time()
+            client.last_sent = time.time()
+            client.sent += 1
+            self.stats['sent'] += 1
+
+        # Binary header like ComfyUI previews: event type 1 (preview image), image type
+        header = struct.pack('>II', 1, IMAGE_TYPES[client.image_format])
+        meta = {
+            'prompt_id': prompt_id,
+            'frame_id': frame_id,
+            'node': frame['node'],
+            'step': frame['step'],
+            'steps': frame['steps'],
+            'format': client.image_format,
+        }
+        try:
+            self.socketio.emit('latent_preview', meta, header + data, to=client.sid,
+                               callback=lambda *_: self.acknowledge(client.sid, frame_id))
+        except Exception as e:
+            logger.debug(f"Failed to send preview to {client.sid}: {e}")
+            self.acknowledge(client.sid, frame_id)
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        self.worker.join(timeout=2.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                **self.stats,
+                'jobs': len(self.subscribers),
+                'clients': sum(len(c) for c in self.subscribers.values()),
+            }
@@ -163,7 +163,8 @@ class StableDiffusionPipeline:
         steps: int = 20,
         cfg_scale: float = 7.0,
         seed: Optional[int] = None,
-        callback: Optional[Callable] = None
+        callback: Optional[Callable] = None,
+        output_type: str = "pil"
     ) -> Image.Image:
         """
         Generate image from text prompt
@@ -177,9 +178,10 @@ class StableDiffusionPipeline:
             cfg_scale: Guidance scale
             seed: Random seed
             callback: Progress callback(step, total_steps)
+            output_type: "pil" or "latent" (scaled latents, decoded by the caller)
 
         Returns:
-            Generated PIL Image
+            Generated PIL Image (or latents)
         """
         if not self._initialized:
             raise RuntimeError("Pipeline not initialized. Call load_from_pretrained() or load_from_state_dict() first")
@@ -238,9 +240,16 @@ class StableDiffusionPipeline:
             if callback:
                 callback(i + 1, steps)
 
+        if output_type == "latent":
+            return latents
+
         latents = 1 / 0.18215 * latents
         image = self.vae.decode(latents).sample
 
+        return self.to_image(image)
+
+    def to_image(self, image: torch.Tensor) -> Image.Image:
+        """Convert decoded VAE output [B, C, H, W] in [-1, 1] to a PIL Image (first batch entry)"""
         image = (image / 2 + 0.5).clamp(0, 1)
         image = image.cpu().permute(0, 2, 3, 1).float().numpy()
         image = (image[0] * 255).astype(np.uint8)